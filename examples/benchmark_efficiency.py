@@ -34,12 +34,11 @@ import json
 # External modules
 import xarray as xr
 import numpy as np
-from mpi4py.futures import MPIPoolExecutor
 import pandas as pd
 
 # Internal modules
 import pytassim
-from pytassim.assimilation.filter import DistributedLETKFUncorr
+from pytassim.assimilation.filter import ParallelLETKFUncorr
 from pytassim.localization import GaspariCohn
 from pytassim.obs_ops.base_ops import BaseOperator
 
@@ -112,7 +111,7 @@ def main(args):
     for workers in worker_range:
         logger.warning('Starting with {0:d} workers'.format(workers))
         with get_executor(workers=workers, backend=args.backend) as pool:
-            letkf = DistributedLETKFUncorr(
+            letkf = ParallelLETKFUncorr(
                 pool=pool, chunksize=args.chunksize,
                 localization=localization, inf_factor=1.1
             )
@@ -144,6 +143,7 @@ def write_csv(path, dataframe, header=None):
 
 def get_executor(workers=4, backend='thread'):
     if backend == 'mpi':
+        from mpi4py.futures import MPIPoolExecutor
         executor = MPIPoolExecutor(max_workers=workers)
     elif backend == 'process':
         executor = ProcessPoolExecutor(max_workers=workers)
@@ -161,7 +161,7 @@ def get_worker_range(max_workers):
 
 
 def distance_func(x_grid, y_grid):
-    dist = np.abs(x_grid-y_grid)
+    dist = np.abs(x_grid-y_grid)[..., 0]
     return dist
 
 
@@ -169,7 +169,7 @@ def get_data(len_grid, ens_size, nr_obs):
     back_state = get_state_data(len_grid, ens_size)
     obs_state = get_obs_data(len_grid, nr_obs)
     obs_operator = IdentityOperator(len_grid=len_grid, nr_obs=nr_obs)
-    obs_state.obs.operator = obs_operator.get_obs_method
+    obs_state.obs.operator = obs_operator
     return back_state, obs_state
 
 
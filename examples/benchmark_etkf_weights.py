@@ -0,0 +1,122 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+import time
+import argparse
+
+# External modules
+import torch
+
+# Internal modules
+from pytassim.assimilation.filter.etkf_core import ETKFWeightsModule
+from pytassim.assimilation.utils import evd
+
+
+logger = logging.getLogger(__name__)
+
+torch.manual_seed(42)
+
+parser = argparse.ArgumentParser(description='ETKF weights Benchmark')
+parser.add_argument(
+    '-b', '--batch_size',
+    help='The number of batched weight estimations',
+    type=int, default=256
+)
+parser.add_argument(
+    '-k', '--ens_sizes',
+    help='The ensemble sizes',
+    type=int, nargs='+', default=[20, 50, 100, 200]
+)
+parser.add_argument(
+    '-n', '--nr_obs',
+    help='Number of local observations', type=int, default=100
+)
+parser.add_argument(
+    '-t', '--nr_times',
+    help='Number of timing repetitions', type=int, default=5
+)
+
+
+def reference_weights(normed_perts, normed_obs, inf_factor=1.):
+    """
+    The reference weight estimation with materialized diagonal matrices and
+    two reconstructions of the eigendecomposition.
+    """
+    def rev_evd(evals, evects):
+        rev_mat = torch.einsum('...ij,...jk->...ik', evects,
+                               torch.diag_embed(evals))
+        return torch.einsum('...ij,...kj->...ik', rev_mat, evects)
+
+    ens_size = normed_perts.shape[-2]
+    kernel_perts = torch.einsum('...ij,...kj->...ik', normed_perts,
+                                normed_perts)
+    evals, evects, evals_inv = evd(kernel_perts, (ens_size-1) / inf_factor)
+    cov_analysed = rev_evd(evals_inv, evects)
+    kernel_obs = torch.einsum('...ij,...kj->...ik', normed_perts, normed_obs)
+    w_mean = torch.einsum('...ij,...jk->...ik', cov_analysed, kernel_obs)
+    w_perts = rev_evd(((ens_size-1) * evals_inv).sqrt(), evects)
+    return w_mean + w_perts, w_mean, w_perts, cov_analysed
+
+
+def measure(func, normed_perts, normed_obs, nr_times):
+    durations = []
+    for _ in range(nr_times):
+        start_time = time.perf_counter()
+        _ = func(normed_perts, normed_obs)
+        durations.append(time.perf_counter()-start_time)
+    return min(durations)
+
+
+def main():
+    args = parser.parse_args()
+    weights_module = ETKFWeightsModule(1.)
+    for ens_size in args.ens_sizes:
+        normed_perts = torch.randn(args.batch_size, ens_size, args.nr_obs,
+                                   dtype=torch.float64)
+        normed_perts -= normed_perts.mean(dim=-2, keepdim=True)
+        normed_obs = torch.randn(args.batch_size, 1, args.nr_obs,
+                                 dtype=torch.float64)
+        torch.testing.assert_close(
+            weights_module(normed_perts, normed_obs)[0],
+            reference_weights(normed_perts, normed_obs)[0]
+        )
+        ref_duration = measure(reference_weights, normed_perts, normed_obs,
+                               args.nr_times)
+        fused_duration = measure(weights_module, normed_perts, normed_obs,
+                                 args.nr_times)
+        print(
+            '({0:d}, {1:d}, {1:d}): reference {2:.4f} s, fused {3:.4f} s, '
+            'speedup {4:.2f}'.format(
+                args.batch_size, ens_size, ref_duration, fused_duration,
+                ref_duration / fused_duration
+            )
+        )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
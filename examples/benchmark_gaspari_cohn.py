@@ -0,0 +1,151 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+import time
+import argparse
+import warnings
+
+# External modules
+import numpy as np
+import torch
+
+# Internal modules
+from pytassim.localization.gaspari_cohn import gaspari_cohn_taper, \
+    gaspari_cohn_inf_taper
+
+
+logger = logging.getLogger(__name__)
+
+rnd = np.random.RandomState(42)
+
+parser = argparse.ArgumentParser(description='Gaspari-Cohn Benchmark')
+parser.add_argument(
+    '-s', '--sizes',
+    help='The number of distance evaluations',
+    type=int, nargs='+', default=[10**6, 10**7]
+)
+parser.add_argument(
+    '-f', '--support_fraction',
+    help='The fraction of distances within the support of the function',
+    type=float, default=0.8
+)
+parser.add_argument(
+    '-t', '--nr_times',
+    help='Number of timing repetitions', type=int, default=3
+)
+
+
+def gc_f1(dist):
+    return -dist**5/4 + dist**4/2 + 5*dist**3/8 - 5*dist**2/3 + 1
+
+
+def gc_f2(dist):
+    return dist**5/12 - dist**4/2 + 5*dist**3/8 + 5*dist**2/3 - 5*dist + 4 \
+        - 2/(3*dist)
+
+
+def gc_inf_f1(dist):
+    return -28*dist**5/33 + 8*dist**4/11 + 20*dist**3/11 - 80*dist**2/33 + 1
+
+
+def gc_inf_f2(dist):
+    return 20*dist**5/33 - 16*dist**4/11 + 100*dist**2/33 - 45*dist/11 \
+        + 51/22 - 7/(44*dist)
+
+
+def gc_inf_f3(dist):
+    return -4*dist**5/11 + 16*dist**4/11 - 10*dist**3/11 - 100*dist**2/33 \
+        + 5*dist - 61/22 + 115/(132*dist)
+
+
+def gc_inf_f4(dist):
+    return 4*dist**5/33 - 8*dist**4/11 + 10*dist**3/11 + 80*dist**2/33 \
+        - 80*dist/11 + 64/11 - 32/(33*dist)
+
+
+def masked_taper(dist_radius, funcs, thres):
+    """
+    The reference evaluation of the Gaspari-Cohn function with boolean masks
+    and the separated polynomials.
+    """
+    taper = np.zeros(dist_radius.shape, dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for func, upper in zip(funcs, thres):
+            cond = dist_radius < upper
+            taper[cond] = func(dist_radius[cond])
+    return taper
+
+
+def gc_reference(dist_radius):
+    return masked_taper(
+        dist_radius, [gc_f2, gc_f1], [2, 1]
+    )
+
+
+def gc_inf_reference(dist_radius):
+    return masked_taper(
+        dist_radius,
+        [gc_inf_f4, gc_inf_f3, gc_inf_f2, gc_inf_f1],
+        [2, 1.5, 1, 0.5]
+    )
+
+
+def measure(func, dist_radius, nr_times):
+    durations = []
+    for _ in range(nr_times):
+        start_time = time.perf_counter()
+        _ = func(dist_radius)
+        durations.append(time.perf_counter()-start_time)
+    return min(durations)
+
+
+def main():
+    args = parser.parse_args()
+    candidates = (
+        ('GC numpy masked', gc_reference, False),
+        ('GC numpy fused', gaspari_cohn_taper, False),
+        ('GC torch fused', gaspari_cohn_taper, True),
+        ('GCInf numpy masked', gc_inf_reference, False),
+        ('GCInf numpy fused', gaspari_cohn_inf_taper, False),
+        ('GCInf torch fused', gaspari_cohn_inf_taper, True),
+    )
+    for size in args.sizes:
+        dist_radius = rnd.uniform(0, 2 / args.support_fraction, size=size)
+        dist_tensor = torch.from_numpy(dist_radius)
+        for name, func, use_torch in candidates:
+            duration = measure(
+                func, dist_tensor if use_torch else dist_radius,
+                args.nr_times
+            )
+            print('{0:>20s} {1:>10d}: {2:.4f} s'.format(name, size,
+                                                        duration))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
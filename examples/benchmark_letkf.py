@@ -71,9 +71,10 @@ def main(len_grid=10000, nr_obs=1000, ens_size=50, loc_radius=20):
     back_state = get_state_data(len_grid, ens_size)
     obs_state = get_obs_data(len_grid, nr_obs)
     obs_operator = IdentityOperator(len_grid=len_grid, nr_obs=nr_obs)
-    obs_state.obs.operator = obs_operator.get_obs_method
+    obs_state.obs.operator = obs_operator
 
-    localization = GaspariCohn(length_scale=loc_radius, dist_func=distance_func)
+    localization = GaspariCohn(length_scale=loc_radius, dist_func=distance_func,
+                               use_index=True)
     letkf = LETKFUncorr(localization=localization, inf_factor=1.1)
     start_time = time.time()
     _ = letkf.assimilate(back_state, obs_state)
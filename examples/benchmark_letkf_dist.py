@@ -33,11 +33,10 @@ from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 # External modules
 import xarray as xr
 import numpy as np
-from mpi4py.futures import MPIPoolExecutor
 
 # Internal modules
 import pytassim
-from pytassim.assimilation.filter import DistributedLETKFUncorr
+from pytassim.assimilation.filter import ParallelLETKFUncorr
 from pytassim.localization import GaspariCohn
 from pytassim.obs_ops.base_ops import BaseOperator
 
@@ -88,10 +87,10 @@ def main(pool, len_grid=10000, nr_obs=1000, ens_size=50, loc_radius=20,
     back_state = get_state_data(len_grid, ens_size)
     obs_state = get_obs_data(len_grid, nr_obs)
     obs_operator = IdentityOperator(len_grid=len_grid, nr_obs=nr_obs)
-    obs_state.obs.operator = obs_operator.get_obs_method
+    obs_state.obs.operator = obs_operator
 
     localization = GaspariCohn(length_scale=loc_radius, dist_func=distance_func)
-    letkf = DistributedLETKFUncorr(
+    letkf = ParallelLETKFUncorr(
         pool=pool, chunksize=chunksize, localization=localization,
         inf_factor=1.1
     )
@@ -104,6 +103,7 @@ def main(pool, len_grid=10000, nr_obs=1000, ens_size=50, loc_radius=20,
 
 def get_executor(max_workers=4, backend='thread'):
     if backend == 'mpi':
+        from mpi4py.futures import MPIPoolExecutor
         executor = MPIPoolExecutor(max_workers=max_workers)
     elif backend == 'process':
         executor = ProcessPoolExecutor(max_workers=max_workers)
@@ -113,7 +113,7 @@ def get_executor(max_workers=4, backend='thread'):
 
 
 def distance_func(x_grid, y_grid):
-    dist = np.abs(x_grid-y_grid)
+    dist = np.abs(x_grid-y_grid)[..., 0]
     return dist
 
 
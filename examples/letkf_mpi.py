@@ -0,0 +1,190 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+# System modules
+import logging
+import datetime
+import time
+import os
+import argparse
+
+# External modules
+import xarray as xr
+import numpy as np
+from mpi4py import MPI
+
+# Internal modules
+import pytassim
+from pytassim.assimilation.filter import LETKFUncorr, MPILETKFUncorr
+from pytassim.localization import GaspariCohn
+
+
+logger = logging.getLogger(__name__)
+
+rnd = np.random.RandomState(42)
+
+parser = argparse.ArgumentParser(
+    description='MPI LETKF, run e.g. with mpirun -n 4 python letkf_mpi.py'
+)
+parser.add_argument(
+    '-k', '--ens_size',
+    help='The number of ensemble members',
+    type=int, default=40
+)
+parser.add_argument(
+    '-l', '--len_grid',
+    help='Length of state grid', type=int, default=10000
+)
+parser.add_argument(
+    '-n', '--nr_obs',
+    help='Number of observations (should be less/equal than state grid length)',
+    type=int, default=1000
+)
+parser.add_argument(
+    '-r', '--loc_radius',
+    help='Localization radius in grid points',
+    type=int, default=20
+)
+parser.add_argument(
+    '-o', '--out_dir',
+    help='The local analysis of every rank is stored in this directory',
+    type=str, default=None
+)
+parser.add_argument(
+    '--check', action='store_true',
+    help='Compare the local analysis to the sequential LETKF'
+)
+
+
+def main(len_grid=10000, nr_obs=1000, ens_size=50, loc_radius=20,
+         out_dir=None, check=False):
+    comm = MPI.COMM_WORLD
+    back_state = get_state_data(len_grid, ens_size)
+    obs_state = get_obs_data(len_grid, nr_obs)
+    obs_state.obs.operator = nearest_operator
+
+    localization = GaspariCohn(length_scale=loc_radius, dist_func=distance_func,
+                               use_index=True)
+    letkf = MPILETKFUncorr(comm=comm, localization=localization,
+                           inf_factor=1.1)
+    local_slice = letkf.get_local_slice(len_grid)
+    local_state = back_state.isel(grid=local_slice)
+    grid_bounds = local_state.grid.values[[0, -1]]
+    obs_grid = obs_state.obs_grid_1.values
+    local_obs = obs_state.isel(obs_grid_1=np.logical_and(
+        obs_grid >= grid_bounds[0]-0.5, obs_grid < grid_bounds[1]+0.5
+    ))
+    local_obs.obs.operator = nearest_operator
+
+    start_time = time.time()
+    analysis = letkf.assimilate(local_state, local_obs)
+    logger.info(
+        'Rank {0:d}: assimilation duration: {1:.2f} s'.format(
+            comm.Get_rank(), time.time() - start_time
+        )
+    )
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        analysis.to_netcdf(
+            os.path.join(out_dir, 'analysis_{0:04d}.nc'.format(comm.Get_rank()))
+        )
+    if check:
+        seq_analysis = LETKFUncorr(
+            localization=localization, inf_factor=1.1
+        ).assimilate(back_state, obs_state)
+        np.testing.assert_allclose(
+            analysis.values, seq_analysis.isel(grid=local_slice).values,
+            rtol=1E-5, atol=1E-8
+        )
+        logger.info('Rank {0:d}: analysis is equal to sequential '
+                    'LETKF'.format(comm.Get_rank()))
+
+
+def distance_func(x_grid, y_grid):
+    dist = np.abs(x_grid-y_grid)[..., 0]
+    return dist
+
+
+def nearest_operator(obs_ds, state):
+    pseudo_obs = state.sel(var_name='x').sel(
+        grid=obs_ds.obs_grid_1.values, method='nearest'
+    )
+    pseudo_obs = pseudo_obs.rename(grid='obs_grid_1')
+    pseudo_obs['time'] = obs_ds.time.values
+    pseudo_obs['obs_grid_1'] = obs_ds.obs_grid_1.values
+    return pseudo_obs
+
+
+def get_state_data(len_grid=10000, ens_size=50):
+    grid_range = np.arange(len_grid)
+    ens_range = np.arange(ens_size)
+
+    data = rnd.normal(size=(1, 1, ens_size, len_grid))
+    state_array = xr.DataArray(
+        data=data,
+        coords={
+            'var_name': ['x', ],
+            'time': [datetime.datetime(1992, 12, 25, 8), ],
+            'ensemble': ens_range,
+            'grid': grid_range
+        },
+        dims=['var_name', 'time', 'ensemble', 'grid']
+    )
+    return state_array
+
+
+def get_obs_data(len_grid=10000, nr_obs=1000):
+    grid_range = np.linspace(start=0, stop=len_grid, num=nr_obs, endpoint=False)
+    data = rnd.normal(size=(1, nr_obs))
+    obs_data = xr.DataArray(
+        data=data,
+        coords={
+            'time': [datetime.datetime(1992, 12, 25, 8), ],
+            'obs_grid_1': grid_range
+        },
+        dims=['time', 'obs_grid_1']
+    )
+    obs_cov = xr.DataArray(
+        data=[1, ] * nr_obs,
+        coords={
+            'obs_grid_1': grid_range
+        },
+        dims=['obs_grid_1']
+    )
+    observations = xr.Dataset(
+        {
+            'observations': obs_data,
+            'covariance': obs_cov
+        }
+    )
+    return observations
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = parser.parse_args()
+    main(len_grid=args.len_grid, nr_obs=args.nr_obs, ens_size=args.ens_size,
+         loc_radius=args.loc_radius, out_dir=args.out_dir, check=args.check)
@@ -39,6 +39,7 @@ import numpy as np
 
 # Internal modules
 from .utils import grid_to_array
+from .covariance import BlockDiagonalMatrix
 
 from pytassim.state import StateError
 from pytassim.observation import ObservationError
@@ -55,6 +56,8 @@ class BaseAssimilation(object):
     assimilation, one needs to overwrite
     :py:meth:`~pytassim.assimilation.base.BaseAssimilation.update_state`.
     """
+    _skip_without_obs = True
+
     def __init__(self, smoother: bool = False, gpu: bool = False,
                  pre_transform: Union[None, Iterable[BaseTransformer]] = None,
                  post_transform: Union[None, Iterable[BaseTransformer]] = None):
@@ -74,7 +77,11 @@ class BaseAssimilation(object):
             self,
             *states: Tuple[np.ndarray]
     ) -> Tuple[torch.Tensor]:
-        torch_states = [torch.from_numpy(s).to(self.dtype) for s in states]
+        torch_states = [
+            s.to_torch(self.dtype) if isinstance(s, BlockDiagonalMatrix)
+            else torch.from_numpy(s).to(self.dtype)
+            for s in states
+        ]
         if self.gpu:
             torch_states = [s.cuda() for s in torch_states]
         return torch_states
@@ -247,6 +254,70 @@ class BaseAssimilation(object):
         """
         pass
 
+    def _prepare_assimilation(
+            self,
+            state: xr.DataArray,
+            observations: Union[xr.Dataset, Iterable[xr.Dataset]],
+            pseudo_state: Union[xr.DataArray, None] = None,
+            analysis_time: Any = None
+    ) -> Tuple[xr.DataArray, Tuple[xr.Dataset], xr.DataArray, Any]:
+        """
+        Validates given state and observations, selects the analysis time if
+        not in smoother mode and applies set pre-transformers. Returns the
+        background state, the observations, the pseudo state and the analysis
+        time, which are used to update the state.
+        """
+        if not isinstance(observations, (list, set, tuple)):
+            observations = (observations, )
+        if pseudo_state is None:
+            pseudo_state = state
+        self._validate_state(state)
+        self._validate_state(pseudo_state)
+        self._validate_observations(observations)
+        analysis_time = self._get_analysis_time(state, analysis_time)
+        if isinstance(analysis_time, datetime.datetime):
+            logger.info(
+                'Analysis time: {0:s}'.format(
+                    analysis_time.strftime('%Y-%m-%d %H:%M UTC')
+                )
+            )
+        if self.smoother:
+            back_state = state
+        else:
+            logger.info('Assimilation in non-smoother mode')
+            pseudo_state = pseudo_state.sel(time=[analysis_time, ])
+            back_state = state.sel(time=[analysis_time, ])
+            sel_obs = []
+            for obs in observations:
+                tmp_obs = obs.sel(time=[analysis_time, ])
+                tmp_obs.obs.operator = obs.obs.operator
+                sel_obs.append(tmp_obs)
+            observations = sel_obs
+        if self.pre_transform:
+            for trans in self.pre_transform:
+                back_state, observations, pseudo_state = trans.pre(
+                    back_state, observations, pseudo_state
+                )
+        return back_state, observations, pseudo_state, analysis_time
+
+    def _post_process(
+            self,
+            analysis: xr.DataArray,
+            back_state: xr.DataArray,
+            observations: Iterable[xr.Dataset],
+            pseudo_state: xr.DataArray
+    ) -> xr.DataArray:
+        """
+        Applies set post-transformers to given analysis and validates the
+        post-processed analysis.
+        """
+        if self.post_transform:
+            for trans in self.post_transform:
+                analysis = trans.post(analysis, back_state, observations,
+                                      pseudo_state)
+        self._validate_state(analysis)
+        return analysis
+
     def assimilate(
             self,
             state: xr.DataArray,
@@ -301,50 +372,21 @@ class BaseAssimilation(object):
         """
         start_time = time.time()
         logger.info('Starting assimilation')
-        if not observations:
+        if not observations and self._skip_without_obs:
             warnings.warn('No observation is given, I will return the '
                           'background state!', UserWarning)
             return state
-        if not isinstance(observations, (list, set, tuple)):
-            observations = (observations, )
-        if pseudo_state is None:
-            pseudo_state = state
-        self._validate_state(state)
-        self._validate_state(pseudo_state)
-        self._validate_observations(observations)
-        analysis_time = self._get_analysis_time(state, analysis_time)
-        if isinstance(analysis_time, datetime.datetime):
-            logger.info(
-                'Analysis time: {0:s}'.format(
-                    analysis_time.strftime('%Y-%m-%d %H:%M UTC')
-                )
-            )
-        if self.smoother:
-            back_state = state
-        else:
-            logger.info('Assimilation in non-smoother mode')
-            pseudo_state = pseudo_state.sel(time=[analysis_time, ])
-            back_state = state.sel(time=[analysis_time, ])
-            sel_obs = []
-            for obs in observations:
-                tmp_obs = obs.sel(time=[analysis_time, ])
-                tmp_obs.obs.operator = obs.obs.operator
-                sel_obs.append(tmp_obs)
-            observations = sel_obs
-        if self.pre_transform:
-            for trans in self.pre_transform:
-                back_state, observations, pseudo_state = trans.pre(
-                    back_state, observations, pseudo_state
-                )
+        elif not observations:
+            observations = ()
+        back_state, observations, pseudo_state, analysis_time = \
+            self._prepare_assimilation(state, observations, pseudo_state,
+                                       analysis_time)
         logger.info('Finished with general preparation')
         analysis = self.update_state(back_state, observations, pseudo_state,
                                      analysis_time)
         logger.info('Created the analysis, starting with post-processing')
-        if self.post_transform:
-            for trans in self.post_transform:
-                analysis = trans.post(analysis, back_state, observations,
+        analysis = self._post_process(analysis, back_state, observations,
                                       pseudo_state)
-        self._validate_state(analysis)
         end_time = time.time()
         logger.info('Finished assimilation after {0:.2f} s'.format(
             end_time-start_time
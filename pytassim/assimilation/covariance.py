@@ -0,0 +1,171 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+from collections import OrderedDict
+from typing import Union, Iterable, List, Tuple
+
+# External modules
+import numpy as np
+import scipy.linalg
+import torch
+
+# Internal modules
+
+
+logger = logging.getLogger(__name__)
+
+
+class BlockDiagonalMatrix(object):
+    """
+    A block-diagonal matrix, which is stored as list of its square diagonal
+    blocks. Observation subsets are independent of each other, such that
+    their concatenated covariance is block-diagonal. The blocks are
+    decomposed and solved independently, without creating the dense matrix
+    or its dense inverse. Repeated blocks, e.g. the same covariance for
+    every time step, should be given as the same object and are then only
+    decomposed and solved once.
+
+    Parameters
+    ----------
+    blocks : iterable(:py:class:`numpy.ndarray` or :py:class:`torch.Tensor`)
+        The square diagonal blocks of this matrix. All blocks should be
+        either numpy arrays or torch tensors.
+    """
+    def __init__(
+            self,
+            blocks: Iterable[Union[np.ndarray, torch.Tensor]]
+    ):
+        self.blocks = list(blocks)
+
+    def __repr__(self) -> str:
+        return 'BlockDiagonalMatrix(shape={0}, n_blocks={1:d})'.format(
+            self.shape, len(self.blocks)
+        )
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        dense_matrix = self.to_dense()
+        if isinstance(dense_matrix, torch.Tensor):
+            dense_matrix = dense_matrix.detach().cpu().numpy()
+        return np.asarray(dense_matrix, dtype=dtype)
+
+    @property
+    def sizes(self) -> List[int]:
+        return [block.shape[-1] for block in self.blocks]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        size = sum(self.sizes)
+        return size, size
+
+    def _get_unique_blocks(self) -> OrderedDict:
+        """
+        Get the indices of every unique block object.
+        """
+        unique_blocks = OrderedDict()
+        for k, block in enumerate(self.blocks):
+            unique_blocks.setdefault(id(block), []).append(k)
+        return unique_blocks
+
+    def _apply_unique(self, func) -> "BlockDiagonalMatrix":
+        """
+        Applies given function once to every unique block.
+        """
+        new_blocks = [None] * len(self.blocks)
+        for block_inds in self._get_unique_blocks().values():
+            new_block = func(self.blocks[block_inds[0]])
+            for k in block_inds:
+                new_blocks[k] = new_block
+        return BlockDiagonalMatrix(new_blocks)
+
+    def to_dense(self) -> Union[np.ndarray, torch.Tensor]:
+        """
+        Creates the dense matrix. This should be only used for small matrices
+        or debugging purpose.
+        """
+        if not self.blocks:
+            return np.zeros((0, 0))
+        if isinstance(self.blocks[0], torch.Tensor):
+            return torch.block_diag(*self.blocks)
+        return scipy.linalg.block_diag(*self.blocks)
+
+    def to_torch(
+            self,
+            dtype: torch.dtype = torch.double,
+            device: Union[None, torch.device, str] = None
+    ) -> "BlockDiagonalMatrix":
+        """
+        Transfers the blocks into torch tensors with given dtype and device.
+        """
+        return self._apply_unique(
+            lambda block: torch.as_tensor(block).to(device=device, dtype=dtype)
+        )
+
+    def cuda(self) -> "BlockDiagonalMatrix":
+        return self._apply_unique(lambda block: block.cuda())
+
+    def cholesky(self) -> "BlockDiagonalMatrix":
+        """
+        Decomposes every block with a cholesky decomposition.
+
+        Returns
+        -------
+        chol_decomp : :py:class:`BlockDiagonalMatrix`
+            The block-diagonal lower triangular cholesky factor.
+        """
+        return self._apply_unique(torch.linalg.cholesky)
+
+    def solve_triangular(self, state: torch.Tensor) -> torch.Tensor:
+        """
+        Multiplies given state with the inverse of this lower triangular
+        matrix, :math:`\\mathbf{X}\\mathbf{L}^{-1}`. The last dimension of
+        the state is split into the blocks, which are solved by triangular
+        solves. Chunks belonging to the same block are solved together.
+
+        Parameters
+        ----------
+        state : :py:class:`torch.Tensor` (..., l)
+            This state is multiplied by the inverse, where the last dimension
+            has to match the size of this matrix.
+
+        Returns
+        -------
+        solved_state : :py:class:`torch.Tensor` (..., l)
+            The state multiplied by the inverse.
+        """
+        if not self.blocks:
+            return state
+        state_chunks = torch.split(state, self.sizes, dim=-1)
+        solved_chunks = [None] * len(self.blocks)
+        for block_inds in self._get_unique_blocks().values():
+            stacked_chunks = torch.stack([state_chunks[k] for k in block_inds])
+            stacked_chunks = torch.linalg.solve_triangular(
+                self.blocks[block_inds[0]], stacked_chunks, upper=False,
+                left=False
+            )
+            for k, solved in zip(block_inds, stacked_chunks):
+                solved_chunks[k] = solved
+        return torch.cat(solved_chunks, dim=-1)
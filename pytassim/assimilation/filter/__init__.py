@@ -1,6 +1,12 @@
 from .etkf import *
 from .letkf import *
 from .letkf_dist import *
+from .letkf_parallel import *
+from .letkf_shared import *
+from .letkf_mpi import *
 
 __all__ = ['ETKFCorr', 'ETKFUncorr', 'LETKFUncorr', 'LETKFCorr',
-           'DistributedLETKFCorr', 'DistributedLETKFUncorr']
+           'DistributedLETKFCorr', 'DistributedLETKFUncorr',
+           'ParallelLETKFCorr', 'ParallelLETKFUncorr',
+           'SharedMemoryLETKFCorr', 'SharedMemoryLETKFUncorr',
+           'MPILETKFCorr', 'MPILETKFUncorr']
@@ -0,0 +1,237 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+# External modules
+import torch
+
+# Internal modules
+from .module_cache import _get_module_key
+
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    'DecompositionCache',
+    'decomposition_cache'
+]
+
+
+class DecompositionCache(object):
+    """
+    Process-wide cache of the decompositions within
+    :py:class:`~pytassim.assimilation.filter.etkf_core.ETKFWeightsModule`.
+    The decompositions are independent of the inflation factor and keyed by
+    the values of the normalized perturbations and observations, the solver
+    and the configuration of the weights module without its inflation
+    factor. If the same background is assimilated with different inflation
+    factors, e.g. in inflation sweeps or adaptive inflation iterations, only
+    the weights are composed again from the cached decompositions, while the
+    decompositions are skipped. The cache is used by the ETKF and LETKF
+    analysers if it is activated by a positive number of maximum items. The
+    decompositions are never cached if the perturbations, the observations or
+    parameters of the weights module, apart from the inflation factor,
+    require gradients.
+
+    Parameters
+    ----------
+    max_items : int, optional
+        The maximum number of cached decompositions. For localized filters,
+        one decomposition is cached per batch of grid points. If this number
+        is exceeded, the least recently used decomposition is removed.
+        Default is 0, which deactivates the cache.
+    """
+    def __init__(self, max_items: int = 0):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._decompositions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._decompositions)
+
+    @property
+    def active(self) -> bool:
+        """
+        If the cache is activated.
+        """
+        return self.max_items > 0
+
+    @staticmethod
+    def _get_config_key(module: torch.nn.Module) -> Tuple:
+        """
+        Get the configuration key of given module without its inflation
+        factor.
+        """
+        return tuple(
+            entry for entry in _get_module_key(module)
+            if not (len(entry) == 3 and entry[:2] == ('', '_inf_factor'))
+        )
+
+    def is_cacheable(
+            self,
+            module: torch.nn.Module,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor
+    ) -> bool:
+        """
+        Checks if the decomposition of given module and tensors can be
+        cached. This is the case, if the cache is active and no gradients
+        are needed for the decomposition.
+        """
+        if not self.active:
+            return False
+        if normed_perts.requires_grad or normed_obs.requires_grad:
+            return False
+        return not any(
+            isinstance(entry[-1], tuple) and entry[-1][:1] == ('id', )
+            for entry in self._get_config_key(module)
+        )
+
+    def get_key(
+            self,
+            module: torch.nn.Module,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            solver: str
+    ) -> str:
+        """
+        Get the cache key for given module, tensors and solver.
+
+        Parameters
+        ----------
+        module : :py:class:`~pytassim.assimilation.filter.etkf_core.ETKFWeightsModule`
+            The configuration of this module without inflation factor is
+            used in the key.
+        normed_perts : :py:class:`torch.Tensor` (..., k, l)
+            The normalized ensemble perturbations.
+        normed_obs : :py:class:`torch.Tensor` (..., 1, l)
+            The normalized observations.
+        solver : str
+            The solver for the decomposition.
+
+        Returns
+        -------
+        key : str
+            The hexadecimal hash, which is used as key.
+        """
+        key_hash = hashlib.sha1()
+        key_hash.update(repr((self._get_config_key(module), solver)).encode())
+        for tensor in (normed_perts, normed_obs):
+            tensor = tensor.detach()
+            key_hash.update(str(
+                (tuple(tensor.shape), str(tensor.dtype), str(tensor.device))
+            ).encode())
+            key_hash.update(tensor.cpu().contiguous().numpy().tobytes())
+        return key_hash.hexdigest()
+
+    def _get_decomposition(
+            self,
+            module: torch.nn.Module,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            solver: str
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        key = self.get_key(module, normed_perts, normed_obs, solver)
+        with self._lock:
+            if key in self._decompositions:
+                self._decompositions.move_to_end(key)
+                self.hits += 1
+                return self._decompositions[key]
+        decomposition = module.decompose(normed_perts, normed_obs, solver)
+        with self._lock:
+            self.misses += 1
+            self._decompositions[key] = decomposition
+            while len(self._decompositions) > self.max_items:
+                self._decompositions.popitem(last=False)
+        return decomposition
+
+    def get_weights(
+            self,
+            module: torch.nn.Module,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Get the ensemble weights of given module for given perturbations and
+        observations. The decomposition is loaded from this cache if
+        possible, otherwise it is estimated and cached. Only the weights are
+        composed with the inflation factor of given module. If the
+        decomposition cannot be cached, the module is directly called.
+
+        Parameters
+        ----------
+        module : :py:class:`~pytassim.assimilation.filter.etkf_core.ETKFWeightsModule`
+            The weights are estimated with this module.
+        normed_perts : :py:class:`torch.Tensor` (..., k, l)
+            The normalized ensemble perturbations.
+        normed_obs : :py:class:`torch.Tensor` (..., 1, l)
+            The normalized observations.
+
+        Returns
+        -------
+        weights : :py:class:`torch.Tensor` (..., k, k)
+            The ensemble weights.
+        w_mean : :py:class:`torch.Tensor` (..., k, 1)
+            The ensemble mean weights.
+        w_perts : :py:class:`torch.Tensor` (..., k, k)
+            The ensemble perturbation weights.
+        cov_analysed : :py:class:`torch.Tensor` (..., k, k)
+            The analysed covariance in weight space.
+        """
+        solver = module.get_solver(*normed_perts.shape[-2:])
+        if solver == 'prior' or not self.is_cacheable(module, normed_perts,
+                                                      normed_obs):
+            return module(normed_perts, normed_obs)
+        module._test_sizes(normed_perts, normed_obs)
+        evects, evals, proj_obs = self._get_decomposition(
+            module, normed_perts, normed_obs, solver
+        )
+        w_mean, w_perts, cov_analysed = module.compose(
+            evects, evals, proj_obs, solver
+        )
+        weights = w_mean + w_perts
+        return weights, w_mean, w_perts, cov_analysed
+
+    def clear(self):
+        """
+        Removes all decompositions from this cache and resets the hits and
+        misses.
+        """
+        with self._lock:
+            self._decompositions.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+decomposition_cache = DecompositionCache()
@@ -26,7 +26,8 @@
 # System modules
 import logging
 import abc
-from typing import Union, Iterable, Tuple, List
+import warnings
+from typing import Union, Iterable, Tuple, List, Any
 
 # External modules
 import xarray as xr
@@ -172,6 +173,30 @@ class ETKFBase(FilterAssimilation):
             is on, then the time axis has only one element.
         """
         logger.info('####### {0:s} #######'.format(self._name))
+        state_mean, state_perts, normed_perts, normed_obs, state_grid, \
+            obs_grid = self._prepare_update(state, observations, pseudo_state)
+
+        logger.info('Create analysis perturbations')
+        analysis_perts = self._get_analysis_perts(
+            state_perts, normed_perts, normed_obs, state_grid, obs_grid
+        )
+
+        logger.info('Create analysis')
+        return self._create_analysis(state, state_mean, analysis_perts)
+
+    def _prepare_update(
+            self,
+            state: xr.DataArray,
+            observations: Union[xr.Dataset, Iterable[xr.Dataset]],
+            pseudo_state: xr.DataArray
+    ) -> Tuple[xr.DataArray, torch.Tensor, torch.Tensor, torch.Tensor,
+               pd.Index, np.ndarray]:
+        """
+        Prepares the parameter-independent quantities to update given state.
+        The observation operator is applied, the observations are
+        concatenated and normalised, and the state is split into its mean
+        and perturbations.
+        """
         logger.info('Starting with specific preparation')
         pseudo_obs, obs_state, obs_cov, obs_grid = self._get_states(
             pseudo_state, observations,
@@ -189,17 +214,174 @@ class ETKFBase(FilterAssimilation):
         state_mean, state_perts = state.state.split_mean_perts()
         state_grid = state_perts.indexes['grid']
         state_perts, = self._states_to_torch(state_perts.values)
+        return state_mean, state_perts, normed_perts, normed_obs, \
+            state_grid, obs_grid
 
-        logger.info('Create analysis perturbations')
-        analysis_perts = self.analyser(state_perts, normed_perts, normed_obs,
-                                       state_grid, obs_grid)
-
-        logger.info('Create analysis')
+    @staticmethod
+    def _create_analysis(
+            state: xr.DataArray,
+            state_mean: xr.DataArray,
+            analysis_perts: torch.Tensor
+    ) -> xr.DataArray:
+        """
+        Creates the analysis from given analysis perturbations and the mean
+        of given state.
+        """
         analysis_perts = state.copy(data=analysis_perts.numpy())
         analysis = analysis_perts + state_mean
         analysis = analysis.transpose('var_name', 'time', 'ensemble', 'grid')
         return analysis
 
+    def _get_sweep_localizations(
+            self,
+            localizations: Union[None, Iterable]
+    ) -> List:
+        """
+        Get the localizations of a hyper-parameter sweep. The global filter
+        cannot sweep over localizations.
+        """
+        if localizations is not None:
+            raise ValueError(
+                'Localizations can be only swept for localized filters!'
+            )
+        return [None]
+
+    def _set_sweep_localization(self, localization):
+        """
+        Sets given localization for a hyper-parameter sweep.
+        """
+        pass
+
+    @staticmethod
+    def _get_config_index(
+            inf_factors: np.ndarray,
+            localizations: List
+    ) -> Tuple[np.ndarray, dict]:
+        """
+        Get the index and coordinates of the configuration dimension for
+        given inflation factors and localizations.
+        """
+        n_configs = len(inf_factors) * len(localizations)
+        coords = {
+            'inf_factor': ('config', np.tile(inf_factors, len(localizations)))
+        }
+        if any(localization is not None for localization in localizations):
+            coords['localization'] = ('config', np.repeat(
+                [str(localization) for localization in localizations],
+                len(inf_factors)
+            ))
+        return np.arange(n_configs), coords
+
+    def sweep(
+            self,
+            state: xr.DataArray,
+            observations: Union[xr.Dataset, Iterable[xr.Dataset]],
+            inf_factors: Iterable[float],
+            localizations: Union[None, Iterable] = None,
+            pseudo_state: Union[xr.DataArray, None] = None,
+            analysis_time: Any = None
+    ) -> xr.DataArray:
+        """
+        Assimilates given observations for a grid of hyper-parameters in one
+        pass. The preparation of the states, the observation operator and the
+        normalisation of the observations are done once for all
+        configurations. The inflation factors become a batch dimension of the
+        weights module, such that the decompositions of the weights are
+        estimated only once for all inflation factors. Localizations are
+        swept one after another. The analyses are estimated with the analyser
+        of this filter in this process and are stacked along a new `config`
+        dimension, which is the product of the localizations and inflation
+        factors.
+
+        Parameters
+        ----------
+        state : :py:class:`xarray.DataArray`
+            This background state is updated for every configuration, as in
+            :py:meth:`~pytassim.assimilation.base.BaseAssimilation.assimilate`.
+        observations : :py:class:`xarray.Dataset` or \
+        iterable(:py:class:`xarray.Dataset`)
+            These observations are assimilated for every configuration.
+        inf_factors : iterable(float)
+            The inflation factors, which are swept.
+        localizations : iterable(localization) or None, optional
+            The localizations, which are swept, e.g.
+            :py:class:`~pytassim.localization.GaspariCohn` with different
+            length scales. Localizations can be only swept for localized
+            filters. If None (default), the set localization is used.
+        pseudo_state : :py:class:`xarray.DataArray` or None
+            If this additional state is given, this state is used to create
+            pseudo-observations.
+        analysis_time : :py:class:`datetime.datetime` or None, optional
+            This analysis time determines at which point the state is updated.
+            If the analysis time is None, than the last time point in given
+            state is used.
+
+        Returns
+        -------
+        analysis : :py:class:`xarray.DataArray`
+            The analysed states, stacked along the leading `config`
+            dimension. The `inf_factor` and, if localizations are swept,
+            `localization` coordinates specify the configuration.
+        """
+        inf_factors = np.atleast_1d(np.asarray(inf_factors, dtype=float))
+        localizations = self._get_sweep_localizations(localizations)
+        config_index, config_coords = self._get_config_index(
+            inf_factors, localizations
+        )
+        if not observations:
+            warnings.warn('No observation is given, I will return the '
+                          'background state!', UserWarning)
+            analysis = xr.concat([state] * len(config_index), dim='config')
+            return analysis.assign_coords(config=config_index, **config_coords)
+        back_state, observations, pseudo_state, analysis_time = \
+            self._prepare_assimilation(state, observations, pseudo_state,
+                                       analysis_time)
+        logger.info('####### Sweep {0:s} #######'.format(self._name))
+        state_mean, state_perts, normed_perts, normed_obs, state_grid, \
+            obs_grid = self._prepare_update(back_state, observations,
+                                            pseudo_state)
+        analyser = self._analyser
+        analyses = []
+        try:
+            self.inf_factor = torch.as_tensor(inf_factors,
+                                              dtype=normed_perts.dtype)
+            for localization in localizations:
+                self._set_sweep_localization(localization)
+                logger.info(
+                    'Create analysis perturbations for {0:d} inflation '
+                    'factors with {1}'.format(len(inf_factors), localization)
+                )
+                analysis_perts = self.analyser(
+                    state_perts, normed_perts, normed_obs, state_grid, obs_grid
+                )
+                analyses.extend(
+                    self._post_process(
+                        self._create_analysis(back_state, state_mean,
+                                              config_perts),
+                        back_state, observations, pseudo_state
+                    )
+                    for config_perts in analysis_perts
+                )
+        finally:
+            self._analyser = analyser
+        analysis = xr.concat(analyses, dim='config')
+        return analysis.assign_coords(config=config_index, **config_coords)
+
+    def _get_analysis_perts(
+            self,
+            state_perts: torch.Tensor,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Estimates the analysis perturbations with set analyser for all given
+        grid points.
+        """
+        return self.analyser(state_perts, normed_perts, normed_obs,
+                             state_grid, obs_grid)
+
     def _get_states(
             self,
             pseudo_state: xr.DataArray,
@@ -33,7 +33,9 @@ import torch
 import torch.sparse
 
 # Internal modules
-from ..utils import evd, rev_evd
+from ..utils import evd, evd_weights, svd_decomposition, svd_weights, \
+    obs_space_decomposition, obs_space_weights
+from .decomposition_cache import decomposition_cache
 
 
 logger = logging.getLogger(__name__)
@@ -44,14 +46,34 @@ class ETKFWeightsModule(torch.nn.Module):
     Module to create ETKF weights based on PyTorch.
     This module estimates weight statistics with given perturbations and
     observations.
+
+    Parameters
+    ----------
+    inf_factor : float, torch.Tensor or torch.nn.Parameter, optional
+        The prior covariance is inflated with this inflation factor. Default
+        is 1.0, which is the same as no inflation at all. If a tensor with
+        shape (c, ) is given, the weights are estimated for these `c`
+        inflation factors at once and get a leading configuration dimension.
+    solver : str, optional
+        The solver to estimate the weights. `evd` eigendecomposes the
+        :math:`k \\times k` ensemble precision, `svd` uses a thin singular
+        value decomposition of the :math:`k \\times l` perturbations and `obs`
+        eigendecomposes the :math:`l \\times l` Gram matrix of the
+        perturbations in observation space. `auto` (default) selects the
+        solver for every call based on the ensemble size :math:`k` and number
+        of observations :math:`l`: `obs` if there are less observations than
+        ensemble members, and `evd` otherwise.
     """
     def __init__(
             self,
-            inf_factor: Union[float, torch.Tensor, torch.nn.Parameter] = 1.0
+            inf_factor: Union[float, torch.Tensor, torch.nn.Parameter] = 1.0,
+            solver: str = 'auto'
     ):
         super().__init__()
         self._inf_factor = None
+        self._solver = 'auto'
         self.inf_factor = inf_factor
+        self.solver = solver
 
     def __str__(self) -> str:
         return 'ETKFWeightsModule({0})'.format(self.inf_factor)
@@ -75,6 +97,49 @@ class ETKFWeightsModule(torch.nn.Module):
         else:
             self._inf_factor = torch.tensor(new_factor)
 
+    @property
+    def solver(self) -> str:
+        return self._solver
+
+    @solver.setter
+    def solver(self, new_solver: str):
+        """
+        Sets a new solver.
+        """
+        available_solvers = ['auto', 'evd', 'svd', 'obs']
+        if new_solver not in available_solvers:
+            raise ValueError(
+                'Given solver {0} is not available, use one of {1}!'.format(
+                    new_solver, available_solvers
+                )
+            )
+        self._solver = new_solver
+
+    def get_solver(self, ens_size: int, n_obs: int) -> str:
+        """
+        Get the solver, which is used to estimate the weights for given
+        ensemble size and number of observations.
+
+        Parameters
+        ----------
+        ens_size : int
+            The ensemble size :math:`k`.
+        n_obs : int
+            The number of observations :math:`l`.
+
+        Returns
+        -------
+        solver : str
+            The used solver, `prior` if there are no observations.
+        """
+        if n_obs == 0:
+            return 'prior'
+        elif self._solver != 'auto':
+            return self._solver
+        elif n_obs < ens_size:
+            return 'obs'
+        return 'evd'
+
     @staticmethod
     def _test_sizes(normed_perts: torch.Tensor, normed_obs: torch.Tensor):
         """
@@ -103,6 +168,17 @@ class ETKFWeightsModule(torch.nn.Module):
         k_mat = torch.einsum('...ij,...kj->...ik', x, y)
         return k_mat
 
+    def _get_config_inf_factor(self, n_dims: int) -> torch.Tensor:
+        """
+        Appends given number of singleton dimensions to the inflation factor.
+        The dimensions of a non-scalar inflation factor are thereby leading
+        configuration dimensions of the weights, such that the weights are
+        estimated for all inflation factors at once.
+        """
+        return self._inf_factor.reshape(
+            list(self._inf_factor.shape) + [1] * n_dims
+        )
+
     def _get_prior_weights(
             self,
             normed_perts: torch.Tensor,
@@ -114,33 +190,112 @@ class ETKFWeightsModule(torch.nn.Module):
         """
         ens_size = normed_perts.shape[-2]
         prior_mean = torch.zeros(normed_perts.shape[:-1]+(1,)).to(normed_perts)
-        prior_eye = torch.ones(normed_perts.shape[:-1]).to(normed_perts)
-        prior_eye = torch.diag_embed(prior_eye)
-        prior_cov = self._inf_factor / (ens_size-1) * prior_eye
-        prior_perts = self._inf_factor.sqrt() * prior_eye
+        prior_eye = torch.eye(ens_size).to(normed_perts).expand(
+            normed_perts.shape[:-1]+(ens_size,)
+        )
+        inf_factor = self._get_config_inf_factor(normed_perts.dim())
+        prior_cov = inf_factor / (ens_size-1) * prior_eye
+        prior_perts = inf_factor.sqrt() * prior_eye
         return prior_mean, prior_perts, prior_cov
 
-    def _estimate_weights(
+    def decompose(
             self,
             normed_perts: torch.Tensor,
-            normed_obs: torch.Tensor
+            normed_obs: torch.Tensor,
+            solver: str
     ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """
-        Estimates the weights with set inflation factor, _apply_kernel method
-        and given data.
+        Decomposes given perturbations and observations with given solver.
+        The decomposition is independent of the inflation factor.
+
+        Parameters
+        ----------
+        normed_perts : :py:class:`torch.Tensor` (..., k, l)
+            The normalized ensemble perturbations in observation space.
+        normed_obs : :py:class:`torch.Tensor` (..., 1, l)
+            The normalized observations.
+        solver : str
+            The solver, as returned by
+            :py:meth:`~ETKFWeightsModule.get_solver`.
+
+        Returns
+        -------
+        evects : :py:class:`torch.Tensor` (..., k, r)
+            The eigenvectors of the ensemble precision, or the projected
+            perturbations for the `obs` solver.
+        evals : :py:class:`torch.Tensor` (..., r)
+            The eigenvalues of the ensemble precision without regularization.
+        proj_obs : :py:class:`torch.Tensor` (..., r, 1)
+            The kernelized observations, projected for the `svd` and `obs`
+            solver.
         """
-        ens_size = normed_perts.shape[-2]
-        reg_value = (ens_size-1) / self._inf_factor
+        if solver == 'svd':
+            return svd_decomposition(normed_perts, normed_obs)
+        elif solver == 'obs':
+            return obs_space_decomposition(normed_perts, normed_obs)
         kernel_perts = self._apply_kernel(normed_perts, normed_perts)
-        evals, evects, evals_inv = evd(kernel_perts, reg_value)
-        cov_analysed = rev_evd(evals_inv, evects)
-
+        evals, evects, _ = evd(kernel_perts)
         kernel_obs = self._apply_kernel(normed_perts, normed_obs)
-        w_mean = torch.einsum('...ij,...jk->...ik', cov_analysed, kernel_obs,)
+        return evects, evals, kernel_obs
 
-        square_root_einv = ((ens_size - 1) * evals_inv).sqrt()
-        w_perts = rev_evd(square_root_einv, evects)
-        return w_mean, w_perts, cov_analysed
+    def compose(
+            self,
+            evects: torch.Tensor,
+            evals: torch.Tensor,
+            proj_obs: torch.Tensor,
+            solver: str
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Composes the weights from a decomposition, estimated with
+        :py:meth:`~ETKFWeightsModule.decompose`, and set inflation factor.
+
+        Parameters
+        ----------
+        evects : :py:class:`torch.Tensor` (..., k, r)
+            The eigenvectors or projected perturbations.
+        evals : :py:class:`torch.Tensor` (..., r)
+            The eigenvalues without regularization.
+        proj_obs : :py:class:`torch.Tensor` (..., r, 1)
+            The kernelized or projected observations.
+        solver : str
+            The solver, which was used for the decomposition.
+
+        Returns
+        -------
+        w_mean : :py:class:`torch.Tensor` (..., k, 1)
+            The ensemble mean weights.
+        w_perts : :py:class:`torch.Tensor` (..., k, k)
+            The ensemble perturbation weights.
+        cov_analysed : :py:class:`torch.Tensor` (..., k, k)
+            The analysed covariance in weight space.
+        """
+        ens_size = evects.shape[-2]
+        reg_value = (ens_size-1) / self._get_config_inf_factor(evals.dim())
+        if solver == 'svd':
+            return svd_weights(evects, evals, proj_obs, reg_value, ens_size)
+        elif solver == 'obs':
+            return obs_space_weights(
+                evects, evals, proj_obs, reg_value, ens_size
+            )
+        evals_inv = 1 / (evals + reg_value)
+        return evd_weights(evals_inv, evects, proj_obs, ens_size)
+
+    def _estimate_weights(
+            self,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Estimates the weights with set inflation factor, _apply_kernel method
+        and given data. The solver is selected by
+        :py:meth:`~ETKFWeightsModule.get_solver`.
+        """
+        solver = self.get_solver(normed_perts.shape[-2],
+                                 normed_perts.shape[-1])
+        evects, evals, proj_obs = self.decompose(
+            normed_perts, normed_obs, solver
+        )
+        return self.compose(evects, evals, proj_obs, solver)
 
     def forward(
             self,
@@ -221,10 +376,28 @@ class ETKFAnalyser(object):
     ) -> torch.Tensor:
         """
         Estimate the analysis perturbations with given data, set inflation
-        factor and kernel.
+        factor and kernel. If the
+        :py:data:`~pytassim.assimilation.filter.decomposition_cache.decomposition_cache`
+        is active, cached decompositions are reused. If the inflation factor
+        is a tensor with shape (c, ), the analysis perturbations are
+        estimated for every inflation factor and stacked along a new leading
+        dimension.
         """
-        weights = self.gen_weights(normed_perts, normed_obs)[0]
+        logger.debug('Estimate weights with {0:s} solver'.format(
+            self.gen_weights.get_solver(*normed_perts.shape[-2:])
+        ))
+        if decomposition_cache.active:
+            weights = decomposition_cache.get_weights(
+                self.gen_weights, normed_perts, normed_obs
+            )[0]
+        else:
+            weights = self.gen_weights(normed_perts, normed_obs)[0]
         weights = weights.detach()
+        if self.gen_weights.inf_factor.dim() > 0:
+            return torch.stack([
+                self._weights_matmul(state_perts, config_weights)
+                for config_weights in weights
+            ])
         ana_perts = self._weights_matmul(state_perts, weights)
         return ana_perts
 
@@ -32,7 +32,7 @@ import torch
 
 # Internal modules
 from .etkf_core import ETKFWeightsModule, ETKFAnalyser
-from ..utils import evd, rev_evd
+from ..utils import evd
 from pytassim.kernels import LinearKernel
 from pytassim.kernels.base_kernels import BaseKernel
 
@@ -60,7 +60,7 @@ class KETKFWeightsModule(ETKFWeightsModule):
             inf_factor: Union[float, torch.Tensor, torch.nn.Parameter]
                       = torch.tensor(1.0)
     ):
-        super().__init__(inf_factor)
+        super().__init__(inf_factor, solver='evd')
         self.add_module('kernel', kernel)
 
     def __str__(self):
@@ -76,18 +76,17 @@ class KETKFWeightsModule(ETKFWeightsModule):
         """
         return self.kernel(x, y)
 
-    def _estimate_weights(
+    def decompose(
             self,
             normed_perts: torch.Tensor,
-            normed_obs: torch.Tensor
+            normed_obs: torch.Tensor,
+            solver: str
     ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """
-        Estimate the ensemble weights with set kernel and inflation factor, and
-        given perturbations and observations.
+        Decomposes the centered kernel matrix of given perturbations with set
+        kernel. The eigendecomposition is always used as solver, because
+        the kernel is not necessarily linear.
         """
-        ens_size = normed_perts.shape[0]
-        reg_value = (ens_size-1) / self._inf_factor
-
         k_perts = self._apply_kernel(normed_perts, normed_perts)
         k_part_mean = torch.mean(k_perts, dim=-1, keepdim=True)
         k_part_mean = k_part_mean - torch.mean(k_part_mean, dim=-2,
@@ -95,19 +94,12 @@ class KETKFWeightsModule(ETKFWeightsModule):
         k_perts_centered = k_perts - torch.mean(k_perts, dim=-2,
                                                 keepdim=True) - k_part_mean
 
-        evals, evects, evals_inv = evd(k_perts_centered, reg_value)
-        cov_analysed = rev_evd(evals_inv, evects)
+        evals, evects, _ = evd(k_perts_centered)
 
         k_obs = self._apply_kernel(normed_perts, normed_obs)
         k_obs_centered = k_obs - torch.mean(k_obs, dim=-2, keepdim=True) - \
                          k_part_mean
-        w_mean = torch.einsum(
-            '...ij,...jk->...ik', cov_analysed, k_obs_centered
-        )
-
-        square_root_einv = ((ens_size - 1) * evals_inv).sqrt()
-        w_perts = rev_evd(square_root_einv, evects)
-        return w_mean, w_perts, cov_analysed
+        return evects, evals, k_obs_centered
 
 
 class KETKFAnalyser(ETKFAnalyser):
@@ -25,7 +25,7 @@
 
 # System modules
 import logging
-from typing import Type, Union, Tuple, Iterable
+from typing import Type, Union, Tuple, Iterable, List
 
 # External modules
 import xarray as xr
@@ -36,6 +36,7 @@ import torch
 from .etkf import ETKFBase
 from pytassim.assimilation.filter.mixins import CorrMixin, UnCorrMixin
 from .letkf_core import LETKFAnalyser
+from .weight_mapping import BaseWeightMapping
 
 from pytassim.localization.localization import BaseLocalization
 from pytassim.transform.base import BaseTransformer
@@ -53,15 +54,24 @@ class LETKFBase(ETKFBase):
             inf_factor: Union[torch.Tensor, float, torch.nn.Parameter] = 1.0,
             smoother: bool = False, gpu: bool = False,
             pre_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
-            post_transform: Union[None, Iterable[Type[BaseTransformer]]] = None
+            post_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            batch_size: int = 1,
+            weight_mapping: Union[None, BaseWeightMapping] = None,
+            deduplicate: bool = False
     ):
         self._analyser = LETKFAnalyser(localization=localization,
-                                       inf_factor=inf_factor)
+                                       inf_factor=inf_factor,
+                                       batch_size=batch_size,
+                                       weight_mapping=weight_mapping,
+                                       deduplicate=deduplicate)
         super().__init__(inf_factor=inf_factor, smoother=smoother, gpu=gpu,
                          pre_transform=pre_transform,
                          post_transform=post_transform)
         self._analyser = LETKFAnalyser(localization=localization,
-                                       inf_factor=inf_factor)
+                                       inf_factor=inf_factor,
+                                       batch_size=batch_size,
+                                       weight_mapping=weight_mapping,
+                                       deduplicate=deduplicate)
         self._name = 'Sequential LETKF'
 
     def __str__(self):
@@ -81,7 +91,9 @@ class LETKFBase(ETKFBase):
         Sets a new localization.
         """
         self._analyser = LETKFAnalyser(
-            localization=new_locs, inf_factor=self.analyser.inf_factor
+            localization=new_locs, inf_factor=self.analyser.inf_factor,
+            batch_size=self.batch_size, weight_mapping=self.weight_mapping,
+            deduplicate=self.deduplicate
         )
 
     @property
@@ -98,12 +110,72 @@ class LETKFBase(ETKFBase):
         """
         if self.analyser is None:
             localization = None
+            batch_size = 1
+            weight_mapping = None
+            deduplicate = False
         else:
             localization = self.analyser.localization
+            batch_size = self.analyser.batch_size
+            weight_mapping = self.analyser.weight_mapping
+            deduplicate = self.analyser.deduplicate
         self._analyser = LETKFAnalyser(
-            localization=localization, inf_factor=new_factor
+            localization=localization, inf_factor=new_factor,
+            batch_size=batch_size, weight_mapping=weight_mapping,
+            deduplicate=deduplicate
         )
 
+    @property
+    def batch_size(self) -> int:
+        return self._analyser.batch_size
+
+    @batch_size.setter
+    def batch_size(self, new_size: int):
+        """
+        Sets a new batch size.
+        """
+        self._analyser.batch_size = new_size
+
+    @property
+    def weight_mapping(self) -> Union[None, BaseWeightMapping]:
+        return self._analyser.weight_mapping
+
+    @weight_mapping.setter
+    def weight_mapping(self, new_mapping: Union[None, BaseWeightMapping]):
+        """
+        Sets a new weight mapping.
+        """
+        self._analyser.weight_mapping = new_mapping
+
+    @property
+    def deduplicate(self) -> bool:
+        return self._analyser.deduplicate
+
+    @deduplicate.setter
+    def deduplicate(self, new_dedup: bool):
+        """
+        Sets if the weights are estimated once per unique localization
+        signature.
+        """
+        self._analyser.deduplicate = new_dedup
+
+    def _get_sweep_localizations(
+            self,
+            localizations: Union[None, Iterable[BaseLocalization]]
+    ) -> List[BaseLocalization]:
+        """
+        Get the localizations of a hyper-parameter sweep. If no localizations
+        are given, only the set localization is used.
+        """
+        if localizations is None:
+            return [self.localization]
+        return list(localizations)
+
+    def _set_sweep_localization(self, localization: BaseLocalization):
+        """
+        Sets given localization for a hyper-parameter sweep.
+        """
+        self.localization = localization
+
 
 class LETKFCorr(CorrMixin, LETKFBase):
     """
@@ -142,6 +214,23 @@ class LETKFCorr(CorrMixin, LETKFBase):
         Indicator if the weight estimation should be done on either GPU (True)
         or CPU (False): Default is None. For small models, estimation of the
         weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points, which are localized and analysed together
+        in one batched weight estimation. A larger batch size reduces the
+        python overhead, but increases the memory consumption. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping, e.g.
+        :py:class:`~pytassim.assimilation.filter.weight_mapping.WeightInterpolation`
+        or tiles with
+        :py:class:`~pytassim.assimilation.filter.weight_mapping.TileWeights`,
+        is given, the ensemble weights are only estimated at the weight points
+        of this mapping and mapped to all grid points. Default is None,
+        indicating that the weights are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points with the same
+        local observations and localization weights, e.g. in observational
+        data voids. Default is False.
     """
     def __str__(self):
         return 'Correlated {0:s}'.format(str(super(LETKFBase)))
@@ -187,6 +276,23 @@ class LETKFUncorr(UnCorrMixin, LETKFBase):
         Indicator if the weight estimation should be done on either GPU (True)
         or CPU (False): Default is None. For small models, estimation of the
         weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points, which are localized and analysed together
+        in one batched weight estimation. A larger batch size reduces the
+        python overhead, but increases the memory consumption. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping, e.g.
+        :py:class:`~pytassim.assimilation.filter.weight_mapping.WeightInterpolation`
+        or tiles with
+        :py:class:`~pytassim.assimilation.filter.weight_mapping.TileWeights`,
+        is given, the ensemble weights are only estimated at the weight points
+        of this mapping and mapped to all grid points. Default is None,
+        indicating that the weights are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points with the same
+        local observations and localization weights, e.g. in observational
+        data voids. Default is False.
     """
     def __str__(self):
         return 'Uncorrelated {0:s}'.format(str(super(LETKFBase)))
@@ -25,15 +25,21 @@
 
 # System modules
 import logging
-from typing import Union, Tuple, Any
+import copy
+import numbers
+from typing import Union, Tuple, Any, List
 
 # External modules
-import torch.jit
+import torch
 import numpy as np
+import scipy.sparse
 
 # Internal modules
 from ..utils import grid_to_array
 from .etkf_core import ETKFAnalyser, ETKFWeightsModule
+from .weight_mapping import BaseWeightMapping
+from .module_cache import CompiledModule, module_cache
+from .decomposition_cache import decomposition_cache
 
 from pytassim.localization import BaseLocalization
 
@@ -44,16 +50,66 @@ logger = logging.getLogger(__name__)
 class LETKFAnalyser(ETKFAnalyser):
     """
     This analyser uses the etkf weight module and wraps in an outer loop the
-    localisation.
+    localisation. The localization is given as sparse localization matrix by
+    :py:meth:`~pytassim.localization.localization.BaseLocalization.localize_all`
+    such that cached localization matrices can be directly used. The grid
+    points are processed in batches. For every batch, the localised
+    observations are gathered into zero-weight padded tensors such that the
+    weights of all grid points within the batch are estimated with a single
+    call of the weights module.
+
+    Parameters
+    ----------
+    localization : obj or None, optional
+        This localization is used to localize and constrain observations
+        spatially. If this localization is None, no localization is applied
+        and the weights are estimated once for all grid points.
+    inf_factor : float, optional
+        Multiplicative inflation factor, which is applied to the background
+        precision. Default is 1.0, which is the same as no inflation at all.
+    batch_size : int, optional
+        The number of grid points, which are processed together. A larger
+        batch size reduces the python overhead, while the memory consumption
+        increases linearly with the batch size and the maximum number of
+        local observations within a batch. Default is 1, which corresponds to
+        a sequential processing of the grid points.
+    weight_mapping : child of \
+    :py:class:`~pytassim.assimilation.filter.weight_mapping.BaseWeightMapping`
+    or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping, e.g. a coarser grid,
+        and mapped to all grid points, e.g. by interpolation. Default is None,
+        indicating that the weights are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights should be only estimated once for grid points with
+        the same localization signature, i.e. the same used observations
+        with the same localization weights. Grid points without any
+        observations in their vicinity share the same empty signature, such
+        that their prior weights are also only estimated once. The weights of
+        all unique signatures are stored at once, which increases the memory
+        consumption if most signatures are unique. Default is False.
+
+    The weights module is compiled once per process and data type with the
+    process-wide
+    :py:data:`~pytassim.assimilation.filter.module_cache.module_cache`,
+    where also the compile and run timings can be inspected.
     """
     def __init__(
             self,
             localization: Union[None, BaseLocalization] = None,
             inf_factor: Union[torch.Tensor, float, torch.nn.Parameter] = 1.0,
+            batch_size: int = 1,
+            weight_mapping: Union[None, BaseWeightMapping] = None,
+            deduplicate: bool = False
     ):
         self._gen_weights = None
+        self._compiled_weights = None
         self._inf_factor = None
+        self._batch_size = 1
         self.localization = localization
+        self.batch_size = batch_size
+        self.weight_mapping = weight_mapping
+        self.deduplicate = deduplicate
         super().__init__(inf_factor)
 
     def __str__(self) -> str:
@@ -63,6 +119,22 @@ class LETKFAnalyser(ETKFAnalyser):
     def __repr__(self) -> str:
         return 'LETKFAnalyser({0:s})'.format(repr(self.localization))
 
+    def __getstate__(self):
+        """
+        The compiled weights module cannot be pickled and is removed, while
+        the weights module is replaced by a new weights module with the same
+        inflation factor and solver, e.g. to send this analyser to another
+        process. The
+        weights module is then compiled again with the module cache of the
+        other process.
+        """
+        state = self.__dict__.copy()
+        state['_gen_weights'] = ETKFWeightsModule(
+            self.inf_factor, solver=getattr(self.gen_weights, 'solver', 'auto')
+        )
+        state['_compiled_weights'] = None
+        return state
+
     @property
     def inf_factor(self) -> Union[float, torch.Tensor, torch.nn.Parameter]:
         return self._inf_factor
@@ -75,12 +147,28 @@ class LETKFAnalyser(ETKFAnalyser):
         self._inf_factor = new_factor
         self.gen_weights = ETKFWeightsModule(new_factor)
 
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, new_size: int):
+        if not isinstance(new_size, numbers.Integral) or \
+                isinstance(new_size, bool) or new_size < 1:
+            raise ValueError(
+                'Given batch size {0} has to be a positive integer!'.format(
+                    new_size
+                )
+            )
+        self._batch_size = int(new_size)
+
     @property
     def gen_weights(self) -> ETKFWeightsModule:
         return self._gen_weights
 
     @gen_weights.setter
     def gen_weights(self, new_module: ETKFWeightsModule):
+        self._compiled_weights = None
         if new_module is None:
             self._gen_weights = None
         elif isinstance(new_module, ETKFWeightsModule):
@@ -89,6 +177,15 @@ class LETKFAnalyser(ETKFAnalyser):
             raise TypeError('Given weights module is not a valid '
                             '`ETKFWeightsModule or None!')
 
+    @property
+    def compiled_weights(self) -> Union[None, CompiledModule]:
+        """
+        The compiled weights module of the last analysis together with its
+        compile and run timings. None if no analysis with localization was
+        estimated yet.
+        """
+        return self._compiled_weights
+
     def _localise_obs(
             self,
             grid_point: Any,
@@ -113,6 +210,293 @@ class LETKFAnalyser(ETKFAnalyser):
             normed_obs = normed_obs[..., use_obs] * obs_weights
             return normed_perts, normed_obs
 
+    def _get_loc_matrix(
+            self,
+            grid_index: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> scipy.sparse.csr_matrix:
+        """
+        Get the sparse localization matrix for all given grid points from set
+        localization.
+        """
+        loc_matrix = self.localization.localize_all(grid_index, obs_grid)
+        return scipy.sparse.csr_matrix(loc_matrix)
+
+    @staticmethod
+    def _sparse_to_padded(
+            loc_matrix: scipy.sparse.csr_matrix
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Converts given sparse localization matrix into observation indices and
+        weights, which are padded with zeros to the maximum number of local
+        observations. Because of their zero weight, the padded observations
+        have no influence on the estimated ensemble weights.
+        """
+        num_obs = np.diff(loc_matrix.indptr)
+        max_obs = num_obs.max(initial=0)
+        pad_ind = np.zeros((loc_matrix.shape[0], max_obs), dtype=int)
+        pad_weights = np.zeros((loc_matrix.shape[0], max_obs), dtype=float)
+        row_ind = np.repeat(np.arange(loc_matrix.shape[0]), num_obs)
+        col_ind = np.arange(loc_matrix.nnz) - np.repeat(
+            loc_matrix.indptr[:-1], num_obs
+        )
+        pad_ind[row_ind, col_ind] = loc_matrix.indices
+        pad_weights[row_ind, col_ind] = loc_matrix.data
+        return pad_ind, pad_weights
+
+    @staticmethod
+    def _gather_obs(
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            obs_ind: np.ndarray,
+            obs_weights: np.ndarray
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Gathers the localised and weighted observational quantities for a batch
+        of grid points. The grid points are the leading batch dimension of the
+        returned tensors.
+        """
+        obs_ind = torch.as_tensor(obs_ind, device=normed_perts.device)
+        obs_weights = torch.as_tensor(
+            obs_weights, dtype=normed_perts.dtype, device=normed_perts.device
+        ).sqrt()
+        loc_perts = normed_perts[..., obs_ind] * obs_weights
+        loc_obs = normed_obs[..., obs_ind] * obs_weights
+        return loc_perts.transpose(-3, -2), loc_obs.transpose(-3, -2)
+
+    @staticmethod
+    def _batch_weights_matmul(
+            perts: torch.Tensor,
+            weights: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Multiply given ensemble perturbations with ensemble weights, where the
+        weights have a leading grid dimension. Additional leading
+        configuration dimensions of the weights are stacked as leading
+        dimensions of the analysis perturbations.
+        """
+        if weights.dim() > 3:
+            return torch.stack([
+                LETKFAnalyser._batch_weights_matmul(perts, config_weights)
+                for config_weights in weights
+            ])
+        ana_perts = torch.einsum('...ig,gij->...jg', perts, weights)
+        return ana_perts
+
+    @staticmethod
+    def _map_weights(
+            weights: torch.Tensor,
+            map_ind: np.ndarray,
+            map_weights: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Maps given ensemble weights at the weight points to grid points with
+        given mapping indices and factors. Negative mapping indices refer to
+        the identity matrix as ensemble weights. Leading configuration
+        dimensions of the weights are kept.
+        """
+        if weights.dim() > 3:
+            return torch.stack([
+                LETKFAnalyser._map_weights(config_weights, map_ind,
+                                           map_weights)
+                for config_weights in weights
+            ])
+        if np.any(map_ind < 0):
+            identity = torch.eye(
+                weights.shape[-1], dtype=weights.dtype, device=weights.device
+            )
+            weights = torch.cat([weights, identity[None, ...]], dim=0)
+        map_ind = torch.as_tensor(map_ind, device=weights.device)
+        map_weights = torch.as_tensor(
+            map_weights, dtype=weights.dtype, device=weights.device
+        )
+        mapped_weights = torch.einsum(
+            'gn,gnij->gij', map_weights, weights[map_ind]
+        )
+        return mapped_weights
+
+    def _estimate_batch_weights(
+            self,
+            loc_matrix: scipy.sparse.csr_matrix,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Estimates the ensemble weights for a batch of grid points, specified
+        by given rows of the localization matrix. If the decomposition cache
+        is active, the decompositions are cached with the uncompiled weights
+        module.
+        """
+        obs_ind, obs_weights = self._sparse_to_padded(loc_matrix)
+        loc_perts, loc_obs = self._gather_obs(
+            normed_perts, normed_obs, obs_ind, obs_weights
+        )
+        logger.debug(
+            'Estimate weights for {0:d} grid points with {1:s} solver'.format(
+                loc_perts.shape[0],
+                self.gen_weights.get_solver(*loc_perts.shape[-2:])
+            )
+        )
+        if decomposition_cache.active:
+            weights = decomposition_cache.get_weights(
+                self.gen_weights, loc_perts, loc_obs
+            )[0]
+        elif self._compiled_weights is None:
+            weights = self.gen_weights(loc_perts, loc_obs)[0]
+        else:
+            weights = self._compiled_weights(loc_perts, loc_obs)[0]
+        return weights.detach()
+
+    @staticmethod
+    def _get_unique_rows(
+            loc_matrix: scipy.sparse.csr_matrix
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the first row for every unique localization signature, given by
+        the indices and weights of the used observations, and the position of
+        the signature for every row. The signatures are the number of used
+        observations, their indices and the bit patterns of their weights,
+        padded to the maximum number of used observations. The unique rows
+        are found with a single :py:func:`np.unique` over the byte strings of
+        these signatures.
+        """
+        loc_matrix.sort_indices()
+        n_rows = loc_matrix.shape[0]
+        if n_rows == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        row_nnz = np.diff(loc_matrix.indptr)
+        max_nnz = int(row_nnz.max())
+        len_signature = 1 + 2 * max_nnz
+        nnz_pos = np.arange(len(loc_matrix.indices)) + np.repeat(
+            np.arange(1, n_rows*len_signature, len_signature)
+            - loc_matrix.indptr[:-1], row_nnz
+        )
+        signatures = np.zeros(n_rows*len_signature, dtype=np.int64)
+        signatures[::len_signature] = row_nnz
+        signatures[nnz_pos] = loc_matrix.indices
+        signatures[nnz_pos+max_nnz] = np.asarray(
+            loc_matrix.data, dtype=np.float64
+        ).view(np.int64)
+        signatures = signatures.view(
+            np.dtype((np.void, signatures.dtype.itemsize * len_signature))
+        )
+        _, first_rows, inverse = np.unique(
+            signatures, return_index=True, return_inverse=True
+        )
+        order = np.argsort(first_rows)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return first_rows[order].astype(int), rank[inverse.reshape(-1)]
+
+    def _estimate_loc_weights(
+            self,
+            loc_matrix: scipy.sparse.csr_matrix,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Estimates the ensemble weights for all rows of given localization
+        matrix in batches.
+        """
+        if loc_matrix.shape[0] == 0:
+            ens_size = normed_perts.shape[-2]
+            return normed_perts.new_zeros(
+                tuple(self.gen_weights.inf_factor.shape)
+                + (0, ens_size, ens_size)
+            )
+        weights = []
+        for start in range(0, loc_matrix.shape[0], self.batch_size):
+            end = start + self.batch_size
+            weights.append(self._estimate_batch_weights(
+                loc_matrix[start:end], normed_perts, normed_obs
+            ))
+        weights = torch.cat(weights, dim=-3)
+        return weights
+
+    def _estimate_grid_weights(
+            self,
+            grid_index: np.ndarray,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            obs_grid: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Estimates the ensemble weights for all given grid points in batches.
+        """
+        loc_matrix = self._get_loc_matrix(grid_index, obs_grid)
+        return self._estimate_loc_weights(loc_matrix, normed_perts, normed_obs)
+
+    def _apply_mapped_weights(
+            self,
+            state_perts: torch.Tensor,
+            weights: torch.Tensor,
+            map_ind: np.ndarray,
+            map_weights: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Maps given ensemble weights to all grid points and applies them
+        batch-wise to given state perturbations.
+        """
+        analysis_perts = []
+        for start in range(0, state_perts.shape[-1], self.batch_size):
+            end = start + self.batch_size
+            batch_weights = self._map_weights(
+                weights, map_ind[start:end], map_weights[start:end]
+            )
+            analysis_perts.append(self._batch_weights_matmul(
+                state_perts[..., start:end], batch_weights
+            ))
+        analysis_perts = torch.cat(analysis_perts, dim=-1)
+        return analysis_perts
+
+    def get_loc_grid(self, grid_index: np.ndarray) -> np.ndarray:
+        """
+        Get the points, for which the observations are localized. These
+        are the weight points if a weight mapping is set, otherwise given
+        grid points.
+        """
+        if self.weight_mapping is None:
+            return grid_index
+        return self.weight_mapping.get_mapping(grid_index)[0]
+
+    def split(
+            self,
+            state_grid: np.ndarray,
+            chunk_pos: np.ndarray
+    ) -> List["LETKFAnalyser"]:
+        """
+        Get an analyser for every contiguous chunk of given grid. If a
+        weight mapping is set, it is estimated once for the whole grid and
+        every chunk analyser gets its slice of this mapping as
+        :py:class:`~pytassim.assimilation.filter.weight_mapping.ChunkWeightMapping`,
+        such that the analysis is independent of the chunking. Otherwise,
+        this analyser is used for all chunks.
+
+        Parameters
+        ----------
+        state_grid : :py:class:`np.ndarray`
+            The grid of the whole state.
+        chunk_pos : :py:class:`np.ndarray` (n_chunks+1), dtype=int
+            The boundaries of the chunks, the `i`-th chunk spans the grid
+            points between `chunk_pos[i]` and `chunk_pos[i+1]`.
+
+        Returns
+        -------
+        analysers : list(:py:class:`LETKFAnalyser`)
+            The analyser for every chunk.
+        """
+        if self.weight_mapping is None or self.localization is None:
+            return [self] * (len(chunk_pos)-1)
+        chunk_mappings = self.weight_mapping.split(
+            grid_to_array(state_grid), chunk_pos
+        )
+        analysers = []
+        for chunk_mapping in chunk_mappings:
+            chunk_analyser = copy.copy(self)
+            chunk_analyser.weight_mapping = chunk_mapping
+            analysers.append(chunk_analyser)
+        return analysers
+
     def get_analysis_perts(
             self,
             state_perts: torch.Tensor,
@@ -123,17 +507,60 @@ class LETKFAnalyser(ETKFAnalyser):
     ) -> torch.Tensor:
         """
         Estimates analysis perturbations based on set localization and given
-        quantities.
+        quantities. The sparse localization matrix is estimated for all grid
+        points at once, while the weights are estimated in batches of set
+        batch size. If a weight mapping is set, the weights are estimated at
+        the weight points and mapped to the grid points. If deduplication is
+        activated, the weights are estimated only once for every unique
+        localization signature. If the inflation factor is a tensor with
+        shape (c, ), the weights are estimated for all inflation factors at
+        once and the analysis perturbations are stacked along a new leading
+        dimension.
         """
-        self._gen_weights = torch.jit.script(self._gen_weights)
+        if self.localization is None:
+            return super().get_analysis_perts(
+                state_perts, normed_perts, normed_obs, state_grid, obs_grid
+            )
+        self._compiled_weights = module_cache.get(self.gen_weights,
+                                                  normed_perts.dtype)
         grid_index = grid_to_array(state_grid)
+        if self.weight_mapping is not None:
+            weight_grid, map_ind, map_weights = \
+                self.weight_mapping.get_mapping(grid_index)
+            logger.info(
+                'Estimate weights for {0:d} weight points instead of {1:d} '
+                'grid points'.format(len(weight_grid), len(grid_index))
+            )
+        else:
+            weight_grid, map_ind, map_weights = grid_index, None, None
+        loc_matrix = self._get_loc_matrix(weight_grid, obs_grid)
+        if self.deduplicate:
+            unique_rows, inverse = self._get_unique_rows(loc_matrix)
+            logger.info(
+                'Found {0:d} unique localization signatures for {1:d} weight '
+                'points'.format(len(unique_rows), loc_matrix.shape[0])
+            )
+            loc_matrix = loc_matrix[unique_rows]
+            if map_ind is None:
+                map_ind = inverse[:, None]
+                map_weights = np.ones((len(grid_index), 1))
+            else:
+                map_ind = np.where(map_ind < 0, map_ind, inverse[map_ind])
+        if map_ind is not None:
+            weights = self._estimate_loc_weights(
+                loc_matrix, normed_perts, normed_obs
+            )
+            return self._apply_mapped_weights(
+                state_perts, weights, map_ind, map_weights
+            )
         analysis_perts = []
-        for ind, grid_point in enumerate(grid_index):
-            loc_perts, loc_obs = self._localise_obs(
-                grid_point, normed_perts, normed_obs, obs_grid
+        for start in range(0, len(grid_index), self.batch_size):
+            end = start + self.batch_size
+            weights = self._estimate_batch_weights(
+                loc_matrix[start:end], normed_perts, normed_obs
             )
-            loc_analysis_perts = super().get_analysis_perts(
-                state_perts[..., [ind]], loc_perts, loc_obs, None, None
+            loc_analysis_perts = self._batch_weights_matmul(
+                state_perts[..., start:end], weights
             )
             analysis_perts.append(loc_analysis_perts)
         analysis_perts = torch.cat(analysis_perts, dim=-1)
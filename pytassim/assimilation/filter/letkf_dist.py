@@ -24,9 +24,11 @@
 #
 
 # System modules
+import copy
 import logging
 import operator
-from typing import Union, Type, Iterable
+import time
+from typing import Union, Type, Iterable, List, Tuple
 
 # External modules
 import numpy as np
@@ -36,12 +38,16 @@ import pandas as pd
 
 import dask
 import dask.array as da
-from distributed import Client
+from dask.delayed import Delayed
+from distributed import Client, Future
 from distributed.deploy.cluster import Cluster
 
 # Internal modules
 from pytassim.assimilation.filter import CorrMixin, UnCorrMixin
+from pytassim.assimilation.utils import grid_to_array
 from .letkf import LETKFBase
+from .partition import partition_grid, estimate_chunksize
+from .weight_mapping import BaseWeightMapping
 
 from pytassim.localization import BaseLocalization
 from pytassim.transform import BaseTransformer
@@ -50,6 +56,10 @@ from pytassim.transform import BaseTransformer
 logger = logging.getLogger(__name__)
 
 
+def _noop():
+    return None
+
+
 class DistributedLETKFBase(LETKFBase):
     """
     Base object for a distributed localised ensemble transform Kalman filter.
@@ -58,15 +68,26 @@ class DistributedLETKFBase(LETKFBase):
             self,
             client: Union[None, Client] = None,
             cluster: Union[None, Type[Cluster]] = None,
-            chunksize: int = 10,
+            chunksize: Union[int, str] = 10,
             localization: Union[None, BaseLocalization] = None,
             inf_factor: Union[torch.Tensor, float, torch.nn.Parameter] = 1.0,
             smoother: bool = False, gpu: bool = False,
             pre_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
-            post_transform: Union[None, Iterable[Type[BaseTransformer]]] = None
+            post_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            batch_size: int = 1,
+            weight_mapping: Union[None, BaseWeightMapping] = None,
+            deduplicate: bool = False,
+            balance: bool = False,
+            target_duration: float = 1.,
+            calib_size: int = 32
     ):
         super().__init__(localization, inf_factor, smoother, gpu, pre_transform,
-                         post_transform)
+                         post_transform, batch_size, weight_mapping,
+                         deduplicate)
+        self.balance = balance
+        self.target_duration = target_duration
+        self.calib_size = calib_size
+        self.calibrated_chunksize = None
         self._name = 'Distributed LETKF'
         self._cluster = None
         self._client = None
@@ -131,6 +152,161 @@ class DistributedLETKFBase(LETKFBase):
             self._cluster = cluster
             self._client = Client(cluster)
 
+    def _get_n_workers(self) -> int:
+        workers = self.client.scheduler_info()['workers'].values()
+        return max(sum(worker.get('nthreads', 1) for worker in workers), 1)
+
+    def _measure_overhead(self, n_tasks: int = 3) -> float:
+        """
+        Measures the round-trip time of an empty task on the cluster as
+        overhead of the scheduler per task.
+        """
+        durations = []
+        for _ in range(n_tasks):
+            start_time = time.perf_counter()
+            self.client.submit(_noop, pure=False).result()
+            durations.append(time.perf_counter() - start_time)
+        return min(durations)
+
+    def _calibrate_chunksize(
+            self,
+            state: xr.DataArray,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            obs_grid: np.ndarray,
+            grid_index: np.ndarray
+    ) -> int:
+        """
+        Calibrates the chunksize. The analysis of a contiguous chunk of
+        ``calib_size`` grid points in the middle of the grid is timed with
+        its chunk analyser, as in :py:meth:`update_state`, to get the
+        duration per grid point, while the overhead of the scheduler is
+        measured with empty tasks. The chunksize is then estimated with
+        :py:func:`~pytassim.assimilation.filter.partition.estimate_chunksize`
+        such that a task takes roughly ``target_duration`` seconds.
+        """
+        len_grid = len(grid_index)
+        calib_size = min(self.calib_size, len_grid)
+        start = (len_grid-calib_size) // 2
+        end = start + calib_size
+        chunk_pos = np.unique([0, start, end, len_grid])
+        calib_analyser = self.analyser.split(grid_index, chunk_pos)[
+            int(np.searchsorted(chunk_pos, start))
+        ]
+        _, calib_perts = state.isel(
+            grid=slice(start, end)
+        ).state.split_mean_perts()
+        calib_perts = torch.from_numpy(calib_perts.values).to(normed_perts)
+        calib_grid = grid_index[start:end]
+        warmup_analyser = copy.copy(self.analyser)
+        warmup_analyser.weight_mapping = None
+        _ = warmup_analyser(calib_perts[..., :1], normed_perts, normed_obs,
+                            calib_grid[:1], obs_grid)
+        start_time = time.perf_counter()
+        _ = calib_analyser(calib_perts, normed_perts, normed_obs, calib_grid,
+                           obs_grid)
+        point_duration = (time.perf_counter()-start_time) / calib_size
+        task_overhead = self._measure_overhead()
+        chunksize = estimate_chunksize(
+            len_grid, point_duration, task_overhead, self.target_duration,
+            self._get_n_workers()
+        )
+        logger.info(
+            'Calibrated chunksize: {0:d} ({1:.2e} s per grid point, '
+            '{2:.2e} s overhead per task)'.format(
+                chunksize, point_duration, task_overhead
+            )
+        )
+        return chunksize
+
+    def _get_chunksize(
+            self,
+            state: xr.DataArray,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            obs_grid: np.ndarray,
+            grid_index: np.ndarray
+    ) -> int:
+        """
+        Returns the set chunksize. If the chunksize is set to `'auto'`, the
+        chunksize is calibrated once and the calibrated chunksize is reused
+        in later cycles.
+        """
+        if self.chunksize != 'auto':
+            return self.chunksize
+        if self.calibrated_chunksize is None:
+            self.calibrated_chunksize = self._calibrate_chunksize(
+                state, normed_perts, normed_obs, obs_grid, grid_index
+            )
+        return self.calibrated_chunksize
+
+    def _scatter_obs(
+            self,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            obs_grid: np.ndarray,
+            loc_grids: List[np.ndarray]
+    ) -> List[Tuple[Future, Future, Future]]:
+        """
+        Scatters the normalized perturbations, observations and observation
+        grid to the workers. If set localization returns an observation
+        subset for the localized points of a chunk, e.g. all observations
+        within the bounding box of these points plus the localization cutoff
+        as halo, only this subset is sent to the worker of this chunk. The
+        localized points are the grid points of the chunk or its weight
+        points if a weight mapping is set. Otherwise, all observations are
+        broadcasted to all workers.
+        """
+        obs_subsets = []
+        for loc_grid in loc_grids:
+            if self.localization is None:
+                obs_subsets.append(None)
+            elif len(loc_grid) == 0:
+                obs_subsets.append(np.zeros(0, dtype=int))
+            else:
+                obs_subsets.append(self.localization.get_obs_subset(
+                    loc_grid, obs_grid
+                ))
+        global_obs = None
+        if any(obs_ind is None for obs_ind in obs_subsets):
+            global_obs = tuple(self.client.scatter(
+                [normed_perts, normed_obs, obs_grid], broadcast=True
+            ))
+        chunk_obs = []
+        for obs_ind in obs_subsets:
+            if obs_ind is None:
+                chunk_obs.append(global_obs)
+            else:
+                torch_ind = torch.as_tensor(obs_ind, dtype=torch.long,
+                                            device=normed_perts.device)
+                chunk_obs.append(tuple(self.client.scatter([
+                    normed_perts[..., torch_ind], normed_obs[..., torch_ind],
+                    obs_grid[obs_ind]
+                ])))
+        n_scattered = np.sum([
+            len(obs_grid) if obs_ind is None else len(obs_ind)
+            for obs_ind in obs_subsets
+        ])
+        logger.info(
+            'Scattered {0:d} observations for {1:d} chunks with {2:d} '
+            'observations'.format(n_scattered, len(obs_subsets), len(obs_grid))
+        )
+        return chunk_obs
+
+    @staticmethod
+    def _get_grid_blocks(
+            array: da.Array,
+            grid_chunks: Tuple[int, ...]
+    ) -> List[Delayed]:
+        """
+        Get a delayed block for every grid chunk of given dask array, where
+        the grid is the last axis. Every block only depends on its own chunk
+        of the array, such that a task only receives the data of its grid
+        chunk and not the whole array.
+        """
+        array = array.rechunk((-1, ) * (array.ndim-1) + (grid_chunks, ))
+        return list(array.to_delayed().reshape(-1))
+
     def update_state(
             self,
             state: xr.DataArray,
@@ -171,7 +347,10 @@ class DistributedLETKFBase(LETKFBase):
         analysis : :py:class:`xarray.DataArray`
             The analysed state based on given state and observations. The
             analysis has same coordinates as given ``state``. If filtering mode
-            is on, then the time axis has only one element.
+            is on, then the time axis has only one element. The analysis is a
+            lazy :py:class:`dask.array.Array` with one chunk per grid chunk,
+            which is only computed on the cluster if requested, e.g. by
+            ``.persist()``, ``.compute()`` or ``.to_zarr()``.
         """
         logger.info('####### {0:s} #######'.format(self._name))
         logger.info('Starting with specific preparation')
@@ -191,25 +370,38 @@ class DistributedLETKFBase(LETKFBase):
                                                        obs_cinv)
 
         logger.info('Chunking and split background state')
+        grid_index = grid_to_array(state['grid'].values)
+        chunksize = self._get_chunksize(
+            state, normed_perts, normed_obs, obs_grid, grid_index
+        )
+        chunk_pos, _ = partition_grid(
+            len(grid_index), chunksize, self.localization, grid_index,
+            obs_grid, normed_perts.shape[-2], self.balance
+        )
+        grid_chunks = tuple(np.diff(chunk_pos).tolist())
         state = state.chunk(
-            {'grid': self.chunksize, 'var_name': -1, 'time': -1, 'ensemble': -1}
+            {'grid': grid_chunks, 'var_name': -1, 'time': -1, 'ensemble': -1}
         )
         state_grid = da.from_array(
-            state['grid'].values, chunks=self.chunksize
+            state['grid'].values, chunks=(grid_chunks, )
         )
         chunk_pos = np.concatenate([[0], np.cumsum(state.chunks[-1])])
         state_mean, state_perts = state.state.split_mean_perts()
+        perts_blocks = self._get_grid_blocks(state_perts.data, grid_chunks)
+        mean_blocks = self._get_grid_blocks(state_mean.data, grid_chunks)
+        grid_blocks = self._get_grid_blocks(state_grid, grid_chunks)
+
+        analysers = self.analyser.split(grid_index, chunk_pos)
+        loc_grids = [
+            analyser.get_loc_grid(grid_index[chunk_pos[k]:chunk_pos[k+1]])
+            for k, analyser in enumerate(analysers)
+        ]
 
         logger.info('Scatter data')
-        normed_perts, normed_obs, obs_grid = self.client.scatter(
-            [normed_perts, normed_obs, obs_grid], broadcast=True
+        chunk_obs = self._scatter_obs(
+            normed_perts, normed_obs, obs_grid, loc_grids
         )
 
-        @dask.delayed
-        def slice_data(array_to_slice, min_bound, max_bound):
-            sliced_array = array_to_slice[..., min_bound:max_bound]
-            return sliced_array
-
         @dask.delayed
         def to_tensor(array_to_convert, as_tensor):
             converted_tensor = torch.from_numpy(array_to_convert).to(as_tensor)
@@ -220,32 +412,32 @@ class DistributedLETKFBase(LETKFBase):
             added_mean = perts + mean.unsqueeze(dim=-2)
             return added_mean
 
+        @dask.delayed
+        def to_numpy(tensor_to_convert):
+            converted_array = tensor_to_convert.cpu().numpy()
+            return converted_array
+
         logger.info('Create analysis')
+        ana_dtype = torch.zeros(0, dtype=obs_state.dtype).numpy().dtype
         analysis_list = []
         for k, pos in enumerate(chunk_pos[1:]):
-            loc_perts = dask.delayed(slice_data)(
-                state_perts.data, chunk_pos[k], pos
-            )
-            loc_perts = dask.delayed(to_tensor)(loc_perts, pseudo_tensor)
-            loc_grid = dask.delayed(slice_data)(state_grid, chunk_pos[k], pos)
-            loc_perts = dask.delayed(self.analyser)(
-                loc_perts, normed_perts, normed_obs, loc_grid, obs_grid
-            )
-            loc_mean = dask.delayed(slice_data)(
-                state_mean.data, chunk_pos[k], pos
+            loc_perts = dask.delayed(to_tensor)(perts_blocks[k],
+                                                pseudo_tensor)
+            loc_normed_perts, loc_normed_obs, loc_obs_grid = chunk_obs[k]
+            loc_perts = dask.delayed(analysers[k])(
+                loc_perts, loc_normed_perts, loc_normed_obs, grid_blocks[k],
+                loc_obs_grid
             )
-            loc_mean = dask.delayed(to_tensor)(loc_mean, pseudo_tensor)
+            loc_mean = dask.delayed(to_tensor)(mean_blocks[k], pseudo_tensor)
             loc_ana = dask.delayed(add_mean)(loc_perts, loc_mean)
+            loc_ana = da.from_delayed(
+                to_numpy(loc_ana),
+                shape=state.shape[:-1]+(int(pos-chunk_pos[k]), ),
+                dtype=ana_dtype
+            )
             analysis_list.append(loc_ana)
 
-        @dask.delayed
-        def cat_numpy(list_to_cat):
-            concatenated_list = torch.cat(list_to_cat, dim=-1)
-            concatenated_numpy = concatenated_list.numpy()
-            return concatenated_numpy
-
-        analysis = dask.delayed(cat_numpy)(analysis_list)
-        analysis = analysis.compute()
+        analysis = da.concatenate(analysis_list, axis=-1)
         analysis = state.copy(data=analysis)
         return analysis
 
@@ -268,10 +460,13 @@ class DistributedLETKFCorr(CorrMixin, DistributedLETKFBase):
         This dask cluster is used to initialize a :py:class:``~dask.distributed.
         Client``, if no client is specified.
         Either this cluster or a ``client`` has to be given. Default is None.
-    chunksize : int, optional
+    chunksize : int or str, optional
         The data is splitted up such that every chunk has this number of
         samples. This influences the performance of this distributed version of
-        the LETKF. Default is 10.
+        the LETKF. If this is `'auto'`, the chunksize is calibrated in the
+        first analysis such that a chunk takes roughly ``target_duration``
+        seconds and stored as ``calibrated_chunksize`` for later cycles.
+        Default is 10.
     localization : obj or None, optional
         This localization is used to localize and constrain observations
         spatially. If this localization is None, no localization is applied such
@@ -292,6 +487,33 @@ class DistributedLETKFCorr(CorrMixin, DistributedLETKFBase):
         Indicator if the weight estimation should be done on either GPU (True)
         or CPU (False): Default is None. For small models, estimation of the
         weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points within a chunk, which are localized and
+        analysed together in one batched weight estimation. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the grid
+        points within a chunk. Default is None, indicating that the weights
+        are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points within a chunk
+        with the same local observations and localization weights. Default
+        is False.
+    balance : bool, optional
+        If the chunks should be balanced by their estimated costs, based on
+        the number of local observations and the ensemble size. The number
+        of chunks is still determined by ``chunksize``, but the chunks have
+        roughly the same costs. With a small chunksize, the work stealing of
+        the dask scheduler additionally balances the chunks dynamically
+        between the workers. Default is False, indicating chunks with a
+        fixed size.
+    target_duration : float, optional
+        The targeted duration of a single task in seconds, if the chunksize
+        is calibrated. Default is 1.
+    calib_size : int, optional
+        The number of contiguous grid points, which are analysed to calibrate
+        the chunksize. Default is 32.
     """
     def __str__(self):
         return 'Correlated {0:s}'.format(str(super(DistributedLETKFBase)))
@@ -309,8 +531,13 @@ class DistributedLETKFUncorr(UnCorrMixin, DistributedLETKFBase):
 
     Parameters
     ----------
-    chunks : int, optional
-        The data is splitted up in this number of chunks.
+    chunksize : int or str, optional
+        The data is splitted up such that every chunk has this number of
+        samples. This influences the performance of this distributed version of
+        the LETKF. If this is `'auto'`, the chunksize is calibrated in the
+        first analysis such that a chunk takes roughly ``target_duration``
+        seconds and stored as ``calibrated_chunksize`` for later cycles.
+        Default is 10.
     localization : obj or None, optional
         This localization is used to localize and constrain observations
         spatially. If this localization is None, no localization is applied such
@@ -331,6 +558,33 @@ class DistributedLETKFUncorr(UnCorrMixin, DistributedLETKFBase):
         Indicator if the weight estimation should be done on either GPU (True)
         or CPU (False): Default is None. For small models, estimation of the
         weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points within a chunk, which are localized and
+        analysed together in one batched weight estimation. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the grid
+        points within a chunk. Default is None, indicating that the weights
+        are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points within a chunk
+        with the same local observations and localization weights. Default
+        is False.
+    balance : bool, optional
+        If the chunks should be balanced by their estimated costs, based on
+        the number of local observations and the ensemble size. The number
+        of chunks is still determined by ``chunksize``, but the chunks have
+        roughly the same costs. With a small chunksize, the work stealing of
+        the dask scheduler additionally balances the chunks dynamically
+        between the workers. Default is False, indicating chunks with a
+        fixed size.
+    target_duration : float, optional
+        The targeted duration of a single task in seconds, if the chunksize
+        is calibrated. Default is 1.
+    calib_size : int, optional
+        The number of contiguous grid points, which are analysed to calibrate
+        the chunksize. Default is 32.
     """
     def __str__(self):
         return 'Uncorrelated {0:s}'.format(str(super(DistributedLETKFBase)))
@@ -0,0 +1,419 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+# System modules
+import logging
+from typing import Union, Type, Iterable, Tuple, Any
+
+# External modules
+import numpy as np
+import pandas as pd
+import torch
+import xarray as xr
+
+# Internal modules
+from pytassim.assimilation.filter.mixins import CorrMixin, UnCorrMixin
+from pytassim.assimilation.utils import grid_to_array
+from .letkf import LETKFBase
+from .letkf_core import LETKFAnalyser
+from .weight_mapping import BaseWeightMapping
+
+from pytassim.localization.localization import BaseLocalization
+from pytassim.transform.base import BaseTransformer
+
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    'MPILETKFCorr',
+    'MPILETKFUncorr'
+]
+
+
+class MPILETKFBase(LETKFBase):
+    """
+    Base object for a localised ensemble transform Kalman filter with a
+    domain decomposition over MPI ranks, where every rank analyses its own
+    part of the state grid. As the observations are exchanged between all
+    ranks, every rank has to update its state, also without own
+    observations.
+    """
+    _skip_without_obs = False
+
+    def __init__(
+            self,
+            comm: Any = None,
+            localization: Union[None, BaseLocalization] = None,
+            inf_factor: Union[torch.Tensor, float, torch.nn.Parameter] = 1.0,
+            smoother: bool = False, gpu: bool = False,
+            pre_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            post_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            batch_size: int = 1,
+            weight_mapping: Union[None, BaseWeightMapping] = None,
+            deduplicate: bool = False
+    ):
+        super().__init__(localization, inf_factor, smoother, gpu, pre_transform,
+                         post_transform, batch_size, weight_mapping,
+                         deduplicate)
+        self._name = 'MPI LETKF'
+        self._comm = comm
+
+    @property
+    def comm(self) -> Any:
+        """
+        The MPI communicator, which is used for the domain decomposition. If
+        no communicator is set, :py:data:`mpi4py.MPI.COMM_WORLD` is used.
+        """
+        if self._comm is None:
+            from mpi4py import MPI
+            self._comm = MPI.COMM_WORLD
+        return self._comm
+
+    @comm.setter
+    def comm(self, new_comm: Any):
+        self._comm = new_comm
+
+    def get_local_slice(self, len_grid: int) -> slice:
+        """
+        Get the contiguous slice of the grid, which is owned by the rank of
+        this process. The grid is evenly splitted between all ranks of set
+        communicator.
+
+        Parameters
+        ----------
+        len_grid : int
+            The number of grid points of the global grid.
+
+        Returns
+        -------
+        local_slice : slice
+            The slice of the grid points, which are owned by this rank.
+        """
+        rank_pos = np.linspace(0, len_grid, self.comm.Get_size()+1)
+        rank_pos = rank_pos.round().astype(int)
+        rank = self.comm.Get_rank()
+        return slice(int(rank_pos[rank]), int(rank_pos[rank+1]))
+
+    def _exchange_halo(
+            self,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            obs_grid: np.ndarray,
+            loc_grid: np.ndarray
+    ) -> Tuple[torch.Tensor, torch.Tensor, np.ndarray]:
+        """
+        Exchanges the normalized perturbations and observations between the
+        ranks. Only the grid of the observations is gathered on every rank.
+        Based on this gathered grid, every rank requests the observations
+        within its halo, given by the observation subset of set
+        localization for the localized points of this rank, from their
+        owning ranks. If no subset is available, all observations are
+        requested.
+        """
+        comm = self.comm
+        rank_obs_grids = comm.allgather(obs_grid)
+        global_obs_grid = np.concatenate(rank_obs_grids, axis=0)
+        rank_pos = np.cumsum([0] + [len(grid) for grid in rank_obs_grids])
+
+        obs_ind = None
+        if len(global_obs_grid) == 0:
+            obs_ind = np.zeros(0, dtype=int)
+        elif self.localization is not None and len(loc_grid) == 0:
+            obs_ind = np.zeros(0, dtype=int)
+        elif self.localization is not None:
+            obs_ind = self.localization.get_obs_subset(loc_grid,
+                                                       global_obs_grid)
+        if obs_ind is None:
+            obs_ind = np.arange(len(global_obs_grid))
+        obs_ind = np.sort(np.asarray(obs_ind, dtype=int))
+        requests = [
+            obs_ind[(obs_ind >= start) & (obs_ind < end)] - start
+            for start, end in zip(rank_pos[:-1], rank_pos[1:])
+        ]
+        requested = comm.alltoall(requests)
+
+        np_perts = normed_perts.cpu().numpy()
+        np_obs = normed_obs.cpu().numpy()
+        received = comm.alltoall([
+            (np_perts[..., ind], np_obs[..., ind]) for ind in requested
+        ])
+        halo_perts = torch.from_numpy(
+            np.concatenate([perts for perts, _ in received], axis=-1)
+        ).to(normed_perts)
+        halo_obs = torch.from_numpy(
+            np.concatenate([obs for _, obs in received], axis=-1)
+        ).to(normed_obs)
+        logger.info(
+            'Received {0:d} of {1:d} observations on rank {2:d}'.format(
+                len(obs_ind), len(global_obs_grid), comm.Get_rank()
+            )
+        )
+        return halo_perts, halo_obs, global_obs_grid[obs_ind]
+
+    def _get_local_analyser(self, state_grid: np.ndarray) -> LETKFAnalyser:
+        """
+        Get the analyser for the local grid of this rank. If a weight
+        mapping is set, the grids of all ranks are gathered and the mapping
+        is estimated for the whole grid, such that weight lattices, columns
+        or tiles are not cut at the rank boundaries. The local analyser then
+        uses the slice of this rank.
+        """
+        if self.weight_mapping is None or self.localization is None:
+            return self.analyser
+        rank_grids = self.comm.allgather(state_grid)
+        rank_pos = np.cumsum([0] + [len(grid) for grid in rank_grids])
+        analysers = self.analyser.split(
+            np.concatenate(rank_grids, axis=0), rank_pos
+        )
+        return analysers[self.comm.Get_rank()]
+
+    def _get_empty_obs(
+            self,
+            state: xr.DataArray,
+            state_grid: np.ndarray
+    ) -> Tuple[torch.Tensor, torch.Tensor, np.ndarray]:
+        """
+        Get empty normalized perturbations, observations and observation
+        grid for a rank without own observations, such that this rank still
+        takes part in the exchange of the observations.
+        """
+        normed_perts, normed_obs = self._states_to_torch(
+            np.zeros((state.sizes['ensemble'], 0)), np.zeros((1, 0))
+        )
+        return normed_perts, normed_obs, state_grid[:0]
+
+    def update_state(
+            self,
+            state: xr.DataArray,
+            observations: Union[xr.Dataset, Iterable[xr.Dataset]],
+            pseudo_state: xr.DataArray,
+            analysis_time: pd.Timestamp
+    ) -> xr.DataArray:
+        """
+        This method updates the local state of this rank based on given
+        local observations. Every rank normalises its own observations,
+        which are then exchanged between the ranks, such that every rank
+        gets all observations within its halo. A rank without own
+        observations takes part in this exchange with an empty set of
+        observations. The analysis is only estimated for the local state and
+        not gathered.
+
+        Parameters
+        ----------
+        state : :py:class:`xarray.DataArray`
+            This local state of this rank is updated by this assimilation
+            algorithm and given ``observation``. This
+            :py:class:`~xarray.DataArray` should have four coordinates, which
+            are specified in :py:class:`pytassim.state.ModelState`.
+        observations : :py:class:`xarray.Dataset` or \
+        iterable(:py:class:`xarray.Dataset`)
+            The observations owned by this rank. Every observation has to be
+            owned by exactly one rank. This can be empty if this rank owns no
+            observations.
+        pseudo_state : :py:class:`xarray.DataArray`
+            This local state is used to generate an observation-equivalent
+            for the observations owned by this rank.
+        analysis_time : :py:class:`datetime.datetime`
+            This analysis time determines at which point the state is updated.
+
+        Returns
+        -------
+        analysis : :py:class:`xarray.DataArray`
+            The analysed local state of this rank. The analysis has same
+            coordinates as given ``state``. If filtering mode is on, then the
+            time axis has only one element.
+        """
+        logger.info('####### {0:s} #######'.format(self._name))
+        state_grid = grid_to_array(state['grid'].values)
+        if observations:
+            logger.info('Starting with specific preparation')
+            pseudo_obs, obs_state, obs_cov, obs_grid = self._get_states(
+                pseudo_state, observations,
+            )
+
+            logger.info('Transfering the data to torch')
+            pseudo_obs, obs_state, obs_cov = self._states_to_torch(
+                pseudo_obs, obs_state, obs_cov
+            )
+
+            logger.info('Normalise perturbations and observations')
+            obs_cinv = self._get_chol_inverse(obs_cov)
+            normed_perts, normed_obs = self._normalise_obs(
+                pseudo_obs, obs_state, obs_cinv
+            )
+        else:
+            logger.info('No local observations on rank {0:d}'.format(
+                self.comm.Get_rank()
+            ))
+            normed_perts, normed_obs, obs_grid = self._get_empty_obs(
+                state, state_grid
+            )
+
+        logger.info('Exchange observations within the halo')
+        analyser = self._get_local_analyser(state_grid)
+        normed_perts, normed_obs, obs_grid = self._exchange_halo(
+            normed_perts, normed_obs, obs_grid,
+            analyser.get_loc_grid(state_grid)
+        )
+
+        state_mean, state_perts = state.state.split_mean_perts()
+        state_perts, = self._states_to_torch(state_perts.values)
+
+        logger.info('Create analysis perturbations')
+        analysis_perts = analyser(state_perts, normed_perts, normed_obs,
+                                  state_grid, obs_grid)
+
+        logger.info('Create analysis')
+        analysis_perts = state.copy(data=analysis_perts.cpu().numpy())
+        analysis = analysis_perts + state_mean
+        analysis = analysis.transpose('var_name', 'time', 'ensemble', 'grid')
+        return analysis
+
+
+class MPILETKFCorr(CorrMixin, MPILETKFBase):
+    """
+    This is a MPI-based implementation of the `localized ensemble transform
+    Kalman filter` :cite:`hunt_efficient_2007` for correlated observations. The
+    state grid is decomposed between the ranks of a MPI communicator and
+    every rank calls
+    :py:meth:`~pytassim.assimilation.base.BaseAssimilation.assimilate` with
+    its own part of the state, e.g. selected with :py:meth:`get_local_slice`,
+    and the observations located within this part. The normalized
+    observations are exchanged between the ranks, such that every rank gets
+    the observations within its localization halo, and the analysis of
+    every rank is returned without a central gather.
+    The observation covariance is only taken into account within the
+    observations of a rank, correlations between observations of different
+    ranks are neglected.
+
+    Parameters
+    ----------
+    comm : :py:class:`mpi4py.MPI.Comm` or None, optional
+        The grid is decomposed between the ranks of this MPI communicator.
+        If no communicator is given (default),
+        :py:data:`mpi4py.MPI.COMM_WORLD` is used.
+    localization : obj or None, optional
+        This localization is used to localize and constrain observations
+        spatially. If the localization returns an observation subset for
+        the local grid, e.g. with a cutoff radius, only observations within
+        this halo are exchanged. Otherwise, all observations are exchanged
+        between all ranks. Default value is None, indicating no localization
+        at all.
+    inf_factor : float, optional
+        Multiplicative inflation factor :math:`\\rho``, which is applied to the
+        background precision. An inflation factor greater one increases the
+        ensemble spread, while a factor less one decreases the spread. Default
+        is 1.0, which is the same as no inflation at all.
+    smoother : bool, optional
+        Indicates if this filter should be run in smoothing or in filtering
+        mode. In smoothing mode, no analysis time is selected from given state
+        and the ensemble weights are applied to the whole state. In filtering
+        mode, the weights are applied only on selected analysis time. Default
+        is False, indicating filtering mode.
+    gpu : bool, optional
+        Indicator if the weight estimation should be done on either GPU (True)
+        or CPU (False): Default is None. For small models, estimation of the
+        weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points, which are localized and analysed together
+        in one batched weight estimation. Default is 1, indicating a
+        sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the
+        local grid points. Default is None, indicating that the weights are
+        estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for local grid points with the
+        same local observations and localization weights. Default is False.
+    """
+    def __str__(self):
+        return 'Correlated {0:s}'.format(str(super(MPILETKFBase)))
+
+    def __repr__(self):
+        return 'Corr{0:s}'.format(repr(super(MPILETKFBase)))
+
+
+class MPILETKFUncorr(UnCorrMixin, MPILETKFBase):
+    """
+    This is a MPI-based implementation of the `localized ensemble transform
+    Kalman filter` :cite:`hunt_efficient_2007` for uncorrelated observations. The
+    state grid is decomposed between the ranks of a MPI communicator and
+    every rank calls
+    :py:meth:`~pytassim.assimilation.base.BaseAssimilation.assimilate` with
+    its own part of the state, e.g. selected with :py:meth:`get_local_slice`,
+    and the observations located within this part. The normalized
+    observations are exchanged between the ranks, such that every rank gets
+    the observations within its localization halo, and the analysis of
+    every rank is returned without a central gather.
+
+    Parameters
+    ----------
+    comm : :py:class:`mpi4py.MPI.Comm` or None, optional
+        The grid is decomposed between the ranks of this MPI communicator.
+        If no communicator is given (default),
+        :py:data:`mpi4py.MPI.COMM_WORLD` is used.
+    localization : obj or None, optional
+        This localization is used to localize and constrain observations
+        spatially. If the localization returns an observation subset for
+        the local grid, e.g. with a cutoff radius, only observations within
+        this halo are exchanged. Otherwise, all observations are exchanged
+        between all ranks. Default value is None, indicating no localization
+        at all.
+    inf_factor : float, optional
+        Multiplicative inflation factor :math:`\\rho``, which is applied to the
+        background precision. An inflation factor greater one increases the
+        ensemble spread, while a factor less one decreases the spread. Default
+        is 1.0, which is the same as no inflation at all.
+    smoother : bool, optional
+        Indicates if this filter should be run in smoothing or in filtering
+        mode. In smoothing mode, no analysis time is selected from given state
+        and the ensemble weights are applied to the whole state. In filtering
+        mode, the weights are applied only on selected analysis time. Default
+        is False, indicating filtering mode.
+    gpu : bool, optional
+        Indicator if the weight estimation should be done on either GPU (True)
+        or CPU (False): Default is None. For small models, estimation of the
+        weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points, which are localized and analysed together
+        in one batched weight estimation. Default is 1, indicating a
+        sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the
+        local grid points. Default is None, indicating that the weights are
+        estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for local grid points with the
+        same local observations and localization weights. Default is False.
+    """
+    def __str__(self):
+        return 'Uncorrelated {0:s}'.format(str(super(MPILETKFBase)))
+
+    def __repr__(self):
+        return 'Uncorr{0:s}'.format(repr(super(MPILETKFBase)))
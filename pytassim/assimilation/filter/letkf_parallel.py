@@ -0,0 +1,315 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Union, Type, Iterable, Tuple, List
+
+# External modules
+import numpy as np
+import torch
+
+# Internal modules
+from pytassim.assimilation.filter.mixins import CorrMixin, UnCorrMixin
+from .letkf import LETKFBase
+from .partition import partition_grid
+from .weight_mapping import BaseWeightMapping
+
+from pytassim.localization.localization import BaseLocalization
+from pytassim.transform.base import BaseTransformer
+
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    'ParallelLETKFCorr',
+    'ParallelLETKFUncorr'
+]
+
+
+class ParallelLETKFBase(LETKFBase):
+    """
+    Base object for a parallel localised ensemble transform Kalman filter,
+    where the grid points are splitted into chunks, which are analysed by
+    a :py:class:`concurrent.futures.Executor`.
+    """
+    def __init__(
+            self,
+            pool: Union[None, Executor] = None,
+            chunksize: int = 100,
+            localization: Union[None, BaseLocalization] = None,
+            inf_factor: Union[torch.Tensor, float, torch.nn.Parameter] = 1.0,
+            smoother: bool = False, gpu: bool = False,
+            pre_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            post_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            batch_size: int = 1,
+            weight_mapping: Union[None, BaseWeightMapping] = None,
+            deduplicate: bool = False,
+            balance: bool = False
+    ):
+        super().__init__(localization, inf_factor, smoother, gpu, pre_transform,
+                         post_transform, batch_size, weight_mapping,
+                         deduplicate)
+        self._name = 'Parallel LETKF'
+        self.pool = pool
+        self.chunksize = chunksize
+        self.balance = balance
+
+    def _partition_grid(
+            self,
+            len_grid: int,
+            ens_size: int,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, List[int]]:
+        """
+        Partitions the grid into chunks and returns the chunk boundaries
+        together with the order, in which the chunks are submitted. Balanced
+        chunks are submitted with descending costs, such that idle workers
+        pick up the remaining cheaper chunks from the pool queue.
+        """
+        chunk_pos, chunk_costs = partition_grid(
+            len_grid, self.chunksize, self.localization, state_grid,
+            obs_grid, ens_size, self.balance
+        )
+        if self.balance:
+            submit_order = list(np.argsort(-chunk_costs, kind='stable'))
+        else:
+            submit_order = list(range(len(chunk_costs)))
+        return chunk_pos, submit_order
+
+    def _get_analysis_perts(
+            self,
+            state_perts: torch.Tensor,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Splits given state perturbations and grid into chunks along the grid
+        dimension and estimates the analysis perturbations of every chunk
+        with set pool. If no pool is set, a thread pool is used for this
+        analysis step.
+        """
+        if self.localization is None:
+            return super()._get_analysis_perts(
+                state_perts, normed_perts, normed_obs, state_grid, obs_grid
+            )
+        if self.pool is None:
+            with self._create_pool() as pool:
+                return self._analyse_chunks(
+                    pool, state_perts, normed_perts, normed_obs, state_grid,
+                    obs_grid
+                )
+        return self._analyse_chunks(
+            self.pool, state_perts, normed_perts, normed_obs, state_grid,
+            obs_grid
+        )
+
+    @staticmethod
+    def _create_pool() -> Executor:
+        """
+        Creates the default pool, which is used if no pool is set.
+        """
+        return ThreadPoolExecutor()
+
+    def _analyse_chunks(
+            self,
+            pool: Executor,
+            state_perts: torch.Tensor,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Submits the analysis of every chunk to given pool and concatenates
+        the analysed chunks. A set weight mapping is estimated for the whole
+        grid and splitted into the chunks.
+        """
+        chunk_pos, submit_order = self._partition_grid(
+            state_perts.shape[-1], normed_perts.shape[-2], state_grid,
+            obs_grid
+        )
+        analysers = self.analyser.split(state_grid, chunk_pos)
+        logger.info('Submit {0:d} chunks to {1}'.format(len(submit_order),
+                                                        pool))
+        futures = {
+            k: pool.submit(
+                analysers[k], state_perts[..., chunk_pos[k]:chunk_pos[k+1]],
+                normed_perts, normed_obs,
+                state_grid[chunk_pos[k]:chunk_pos[k+1]], obs_grid
+            )
+            for k in submit_order
+        }
+        analysis_perts = torch.cat(
+            [futures[k].result() for k in range(len(futures))], dim=-1
+        )
+        return analysis_perts
+
+
+class ParallelLETKFCorr(CorrMixin, ParallelLETKFBase):
+    """
+    This is an executor-based implementation of the `localized ensemble
+    transform Kalman filter` :cite:`hunt_efficient_2007` for correlated
+    observations. The grid points are splitted into chunks, which are
+    analysed in parallel by a :py:class:`concurrent.futures.Executor`. A
+    :py:class:`~concurrent.futures.ThreadPoolExecutor` shares the
+    normalized perturbations and observations between the chunks without
+    copying, as PyTorch releases the GIL for its linear algebra. A
+    :py:class:`~concurrent.futures.ProcessPoolExecutor` or
+    :py:class:`mpi4py.futures.MPIPoolExecutor` serializes them for every
+    chunk.
+
+    Parameters
+    ----------
+    pool : :py:class:`concurrent.futures.Executor` or None, optional
+        The chunks are submitted to this pool. If no pool is given (default),
+        a :py:class:`~concurrent.futures.ThreadPoolExecutor` with the default
+        number of workers is created for every analysis.
+    chunksize : int, optional
+        The grid is splitted up such that every chunk has this number of grid
+        points. Default is 100.
+    localization : obj or None, optional
+        This localization is used to localize and constrain observations
+        spatially. If this localization is None, no localization is applied
+        and the analysis is not parallelized. Default value is None,
+        indicating no localization at all.
+    inf_factor : float, optional
+        Multiplicative inflation factor :math:`\\rho``, which is applied to the
+        background precision. An inflation factor greater one increases the
+        ensemble spread, while a factor less one decreases the spread. Default
+        is 1.0, which is the same as no inflation at all.
+    smoother : bool, optional
+        Indicates if this filter should be run in smoothing or in filtering
+        mode. In smoothing mode, no analysis time is selected from given state
+        and the ensemble weights are applied to the whole state. In filtering
+        mode, the weights are applied only on selected analysis time. Default
+        is False, indicating filtering mode.
+    gpu : bool, optional
+        Indicator if the weight estimation should be done on either GPU (True)
+        or CPU (False): Default is None. For small models, estimation of the
+        weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points within a chunk, which are localized and
+        analysed together in one batched weight estimation. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the grid
+        points within a chunk. Default is None, indicating that the weights
+        are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points within a chunk
+        with the same local observations and localization weights. Default
+        is False.
+    balance : bool, optional
+        If the chunks should be balanced by their estimated costs, based on
+        the number of local observations and the ensemble size. The number
+        of chunks is still determined by ``chunksize``, but the chunks have
+        roughly the same costs and are submitted with descending costs. In
+        combination with a small chunksize, idle workers then dynamically
+        pick up the remaining chunks. Default is False, indicating chunks
+        with a fixed size.
+    """
+    def __str__(self):
+        return 'Correlated {0:s}'.format(str(super(ParallelLETKFBase)))
+
+    def __repr__(self):
+        return 'Corr{0:s}'.format(repr(super(ParallelLETKFBase)))
+
+
+class ParallelLETKFUncorr(UnCorrMixin, ParallelLETKFBase):
+    """
+    This is an executor-based implementation of the `localized ensemble
+    transform Kalman filter` :cite:`hunt_efficient_2007` for uncorrelated
+    observations. The grid points are splitted into chunks, which are
+    analysed in parallel by a :py:class:`concurrent.futures.Executor`. A
+    :py:class:`~concurrent.futures.ThreadPoolExecutor` shares the
+    normalized perturbations and observations between the chunks without
+    copying, as PyTorch releases the GIL for its linear algebra. A
+    :py:class:`~concurrent.futures.ProcessPoolExecutor` or
+    :py:class:`mpi4py.futures.MPIPoolExecutor` serializes them for every
+    chunk.
+
+    Parameters
+    ----------
+    pool : :py:class:`concurrent.futures.Executor` or None, optional
+        The chunks are submitted to this pool. If no pool is given (default),
+        a :py:class:`~concurrent.futures.ThreadPoolExecutor` with the default
+        number of workers is created for every analysis.
+    chunksize : int, optional
+        The grid is splitted up such that every chunk has this number of grid
+        points. Default is 100.
+    localization : obj or None, optional
+        This localization is used to localize and constrain observations
+        spatially. If this localization is None, no localization is applied
+        and the analysis is not parallelized. Default value is None,
+        indicating no localization at all.
+    inf_factor : float, optional
+        Multiplicative inflation factor :math:`\\rho``, which is applied to the
+        background precision. An inflation factor greater one increases the
+        ensemble spread, while a factor less one decreases the spread. Default
+        is 1.0, which is the same as no inflation at all.
+    smoother : bool, optional
+        Indicates if this filter should be run in smoothing or in filtering
+        mode. In smoothing mode, no analysis time is selected from given state
+        and the ensemble weights are applied to the whole state. In filtering
+        mode, the weights are applied only on selected analysis time. Default
+        is False, indicating filtering mode.
+    gpu : bool, optional
+        Indicator if the weight estimation should be done on either GPU (True)
+        or CPU (False): Default is None. For small models, estimation of the
+        weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points within a chunk, which are localized and
+        analysed together in one batched weight estimation. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the grid
+        points within a chunk. Default is None, indicating that the weights
+        are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points within a chunk
+        with the same local observations and localization weights. Default
+        is False.
+    balance : bool, optional
+        If the chunks should be balanced by their estimated costs, based on
+        the number of local observations and the ensemble size. The number
+        of chunks is still determined by ``chunksize``, but the chunks have
+        roughly the same costs and are submitted with descending costs. In
+        combination with a small chunksize, idle workers then dynamically
+        pick up the remaining chunks. Default is False, indicating chunks
+        with a fixed size.
+    """
+    def __str__(self):
+        return 'Uncorrelated {0:s}'.format(str(super(ParallelLETKFBase)))
+
+    def __repr__(self):
+        return 'Uncorr{0:s}'.format(repr(super(ParallelLETKFBase)))
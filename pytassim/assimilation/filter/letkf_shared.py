@@ -0,0 +1,383 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple, Union, Type, Iterable
+
+# External modules
+import numpy as np
+import torch
+
+# Internal modules
+from pytassim.assimilation.filter.mixins import CorrMixin, UnCorrMixin
+from pytassim.assimilation.utils import grid_to_array
+from .letkf_core import LETKFAnalyser
+from .letkf_parallel import ParallelLETKFBase
+from .weight_mapping import BaseWeightMapping
+
+from pytassim.localization.localization import BaseLocalization
+from pytassim.transform.base import BaseTransformer
+
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    'SharedMemoryLETKFCorr',
+    'SharedMemoryLETKFUncorr'
+]
+
+
+_SharedMeta = Tuple[str, Tuple[int, ...], str]
+
+
+def _create_shared(
+        shape: Tuple[int, ...],
+        dtype: np.dtype,
+        shared_blocks: List[shared_memory.SharedMemory]
+) -> Tuple[_SharedMeta, np.ndarray]:
+    """
+    Creates a new shared memory block for an array with given shape and
+    dtype. The block is appended to given list of blocks and the meta data
+    to attach the block together with an array view on the block are
+    returned.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    shared_blocks.append(shm)
+    shared_array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return (shm.name, tuple(shape), dtype.str), shared_array
+
+
+def _to_shared(
+        array: np.ndarray,
+        shared_blocks: List[shared_memory.SharedMemory]
+) -> _SharedMeta:
+    """
+    Copies given array into a new shared memory block and returns the meta
+    data to attach this block.
+    """
+    shared_meta, shared_array = _create_shared(
+        array.shape, array.dtype, shared_blocks
+    )
+    shared_array[...] = array
+    return shared_meta
+
+
+def _close_shared(
+        shared_blocks: Iterable[shared_memory.SharedMemory],
+        unlink: bool = False
+):
+    """
+    Closes given shared memory blocks and unlinks them if requested. Every
+    block is closed and unlinked, even if another block fails. A block, which
+    cannot be closed as an array view on it is still alive, e.g. within the
+    traceback of an exception, is only unlinked.
+    """
+    for shm in shared_blocks:
+        try:
+            shm.close()
+        except BufferError:
+            logger.warning(
+                'Shared memory block {0:s} is still in use and cannot be '
+                'closed'.format(shm.name)
+            )
+        finally:
+            if unlink:
+                shm.unlink()
+
+
+def _analyse_shared_chunk(
+        analyser: LETKFAnalyser,
+        shared_meta: Dict[str, _SharedMeta],
+        start: int,
+        end: int
+) -> int:
+    """
+    Attaches to the shared memory blocks, analyses the grid points between
+    `start` and `end` with given analyser and writes the analysis
+    perturbations in place into the shared analysis buffer. The attached
+    blocks are closed again, also if the analysis fails.
+    """
+    shared_blocks = []
+    arrays = {}
+    try:
+        for key, meta in shared_meta.items():
+            shared_blocks.append(shared_memory.SharedMemory(name=meta[0]))
+            arrays[key] = np.ndarray(meta[1], dtype=meta[2],
+                                     buffer=shared_blocks[-1].buf)
+        analysis_perts = analyser(
+            torch.from_numpy(arrays['state_perts'][..., start:end]),
+            torch.from_numpy(arrays['normed_perts']),
+            torch.from_numpy(arrays['normed_obs']),
+            arrays['state_grid'][start:end],
+            arrays['obs_grid']
+        )
+        arrays['analysis'][..., start:end] = analysis_perts.numpy()
+    finally:
+        arrays.clear()
+        analysis_perts = None
+        _close_shared(shared_blocks)
+    return end-start
+
+
+class SharedMemoryLETKFBase(ParallelLETKFBase):
+    """
+    Base object for a process-based localised ensemble transform Kalman
+    filter, where the input and output arrays are placed in shared memory.
+    """
+    def __init__(
+            self,
+            pool: Union[None, Executor] = None,
+            chunksize: int = 100,
+            localization: Union[None, BaseLocalization] = None,
+            inf_factor: Union[torch.Tensor, float, torch.nn.Parameter] = 1.0,
+            smoother: bool = False, gpu: bool = False,
+            pre_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            post_transform: Union[None, Iterable[Type[BaseTransformer]]] = None,
+            batch_size: int = 1,
+            weight_mapping: Union[None, BaseWeightMapping] = None,
+            deduplicate: bool = False,
+            balance: bool = False
+    ):
+        super().__init__(pool, chunksize, localization, inf_factor, smoother,
+                         gpu, pre_transform, post_transform, batch_size,
+                         weight_mapping, deduplicate, balance)
+        self._name = 'Shared memory LETKF'
+
+    @staticmethod
+    def _create_pool() -> Executor:
+        """
+        Creates the default process pool, which is used if no pool is set.
+        """
+        return ProcessPoolExecutor()
+
+    def _analyse_chunks(
+            self,
+            pool: Executor,
+            state_perts: torch.Tensor,
+            normed_perts: torch.Tensor,
+            normed_obs: torch.Tensor,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> torch.Tensor:
+        """
+        Copies the perturbations, observations and grids into shared memory,
+        creates a shared analysis buffer and submits only the grid ranges of
+        the chunks to given pool. The workers write their analysis in place
+        into the analysis buffer. All shared memory blocks are closed and
+        unlinked, also if the analysis fails.
+        """
+        shared_blocks = []
+        analysis_buffer = None
+        try:
+            shared_meta = {
+                'state_perts': _to_shared(
+                    state_perts.cpu().numpy(), shared_blocks
+                ),
+                'normed_perts': _to_shared(
+                    normed_perts.cpu().numpy(), shared_blocks
+                ),
+                'normed_obs': _to_shared(
+                    normed_obs.cpu().numpy(), shared_blocks
+                ),
+                'state_grid': _to_shared(
+                    grid_to_array(state_grid), shared_blocks
+                ),
+                'obs_grid': _to_shared(
+                    grid_to_array(obs_grid), shared_blocks
+                ),
+            }
+            shared_meta['analysis'], analysis_buffer = _create_shared(
+                state_perts.shape, shared_meta['state_perts'][2],
+                shared_blocks
+            )
+            chunk_pos, submit_order = self._partition_grid(
+                state_perts.shape[-1], normed_perts.shape[-2], state_grid,
+                obs_grid
+            )
+            logger.info(
+                'Submit {0:d} chunks with shared memory to {1}'.format(
+                    len(submit_order), pool
+                )
+            )
+            analysers = self.analyser.split(state_grid, chunk_pos)
+            futures = [
+                pool.submit(
+                    _analyse_shared_chunk, analysers[k], shared_meta,
+                    int(chunk_pos[k]), int(chunk_pos[k+1])
+                )
+                for k in submit_order
+            ]
+            _ = [f.result() for f in futures]
+            analysis_perts = torch.from_numpy(analysis_buffer.copy())
+        finally:
+            analysis_buffer = None
+            _close_shared(shared_blocks, unlink=True)
+        return analysis_perts.to(state_perts)
+
+
+class SharedMemoryLETKFCorr(CorrMixin, SharedMemoryLETKFBase):
+    """
+    This is a process-based implementation of the `localized ensemble
+    transform Kalman filter` :cite:`hunt_efficient_2007` for correlated
+    observations. The ensemble perturbations, observations, grids and the
+    analysis buffer are placed in :py:mod:`multiprocessing.shared_memory`.
+    The workers attach to these blocks as zero-copy numpy and torch views,
+    analyse the grid points of their chunk and write their analysis in place
+    into the analysis buffer, such that only the grid ranges are sent to the
+    pool. This backend scales also if the analysis is limited by the
+    python overhead, where threads are restricted by the GIL.
+
+    Parameters
+    ----------
+    pool : :py:class:`concurrent.futures.Executor` or None, optional
+        The grid ranges are submitted to this pool, which has to run on the
+        same machine, e.g. a
+        :py:class:`~concurrent.futures.ProcessPoolExecutor`. If no pool is
+        given (default), a
+        :py:class:`~concurrent.futures.ProcessPoolExecutor` with the default
+        number of workers is created for every analysis.
+    chunksize : int, optional
+        The grid is splitted up such that every chunk has this number of grid
+        points. Default is 100.
+    localization : obj or None, optional
+        This localization is used to localize and constrain observations
+        spatially. If this localization is None, no localization is applied
+        and the analysis is not parallelized. Default value is None,
+        indicating no localization at all.
+    inf_factor : float, optional
+        Multiplicative inflation factor :math:`\\rho``, which is applied to the
+        background precision. An inflation factor greater one increases the
+        ensemble spread, while a factor less one decreases the spread. Default
+        is 1.0, which is the same as no inflation at all.
+    smoother : bool, optional
+        Indicates if this filter should be run in smoothing or in filtering
+        mode. In smoothing mode, no analysis time is selected from given state
+        and the ensemble weights are applied to the whole state. In filtering
+        mode, the weights are applied only on selected analysis time. Default
+        is False, indicating filtering mode.
+    gpu : bool, optional
+        Indicator if the weight estimation should be done on either GPU (True)
+        or CPU (False): Default is None. For small models, estimation of the
+        weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points within a chunk, which are localized and
+        analysed together in one batched weight estimation. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the grid
+        points within a chunk. Default is None, indicating that the weights
+        are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points within a chunk
+        with the same local observations and localization weights. Default
+        is False.
+    balance : bool, optional
+        If the chunks should be balanced by their estimated costs, based on
+        the number of local observations and the ensemble size. The chunks
+        are submitted with descending costs. Default is False, indicating
+        chunks with a fixed size.
+    """
+    def __str__(self):
+        return 'Correlated {0:s}'.format(str(super(SharedMemoryLETKFBase)))
+
+    def __repr__(self):
+        return 'Corr{0:s}'.format(repr(super(SharedMemoryLETKFBase)))
+
+
+class SharedMemoryLETKFUncorr(UnCorrMixin, SharedMemoryLETKFBase):
+    """
+    This is a process-based implementation of the `localized ensemble
+    transform Kalman filter` :cite:`hunt_efficient_2007` for uncorrelated
+    observations. The ensemble perturbations, observations, grids and the
+    analysis buffer are placed in :py:mod:`multiprocessing.shared_memory`.
+    The workers attach to these blocks as zero-copy numpy and torch views,
+    analyse the grid points of their chunk and write their analysis in place
+    into the analysis buffer, such that only the grid ranges are sent to the
+    pool. This backend scales also if the analysis is limited by the
+    python overhead, where threads are restricted by the GIL.
+
+    Parameters
+    ----------
+    pool : :py:class:`concurrent.futures.Executor` or None, optional
+        The grid ranges are submitted to this pool, which has to run on the
+        same machine, e.g. a
+        :py:class:`~concurrent.futures.ProcessPoolExecutor`. If no pool is
+        given (default), a
+        :py:class:`~concurrent.futures.ProcessPoolExecutor` with the default
+        number of workers is created for every analysis.
+    chunksize : int, optional
+        The grid is splitted up such that every chunk has this number of grid
+        points. Default is 100.
+    localization : obj or None, optional
+        This localization is used to localize and constrain observations
+        spatially. If this localization is None, no localization is applied
+        and the analysis is not parallelized. Default value is None,
+        indicating no localization at all.
+    inf_factor : float, optional
+        Multiplicative inflation factor :math:`\\rho``, which is applied to the
+        background precision. An inflation factor greater one increases the
+        ensemble spread, while a factor less one decreases the spread. Default
+        is 1.0, which is the same as no inflation at all.
+    smoother : bool, optional
+        Indicates if this filter should be run in smoothing or in filtering
+        mode. In smoothing mode, no analysis time is selected from given state
+        and the ensemble weights are applied to the whole state. In filtering
+        mode, the weights are applied only on selected analysis time. Default
+        is False, indicating filtering mode.
+    gpu : bool, optional
+        Indicator if the weight estimation should be done on either GPU (True)
+        or CPU (False): Default is None. For small models, estimation of the
+        weights on CPU is faster than on GPU!.
+    batch_size : int, optional
+        The number of grid points within a chunk, which are localized and
+        analysed together in one batched weight estimation. Default is 1,
+        indicating a sequential processing of the grid points.
+    weight_mapping : obj or None, optional
+        If this weight mapping is given, the ensemble weights are only
+        estimated at the weight points of this mapping and mapped to the grid
+        points within a chunk. Default is None, indicating that the weights
+        are estimated for every grid point.
+    deduplicate : bool, optional
+        If the weights are only estimated once for grid points within a chunk
+        with the same local observations and localization weights. Default
+        is False.
+    balance : bool, optional
+        If the chunks should be balanced by their estimated costs, based on
+        the number of local observations and the ensemble size. The chunks
+        are submitted with descending costs. Default is False, indicating
+        chunks with a fixed size.
+    """
+    def __str__(self):
+        return 'Uncorrelated {0:s}'.format(str(super(SharedMemoryLETKFBase)))
+
+    def __repr__(self):
+        return 'Uncorr{0:s}'.format(repr(super(SharedMemoryLETKFBase)))
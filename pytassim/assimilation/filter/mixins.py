@@ -25,17 +25,17 @@
 
 # System modules
 import logging
+from typing import Iterable, Union
 
 # External modules
-import scipy.linalg
-
-# Internal modules
-from typing import Iterable
-
 import numpy as np
 import torch
 import xarray as xr
 
+# Internal modules
+from pytassim.assimilation.covariance import BlockDiagonalMatrix
+
+
 logger = logging.getLogger(__name__)
 
 
@@ -62,44 +62,59 @@ class CorrMixin(object):
     @staticmethod
     def _get_block_cov_wo_time(obs):
         """
-        Get stacked covariance from observations without time dimension in
-        covariance.
+        Get the covariance blocks from observations without time dimension in
+        covariance. The same block is used for every time step.
         """
         len_time = len(obs.time)
         stacked_cov = [obs['covariance'].values] * len_time
-        stacked_cov = scipy.linalg.block_diag(*stacked_cov)
         return stacked_cov
 
-    def _get_obs_cov(self, observations: Iterable[xr.Dataset]) -> np.ndarray:
+    def _get_obs_cov(
+            self,
+            observations: Iterable[xr.Dataset]
+    ) -> BlockDiagonalMatrix:
         """
-        Get the observational covariance from given observations.
+        Get the observational covariance from given observations. The
+        observation subsets are independent, such that the covariance is
+        returned as block-diagonal matrix without creating the dense matrix.
         """
-        cov_stacked_list = []
+        cov_blocks = []
         for obs in observations:
             if 'time' in obs['covariance'].dims:
-                stacked_cov = self._get_block_cov_with_time(obs)
+                cov_blocks.append(self._get_block_cov_with_time(obs))
             else:
-                stacked_cov = self._get_block_cov_wo_time(obs)
-            cov_stacked_list.append(stacked_cov)
-        obs_cov = scipy.linalg.block_diag(*cov_stacked_list)
+                cov_blocks.extend(self._get_block_cov_wo_time(obs))
+        obs_cov = BlockDiagonalMatrix(cov_blocks)
         return obs_cov
 
     @staticmethod
-    def _get_chol_inverse(cov: torch.Tensor) -> torch.Tensor:
+    def _get_chol_inverse(
+            cov: Union[torch.Tensor, BlockDiagonalMatrix]
+    ) -> Union[torch.Tensor, BlockDiagonalMatrix]:
         """
         Decomposes given covariance with cholesky decomposition and returns the
-        inverse of the cholesky decomposition.
+        inverse of the cholesky decomposition. For a block-diagonal
+        covariance, the blockwise cholesky factors are returned, which are
+        only implicitly inverted by triangular solves in
+        :py:meth:`_mul_cinv`.
         """
+        if isinstance(cov, BlockDiagonalMatrix):
+            return cov.cholesky()
         chol_decomp = torch.cholesky(cov)
         chol_inv = chol_decomp.inverse()
         return chol_inv
 
     @staticmethod
-    def _mul_cinv(state: torch.Tensor, cinv: torch.Tensor) -> torch.Tensor:
+    def _mul_cinv(
+            state: torch.Tensor,
+            cinv: Union[torch.Tensor, BlockDiagonalMatrix]
+    ) -> torch.Tensor:
         """
         Multiplies given tensor with given inverse of the cholesky decomposed
         covariance matrix.
         """
+        if isinstance(cinv, BlockDiagonalMatrix):
+            return cinv.solve_triangular(state)
         normed_state = torch.mm(state, cinv)
         return normed_state
 
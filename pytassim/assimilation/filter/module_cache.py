@@ -0,0 +1,326 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple, Union
+
+# External modules
+import torch
+import torch.jit
+
+# Internal modules
+
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    'CompiledModule',
+    'CompiledModuleCache',
+    'module_cache'
+]
+
+
+def _get_tensor_key(tensor: torch.Tensor) -> Tuple:
+    """
+    Tensors with gradients are identified by their identity, as the compiled
+    module shares them with the original module. All other tensors are
+    identified by a sha1 digest of their values. The digest is estimated when
+    the module is looked up, such that tensors, which are changed in-place
+    after a module was compiled, are not detected for this compiled module.
+    """
+    if tensor.requires_grad:
+        return 'id', id(tensor)
+    tensor = tensor.detach()
+    tensor_hash = hashlib.sha1(tensor.cpu().contiguous().numpy().tobytes())
+    return (
+        str(tensor.dtype), str(tensor.device), tuple(tensor.shape),
+        tensor_hash.hexdigest()
+    )
+
+
+def _get_module_key(module: torch.nn.Module) -> Tuple:
+    """
+    Returns a hashable key for the configuration of given module, based on
+    the types of all submodules, their tensors and their scalar attributes.
+    """
+    key = []
+    for name, submodule in module.named_modules():
+        key.append((name, type(submodule).__module__,
+                    type(submodule).__qualname__))
+        for attr, value in sorted(vars(submodule).items()):
+            if isinstance(value, torch.Tensor):
+                key.append((name, attr, _get_tensor_key(value)))
+            elif isinstance(value, (bool, int, float, str)):
+                key.append((name, attr, value))
+        tensors = list(submodule.named_parameters(recurse=False)) + \
+            list(submodule.named_buffers(recurse=False))
+        for attr, value in tensors:
+            key.append((name, attr, _get_tensor_key(value)))
+    return tuple(key)
+
+
+class CompiledModule(object):
+    """
+    A compiled weights module together with its compile and run timings.
+    Calling this object calls the compiled module and accumulates the run
+    time. If the first call of a compiled module fails, e.g. because the
+    compiled graph does not support given inputs, the original module is
+    used instead, and this object is marked as not compiled.
+
+    Parameters
+    ----------
+    module : :py:class:`torch.nn.Module`
+        The compiled module, or the original module if the compilation
+        failed or is deactivated.
+    name : str
+        The name of the original module, used for the timings.
+    dtype : :py:class:`torch.dtype` or None
+        The data type for which the module was compiled.
+    compiled : bool
+        If the module is compiled.
+    compile_time : float
+        The time needed for the compilation in seconds.
+    original : :py:class:`torch.nn.Module` or None, optional
+        The original module, which is used if a call of the compiled module
+        fails. Default is None, indicating that there is no fallback.
+    """
+    def __init__(
+            self,
+            module: torch.nn.Module,
+            name: str,
+            dtype: Union[None, torch.dtype],
+            compiled: bool,
+            compile_time: float,
+            original: Union[None, torch.nn.Module] = None
+    ):
+        self.module = module
+        self.original = original
+        self.name = name
+        self.dtype = dtype
+        self.compiled = compiled
+        self.compile_time = compile_time
+        self.run_time = 0.
+        self.n_calls = 0
+        self._lock = threading.Lock()
+
+    def _fall_back(self, error: Exception) -> torch.nn.Module:
+        """
+        Replaces the compiled module by the original module after given
+        error and returns the original module.
+        """
+        with self._lock:
+            if self.compiled:
+                logger.warning(
+                    'Call of compiled {0:s} failed, the module is used without '
+                    'compilation: {1}'.format(self.name, error)
+                )
+                self.module = self.original
+                self.compiled = False
+            return self.module
+
+    def __call__(self, *args, **kwargs) -> Any:
+        start_time = time.perf_counter()
+        module = self.module
+        try:
+            output = module(*args, **kwargs)
+        except Exception as e:
+            if not self.compiled or self.original is None or \
+                    module is self.original:
+                raise
+            output = self._fall_back(e)(*args, **kwargs)
+        duration = time.perf_counter() - start_time
+        with self._lock:
+            self.run_time += duration
+            self.n_calls += 1
+        return output
+
+    def get_timings(self) -> Dict[str, Any]:
+        return {
+            'module': self.name, 'dtype': str(self.dtype),
+            'compiled': self.compiled, 'compile_time': self.compile_time,
+            'run_time': self.run_time, 'n_calls': self.n_calls
+        }
+
+
+class CompiledModuleCache(object):
+    """
+    Process-wide cache of compiled weights modules, e.g.
+    :py:class:`~pytassim.assimilation.filter.etkf_core.ETKFWeightsModule` or
+    :py:class:`~pytassim.assimilation.filter.ketkf_core.KETKFWeightsModule`.
+    The compiled modules are keyed by the module type, the configuration of
+    the module and its submodules like kernels, including the values of
+    their tensors, and the data type. A module is therefore only compiled
+    once per process and reused across cycles, analysers and chunks, e.g.
+    within the workers of
+    :py:class:`~pytassim.assimilation.filter.letkf_dist.DistributedLETKFUncorr`.
+    Tensors with gradients are identified by their identity such that
+    trainable modules are never shared.
+
+    Parameters
+    ----------
+    method : str or None, optional
+        The compilation method. `script` (default) compiles the modules with
+        :py:func:`torch.jit.script`, while `compile` uses `torch.compile` if
+        available and falls back to `script` otherwise. If None, the modules
+        are not compiled. If a compilation or the first call of a compiled
+        module fails, the original module is used.
+    max_items : int, optional
+        The maximum number of compiled modules in this cache. If this number
+        is exceeded, the least recently used module is removed. Default is
+        32.
+    """
+    def __init__(
+            self,
+            method: Union[None, str] = 'script',
+            max_items: int = 32
+    ):
+        self.method = method
+        self.max_items = max_items
+        self._modules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+    @staticmethod
+    def get_key(
+            module: torch.nn.Module,
+            dtype: Union[None, torch.dtype] = None
+    ) -> Tuple:
+        """
+        Get the cache key for given module and data type.
+
+        Parameters
+        ----------
+        module : :py:class:`torch.nn.Module`
+            The key is based on the configuration of this module.
+        dtype : :py:class:`torch.dtype` or None, optional
+            The data type for which the module is compiled. Default is None.
+
+        Returns
+        -------
+        key : tuple
+            The hashable key.
+        """
+        return _get_module_key(module), str(dtype)
+
+    def _compile(
+            self,
+            module: torch.nn.Module
+    ) -> Tuple[torch.nn.Module, bool]:
+        """
+        Compiles given module with set method.
+        """
+        if self.method is None:
+            return module, False
+        if self.method not in ('script', 'compile'):
+            raise ValueError(
+                'Given compilation method {0} is not available!'.format(
+                    self.method
+                )
+            )
+        try:
+            if self.method == 'compile' and hasattr(torch, 'compile'):
+                return torch.compile(module), True
+            return torch.jit.script(module), True
+        except Exception as e:
+            logger.warning(
+                'Compilation of {0:s} failed, the module is used without '
+                'compilation: {1}'.format(str(module), e)
+            )
+        return module, False
+
+    def get(
+            self,
+            module: torch.nn.Module,
+            dtype: Union[None, torch.dtype] = None
+    ) -> CompiledModule:
+        """
+        Get the compiled module for given module and data type. The module
+        is compiled if it is not cached yet.
+
+        Parameters
+        ----------
+        module : :py:class:`torch.nn.Module`
+            This module is compiled.
+        dtype : :py:class:`torch.dtype` or None, optional
+            The data type for which the module is compiled. Default is None.
+
+        Returns
+        -------
+        compiled_module : :py:class:`CompiledModule`
+            The compiled module with its timings, which can be called like
+            the original module.
+        """
+        key = self.get_key(module, dtype)
+        with self._lock:
+            if key in self._modules:
+                self._modules.move_to_end(key)
+                return self._modules[key]
+            start_time = time.perf_counter()
+            compiled_module, compiled = self._compile(module)
+            compile_time = time.perf_counter() - start_time
+            logger.debug('Compiled {0:s} in {1:.3f} s'.format(
+                str(module), compile_time
+            ))
+            self._modules[key] = CompiledModule(
+                compiled_module, str(module), dtype, compiled, compile_time,
+                original=module
+            )
+            while len(self._modules) > self.max_items:
+                self._modules.popitem(last=False)
+            return self._modules[key]
+
+    def get_timings(self) -> List[Dict[str, Any]]:
+        """
+        Get the compile and run timings of all cached modules.
+
+        Returns
+        -------
+        timings : list(dict)
+            The timings of every cached module with the module name, its data
+            type, if it is compiled, the compile time, the accumulated run
+            time in seconds and the number of calls.
+        """
+        return [
+            compiled_module.get_timings()
+            for compiled_module in self._modules.values()
+        ]
+
+    def clear(self):
+        """
+        Removes all compiled modules from this cache.
+        """
+        with self._lock:
+            self._modules.clear()
+
+
+module_cache = CompiledModuleCache()
@@ -0,0 +1,241 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+from typing import Union, Tuple
+
+# External modules
+import numpy as np
+
+# Internal modules
+from pytassim.localization.localization import BaseLocalization
+from pytassim.assimilation.utils import grid_to_array
+
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_costs(
+        localization: BaseLocalization,
+        grid_index: np.ndarray,
+        obs_grid: np.ndarray,
+        ens_size: int,
+        n_samples: int = 1000
+) -> np.ndarray:
+    """
+    Estimates the computational costs to analyse given grid points. The
+    costs of a grid point are estimated based on the number of local
+    observations :math:`l_i` and the ensemble size :math:`k` as
+    :math:`k^3 + k^2 l_i`, which represents the eigendecomposition in
+    ensemble space and the projection of the local observations.
+
+    The observations are only counted for at most `n_samples` grid points,
+    strided over the grid, and linearly interpolated to all other grid
+    points. Without a spatial index, counting the observations has the
+    same costs as localizing the observations, such that the costs of this
+    estimate scale with the number of samples and not with the grid size.
+
+    Parameters
+    ----------
+    localization : child of \
+    :py:class:`~pytassim.localization.localization.BaseLocalization`
+        The number of local observations is estimated with
+        :py:meth:`~pytassim.localization.localization.BaseLocalization.count_obs`
+        of this localization.
+    grid_index : :py:class:`np.ndarray` (n_grid, n_coords)
+        The costs are estimated for these grid points.
+    obs_grid : :py:class:`np.ndarray` (n_obs, n_coords)
+        The grid of the observations.
+    ens_size : int
+        The number of ensemble members.
+    n_samples : int, optional
+        The maximum number of grid points, for which the observations are
+        counted. Default is 1000.
+
+    Returns
+    -------
+    costs : :py:class:`np.ndarray` (n_grid)
+        The estimated costs for every grid point.
+    """
+    len_grid = len(grid_index)
+    if len_grid > n_samples:
+        sample_ind = np.unique(
+            np.linspace(0, len_grid-1, n_samples).round().astype(int)
+        )
+        sample_obs = localization.count_obs(grid_index[sample_ind], obs_grid)
+        n_obs = np.interp(np.arange(len_grid), sample_ind, sample_obs)
+        logger.debug(
+            'Estimated number of observations from {0:d} of {1:d} grid '
+            'points'.format(len(sample_ind), len_grid)
+        )
+    else:
+        n_obs = localization.count_obs(grid_index, obs_grid)
+    costs = ens_size ** 3 + ens_size ** 2 * np.asarray(n_obs, dtype=float)
+    return costs
+
+
+def get_chunk_pos(
+        len_grid: int,
+        chunksize: int,
+        costs: Union[None, np.ndarray] = None
+) -> np.ndarray:
+    """
+    Get the boundaries of contiguous grid chunks. Without costs, every chunk
+    has `chunksize` grid points. With given costs, the grid is splitted into
+    the same number of chunks, but such that every chunk has roughly the
+    same accumulated costs.
+
+    Parameters
+    ----------
+    len_grid : int
+        The number of grid points, which are splitted into chunks.
+    chunksize : int
+        The number of grid points per chunk without costs. With costs, this
+        chunksize determines the number of chunks.
+    costs : :py:class:`np.ndarray` (n_grid) or None, optional
+        The estimated costs per grid point. Default is None, indicating
+        chunks of fixed size.
+
+    Returns
+    -------
+    chunk_pos : :py:class:`np.ndarray` (n_chunks+1), dtype=int
+        The boundaries of the chunks, starting with 0 and ending with
+        `len_grid`. The `i`-th chunk spans the grid points between
+        `chunk_pos[i]` and `chunk_pos[i+1]`.
+    """
+    if costs is None:
+        return np.append(np.arange(0, len_grid, chunksize), len_grid)
+    n_chunks = int(np.ceil(len_grid / chunksize))
+    cum_costs = np.cumsum(costs)
+    targets = cum_costs[-1] * np.arange(1, n_chunks) / n_chunks
+    inner_pos = np.searchsorted(cum_costs, targets, side='left') + 1
+    chunk_pos = np.unique(np.concatenate([[0], inner_pos, [len_grid]]))
+    chunk_pos = chunk_pos[chunk_pos <= len_grid]
+    logger.debug(
+        'Balanced {0:d} grid points into {1:d} chunks'.format(
+            len_grid, len(chunk_pos)-1
+        )
+    )
+    return chunk_pos.astype(int)
+
+
+def get_chunk_costs(
+        costs: np.ndarray,
+        chunk_pos: np.ndarray
+) -> np.ndarray:
+    """
+    Get the accumulated costs of the chunks, specified by given chunk
+    boundaries.
+    """
+    cum_costs = np.concatenate([[0], np.cumsum(costs)])
+    return np.diff(cum_costs[chunk_pos])
+
+
+def partition_grid(
+        len_grid: int,
+        chunksize: int,
+        localization: Union[None, BaseLocalization] = None,
+        state_grid: Union[None, np.ndarray] = None,
+        obs_grid: Union[None, np.ndarray] = None,
+        ens_size: int = 1,
+        balance: bool = False,
+        n_samples: int = 1000
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Partitions the grid into contiguous chunks. If the chunks should be
+    balanced and a localization is given, the costs of the grid points are
+    estimated with :py:func:`estimate_costs` from at most `n_samples` grid
+    points and the chunks have roughly the same costs. Otherwise, the chunks
+    have a fixed size and every grid point has the same costs.
+
+    Returns
+    -------
+    chunk_pos : :py:class:`np.ndarray` (n_chunks+1), dtype=int
+        The boundaries of the chunks.
+    chunk_costs : :py:class:`np.ndarray` (n_chunks)
+        The estimated costs of every chunk.
+    """
+    if balance and localization is not None:
+        costs = estimate_costs(
+            localization, grid_to_array(state_grid), obs_grid, ens_size,
+            n_samples=n_samples
+        )
+        chunk_pos = get_chunk_pos(len_grid, chunksize, costs)
+    else:
+        costs = np.ones(len_grid)
+        chunk_pos = get_chunk_pos(len_grid, chunksize)
+    return chunk_pos, get_chunk_costs(costs, chunk_pos)
+
+
+def estimate_chunksize(
+        len_grid: int,
+        point_duration: float,
+        task_overhead: float = 0.,
+        target_duration: float = 1.,
+        n_workers: int = 1,
+        overhead_ratio: float = 10.
+) -> int:
+    """
+    Estimates a chunksize such that the analysis of a chunk takes roughly
+    the target duration. The duration of a task is at least `overhead_ratio`
+    times the overhead of the scheduler per task, such that the scheduler
+    is not flooded by too many small tasks. The chunksize is further
+    limited such that every worker gets at least one chunk.
+
+    Parameters
+    ----------
+    len_grid : int
+        The number of grid points, which are splitted into chunks.
+    point_duration : float
+        The measured duration in seconds to analyse a single grid point.
+    task_overhead : float, optional
+        The measured overhead in seconds of the scheduler per task. Default
+        is 0.
+    target_duration : float, optional
+        The targeted duration in seconds of a single task. Default is 1.
+    n_workers : int, optional
+        The number of workers or threads, which analyse the chunks in
+        parallel. Default is 1.
+    overhead_ratio : float, optional
+        The minimum ratio between the task duration and the task overhead.
+        Default is 10.
+
+    Returns
+    -------
+    chunksize : int
+        The estimated number of grid points per chunk.
+    """
+    task_duration = max(target_duration, overhead_ratio * task_overhead)
+    chunksize = task_duration / max(point_duration, np.finfo(float).tiny)
+    max_chunksize = np.ceil(len_grid / max(n_workers, 1))
+    chunksize = int(np.clip(np.round(chunksize), 1, max(max_chunksize, 1)))
+    logger.debug(
+        'Estimated chunksize of {0:d} for {1:.2e} s per grid point and '
+        '{2:.2e} s overhead per task'.format(
+            chunksize, point_duration, task_overhead
+        )
+    )
+    return chunksize
@@ -0,0 +1,582 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+import abc
+import itertools
+from typing import Union, Tuple, Iterable, List, Callable
+
+# External modules
+import numpy as np
+import scipy.spatial
+
+# Internal modules
+
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    'BaseWeightMapping',
+    'ChunkWeightMapping',
+    'WeightInterpolation',
+    'ColumnWeights',
+    'TileWeights'
+]
+
+
+class BaseWeightMapping(object):
+    """
+    A weight mapping specifies at which points the ensemble weights are
+    estimated and how these weights are mapped to the grid points of the
+    state. The mapped weights of a grid point are a weighted sum of the
+    ensemble weights at the weight points.
+    """
+    @abc.abstractmethod
+    def get_mapping(
+            self,
+            grid_index: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the weight points and the mapping from these weight points to
+        given grid points.
+
+        Parameters
+        ----------
+        grid_index : :py:class:`np.ndarray` (n_grid, n_coords)
+            The grid points of the state as returned by
+            :py:func:`~pytassim.assimilation.utils.grid_to_array`.
+
+        Returns
+        -------
+        weight_grid : :py:class:`np.ndarray` (n_weights, n_coords)
+            The ensemble weights are estimated at these points. The
+            observations are localized for these points.
+        map_ind : :py:class:`np.ndarray` (n_grid, n_neighbours), dtype=int
+            The indices of the weight points, which are used for the `i`-th
+            grid point. A negative index refers to the identity matrix as
+            ensemble weights, which keeps the prior perturbations.
+        map_weights : :py:class:`np.ndarray` (n_grid, n_neighbours)
+            The ensemble weights of the weight points, indexed by ``map_ind``,
+            are multiplied by these factors and summed up.
+        """
+        pass
+
+    def split(
+            self,
+            grid_index: np.ndarray,
+            chunk_pos: np.ndarray
+    ) -> List["ChunkWeightMapping"]:
+        """
+        Splits the mapping of the whole grid into mappings for contiguous
+        chunks of grid points. The mapping is estimated once for the whole
+        grid, such that weight lattices, columns or tiles are not cut at the
+        chunk boundaries and the mapped weights are independent of the
+        chunking. Every chunk only keeps the weight points used by its grid
+        points.
+
+        Parameters
+        ----------
+        grid_index : :py:class:`np.ndarray` (n_grid, n_coords)
+            The grid points of the whole state as returned by
+            :py:func:`~pytassim.assimilation.utils.grid_to_array`.
+        chunk_pos : :py:class:`np.ndarray` (n_chunks+1), dtype=int
+            The boundaries of the chunks, the `i`-th chunk spans the grid
+            points between `chunk_pos[i]` and `chunk_pos[i+1]`.
+
+        Returns
+        -------
+        chunk_mappings : list(:py:class:`ChunkWeightMapping`)
+            The precomputed mapping for every chunk.
+        """
+        weight_grid, map_ind, map_weights = self.get_mapping(grid_index)
+        chunk_mappings = []
+        for start, end in zip(chunk_pos[:-1], chunk_pos[1:]):
+            chunk_ind = map_ind[start:end]
+            is_weight = chunk_ind >= 0
+            used_ind, weight_ind = np.unique(chunk_ind[is_weight],
+                                             return_inverse=True)
+            chunk_map_ind = np.full_like(chunk_ind, -1)
+            chunk_map_ind[is_weight] = weight_ind
+            chunk_mappings.append(ChunkWeightMapping(
+                weight_grid[used_ind], chunk_map_ind, map_weights[start:end]
+            ))
+        return chunk_mappings
+
+
+class ChunkWeightMapping(BaseWeightMapping):
+    """
+    A precomputed weight mapping for a chunk of grid points, as created by
+    :py:meth:`BaseWeightMapping.split` from the mapping of the whole grid.
+
+    Parameters
+    ----------
+    weight_grid : :py:class:`np.ndarray` (n_weights, n_coords)
+        The weight points used by the grid points of this chunk.
+    map_ind : :py:class:`np.ndarray` (n_grid, n_neighbours), dtype=int
+        The indices of the weight points for the grid points of this chunk.
+        A negative index refers to the identity matrix as ensemble weights.
+    map_weights : :py:class:`np.ndarray` (n_grid, n_neighbours)
+        The mapping factors for the weight points.
+    """
+    def __init__(
+            self,
+            weight_grid: np.ndarray,
+            map_ind: np.ndarray,
+            map_weights: np.ndarray
+    ):
+        self.weight_grid = weight_grid
+        self.map_ind = map_ind
+        self.map_weights = map_weights
+
+    def __str__(self) -> str:
+        return 'ChunkWeightMapping({0:d}, {1:d})'.format(
+            len(self.weight_grid), len(self.map_ind)
+        )
+
+    def __repr__(self) -> str:
+        return 'ChunkWeightMapping'
+
+    def get_mapping(
+            self,
+            grid_index: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the precomputed mapping, given grid points have to be the
+        grid points of this chunk.
+        """
+        if len(grid_index) != len(self.map_ind):
+            raise ValueError(
+                'Given {0:d} grid points do not match the {1:d} grid points '
+                'of this chunk mapping!'.format(len(grid_index),
+                                                len(self.map_ind))
+            )
+        return self.weight_grid, self.map_ind, self.map_weights
+
+
+def _get_lattice_axes(
+        grid_index: np.ndarray
+) -> Union[None, List[np.ndarray]]:
+    """
+    Get the coordinate axes of given grid points if they form a complete
+    rectilinear lattice, else None is returned.
+    """
+    axes = [np.unique(grid_index[:, k]) for k in range(grid_index.shape[1])]
+    if len(grid_index) != np.prod([len(ax) for ax in axes]):
+        return None
+    return axes
+
+
+def _interp_lattice(
+        axes: List[np.ndarray],
+        grid_index: np.ndarray,
+        method: str = 'linear'
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the interpolation indices and factors for given grid points on a
+    lattice, spanned by given axes. The grid points are clipped to the
+    lattice boundaries. The indices refer to the flattened lattice points
+    in `ij` order.
+    """
+    corners = []
+    for k, axis in enumerate(axes):
+        coords = np.clip(grid_index[:, k], axis[0], axis[-1])
+        if len(axis) == 1:
+            pos = np.zeros(len(coords), dtype=int)
+            frac = np.zeros(len(coords), dtype=float)
+        else:
+            pos = np.searchsorted(axis, coords, side='right') - 1
+            pos = np.clip(pos, 0, len(axis)-2)
+            frac = (coords-axis[pos]) / (axis[pos+1]-axis[pos])
+        if method == 'nearest':
+            pos = pos + (frac > 0.5)
+            corners.append(((pos, np.ones_like(frac)), ))
+        else:
+            upper_pos = np.minimum(pos+1, len(axis)-1)
+            corners.append(((pos, 1-frac), (upper_pos, frac)))
+    lattice_shape = tuple(len(axis) for axis in axes)
+    map_ind = []
+    map_weights = []
+    for corner in itertools.product(*corners):
+        corner_pos, corner_frac = zip(*corner)
+        map_ind.append(np.ravel_multi_index(corner_pos, lattice_shape))
+        map_weights.append(np.prod(corner_frac, axis=0))
+    return np.stack(map_ind, axis=-1), np.stack(map_weights, axis=-1)
+
+
+class WeightInterpolation(BaseWeightMapping):
+    """
+    The ensemble weights are estimated on a coarser weight grid and
+    interpolated to all grid points :cite:`yang_weight_2009`. For smooth
+    fields, this interpolation reduces the number of weight estimations
+    without a large impact on the analysis. The weight grid is either
+    specified by strides along the coordinate axes or by given grid point
+    indices.
+
+    Linear interpolation, which is bilinear for two-dimensional grids, is
+    only possible if the weight points are a rectilinear lattice. This is
+    the case for strides on a complete lattice of grid points, e.g. on the
+    `(rlat, rlon)` grid of COSMO, or one-dimensional grids, e.g. of the
+    Lorenz '96 model. Otherwise, only nearest neighbour interpolation is
+    possible.
+
+    Parameters
+    ----------
+    stride : int or iterable(int) or None, optional
+        The weights are estimated for every `stride`-th coordinate value along
+        every coordinate axis. The last coordinate value is always
+        additionally included. Different strides can be given for the
+        coordinate axes as iterable. Either this stride or ``points`` has to
+        be specified. Default is None.
+    points : iterable(int) or None, optional
+        The weights are estimated for grid points with these indices. If
+        stride is given, these points are ignored. Default is None.
+    method : str, optional
+        The interpolation method, either `linear` for a (multi-)linear
+        interpolation or `nearest` for a nearest neighbour interpolation.
+        Default is `linear`.
+    """
+    def __init__(
+            self,
+            stride: Union[None, int, Iterable[int]] = None,
+            points: Union[None, Iterable[int]] = None,
+            method: str = 'linear'
+    ):
+        if stride is None and points is None:
+            raise ValueError('Either stride or points has to be specified!')
+        if method not in ('linear', 'nearest'):
+            raise ValueError(
+                'Given interpolation method {0:s} is not available, '
+                'please use either `linear` or `nearest`'.format(method)
+            )
+        self.stride = stride
+        self.points = points
+        self.method = method
+
+    def __str__(self) -> str:
+        return 'WeightInterpolation({0}, {1:s})'.format(
+            self.stride if self.stride is not None else 'points',
+            self.method
+        )
+
+    def __repr__(self) -> str:
+        return 'WeightInterpolation'
+
+    def _get_strided_axes(self, grid_index: np.ndarray) -> List[np.ndarray]:
+        """
+        Get strided coordinate axes for given lattice grid.
+        """
+        axes = _get_lattice_axes(grid_index)
+        if axes is None:
+            raise ValueError(
+                'A stride can be only used for a complete rectilinear grid!'
+            )
+        stride = np.broadcast_to(np.asarray(self.stride, dtype=int),
+                                 (len(axes), ))
+        strided_axes = []
+        for axis, axis_stride in zip(axes, stride):
+            strided_axis = axis[::axis_stride]
+            if strided_axis[-1] != axis[-1]:
+                strided_axis = np.append(strided_axis, axis[-1])
+            strided_axes.append(strided_axis)
+        return strided_axes
+
+    def get_mapping(
+            self,
+            grid_index: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the weight grid and the interpolation from the weight grid to
+        given grid points.
+
+        Parameters
+        ----------
+        grid_index : :py:class:`np.ndarray` (n_grid, n_coords)
+            The grid points of the state as returned by
+            :py:func:`~pytassim.assimilation.utils.grid_to_array`.
+
+        Returns
+        -------
+        weight_grid : :py:class:`np.ndarray` (n_weights, n_coords)
+            The ensemble weights are estimated at these points.
+        map_ind : :py:class:`np.ndarray` (n_grid, n_neighbours), dtype=int
+            The indices of the weight points, which are used to interpolate
+            the weights for the `i`-th grid point.
+        map_weights : :py:class:`np.ndarray` (n_grid, n_neighbours)
+            The interpolation factors for the weight points.
+        """
+        if self.stride is not None:
+            axes = self._get_strided_axes(grid_index)
+        else:
+            weight_grid = grid_index[np.asarray(self.points, dtype=int)]
+            axes = _get_lattice_axes(weight_grid)
+            if axes is None and self.method == 'nearest':
+                tree = scipy.spatial.cKDTree(weight_grid)
+                map_ind = tree.query(grid_index)[1]
+                return weight_grid, map_ind[:, None], \
+                    np.ones((len(grid_index), 1))
+            elif axes is None:
+                raise ValueError(
+                    'Linear interpolation is only possible if the given '
+                    'points span a rectilinear grid, please use `nearest` '
+                    'interpolation!'
+                )
+        weight_grid = np.stack(
+            [ax.reshape(-1) for ax in np.meshgrid(*axes, indexing='ij')],
+            axis=-1
+        )
+        map_ind, map_weights = _interp_lattice(axes, grid_index, self.method)
+        return weight_grid, map_ind, map_weights
+
+
+class ColumnWeights(BaseWeightMapping):
+    """
+    The grid points are grouped into columns by their horizontal
+    coordinates and one ensemble weight matrix is estimated per column,
+    which is then applied to all vertical levels of this column. This is
+    useful for stacked `(rlat, rlon, vgrid)` grids, e.g. of TerrSysMP, where
+    all levels of a column see the same local observations if the
+    observations are only horizontally localized.
+
+    The first grid point of a column is used as weight point of this column
+    and the localization is therefore evaluated for the vertical coordinate
+    of this point. The column weights can be optionally tapered in the
+    vertical: the weights of a grid point are then
+    :math:`\\alpha(z) \\mathbf{W}_{col} + (1-\\alpha(z))\\mathbf{I}`, where
+    :math:`\\alpha(z)` is the taper factor for the vertical coordinate
+    :math:`z` of this grid point.
+
+    Parameters
+    ----------
+    vertical_coord : int, optional
+        The position of the vertical coordinate within the coordinates of
+        the grid points. All other coordinates are used as horizontal
+        coordinates. Default is -1, the last coordinate, as in the stacked
+        `(rlat, rlon, vgrid)` grids of TerrSysMP.
+    taper : callable or None, optional
+        This taper function is called with the vertical coordinates of all
+        grid points and should return the taper factors between 0 and 1 for
+        these points. A factor of 1 applies the column weights, while a
+        factor of 0 keeps the prior perturbations. If no taper is given
+        (default), the column weights are applied to all levels.
+    """
+    def __init__(
+            self,
+            vertical_coord: int = -1,
+            taper: Union[None, Callable] = None
+    ):
+        self.vertical_coord = vertical_coord
+        self.taper = taper
+
+    def __str__(self) -> str:
+        return 'ColumnWeights({0:d}, {1})'.format(
+            self.vertical_coord, self.taper
+        )
+
+    def __repr__(self) -> str:
+        return 'ColumnWeights'
+
+    def get_mapping(
+            self,
+            grid_index: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the weight points of the columns and the mapping from the
+        columns to given grid points.
+
+        Parameters
+        ----------
+        grid_index : :py:class:`np.ndarray` (n_grid, n_coords)
+            The grid points of the state as returned by
+            :py:func:`~pytassim.assimilation.utils.grid_to_array`.
+
+        Returns
+        -------
+        weight_grid : :py:class:`np.ndarray` (n_columns, n_coords)
+            The first grid point of every column.
+        map_ind : :py:class:`np.ndarray` (n_grid, n_neighbours), dtype=int
+            The column index of every grid point. If a taper is set, the
+            second index is -1 and refers to the identity weights.
+        map_weights : :py:class:`np.ndarray` (n_grid, n_neighbours)
+            The taper factors for the column weights and the identity weights.
+        """
+        if grid_index.shape[1] < 2:
+            raise ValueError(
+                'The grid points need at least one horizontal and one '
+                'vertical coordinate to be grouped into columns!'
+            )
+        horizontal_index = np.delete(grid_index, self.vertical_coord, axis=1)
+        _, first_ind, col_ind = np.unique(
+            horizontal_index, axis=0, return_index=True, return_inverse=True
+        )
+        col_ind = col_ind.reshape(-1)
+        weight_grid = grid_index[first_ind]
+        if self.taper is None:
+            return weight_grid, col_ind[:, None], \
+                np.ones((len(grid_index), 1))
+        taper_factor = np.clip(
+            self.taper(grid_index[:, self.vertical_coord]), 0, 1
+        )
+        taper_factor = np.broadcast_to(taper_factor, (len(grid_index), ))
+        map_ind = np.stack([col_ind, -np.ones_like(col_ind)], axis=-1)
+        map_weights = np.stack([taper_factor, 1-taper_factor], axis=-1)
+        return weight_grid, map_ind, map_weights
+
+
+class TileWeights(BaseWeightMapping):
+    """
+    The grid is partitioned into rectangular tiles and the ensemble weights
+    are only estimated at the tile centres. The observations are therefore
+    only localized once per tile, based on the distance to the tile centre.
+    The weights of a tile centre are either applied to all grid points
+    within this tile or (multi-)linearly interpolated between the tile
+    centres. For high-resolution `(rlat, rlon)` grids, e.g. of COSMO or
+    CLM, this reduces the number of weight estimations by the number of
+    grid points per tile, while the tile size controls the quality of the
+    localization.
+
+    The tiles are specified by the number of coordinate values along every
+    tiled coordinate axis and are independent of missing grid points. The
+    tile centre is the midpoint between the first and last coordinate value
+    of a tile. The coordinates, which are not tiled, e.g. the vertical
+    coordinate of stacked `(rlat, rlon, vgrid)` grids, are grouped as in
+    :py:class:`ColumnWeights` and taken from the first grid point for all
+    weight points.
+
+    Parameters
+    ----------
+    tile_size : int or iterable(int)
+        The number of coordinate values per tile along every tiled
+        coordinate axis. Different sizes can be given for the tiled
+        coordinates as iterable.
+    coords : iterable(int) or None, optional
+        The positions of the tiled coordinates within the coordinates of the
+        grid points. Default is None, indicating that all coordinates are
+        tiled.
+    method : str, optional
+        Either `constant` to apply the weights of a tile centre to all grid
+        points within this tile or `linear` for a (multi-)linear
+        interpolation between the tile centres. Default is `constant`.
+    """
+    def __init__(
+            self,
+            tile_size: Union[int, Iterable[int]],
+            coords: Union[None, Iterable[int]] = None,
+            method: str = 'constant'
+    ):
+        if method not in ('constant', 'linear'):
+            raise ValueError(
+                'Given tile method {0:s} is not available, please use either '
+                '`constant` or `linear`'.format(method)
+            )
+        if np.any(np.asarray(tile_size) < 1):
+            raise ValueError('The tile size has to be at least 1!')
+        self.tile_size = tile_size
+        self.coords = coords
+        self.method = method
+
+    def __str__(self) -> str:
+        return 'TileWeights({0}, {1:s})'.format(self.tile_size, self.method)
+
+    def __repr__(self) -> str:
+        return 'TileWeights'
+
+    def _get_tile_axes(
+            self,
+            grid_index: np.ndarray
+    ) -> Tuple[np.ndarray, List[np.ndarray], np.ndarray]:
+        """
+        Get the tiled coordinates, the tile centres along every tiled
+        coordinate axis and the tile position of every grid point along
+        these axes.
+        """
+        if self.coords is None:
+            coords = np.arange(grid_index.shape[1])
+        else:
+            coords = np.arange(grid_index.shape[1])[list(self.coords)]
+        tile_size = np.broadcast_to(np.asarray(self.tile_size, dtype=int),
+                                    (len(coords), ))
+        centre_axes = []
+        tile_pos = []
+        for coord, size in zip(coords, tile_size):
+            axis, axis_pos = np.unique(grid_index[:, coord],
+                                       return_inverse=True)
+            starts = np.arange(0, len(axis), size)
+            ends = np.minimum(starts+size, len(axis)) - 1
+            centre_axes.append((axis[starts]+axis[ends]) / 2)
+            tile_pos.append(axis_pos.reshape(-1) // size)
+        return coords, centre_axes, np.stack(tile_pos, axis=-1)
+
+    def get_mapping(
+            self,
+            grid_index: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the tile centres as weight points and the mapping from these
+        tile centres to given grid points.
+
+        Parameters
+        ----------
+        grid_index : :py:class:`np.ndarray` (n_grid, n_coords)
+            The grid points of the state as returned by
+            :py:func:`~pytassim.assimilation.utils.grid_to_array`.
+
+        Returns
+        -------
+        weight_grid : :py:class:`np.ndarray` (n_tiles, n_coords)
+            The centres of the tiles. With `constant` tiles, only tiles with
+            grid points are returned.
+        map_ind : :py:class:`np.ndarray` (n_grid, n_neighbours), dtype=int
+            The indices of the tile centres, which are used for the `i`-th
+            grid point.
+        map_weights : :py:class:`np.ndarray` (n_grid, n_neighbours)
+            The interpolation factors for the tile centres.
+        """
+        coords, centre_axes, tile_pos = self._get_tile_axes(grid_index)
+        if self.method == 'constant':
+            tiles, tile_ind = np.unique(tile_pos, axis=0, return_inverse=True)
+            centres = np.stack(
+                [axis[tiles[:, k]] for k, axis in enumerate(centre_axes)],
+                axis=-1
+            )
+            map_ind = tile_ind.reshape(-1)[:, None]
+            map_weights = np.ones((len(grid_index), 1))
+        else:
+            centres = np.stack(
+                [ax.reshape(-1)
+                 for ax in np.meshgrid(*centre_axes, indexing='ij')],
+                axis=-1
+            )
+            map_ind, map_weights = _interp_lattice(
+                centre_axes, grid_index[:, coords], 'linear'
+            )
+        weight_grid = np.repeat(grid_index[:1].astype(float), len(centres),
+                                axis=0)
+        weight_grid[:, coords] = centres
+        logger.debug('Partitioned {0:d} grid points into {1:d} tiles'.format(
+            len(grid_index), len(weight_grid)
+        ))
+        return weight_grid, map_ind, map_weights
@@ -101,12 +101,280 @@ def rev_evd(
     rev_mat : :py:class:`torch.Tensor` (..., nx, nx)
         The recomposed matrix based on given eigenvalues and eigenvectors.
     """
-    diag_flat_evals = torch.diag_embed(evals)
-    rev_mat = torch.einsum('...ij,...jk->...ik', evects, diag_flat_evals)
-    rev_mat = torch.einsum('...ij,...kj->...ik', rev_mat, evects)
+    scaled_evects = evects * evals.unsqueeze(-2)
+    rev_mat = torch.matmul(scaled_evects, evects.transpose(-1, -2))
     return rev_mat
 
 
+def evd_weights(
+        evals_inv: torch.Tensor,
+        evects: torch.Tensor,
+        kernel_obs: torch.Tensor,
+        ens_size: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Estimates the ensemble weights of the ensemble transform Kalman filter
+    from a single eigendecomposition of the regularized ensemble precision.
+    The eigenvectors are scaled column-wise by the square root of the
+    inverted eigenvalues, :math:`\\tilde{u} = u \\lambda^{-\\frac{1}{2}}`,
+    such that no diagonal matrices are built and the analysed covariance
+    and the weight perturbations are both estimated with a single matrix
+    product from these scaled eigenvectors,
+
+    .. math::
+
+       \\widetilde{P}^a = \\tilde{u} (\\tilde{u})^T, \\quad
+       \\overline{w}^a = \\widetilde{P}^a k_{o}, \\quad
+       W^a = \\sqrt{k-1} \\tilde{u} (u)^T.
+
+
+    Parameters
+    ----------
+    evals_inv : :py:class:`torch.Tensor` (..., k)
+        The inverted eigenvalues of the regularized ensemble precision.
+    evects : :py:class:`torch.Tensor` (..., k, k)
+        The eigenvectors of the regularized ensemble precision.
+    kernel_obs : :py:class:`torch.Tensor` (..., k, 1)
+        The kernelized observations, which are projected into weight space.
+    ens_size : int
+        The ensemble size :math:`k`.
+
+    Returns
+    -------
+    w_mean : :py:class:`torch.Tensor` (..., k, 1)
+        The ensemble mean weights.
+    w_perts : :py:class:`torch.Tensor` (..., k, k)
+        The ensemble perturbation weights.
+    cov_analysed : :py:class:`torch.Tensor` (..., k, k)
+        The analysed covariance in weight space.
+    """
+    scaled_evects = evects * evals_inv.sqrt().unsqueeze(-2)
+    cov_analysed = torch.matmul(scaled_evects, scaled_evects.transpose(-1, -2))
+    w_mean = torch.matmul(cov_analysed, kernel_obs)
+    w_perts = torch.matmul(scaled_evects, evects.transpose(-1, -2))
+    w_perts *= (ens_size - 1) ** 0.5
+    return w_mean, w_perts, cov_analysed
+
+
+def _low_rank_weights(
+        evects: torch.Tensor,
+        cov_coeffs: torch.Tensor,
+        perts_coeffs: torch.Tensor,
+        reg_value: torch.Tensor,
+        ens_size: int
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Composes the analysed covariance and the weight perturbations as
+    low-rank updates of the regularized identity matrix.
+    """
+    eye = torch.eye(ens_size).to(evects)
+    reg_value = reg_value.unsqueeze(-1)
+    cov_analysed = eye / reg_value + torch.matmul(
+        evects * cov_coeffs.unsqueeze(-2), evects.transpose(-1, -2)
+    )
+    w_perts = eye / reg_value.sqrt() + torch.matmul(
+        evects * perts_coeffs.unsqueeze(-2), evects.transpose(-1, -2)
+    )
+    w_perts *= (ens_size - 1) ** 0.5
+    return cov_analysed, w_perts
+
+
+def svd_decomposition(
+        normed_perts: torch.Tensor,
+        normed_obs: torch.Tensor
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Decomposes the normalized ensemble perturbations with a thin singular
+    value decomposition, :math:`Y = u s v^T`. The decomposition is
+    independent of the inflation factor and can be used to estimate the
+    weights with :py:func:`svd_weights`.
+
+    Parameters
+    ----------
+    normed_perts : :py:class:`torch.Tensor` (..., k, l)
+        The normalized ensemble perturbations in observation space.
+    normed_obs : :py:class:`torch.Tensor` (..., 1, l)
+        The normalized observations.
+
+    Returns
+    -------
+    evects : :py:class:`torch.Tensor` (..., k, r)
+        The left singular vectors :math:`u` with :math:`r = \\min(k, l)`,
+        which are the eigenvectors of the ensemble precision.
+    evals : :py:class:`torch.Tensor` (..., r)
+        The squared singular values :math:`s^2`, which are the eigenvalues of
+        the ensemble precision.
+    proj_obs : :py:class:`torch.Tensor` (..., r, 1)
+        The kernelized observations projected onto the singular vectors,
+        :math:`s v^T y_o`.
+    """
+    evects, svals, right_vects = torch.linalg.svd(
+        normed_perts, full_matrices=False
+    )
+    proj_obs = svals.unsqueeze(-1) * torch.matmul(
+        right_vects, normed_obs.transpose(-1, -2)
+    )
+    return evects, svals.pow(2), proj_obs
+
+
+def svd_weights(
+        evects: torch.Tensor,
+        evals: torch.Tensor,
+        proj_obs: torch.Tensor,
+        reg_value: torch.Tensor,
+        ens_size: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Estimates the ensemble weights of the ensemble transform Kalman filter
+    from a thin singular value decomposition of the normalized ensemble
+    perturbations, :math:`Y = u s v^T`, estimated with
+    :py:func:`svd_decomposition`, without forming the ensemble precision. The
+    regularized precision has the eigenvalues :math:`s^2 + \\gamma` in the
+    space spanned by :math:`u` and :math:`\\gamma` in its orthogonal
+    complement, such that
+
+    .. math::
+
+       \\widetilde{P}^a = \\gamma^{-1} I + u \\left((s^2 + \\gamma)^{-1} -
+       \\gamma^{-1}\\right) u^T, \\quad
+       \\overline{w}^a = u \\frac{s}{s^2 + \\gamma} v^T y_o, \\quad
+       W^a = \\sqrt{k-1} \\left(\\gamma^{-\\frac{1}{2}} I + u \\left(
+       (s^2 + \\gamma)^{-\\frac{1}{2}} - \\gamma^{-\\frac{1}{2}}\\right)
+       u^T\\right).
+
+    The decomposition avoids squaring the perturbations and is more accurate
+    than the eigendecomposition of the precision for ill-conditioned
+    perturbations.
+
+    Parameters
+    ----------
+    evects : :py:class:`torch.Tensor` (..., k, r)
+        The left singular vectors :math:`u`.
+    evals : :py:class:`torch.Tensor` (..., r)
+        The squared singular values :math:`s^2`.
+    proj_obs : :py:class:`torch.Tensor` (..., r, 1)
+        The projected observations :math:`s v^T y_o`.
+    reg_value : :py:class:`torch.Tensor`
+        The regularization value :math:`\\gamma = (k-1) / \\rho`.
+    ens_size : int
+        The ensemble size :math:`k`.
+
+    Returns
+    -------
+    w_mean : :py:class:`torch.Tensor` (..., k, 1)
+        The ensemble mean weights.
+    w_perts : :py:class:`torch.Tensor` (..., k, k)
+        The ensemble perturbation weights.
+    cov_analysed : :py:class:`torch.Tensor` (..., k, k)
+        The analysed covariance in weight space.
+    """
+    evals = evals + reg_value
+    cov_analysed, w_perts = _low_rank_weights(
+        evects, 1 / evals - 1 / reg_value,
+        evals.rsqrt() - reg_value.rsqrt(), reg_value, ens_size
+    )
+    w_mean = torch.matmul(evects, proj_obs / evals.unsqueeze(-1))
+    return w_mean, w_perts, cov_analysed
+
+
+def obs_space_decomposition(
+        normed_perts: torch.Tensor,
+        normed_obs: torch.Tensor
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Decomposes the :math:`l \\times l` Gram matrix of the normalized ensemble
+    perturbations in observation space, :math:`Y^T Y = v \\lambda v^T`. The
+    decomposition is independent of the inflation factor and can be used to
+    estimate the weights with :py:func:`obs_space_weights`.
+
+    Parameters
+    ----------
+    normed_perts : :py:class:`torch.Tensor` (..., k, l)
+        The normalized ensemble perturbations in observation space.
+    normed_obs : :py:class:`torch.Tensor` (..., 1, l)
+        The normalized observations.
+
+    Returns
+    -------
+    proj_perts : :py:class:`torch.Tensor` (..., k, l)
+        The perturbations projected onto the eigenvectors, :math:`z = Y v`.
+    evals : :py:class:`torch.Tensor` (..., l)
+        The eigenvalues :math:`\\lambda` of the nearest positive semidefinit
+        matrix to the Gram matrix.
+    proj_obs : :py:class:`torch.Tensor` (..., l, 1)
+        The observations projected onto the eigenvectors, :math:`v^T y_o`.
+    """
+    gram = torch.matmul(normed_perts.transpose(-1, -2), normed_perts)
+    evals, evects, _ = evd(gram)
+    proj_perts = torch.matmul(normed_perts, evects)
+    proj_obs = torch.matmul(evects.transpose(-1, -2),
+                            normed_obs.transpose(-1, -2))
+    return proj_perts, evals, proj_obs
+
+
+def obs_space_weights(
+        proj_perts: torch.Tensor,
+        evals: torch.Tensor,
+        proj_obs: torch.Tensor,
+        reg_value: torch.Tensor,
+        ens_size: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Estimates the ensemble weights of the ensemble transform Kalman filter
+    in observation space from an eigendecomposition of the :math:`l \\times l`
+    Gram matrix of the normalized ensemble perturbations,
+    :math:`Y^T Y = v \\lambda v^T`, estimated with
+    :py:func:`obs_space_decomposition`. With the projected perturbations
+    :math:`z = Y v`, the weights are given by the Sherman-Morrison-Woodbury
+    identity,
+
+    .. math::
+
+       \\widetilde{P}^a = \\gamma^{-1} \\left(I - z (\\lambda +
+       \\gamma)^{-1} z^T\\right), \\quad
+       \\overline{w}^a = z (\\lambda + \\gamma)^{-1} v^T y_o, \\quad
+       W^a = \\sqrt{k-1} \\left(\\gamma^{-\\frac{1}{2}} I - z
+       \\frac{1}{\\sqrt{\\gamma(\\lambda+\\gamma)} (\\sqrt{\\gamma} +
+       \\sqrt{\\lambda+\\gamma})} z^T\\right).
+
+    No singular values are inverted, such that rank-deficient perturbations
+    are supported. This is the cheapest way to estimate the weights if there
+    are less observations than ensemble members.
+
+    Parameters
+    ----------
+    proj_perts : :py:class:`torch.Tensor` (..., k, l)
+        The projected perturbations :math:`z = Y v`.
+    evals : :py:class:`torch.Tensor` (..., l)
+        The eigenvalues :math:`\\lambda` of the Gram matrix.
+    proj_obs : :py:class:`torch.Tensor` (..., l, 1)
+        The projected observations :math:`v^T y_o`.
+    reg_value : :py:class:`torch.Tensor`
+        The regularization value :math:`\\gamma = (k-1) / \\rho`.
+    ens_size : int
+        The ensemble size :math:`k`.
+
+    Returns
+    -------
+    w_mean : :py:class:`torch.Tensor` (..., k, 1)
+        The ensemble mean weights.
+    w_perts : :py:class:`torch.Tensor` (..., k, k)
+        The ensemble perturbation weights.
+    cov_analysed : :py:class:`torch.Tensor` (..., k, k)
+        The analysed covariance in weight space.
+    """
+    evals = evals + reg_value
+    evals_inv = 1 / evals
+    reg_sqrt = reg_value.sqrt()
+    cov_analysed, w_perts = _low_rank_weights(
+        proj_perts, -evals_inv / reg_value,
+        -evals_inv.sqrt() / (reg_sqrt * (reg_sqrt + evals.sqrt())),
+        reg_value, ens_size
+    )
+    w_mean = torch.matmul(proj_perts, evals_inv.unsqueeze(-1) * proj_obs)
+    return w_mean, w_perts, cov_analysed
+
+
 def grid_to_array(
         index: Any
 ) -> np.ndarray:
@@ -134,7 +402,9 @@ def grid_to_array(
     if isinstance(raw_index_array[0], tuple):
         shape = (-1, len(raw_index_array[0]))
     elif raw_index_array.ndim > 1:
-        shape = raw_index_array.shape
+        return raw_index_array.astype(float).reshape(
+            raw_index_array.shape[0], -1
+        )
     else:
         shape = (-1, 1)
     dtype = ','.join(['float']*shape[-1])
@@ -1,3 +1,10 @@
 from .gaspari_cohn import *
+from .cache import CachedLocalization
+from .nearest import NearestLocalization
+from .distance import *
+from .separable import SeparableGaspariCohn
 
-__all__ = ['GaspariCohn', 'GaspariCohnInf']
+__all__ = ['GaspariCohn', 'GaspariCohnInf', 'CachedLocalization',
+           'NearestLocalization', 'SeparableGaspariCohn', 'EuclideanDistance',
+           'CyclicDistance', 'HaversineDistance', 'ChordDistance',
+           'LogPressureDistance', 'SeparatedDistance']
@@ -0,0 +1,359 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+import os
+import hashlib
+import functools
+import threading
+import types
+from collections import OrderedDict
+from typing import Any, Union, Tuple, Dict
+
+# External modules
+import numpy as np
+import scipy.sparse
+import torch
+
+# Internal modules
+from .localization import BaseLocalization
+
+
+logger = logging.getLogger(__name__)
+
+
+class CachedLocalization(BaseLocalization):
+    """
+    This localization wraps another localization and caches the sparse
+    localization matrices created by
+    :py:meth:`~pytassim.localization.localization.BaseLocalization.localize_all`.
+    The matrices are cached in memory and optionally on disk. They are keyed
+    by a hash of the state grid, the observation grid and the recursive
+    state of the wrapped localization, including nested localizations,
+    distances and the code of distance functions. In cycling experiments
+    with a fixed observation network, the localization is then only
+    estimated once. The memory cache is thread-safe, but not shared between
+    processes; it is dropped if this localization is pickled.
+
+    Parameters
+    ----------
+    localization : child of \
+    :py:class:`~pytassim.localization.localization.BaseLocalization`
+        This localization is wrapped and used to estimate the localization
+        matrices, if they are not cached.
+    cache_dir : str or None, optional
+        If this path is given, the localization matrices are additionally
+        stored as `.npz` files within this directory and can be reused by
+        other processes and runs. Default is None, indicating that the
+        matrices are only cached in memory.
+    max_items : int, optional
+        The maximum number of localization matrices held in memory. If this
+        number is exceeded, the least recently used matrix is removed from
+        memory. Default is 8.
+    cache_key : str or None, optional
+        If given, this explicit key is used instead of the parameters of the
+        wrapped localization, e.g. if a parameter has no stable
+        representation. This key has to be changed whenever the wrapped
+        localization is changed. Default is None.
+    """
+    def __init__(
+            self,
+            localization: BaseLocalization,
+            cache_dir: Union[None, str] = None,
+            max_items: int = 8,
+            cache_key: Union[None, str] = None
+    ):
+        self.localization = localization
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.cache_key = cache_key
+        self._memory_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        state['_memory_cache'] = OrderedDict()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return 'CachedLocalization({0:s})'.format(str(self.localization))
+
+    def __repr__(self) -> str:
+        return 'Cached{0:s}'.format(repr(self.localization))
+
+    def localize_cov(self):
+        return self.localization.localize_cov()
+
+    def localize_obs(
+            self,
+            grid_ind: Any,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The observation weights for a single grid point are not cached and
+        directly estimated by the wrapped localization.
+        """
+        return self.localization.localize_obs(grid_ind, obs_grid)
+
+    def get_obs_subset(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Union[None, np.ndarray]:
+        """
+        The observation subset is directly estimated by the wrapped
+        localization.
+        """
+        return self.localization.get_obs_subset(state_grid, obs_grid)
+
+    @classmethod
+    def _get_param_repr(cls, param: Any, _seen: Tuple[int, ...] = ()) -> str:
+        """
+        Get a representation of given parameter, which is stable across
+        different processes. Nested localizations, distances and other
+        objects are represented by their recursive state, while functions
+        are represented by their code, constants, referenced names, defaults
+        and closure. Private attributes of localizations are caches and
+        skipped. The values of global variables referenced by a function are
+        not part of the representation.
+
+        Raises
+        ------
+        TypeError
+            If given parameter has no stable representation.
+        """
+        if isinstance(param, (type(None), type(Ellipsis), bool, int, float,
+                              complex, str, bytes, np.generic)):
+            return repr(param)
+        if id(param) in _seen:
+            return '<recursion>'
+        _seen = _seen + (id(param), )
+        if isinstance(param, torch.Tensor):
+            param = param.detach().cpu().numpy()
+        if isinstance(param, np.ndarray):
+            param = np.ascontiguousarray(param)
+            return 'array({0}, {1:s}, {2:s})'.format(
+                param.shape, param.dtype.str,
+                hashlib.sha1(param.tobytes()).hexdigest()
+            )
+        if isinstance(param, (list, tuple, set, frozenset)):
+            items = [cls._get_param_repr(item, _seen) for item in param]
+            if isinstance(param, (set, frozenset)):
+                items = sorted(items)
+            return '{0:s}({1:s})'.format(type(param).__name__,
+                                         ', '.join(items))
+        if isinstance(param, dict):
+            items = sorted(
+                '{0:s}: {1:s}'.format(cls._get_param_repr(name, _seen),
+                                      cls._get_param_repr(value, _seen))
+                for name, value in param.items()
+            )
+            return 'dict({0:s})'.format(', '.join(items))
+        if isinstance(param, functools.partial):
+            return 'partial({0:s}, {1:s}, {2:s})'.format(
+                cls._get_param_repr(param.func, _seen),
+                cls._get_param_repr(param.args, _seen),
+                cls._get_param_repr(param.keywords, _seen)
+            )
+        if isinstance(param, types.CodeType):
+            return 'code({0:s}, {1:s}, {2:s}, {3:s})'.format(
+                hashlib.sha1(param.co_code).hexdigest(),
+                cls._get_param_repr(param.co_consts, _seen),
+                cls._get_param_repr(param.co_names, _seen),
+                cls._get_param_repr(param.co_varnames, _seen)
+            )
+        if isinstance(param, types.FunctionType):
+            closure = []
+            for cell in param.__closure__ or ():
+                try:
+                    closure.append(cell.cell_contents)
+                except ValueError:
+                    closure.append(Ellipsis)
+            return 'function({0:s}, {1:s}, {2:s}, {3:s}, {4:s})'.format(
+                cls._get_qualname(param),
+                cls._get_param_repr(param.__code__, _seen),
+                cls._get_param_repr(param.__defaults__, _seen),
+                cls._get_param_repr(param.__kwdefaults__, _seen),
+                cls._get_param_repr(closure, _seen)
+            )
+        if isinstance(param, types.MethodType):
+            return 'method({0:s}, {1:s})'.format(
+                cls._get_param_repr(param.__func__, _seen),
+                cls._get_param_repr(param.__self__, _seen)
+            )
+        if isinstance(param, (types.BuiltinFunctionType, np.ufunc, type)):
+            return cls._get_qualname(param)
+        if hasattr(param, '__dict__'):
+            skip_private = isinstance(param, BaseLocalization)
+            state = {
+                name: value for name, value in vars(param).items()
+                if not (skip_private and name.startswith('_'))
+            }
+            return '{0:s}({1:s})'.format(
+                cls._get_qualname(type(param)),
+                cls._get_param_repr(state, _seen)
+            )
+        raise TypeError(
+            'Cannot create a stable cache key for parameter {0:s} of type '
+            '{1:s}, please specify an explicit `cache_key`'.format(
+                repr(param), type(param).__qualname__
+            )
+        )
+
+    @staticmethod
+    def _get_qualname(param: Any) -> str:
+        return '{0:s}.{1:s}'.format(
+            getattr(param, '__module__', None) or '',
+            getattr(param, '__qualname__', None)
+            or getattr(param, '__name__', type(param).__qualname__)
+        )
+
+    def _get_loc_params(self) -> str:
+        """
+        Get the representation of the wrapped localization, or the explicit
+        cache key if specified.
+        """
+        if self.cache_key is not None:
+            return 'key({0:s})'.format(self.cache_key)
+        return self._get_param_repr(self.localization)
+
+    def get_key(self, state_grid: np.ndarray, obs_grid: np.ndarray) -> str:
+        """
+        Get the cache key for given grids and the parameters of the wrapped
+        localization.
+
+        Parameters
+        ----------
+        state_grid : :py:class:`np.ndarray`
+            The state grid for which the localization is estimated.
+        obs_grid : :py:class:`np.ndarray`
+            The observation grid for which the localization is estimated.
+
+        Returns
+        -------
+        key : str
+            The hexadecimal hash, which is used as key.
+
+        Raises
+        ------
+        TypeError
+            If a parameter of the wrapped localization has no stable
+            representation and no explicit `cache_key` is specified.
+        """
+        key_hash = hashlib.sha1()
+        for grid in (state_grid, obs_grid):
+            grid = np.ascontiguousarray(grid)
+            key_hash.update(str((grid.shape, grid.dtype.str)).encode())
+            key_hash.update(grid.tobytes())
+        key_hash.update(self._get_loc_params().encode())
+        return key_hash.hexdigest()
+
+    def _get_cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, 'loc_{0:s}.npz'.format(key))
+
+    def _load_from_memory(
+            self,
+            key: str
+    ) -> Union[None, scipy.sparse.csr_matrix]:
+        with self._lock:
+            if key not in self._memory_cache:
+                return None
+            self._memory_cache.move_to_end(key)
+            return self._memory_cache[key]
+
+    def _store_in_memory(self, key: str, loc_matrix: scipy.sparse.csr_matrix):
+        with self._lock:
+            self._memory_cache[key] = loc_matrix
+            self._memory_cache.move_to_end(key)
+            while len(self._memory_cache) > self.max_items:
+                self._memory_cache.popitem(last=False)
+
+    def _load_from_disk(self, key: str) -> Union[None, scipy.sparse.csr_matrix]:
+        if self.cache_dir is None:
+            return None
+        cache_path = self._get_cache_path(key)
+        if not os.path.isfile(cache_path):
+            return None
+        logger.debug('Load localization matrix from {0:s}'.format(cache_path))
+        return scipy.sparse.load_npz(cache_path).tocsr()
+
+    def _store_on_disk(self, key: str, loc_matrix: scipy.sparse.csr_matrix):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._get_cache_path(key)
+        tmp_path = '{0:s}.{1:d}.tmp.npz'.format(cache_path[:-4], os.getpid())
+        scipy.sparse.save_npz(tmp_path, loc_matrix, compressed=False)
+        os.replace(tmp_path, cache_path)
+
+    def localize_all(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> scipy.sparse.csr_matrix:
+        """
+        Returns the sparse localization matrix for given grids. The matrix is
+        loaded from the memory or disk cache if possible. Otherwise, it is
+        estimated with the wrapped localization and stored in the cache.
+
+        Parameters
+        ----------
+        state_grid : :py:class:`np.ndarray`
+            The observation weights are estimated for every grid point in this
+            state grid. The first axis of this array has to be the grid point
+            axis.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid points.
+
+        Returns
+        -------
+        loc_matrix : :py:class:`scipy.sparse.csr_matrix` (n_grid, n_obs)
+            The sparse localization matrix. The `i`-th row contains the weights
+            of all used observations for the `i`-th grid point.
+        """
+        key = self.get_key(state_grid, obs_grid)
+        loc_matrix = self._load_from_memory(key)
+        if loc_matrix is not None:
+            return loc_matrix
+        loc_matrix = self._load_from_disk(key)
+        if loc_matrix is None:
+            loc_matrix = self.localization.localize_all(state_grid, obs_grid)
+            self._store_on_disk(key, loc_matrix)
+        self._store_in_memory(key, loc_matrix)
+        return loc_matrix
+
+    def clear(self):
+        """
+        Clears the memory cache. Files on disk are not removed.
+        """
+        with self._lock:
+            self._memory_cache.clear()
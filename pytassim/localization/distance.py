@@ -0,0 +1,407 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+# System modules
+import logging
+import abc
+from typing import Any, Iterable, Tuple, Union
+
+# External modules
+import numpy as np
+import torch
+
+# Internal modules
+
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    'BaseDistance',
+    'EuclideanDistance',
+    'CyclicDistance',
+    'HaversineDistance',
+    'ChordDistance',
+    'LogPressureDistance',
+    'SeparatedDistance'
+]
+
+
+_Array = Union[np.ndarray, torch.Tensor]
+
+
+def _to_common(
+        grid_a: Any,
+        grid_b: Any
+) -> Tuple[Any, _Array, _Array]:
+    """
+    Converts given grids into floating point arrays of a common backend.
+    If any of the grids is a :py:class:`torch.Tensor`, both grids are
+    converted into tensors and :py:mod:`torch` is returned as backend,
+    otherwise :py:mod:`numpy`.
+    """
+    if torch.is_tensor(grid_a) or torch.is_tensor(grid_b):
+        tensor = grid_a if torch.is_tensor(grid_a) else grid_b
+        dtype = tensor.dtype if tensor.is_floating_point() \
+            else torch.get_default_dtype()
+        grid_a = torch.as_tensor(grid_a, dtype=dtype, device=tensor.device)
+        grid_b = torch.as_tensor(grid_b, dtype=dtype, device=tensor.device)
+        return torch, grid_a, grid_b
+    return np, np.asarray(grid_a, dtype=float), np.asarray(grid_b, dtype=float)
+
+
+def _get_coord(grid: _Array, coord: int) -> _Array:
+    """
+    Selects given coordinate from the last axis of given grid. A scalar grid
+    is interpreted as single coordinate.
+    """
+    if grid.ndim == 0:
+        return grid
+    return grid[..., coord]
+
+
+class BaseDistance(object):
+    """
+    Base object for vectorized distance functions, which can be used as
+    ``dist_func`` of the localizations, e.g.
+    :py:class:`~pytassim.localization.gaspari_cohn.GaspariCohn`. A distance
+    is called with two grids, where the coordinates are on the last axis.
+    Both grids are broadcasted against each other and the distance is
+    estimated for every broadcasted pair of grid points. The grids can be
+    either :py:class:`numpy.ndarray` or :py:class:`torch.Tensor`, where the
+    distance is returned with the same backend.
+
+    Additionally, every distance specifies a transformation into
+    Euclidean coordinates with :py:meth:`to_coords`. The Euclidean distance
+    between the transformed coordinates is less or equal than this
+    distance, such that the transformed coordinates can be used by the
+    :py:class:`~pytassim.localization.spatial_index.SpatialIndex` to find
+    all grid points within a cutoff radius.
+    """
+    def __call__(self, grid_a: Any, grid_b: Any) -> _Array:
+        backend, grid_a, grid_b = _to_common(grid_a, grid_b)
+        return self.distance(backend, grid_a, grid_b)
+
+    def __str__(self) -> str:
+        return repr(self)
+
+    def __repr__(self) -> str:
+        params = ', '.join(
+            '{0:s}={1}'.format(name, param)
+            for name, param in sorted(vars(self).items())
+        )
+        return '{0:s}({1:s})'.format(self.__class__.__name__, params)
+
+    @abc.abstractmethod
+    def distance(
+            self,
+            backend: Any,
+            grid_a: _Array,
+            grid_b: _Array
+    ) -> _Array:
+        """
+        Estimates the distance between given grids with given backend,
+        either :py:mod:`numpy` or :py:mod:`torch`.
+        """
+        pass
+
+    @abc.abstractmethod
+    def to_coords(self, grid: np.ndarray) -> np.ndarray:
+        """
+        Transforms given grid into Euclidean coordinates, where the
+        Euclidean distance is less or equal than this distance.
+
+        Parameters
+        ----------
+        grid : :py:class:`np.ndarray` (n_grid, n_coords)
+            The grid, which is transformed.
+
+        Returns
+        -------
+        coords : :py:class:`np.ndarray` (n_grid, n_euclidean)
+            The transformed coordinates.
+        """
+        pass
+
+
+class EuclideanDistance(BaseDistance):
+    """
+    The Euclidean distance between the coordinates of the grid points.
+
+    Parameters
+    ----------
+    coords : iterable(int) or None, optional
+        The positions of the used coordinates on the last axis. Default is
+        None, indicating that all coordinates are used.
+    """
+    def __init__(self, coords: Union[None, Iterable[int]] = None):
+        self.coords = None if coords is None else list(coords)
+
+    def _select(self, grid: _Array) -> _Array:
+        if grid.ndim == 0:
+            return grid[None]
+        if self.coords is None:
+            return grid
+        return grid[..., self.coords]
+
+    def distance(
+            self,
+            backend: Any,
+            grid_a: _Array,
+            grid_b: _Array
+    ) -> _Array:
+        diff = self._select(grid_a) - self._select(grid_b)
+        return backend.sqrt((diff ** 2).sum(-1))
+
+    def to_coords(self, grid: np.ndarray) -> np.ndarray:
+        return self._select(np.asarray(grid, dtype=float))
+
+
+class CyclicDistance(BaseDistance):
+    """
+    The distance on a one-dimensional cyclic grid with given period, e.g.
+    of the Lorenz '96 model, :math:`\\min(|a-b| \\bmod P, P - |a-b|
+    \\bmod P)`.
+
+    Parameters
+    ----------
+    period : float
+        The period :math:`P` of the cyclic grid, e.g. the number of grid
+        points for the Lorenz '96 model.
+    coord : int, optional
+        The position of the cyclic coordinate on the last axis. Default is 0.
+    """
+    def __init__(self, period: float, coord: int = 0):
+        self.period = period
+        self.coord = coord
+
+    def distance(
+            self,
+            backend: Any,
+            grid_a: _Array,
+            grid_b: _Array
+    ) -> _Array:
+        diff = backend.remainder(
+            backend.abs(_get_coord(grid_a, self.coord)
+                        - _get_coord(grid_b, self.coord)),
+            self.period
+        )
+        return backend.minimum(diff, self.period-diff)
+
+    def to_coords(self, grid: np.ndarray) -> np.ndarray:
+        """
+        The cyclic coordinate is projected onto a circle with circumference
+        of the period. The chord on this circle is less or equal than the
+        cyclic distance.
+        """
+        angle = 2 * np.pi * _get_coord(np.asarray(grid, dtype=float),
+                                       self.coord) / self.period
+        circle_radius = self.period / (2 * np.pi)
+        return circle_radius * np.stack([np.cos(angle), np.sin(angle)],
+                                        axis=-1)
+
+
+class _SphericalDistance(BaseDistance):
+    """
+    Base object for distances on a sphere with latitude and longitude as
+    coordinates.
+    """
+    def __init__(
+            self,
+            radius: float = 6371.,
+            lat_coord: int = 0,
+            lon_coord: int = 1,
+            degrees: bool = True
+    ):
+        self.radius = radius
+        self.lat_coord = lat_coord
+        self.lon_coord = lon_coord
+        self.degrees = degrees
+
+    def _get_lat_lon(
+            self,
+            backend: Any,
+            grid: _Array
+    ) -> Tuple[_Array, _Array]:
+        lat = grid[..., self.lat_coord]
+        lon = grid[..., self.lon_coord]
+        if self.degrees:
+            lat, lon = backend.deg2rad(lat), backend.deg2rad(lon)
+        return lat, lon
+
+    def _to_cartesian(self, backend: Any, grid: _Array) -> _Array:
+        lat, lon = self._get_lat_lon(backend, grid)
+        return backend.stack([
+            backend.cos(lat) * backend.cos(lon),
+            backend.cos(lat) * backend.sin(lon),
+            backend.sin(lat)
+        ], -1)
+
+    def to_coords(self, grid: np.ndarray) -> np.ndarray:
+        """
+        The grid points are transformed into three-dimensional Cartesian
+        coordinates on the sphere. The Euclidean distance between these
+        coordinates is the chord distance.
+        """
+        return self.radius * self._to_cartesian(
+            np, np.asarray(grid, dtype=float)
+        )
+
+
+class HaversineDistance(_SphericalDistance):
+    """
+    The great-circle distance on a sphere, estimated with the haversine
+    formula. As the great-circle distance is invariant under a rotation of
+    the sphere, this distance can be also used for the rotated latitudes
+    and longitudes of a rotated pole grid, e.g. of COSMO or CLM.
+
+    Parameters
+    ----------
+    radius : float, optional
+        The radius of the sphere, which determines the unit of the distance.
+        Default is 6371, the mean radius of the earth in kilometres.
+    lat_coord : int, optional
+        The position of the latitude on the last axis. Default is 0.
+    lon_coord : int, optional
+        The position of the longitude on the last axis. Default is 1.
+    degrees : bool, optional
+        If the latitude and longitude are given in degrees (default) or in
+        radians.
+    """
+    def distance(
+            self,
+            backend: Any,
+            grid_a: _Array,
+            grid_b: _Array
+    ) -> _Array:
+        lat_a, lon_a = self._get_lat_lon(backend, grid_a)
+        lat_b, lon_b = self._get_lat_lon(backend, grid_b)
+        hav = backend.sin((lat_b-lat_a)/2) ** 2 + backend.cos(lat_a) * \
+            backend.cos(lat_b) * backend.sin((lon_b-lon_a)/2) ** 2
+        hav = backend.clip(hav, 0., 1.)
+        return 2 * self.radius * backend.arcsin(backend.sqrt(hav))
+
+
+class ChordDistance(_SphericalDistance):
+    """
+    The chord distance on a sphere, which is the Euclidean distance between
+    the three-dimensional Cartesian coordinates of the grid points. For
+    short distances, the chord distance is approximately the great-circle
+    distance.
+
+    Parameters
+    ----------
+    radius : float, optional
+        The radius of the sphere, which determines the unit of the distance.
+        Default is 6371, the mean radius of the earth in kilometres.
+    lat_coord : int, optional
+        The position of the latitude on the last axis. Default is 0.
+    lon_coord : int, optional
+        The position of the longitude on the last axis. Default is 1.
+    degrees : bool, optional
+        If the latitude and longitude are given in degrees (default) or in
+        radians.
+    """
+    def distance(
+            self,
+            backend: Any,
+            grid_a: _Array,
+            grid_b: _Array
+    ) -> _Array:
+        diff = self._to_cartesian(backend, grid_a) - \
+            self._to_cartesian(backend, grid_b)
+        return self.radius * backend.sqrt((diff ** 2).sum(-1))
+
+
+class LogPressureDistance(BaseDistance):
+    """
+    The vertical distance in log-pressure coordinates,
+    :math:`H |\\ln(p_a) - \\ln(p_b)|`, with :math:`H` as scale height.
+
+    Parameters
+    ----------
+    coord : int, optional
+        The position of the pressure coordinate on the last axis. Default is
+        -1, the last coordinate.
+    scale_height : float, optional
+        The distance is scaled by this scale height. Default is 1, such that
+        the distance is given in natural logarithms of the pressure.
+    """
+    def __init__(self, coord: int = -1, scale_height: float = 1.):
+        self.coord = coord
+        self.scale_height = scale_height
+
+    def distance(
+            self,
+            backend: Any,
+            grid_a: _Array,
+            grid_b: _Array
+    ) -> _Array:
+        log_diff = backend.log(_get_coord(grid_a, self.coord)) - \
+            backend.log(_get_coord(grid_b, self.coord))
+        return self.scale_height * backend.abs(log_diff)
+
+    def to_coords(self, grid: np.ndarray) -> np.ndarray:
+        log_p = np.log(_get_coord(np.asarray(grid, dtype=float), self.coord))
+        return self.scale_height * log_p[..., None]
+
+
+class SeparatedDistance(BaseDistance):
+    """
+    Combines different distances, e.g. a horizontal and a vertical
+    distance, which are stacked along a new first axis. These separated
+    distances can be used together with multiple length scales in
+    :py:class:`~pytassim.localization.gaspari_cohn.GaspariCohn`.
+
+    Parameters
+    ----------
+    distances : iterable(child of :py:class:`BaseDistance`)
+        These distances are estimated and stacked.
+    """
+    def __init__(self, distances: Iterable[BaseDistance]):
+        self.distances = list(distances)
+
+    def distance(
+            self,
+            backend: Any,
+            grid_a: _Array,
+            grid_b: _Array
+    ) -> _Array:
+        return backend.stack(
+            [dist.distance(backend, grid_a, grid_b)
+             for dist in self.distances], 0
+        )
+
+    def to_coords(self, grid: np.ndarray) -> np.ndarray:
+        """
+        The transformed coordinates of all distances are concatenated. As
+        a grid point is only used if all its separated distances are within
+        their cutoff, the Euclidean norm of the separated cutoffs is a valid
+        cutoff radius for these coordinates.
+        """
+        return np.concatenate(
+            [dist.to_coords(grid) for dist in self.distances], axis=-1
+        )
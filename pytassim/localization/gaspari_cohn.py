@@ -25,74 +25,264 @@
 
 # System modules
 import logging
-import warnings
 from typing import Tuple, Union, Callable, Any
 
 # External modules
 import numpy as np
+import scipy.sparse
+import torch
 
 # Internal modules
 from .localization import BaseLocalization
+from .distance import BaseDistance
 
 
 logger = logging.getLogger(__name__)
 
 
-class GaspariCohn(BaseLocalization):
+# Pieces of the Gaspari-Cohn functions as (upper bound, polynomial
+# coefficients with descending order, coefficient of the reciprocal term)
+_GC_PIECES = (
+    (1., (-1/4, 1/2, 5/8, -5/3, 0., 1.), 0.),
+    (2., (1/12, -1/2, 5/8, 5/3, -5., 4.), -2/3),
+)
+
+_GC_INF_PIECES = (
+    (0.5, (-28/33, 8/11, 20/11, -80/33, 0., 1.), 0.),
+    (1., (20/33, -16/11, 0., 100/33, -45/11, 51/22), -7/44),
+    (1.5, (-4/11, 16/11, -10/11, -100/33, 5., -61/22), 115/132),
+    (2., (4/33, -8/11, 10/11, 80/33, -80/11, 64/11), -32/33),
+)
+
+
+def _horner(dist: Any, coeffs: Tuple[float, ...]) -> Any:
     """
-    This localization can  be used to constrain observations. It is based on
-    Gaspari-Cohn correlation function :cite:`gaspari_construction_1999`. This
-    correlation function corresponds to a form factor of :math:`\\frac{1}{2}`,
-    in :cite:`gaspari_construction_1999` :math:`C_0(z, \\frac{1}{2}, c)`.
+    Evaluates the polynomial with given coefficients in Horner form, where
+    all intermediate results are updated in-place.
+    """
+    poly = coeffs[0] * dist
+    for coeff in coeffs[1:-1]:
+        poly += coeff
+        poly *= dist
+    poly += coeffs[-1]
+    return poly
+
+
+def _eval_pieces(dist_radius: Any, pieces: Tuple) -> Any:
+    """
+    Evaluates given piecewise function in a single pass over all pieces.
+    Only the normalized distances within the support of the function are
+    evaluated. Every piece is evaluated for these distances clipped to its
+    bounds, such that the reciprocal terms never divide by zero, and the
+    pieces are selected with `where`. Normalized distances beyond the last
+    piece get a zero weight.
+    """
+    if torch.is_tensor(dist_radius):
+        backend = torch
+    else:
+        backend = np
+        dist_radius = np.asarray(dist_radius, dtype=float)
+    bounds = [0.] + [piece[0] for piece in pieces]
+    taper = backend.zeros_like(dist_radius)
+    in_support = dist_radius < bounds[-1]
+    dist_support = dist_radius[in_support]
+    taper_support = backend.zeros_like(dist_support)
+    for k in reversed(range(len(pieces))):
+        _, coeffs, inv_coeff = pieces[k]
+        clipped = backend.clip(dist_support, bounds[k], bounds[k+1])
+        piece = _horner(clipped, coeffs)
+        if inv_coeff:
+            piece += inv_coeff / clipped
+        taper_support = backend.where(dist_support < bounds[k+1], piece,
+                                      taper_support)
+    taper[in_support] = taper_support
+    return taper
+
+
+def gaspari_cohn_taper(dist_radius: Any) -> Any:
+    """
+    Evaluates the Gaspari-Cohn function with a form factor of
+    :math:`\\frac{1}{2}` :cite:`gaspari_construction_1999` in Horner form.
 
     Parameters
     ----------
-    length_scale : float or tuple(float)
-        This length scale is :math:`c` in :cite:`gaspari_construction_1999`.
-        This length scale determines
-        the truncation to zero and the decay of the covariance function. The
-        Gaspari-Cohn function is truncated to zero by 2 * length_scale.
-    dist_func : func
-        This distance function is used to determine the distance between states.
-        This functions takes two different grid lists and estimates a distance
-        between these two grids.
+    dist_radius : :py:class:`np.ndarray` or :py:class:`torch.Tensor`
+        The distances, normalized by the length scale.
+
+    Returns
+    -------
+    taper : :py:class:`np.ndarray` or :py:class:`torch.Tensor`
+        The tapered weights with the same type and shape as the distances.
+        The weights are zero for normalized distances greater or equal than
+        two.
+    """
+    return _eval_pieces(dist_radius, _GC_PIECES)
+
+
+def gaspari_cohn_inf_taper(dist_radius: Any) -> Any:
+    """
+    Evaluates the Gaspari-Cohn function with a form factor of infinity
+    :cite:`gaspari_construction_1999` in Horner form.
+
+    Parameters
+    ----------
+    dist_radius : :py:class:`np.ndarray` or :py:class:`torch.Tensor`
+        The distances, normalized by the length scale.
+
+    Returns
+    -------
+    taper : :py:class:`np.ndarray` or :py:class:`torch.Tensor`
+        The tapered weights with the same type and shape as the distances.
+        The weights are zero for normalized distances greater or equal than
+        two.
+    """
+    return _eval_pieces(dist_radius, _GC_INF_PIECES)
+
+
+def _get_pair_dist(
+        dist_func: Callable,
+        grid_points: np.ndarray,
+        obs_grid: np.ndarray
+) -> np.ndarray:
+    """
+    Estimates the distances between given grid points and observations,
+    which are already paired along the first axis, with a single call of
+    given distance function. For vectorized distances of
+    :py:mod:`pytassim.localization.distance`, a one-dimensional grid is
+    interpreted as grid with a single coordinate.
+
+    Returns
+    -------
+    dist : :py:class:`np.ndarray` (n_dims, n_pairs)
+        The distances, where the first axis are the different distances
+        returned by the distance function, e.g. for every coordinate.
+    """
+    n_pairs = len(grid_points)
+    if isinstance(dist_func, BaseDistance):
+        obs_grid = np.asarray(obs_grid, dtype=float)
+        if obs_grid.ndim == 1:
+            obs_grid = obs_grid[:, None]
+        grid_points = np.asarray(grid_points, dtype=float)
+    while grid_points.ndim < obs_grid.ndim:
+        grid_points = grid_points[..., None]
+    dist = np.asarray(dist_func(grid_points, obs_grid))
+    return dist.reshape(-1, n_pairs)
+
+
+def _get_paired_dist(
+        dist_func: Callable,
+        grid_points: np.ndarray,
+        obs_grid: np.ndarray
+) -> np.ndarray:
     """
+    Estimates the distances between all given grid points and observations
+    with a single call of given distance function. The grid points and
+    observations are repeated such that they are paired along the first
+    axis, which is equivalent to the broadcasting of a single grid point
+    against the observation grid.
+
+    Vectorized distances of :py:mod:`pytassim.localization.distance` are
+    instead directly broadcasted, where a one-dimensional grid is
+    interpreted as grid with a single coordinate.
+
+    Returns
+    -------
+    dist : :py:class:`np.ndarray` (n_dims, n_points, n_obs)
+        The distances, where the first axis are the different distances
+        returned by the distance function, e.g. for every coordinate.
+    """
+    n_points, n_obs = len(grid_points), len(obs_grid)
+    if isinstance(dist_func, BaseDistance):
+        obs_grid = np.asarray(obs_grid, dtype=float)
+        if obs_grid.ndim == 1:
+            obs_grid = obs_grid[:, None]
+        grid_points = np.asarray(grid_points, dtype=float)
+        while grid_points.ndim < obs_grid.ndim:
+            grid_points = grid_points[..., None]
+        dist = dist_func(grid_points[:, None], obs_grid[None, :])
+        return dist.reshape(-1, n_points, n_obs)
+    paired_points = np.repeat(grid_points, n_obs, axis=0)
+    paired_obs = np.tile(obs_grid, (n_points, ) + (1, ) * (obs_grid.ndim-1))
+    dist = _get_pair_dist(dist_func, paired_points, paired_obs)
+    return dist.reshape(-1, n_points, n_obs)
+
+
+class _GaspariCohnBase(BaseLocalization):
+    """
+    Base class for the localizations with a compactly supported Gaspari-Cohn
+    function :cite:`gaspari_construction_1999`. The localizations only
+    differ in their taper function, which is evaluated for the distances
+    normalized by the length scale and truncated to zero beyond the support
+    factor times the length scale. The parameters are described in
+    :py:class:`~pytassim.localization.gaspari_cohn.GaspariCohn`.
+    """
+    _support = 2.
+
     def __init__(
             self,
             length_scale: Union[float, Tuple[float]],
             dist_func: Callable,
-            epsilon: float = 1E-5
+            epsilon: float = 1E-5,
+            use_index: bool = False
     ):
-        self.radius = np.atleast_1d(length_scale)
+        self.radius = length_scale
         self.dist_func = dist_func
         self.epsilon = epsilon
-        self._thres = [2, 1]
+        self.use_index = use_index
 
     def __str__(self) -> str:
-        return 'GaspariCohn(l={0})'.format(str(self.radius))
+        return '{0}(l={1})'.format(self.__class__.__name__, str(self.radius))
 
     def __repr__(self) -> str:
-        return 'GaspariCohn'
+        return self.__class__.__name__
 
     @staticmethod
-    def _f1(dist: np.ndarray) -> np.ndarray:
-        f1 = - 0.25 * dist ** 5
-        f1 += 0.5 * dist ** 4
-        f1 += 0.625 * dist ** 3
-        f1 -= 5 / 3 * dist ** 2
-        f1 += 1
-        return f1
+    def _taper(dist_radius: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the taper function for given distances, normalized by the
+        length scale.
+        """
+        raise NotImplementedError
 
-    @staticmethod
-    def _f2(dist: np.ndarray) -> np.ndarray:
-        f2 = 1 / 12 * dist ** 5
-        f2 -= 0.5 * dist ** 4
-        f2 += 0.625 * dist ** 3
-        f2 += 5 / 3 * dist ** 2
-        f2 -= 5 * dist
-        f2 += 4
-        f2 -= 2 / 3 / dist
-        return f2
+    @property
+    def cutoff(self) -> float:
+        """
+        The observation weights are truncated to zero beyond this distance.
+        """
+        return self._support * float(
+            np.linalg.norm(np.atleast_1d(self.radius))
+        )
+
+    def get_obs_subset(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Union[None, np.ndarray]:
+        """
+        Returns the indices of all observations within the bounding box of
+        given state grid plus the cutoff radius. These observations are only
+        returned if the spatial index is used, else all observations could
+        be used and None is returned.
+        """
+        if self.use_index:
+            return self._get_halo_subset(state_grid, obs_grid, self.cutoff,
+                                         self._get_coord_transform())
+        return None
+
+    def count_obs(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> np.ndarray:
+        """
+        Estimates the number of used observations for every given grid point.
+        If the spatial index is used, the observations within the cutoff
+        radius are counted with the index as upper bound, without estimating
+        the weights.
+        """
+        if self.use_index:
+            return self._get_obs_index(obs_grid).count(state_grid, self.cutoff)
+        return super().count_obs(state_grid, obs_grid)
 
     def localize_obs(
             self,
@@ -121,27 +311,149 @@ class GaspariCohn(BaseLocalization):
             The estimated observation weights. These weights can be used to
             weight observations.
         """
-        weights = np.ones((obs_grid.shape[0]), dtype=float)
-        dist = np.atleast_2d(self.dist_func(grid_ind, obs_grid))
-        for i, d in enumerate(dist):
-            dist_radius = d / self.radius[i]
-            conds = [dist_radius < thres for thres in self._thres]
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                tmp_weights = np.zeros((obs_grid.shape[0]), dtype=float)
-                tmp_weights[conds[0]] = self._f2(dist_radius[conds[0]])
-                tmp_weights[conds[1]] = self._f1(dist_radius[conds[1]])
-            weights *= tmp_weights
+        use_obs, weights = self.localize_obs_batch(
+            np.asarray(grid_ind)[None, ...], obs_grid
+        )
+        return use_obs[0], weights[0]
+
+    def localize_obs_batch(
+            self,
+            grid_points: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method creates weights for observations based on given block of
+        grid points and observation grid. The distances and
+        weights are estimated for all grid points at once. If the spatial
+        index is used, the distances are only estimated for the
+        observations within the cutoff radius of every grid point.
+
+        Parameters
+        ----------
+        grid_points : :py:class:`np.ndarray`
+            The observation weights are estimated for these grid points. The
+            first axis of this array has to be the grid point axis.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid points.
+
+        Returns
+        -------
+        use_obs : :py:class:`np.ndarray` (n_points, n_obs), dtype=bool
+            This is a boolean array indicating if the `j`-th observation should
+            be used for the `i`-th grid point.
+        obs_weights : :py:class:`np.ndarray` (n_points, n_obs), dtype=float
+            The estimated observation weights for every grid point.
+        """
+        grid_points = np.asarray(grid_points)
+        weights = np.zeros((len(grid_points), len(obs_grid)), dtype=float)
+        if self.use_index:
+            point_ind, obs_ind, pair_weights = self._get_pair_weights(
+                grid_points, obs_grid
+            )
+            weights[point_ind, obs_ind] = pair_weights
+        elif len(obs_grid) > 0 and len(grid_points) > 0:
+            weights = self._get_weights(grid_points, obs_grid)
         use_obs = weights > self.epsilon
         return use_obs, weights
 
+    def localize_all(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> scipy.sparse.csr_matrix:
+        """
+        This method creates the observation weights for all given grid points
+        at once as sparse matrix. If the spatial index is used, the rows of
+        this matrix are directly built from the observations within the
+        cutoff radius of every grid point, without dense arrays over all
+        observations.
+
+        Parameters
+        ----------
+        state_grid : :py:class:`np.ndarray`
+            The observation weights are estimated for every grid point in this
+            state grid. The first axis of this array has to be the grid point
+            axis.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid points.
+
+        Returns
+        -------
+        loc_matrix : :py:class:`scipy.sparse.csr_matrix` (n_grid, n_obs)
+            The sparse localization matrix. The `i`-th row contains the weights
+            of all used observations for the `i`-th grid point.
+        """
+        if not self.use_index:
+            return super().localize_all(state_grid, obs_grid)
+        point_ind, obs_ind, weights = self._get_pair_weights(
+            np.asarray(state_grid), obs_grid
+        )
+        use_obs = weights > self.epsilon
+        loc_matrix = scipy.sparse.csr_matrix(
+            (weights[use_obs], (point_ind[use_obs], obs_ind[use_obs])),
+            shape=(len(state_grid), len(obs_grid))
+        )
+        return loc_matrix
+
+    def _get_pair_weights(
+            self,
+            grid_points: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Estimates the weights with the spatial index for all pairs of grid
+        points and observations within the cutoff radius. The distances are
+        only estimated for these pairs, in blocks of pairs.
+        """
+        if len(grid_points) == 0 or len(obs_grid) == 0:
+            empty_ind = np.zeros(0, dtype=int)
+            return empty_ind, empty_ind, np.zeros(0, dtype=float)
+        point_ind, obs_ind = self._get_obs_index(obs_grid).query_pairs(
+            grid_points, self.cutoff
+        )
+        weights = np.zeros(len(point_ind), dtype=float)
+        for start in range(0, len(point_ind), self._max_block_elements):
+            block = slice(start, start+self._max_block_elements)
+            dist = _get_pair_dist(
+                self.dist_func, grid_points[point_ind[block]],
+                obs_grid[obs_ind[block]]
+            )
+            weights[block] = self._taper_dist(dist)
+        return point_ind, obs_ind, weights
 
-class GaspariCohnInf(BaseLocalization):
+    def _taper_dist(self, dist: np.ndarray) -> np.ndarray:
+        """
+        Estimates the weights as product of the tapers for every distance
+        along the first axis of given distances.
+        """
+        radius = np.atleast_1d(self.radius)
+        weights = np.ones(dist.shape[1:], dtype=float)
+        for i, d in enumerate(dist):
+            weights *= self._taper(d / radius[i])
+        return weights
+
+    def _get_weights(
+            self,
+            grid_points: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> np.ndarray:
+        """
+        Estimates the weights for all given grid points and observations as
+        product of the tapers for every distance returned by the distance
+        function.
+        """
+        dist = _get_paired_dist(self.dist_func, grid_points, obs_grid)
+        return self._taper_dist(dist)
+
+
+class GaspariCohn(_GaspariCohnBase):
     """
     This localization can  be used to constrain observations. It is based on
     Gaspari-Cohn correlation function :cite:`gaspari_construction_1999`. This
-    correlation function corresponds to a form factor of infinity, in
-    :cite:`gaspari_construction_1999` :math:`C_0(z, \\infty, c)`.
+    correlation function corresponds to a form factor of :math:`\\frac{1}{2}`,
+    in :cite:`gaspari_construction_1999` :math:`C_0(z, \\frac{1}{2}, c)`.
 
     Parameters
     ----------
@@ -153,102 +465,47 @@ class GaspariCohnInf(BaseLocalization):
     dist_func : func
         This distance function is used to determine the distance between states.
         This functions takes two different grid lists and estimates a distance
-        between these two grids.
+        between these two grids. Vectorized distances are available in
+        :py:mod:`pytassim.localization.distance`.
+    epsilon : float, optional
+        Observations with a weight less or equal than this value are not used.
+        Default is 1E-5.
+    use_index : bool, optional
+        If a spatial index should be built for the observation grid. The index
+        is cached and only the observations within the cutoff radius of
+        2 * length_scale are used to estimate the distances. The cutoff
+        radius is given by the Euclidean norm of the length scales and uses
+        the Euclidean distance between the grid coordinates. The index can be
+        therefore used if the distance function is the Euclidean distance
+        between the grid coordinates, or a composition of such distances for
+        disjoint subsets of the coordinates. If the distance function is a
+        :py:class:`~pytassim.localization.distance.BaseDistance`, the index
+        is built on its transformed coordinates, such that the index can be
+        also used for e.g. spherical or cyclic distances. Default is False.
     """
     def __init__(
             self,
             length_scale: Union[float, Tuple[float]],
             dist_func: Callable,
-            epsilon: float = 1E-5
+            epsilon: float = 1E-5,
+            use_index: bool = False
     ):
-        self.radius = length_scale
-        self.dist_func = dist_func
-        self.epsilon = epsilon
-        self._thres = [2, 1.5, 1, 0.5]
-
-    def __str__(self) -> str:
-        return 'GaspariCohnInf(l={0})'.format(str(self.radius))
-
-    def __repr__(self) -> str:
-        return 'GaspariCohnInf'
-
-    @staticmethod
-    def _f1(dist: np.ndarray) -> np.ndarray:
-        f1 = -28 * dist ** 5 / 33
-        f1 += 8 * dist ** 4 / 11
-        f1 += 20 * dist ** 3 / 11
-        f1 -= 80 * dist ** 2 / 33
-        f1 += 1
-        return f1
-
-    @staticmethod
-    def _f2(dist: np.ndarray) -> np.ndarray:
-        f2 = 20 * dist ** 5 / 33
-        f2 -= 16 * dist ** 4 / 11
-        f2 += 100 * dist ** 2 / 33
-        f2 -= 45 * dist / 11
-        f2 += 51 / 22
-        f2 -= 7 / (44 * dist)
-        return f2
-
-    @staticmethod
-    def _f3(dist: np.ndarray) -> np.ndarray:
-        f3 = -4 * dist ** 5 / 11
-        f3 += 16 * dist ** 4 / 11
-        f3 -= 10 * dist ** 3 / 11
-        f3 -= 100 * dist ** 2 / 33
-        f3 += 5 * dist
-        f3 -= 61 / 22
-        f3 += 115 / (132 * dist)
-        return f3
+        super().__init__(
+            length_scale=np.atleast_1d(length_scale), dist_func=dist_func,
+            epsilon=epsilon, use_index=use_index
+        )
 
-    @staticmethod
-    def _f4(dist: np.ndarray) -> np.ndarray:
-        f4 = 4 * dist ** 5 / 33
-        f4 -= 8 * dist ** 4 / 11
-        f4 += 10 * dist ** 3 / 11
-        f4 += 80 * dist ** 2 / 33
-        f4 -= 80 * dist / 11
-        f4 += 64 / 11
-        f4 -= 32 / (33 * dist)
-        return f4
+    _taper = staticmethod(gaspari_cohn_taper)
 
-    def localize_obs(
-            self,
-            grid_ind: Any,
-            obs_grid: np.ndarray
-    ) -> Tuple[np.ndarray, np.ndarray]:
-        """
-        This method creates weights for observations based on given grid index
-        and observation grid.
 
-        Parameters
-        ----------
-        grid_ind : any
-            This parameter indicates the current grid index.
-        obs_grid : :py:class:`np.ndarray`
-            This observation grid is used to estimate a spatial distance to
-            given grid index.
-
-        Returns
-        -------
-        use_obs : :py:class:`np.ndarray`, dtype=bool
-            This is a boolean array indicating if the `i`-th observation should
-            be used. This array is calculated based on estimated observation
-            weights.
-        obs_weights : :py:class:`np.ndarray`, dtype=float
-            The estimated observation weights. These weights can be used to
-            weight observations.
-        """
-        weights = np.zeros((obs_grid.shape[-1]), dtype=float)
-        dist = self.dist_func(grid_ind, obs_grid)
-        dist_radius = dist / self.radius
-        conds = [dist_radius < thres for thres in self._thres]
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            weights[conds[0]] = self._f4(dist_radius[conds[0]])
-            weights[conds[1]] = self._f3(dist_radius[conds[1]])
-            weights[conds[2]] = self._f2(dist_radius[conds[2]])
-        weights[conds[3]] = self._f1(dist_radius[conds[3]])
-        use_obs = weights > self.epsilon
-        return use_obs, weights
+class GaspariCohnInf(_GaspariCohnBase):
+    """
+    This localization can  be used to constrain observations. It is based on
+    Gaspari-Cohn correlation function :cite:`gaspari_construction_1999`. This
+    correlation function corresponds to a form factor of infinity, in
+    :cite:`gaspari_construction_1999` :math:`C_0(z, \\infty, c)`. The
+    parameters are the same as for
+    :py:class:`~pytassim.localization.gaspari_cohn.GaspariCohn`, and the
+    function is also truncated to zero by 2 * length_scale.
+    """
+    _taper = staticmethod(gaspari_cohn_inf_taper)
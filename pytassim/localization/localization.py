@@ -26,12 +26,14 @@
 # System modules
 import logging
 import abc
-from typing import Any, Tuple
+from typing import Any, Dict, Tuple, Union, Callable
 
 # External modules
 import numpy as np
+import scipy.sparse
 
 # Internal modules
+from .spatial_index import SpatialIndex
 
 
 logger = logging.getLogger(__name__)
@@ -42,6 +44,19 @@ class BaseLocalization(object):
     This base localization should be used if a localization algorithm is
     implemented.
     """
+    _obs_index = None
+    _max_block_elements = 2 ** 20
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        The cached spatial index is not pickled, e.g. if this localization
+        is sent to another process together with an analyser, and is rebuilt
+        there if needed.
+        """
+        state = self.__dict__.copy()
+        state.pop('_obs_index', None)
+        return state
+
     @abc.abstractmethod
     def localize_cov(self):
         """
@@ -78,3 +93,188 @@ class BaseLocalization(object):
             weight observations.
         """
         pass
+
+    def localize_obs_batch(
+            self,
+            grid_points: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method creates weights for observations based on given block of
+        grid points and observation grid. This base method calls
+        :py:meth:`localize_obs` for every grid point, while child classes can
+        estimate the weights for all grid points at once.
+
+        Parameters
+        ----------
+        grid_points : :py:class:`np.ndarray`
+            The observation weights are estimated for these grid points. The
+            first axis of this array has to be the grid point axis.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid points.
+
+        Returns
+        -------
+        use_obs : :py:class:`np.ndarray` (n_points, n_obs), dtype=bool
+            This is a boolean array indicating if the `j`-th observation should
+            be used for the `i`-th grid point.
+        obs_weights : :py:class:`np.ndarray` (n_points, n_obs), dtype=float
+            The estimated observation weights for every grid point.
+        """
+        use_obs = np.zeros((len(grid_points), len(obs_grid)), dtype=bool)
+        obs_weights = np.zeros((len(grid_points), len(obs_grid)), dtype=float)
+        for k, grid_ind in enumerate(grid_points):
+            use_obs[k], obs_weights[k] = self.localize_obs(grid_ind, obs_grid)
+        return use_obs, obs_weights
+
+    def localize_all(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> scipy.sparse.csr_matrix:
+        """
+        This method creates the observation weights for all given grid points
+        at once. The weights are estimated with :py:meth:`localize_obs_batch`
+        for blocks of grid points and returned as sparse matrix, where only
+        used observations are stored.
+
+        Parameters
+        ----------
+        state_grid : :py:class:`np.ndarray`
+            The observation weights are estimated for every grid point in this
+            state grid. The first axis of this array has to be the grid point
+            axis.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid points.
+
+        Returns
+        -------
+        loc_matrix : :py:class:`scipy.sparse.csr_matrix` (n_grid, n_obs)
+            The sparse localization matrix. The `i`-th row contains the weights
+            of all used observations for the `i`-th grid point.
+        """
+        block_size = max(1, self._max_block_elements // max(len(obs_grid), 1))
+        rows = []
+        cols = []
+        weights = []
+        for start in range(0, len(state_grid), block_size):
+            use_obs, obs_weights = self.localize_obs_batch(
+                state_grid[start:start+block_size], obs_grid
+            )
+            block_rows, block_cols = np.nonzero(use_obs)
+            rows.append(block_rows + start)
+            cols.append(block_cols)
+            weights.append(obs_weights[block_rows, block_cols])
+        loc_matrix = scipy.sparse.csr_matrix(
+            (
+                np.concatenate(weights+[np.zeros(0)]).astype(float),
+                (
+                    np.concatenate(rows+[np.zeros(0, dtype=int)]),
+                    np.concatenate(cols+[np.zeros(0, dtype=int)])
+                )
+            ),
+            shape=(len(state_grid), len(obs_grid))
+        )
+        return loc_matrix
+
+    def count_obs(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> np.ndarray:
+        """
+        This method estimates the number of used observations for every given
+        grid point, e.g. to estimate the computational costs of the grid
+        points. This base method counts the observations in the localization
+        matrix of :py:meth:`localize_all`.
+
+        Parameters
+        ----------
+        state_grid : :py:class:`np.ndarray`
+            The observations are counted for every grid point in this state
+            grid. The first axis of this array has to be the grid point axis.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid points.
+
+        Returns
+        -------
+        n_obs : :py:class:`np.ndarray` (n_grid), dtype=int
+            The number of used observations for every grid point.
+        """
+        loc_matrix = self.localize_all(state_grid, obs_grid)
+        return np.diff(loc_matrix.indptr)
+
+    def get_obs_subset(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Union[None, np.ndarray]:
+        """
+        This method returns the indices of all observations, which could be
+        used for any of the given grid points, e.g. to send only these
+        observations to a worker that analyses these grid points.
+
+        Parameters
+        ----------
+        state_grid : :py:class:`np.ndarray`
+            The grid points, for which the observations are selected. The
+            first axis of this array has to be the grid point axis.
+        obs_grid : :py:class:`np.ndarray`
+            The observations are selected from this observation grid.
+
+        Returns
+        -------
+        obs_ind : :py:class:`np.ndarray` or None, dtype=int
+            The sorted indices of the selected observations. If None is
+            returned, all observations could be used. This base method always
+            returns None.
+        """
+        return None
+
+    @staticmethod
+    def _get_halo_subset(
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray,
+            cutoff: float,
+            to_coords: Union[None, Callable] = None
+    ) -> np.ndarray:
+        """
+        Returns the indices of all observations within the bounding box of
+        given state grid, extended by given cutoff radius as halo. This
+        halo is valid if the distance is the Euclidean distance between the
+        grid coordinates, optionally transformed by given function.
+        """
+        state_coords = SpatialIndex._transform(state_grid, to_coords)
+        obs_coords = SpatialIndex._transform(obs_grid, to_coords)
+        lower_bound = state_coords.min(axis=0) - cutoff
+        upper_bound = state_coords.max(axis=0) + cutoff
+        in_box = np.all(
+            (obs_coords >= lower_bound) & (obs_coords <= upper_bound), axis=1
+        )
+        return np.nonzero(in_box)[0]
+
+    def _get_coord_transform(self) -> Union[None, Callable]:
+        """
+        Returns the transformation of the grid into the coordinates of the
+        spatial index. If the distance function of this localization is a
+        :py:class:`~pytassim.localization.distance.BaseDistance`, its
+        :py:meth:`~pytassim.localization.distance.BaseDistance.to_coords` is
+        used, else the grid coordinates are not transformed.
+        """
+        dist_func = getattr(self, 'dist_func', None)
+        return getattr(dist_func, 'to_coords', None)
+
+    def _get_obs_index(self, obs_grid: np.ndarray) -> SpatialIndex:
+        """
+        Returns a spatial index for given observation grid. The index is
+        cached and only rebuilt if the observation grid changes.
+        """
+        if self._obs_index is None or not self._obs_index.fits(obs_grid):
+            logger.debug('Build new spatial index for observation grid')
+            self._obs_index = SpatialIndex(
+                obs_grid, to_coords=self._get_coord_transform()
+            )
+        return self._obs_index
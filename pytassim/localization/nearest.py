@@ -0,0 +1,308 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+# System modules
+import logging
+from typing import Any, Tuple, Union
+
+# External modules
+import numpy as np
+
+# Internal modules
+from .localization import BaseLocalization
+
+
+logger = logging.getLogger(__name__)
+
+
+class NearestLocalization(BaseLocalization):
+    """
+    This localization wraps a distance-based localization, e.g.
+    :py:class:`~pytassim.localization.gaspari_cohn.GaspariCohn`, and
+    restricts the used observations to at most `n_obs` observations per
+    grid point. The number of local observations and therefore the costs
+    and memory of a local analysis are bounded, also in regions with a
+    dense observation network.
+
+    The selected observations are either the nearest observations, found
+    with a KD-tree over the observation grid, or the observations with the
+    highest weights of the wrapped localization. The selected observations
+    are then tapered with the weights of the wrapped localization. The
+    KD-tree uses the Euclidean distance between the grid coordinates as in
+    :py:class:`~pytassim.localization.spatial_index.SpatialIndex`. If the
+    wrapped localization has its own spatial index, it is evaluated for the
+    whole observation grid, such that its cached index is reused and not
+    rebuilt for the selected observations.
+
+    Parameters
+    ----------
+    localization : child of \
+    :py:class:`~pytassim.localization.localization.BaseLocalization`
+        This localization is used to taper the selected observations. If it
+        has a `cutoff` attribute, only observations within this cutoff are
+        selected by the KD-tree.
+    n_obs : int
+        The maximum number of used observations per grid point.
+    by_weight : bool, optional
+        If the observations with the highest weights of the wrapped
+        localization are selected instead of the nearest observations. This
+        selection is independent of the coordinates, but the wrapped
+        localization is evaluated for all observations. Default is False.
+    """
+    def __init__(
+            self,
+            localization: BaseLocalization,
+            n_obs: int,
+            by_weight: bool = False
+    ):
+        if n_obs < 1:
+            raise ValueError('At least one observation has to be used!')
+        self.localization = localization
+        self.n_obs = n_obs
+        self.by_weight = by_weight
+
+    def __str__(self) -> str:
+        return 'NearestLocalization({0:s}, k={1:d})'.format(
+            str(self.localization), self.n_obs
+        )
+
+    def __repr__(self) -> str:
+        return 'Nearest{0:s}'.format(repr(self.localization))
+
+    @property
+    def cutoff(self) -> float:
+        """
+        The cutoff radius of the wrapped localization, infinity if it has
+        no cutoff.
+        """
+        return float(getattr(self.localization, 'cutoff', np.inf))
+
+    def _get_coord_transform(self):
+        return self.localization._get_coord_transform()
+
+    def localize_cov(self):
+        return self.localization.localize_cov()
+
+    @property
+    def _wrapped_index(self) -> bool:
+        """
+        If the wrapped localization uses its own spatial index.
+        """
+        return bool(getattr(self.localization, 'use_index', False))
+
+    def _keep_largest(
+            self,
+            use_obs: np.ndarray,
+            weights: np.ndarray
+    ) -> np.ndarray:
+        """
+        Keeps for every row at most `n_obs` used observations with the
+        highest weights. Observations with the same weight are kept in the
+        order of their index, as for a stable sort.
+        """
+        if use_obs.shape[-1] <= self.n_obs:
+            return use_obs
+        scores = np.where(use_obs, weights, -np.inf)
+        kth_ind = np.argpartition(-scores, self.n_obs-1, axis=-1)
+        kth_ind = kth_ind[..., self.n_obs-1:self.n_obs]
+        threshold = np.take_along_axis(scores, kth_ind, axis=-1)
+        above = scores > threshold
+        n_ties = self.n_obs - above.sum(axis=-1, keepdims=True)
+        ties = scores == threshold
+        ties &= np.cumsum(ties, axis=-1) <= n_ties
+        return use_obs & (above | ties)
+
+    def _select_by_weight(
+            self,
+            grid_ind: Any,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        use_obs, weights = self.localization.localize_obs(grid_ind, obs_grid)
+        used_ind = np.nonzero(use_obs)[0]
+        if len(used_ind) > self.n_obs:
+            sel_ind = np.argsort(-weights[used_ind], kind='stable')
+            use_obs = np.zeros_like(use_obs)
+            use_obs[used_ind[sel_ind[:self.n_obs]]] = True
+        return use_obs, np.where(use_obs, weights, 0.)
+
+    def _select_nearest(
+            self,
+            grid_ind: Any,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        obs_ind = self._get_obs_index(obs_grid).nearest(
+            [grid_ind], self.n_obs, self.cutoff
+        )[0]
+        obs_ind = np.sort(obs_ind[obs_ind >= 0])
+        use_obs = np.zeros(len(obs_grid), dtype=bool)
+        weights = np.zeros(len(obs_grid), dtype=float)
+        if self._wrapped_index:
+            sub_use, sub_weights = self.localization.localize_obs(
+                grid_ind, obs_grid
+            )
+            sub_use, sub_weights = sub_use[obs_ind], sub_weights[obs_ind]
+        else:
+            sub_use, sub_weights = self.localization.localize_obs(
+                grid_ind, obs_grid[obs_ind]
+            )
+        use_obs[obs_ind] = sub_use
+        weights[obs_ind] = sub_weights
+        return use_obs, weights
+
+    def localize_obs(
+            self,
+            grid_ind: Any,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method selects at most `n_obs` observations for given grid index
+        and weights them with the wrapped localization.
+
+        Parameters
+        ----------
+        grid_ind : any
+            This parameter indicates the current grid index.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid index.
+
+        Returns
+        -------
+        use_obs : :py:class:`np.ndarray`, dtype=bool
+            This is a boolean array indicating if the `i`-th observation should
+            be used. At most `n_obs` observations are used.
+        obs_weights : :py:class:`np.ndarray`, dtype=float
+            The estimated observation weights of the wrapped localization.
+            The weights of not selected observations are zero.
+        """
+        if self.by_weight:
+            return self._select_by_weight(grid_ind, obs_grid)
+        return self._select_nearest(grid_ind, obs_grid)
+
+    def localize_obs_batch(
+            self,
+            grid_points: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method selects at most `n_obs` observations for every given grid
+        point and weights them with the wrapped localization. The wrapped
+        localization is called only once for the whole block of grid points.
+        If the observations are selected by their weight, the highest weights
+        are selected per grid point with a partial sort. The nearest
+        observations are otherwise found with a single query of the KD-tree,
+        and the wrapped localization is evaluated for the union of these
+        observations. If the wrapped localization has its own spatial index,
+        it is evaluated for the whole observation grid to reuse its index.
+
+        Parameters
+        ----------
+        grid_points : :py:class:`np.ndarray`
+            The observation weights are estimated for these grid points. The
+            first axis of this array has to be the grid point axis.
+        obs_grid : :py:class:`np.ndarray`
+            This observation grid is used to estimate a spatial distance to
+            given grid points.
+
+        Returns
+        -------
+        use_obs : :py:class:`np.ndarray` (n_points, n_obs), dtype=bool
+            This is a boolean array indicating if the `j`-th observation should
+            be used for the `i`-th grid point. At most `n_obs` observations
+            are used per grid point.
+        obs_weights : :py:class:`np.ndarray` (n_points, n_obs), dtype=float
+            The estimated observation weights of the wrapped localization.
+            The weights of not selected observations are zero.
+        """
+        grid_points = np.asarray(grid_points)
+        if self.by_weight:
+            use_obs, weights = self.localization.localize_obs_batch(
+                grid_points, obs_grid
+            )
+            use_obs = self._keep_largest(use_obs, weights)
+            return use_obs, np.where(use_obs, weights, 0.)
+
+        use_obs = np.zeros((len(grid_points), len(obs_grid)), dtype=bool)
+        weights = np.zeros((len(grid_points), len(obs_grid)), dtype=float)
+        if len(grid_points) == 0:
+            return use_obs, weights
+        obs_ind = self._get_obs_index(obs_grid).nearest(
+            grid_points, self.n_obs, self.cutoff
+        )
+        point_ind, sel_ind = np.nonzero(obs_ind >= 0)
+        obs_ind = obs_ind[point_ind, sel_ind]
+        if self._wrapped_index:
+            sub_use, sub_weights = self.localization.localize_obs_batch(
+                grid_points, obs_grid
+            )
+            sub_ind = obs_ind
+        else:
+            union_ind, sub_ind = np.unique(obs_ind, return_inverse=True)
+            sub_use, sub_weights = self.localization.localize_obs_batch(
+                grid_points, obs_grid[union_ind]
+            )
+        use_obs[point_ind, obs_ind] = sub_use[point_ind, sub_ind]
+        weights[point_ind, obs_ind] = sub_weights[point_ind, sub_ind]
+        return use_obs, weights
+
+    def count_obs(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> np.ndarray:
+        """
+        The number of observations is limited by `n_obs`. If the nearest
+        observations are selected, the observations found by the KD-tree
+        within the cutoff radius are counted as upper bound, without
+        estimating the weights. If the observations are selected by their
+        weight, they are counted by the wrapped localization, which runs
+        :py:meth:`localize_all` for a localization without cheap count.
+        """
+        if self.by_weight:
+            n_obs = self.localization.count_obs(state_grid, obs_grid)
+        else:
+            obs_ind = self._get_obs_index(obs_grid).nearest(
+                state_grid, self.n_obs, self.cutoff
+            )
+            n_obs = np.count_nonzero(obs_ind >= 0, axis=1)
+        return np.minimum(n_obs, self.n_obs)
+
+    def get_obs_subset(
+            self,
+            state_grid: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> Union[None, np.ndarray]:
+        """
+        Returns the union of the nearest observations of all given grid
+        points. If the observations are selected by their weight, the
+        subset of the wrapped localization is returned.
+        """
+        if self.by_weight:
+            return self.localization.get_obs_subset(state_grid, obs_grid)
+        obs_ind = self._get_obs_index(obs_grid).nearest(
+            state_grid, self.n_obs, self.cutoff
+        )
+        return np.unique(obs_ind[obs_ind >= 0])
@@ -0,0 +1,182 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+# System modules
+import logging
+from typing import Tuple
+
+# External modules
+import numpy as np
+
+# Internal modules
+from .gaspari_cohn import GaspariCohn
+from .distance import BaseDistance, SeparatedDistance
+
+
+logger = logging.getLogger(__name__)
+
+
+def _get_unique_rows(
+        grid: np.ndarray,
+        coords: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns a representative grid point for every unique combination of
+    given coordinates, together with the position of every grid point in
+    these representatives.
+    """
+    _, first_ind, unique_inv = np.unique(
+        grid[:, coords], axis=0, return_index=True, return_inverse=True
+    )
+    return grid[first_ind], unique_inv.reshape(-1)
+
+
+class SeparableGaspariCohn(GaspariCohn):
+    """
+    This localization is a separable three-dimensional Gaspari-Cohn
+    localization :cite:`gaspari_construction_1999` with a horizontal and a
+    vertical taper. The weights are the product of both tapers, as in
+    :py:class:`~pytassim.localization.gaspari_cohn.GaspariCohn` with two
+    length scales and a
+    :py:class:`~pytassim.localization.distance.SeparatedDistance`.
+
+    For stacked grids, e.g. with `(rlat, rlon, vgrid)` as coordinates, many
+    grid points and observations share the same column or vertical level.
+    The horizontal taper is therefore only estimated once for every pair of
+    unique columns, and the vertical taper only once for every pair of unique
+    levels. Both precomputed taper tables are composed to the weights by a
+    lookup, such that the costs of the three-dimensional localization
+    approach the costs of the horizontal localization.
+
+    Parameters
+    ----------
+    length_scale : tuple(float, float)
+        The horizontal and vertical length scale :math:`c` in
+        :cite:`gaspari_construction_1999`. The weights are truncated to zero
+        by 2 * length_scale.
+    hori_dist : child of :py:class:`~pytassim.localization.distance.BaseDistance`
+        This distance is used as horizontal distance between the columns,
+        e.g. :py:class:`~pytassim.localization.distance.HaversineDistance`.
+        This distance should not depend on the vertical coordinate.
+    vert_dist : child of :py:class:`~pytassim.localization.distance.BaseDistance`
+        This distance is used as vertical distance between the levels,
+        e.g. :py:class:`~pytassim.localization.distance.LogPressureDistance`.
+        This distance should only depend on the vertical coordinate.
+    vert_coord : int, optional
+        The position of the vertical coordinate on the last axis of the
+        grids. All other coordinates are interpreted as horizontal
+        coordinates. Default is -1, the last coordinate.
+    epsilon : float, optional
+        Observations with a weight less or equal than this value are not used.
+        Default is 1E-5.
+    use_index : bool, optional
+        If a spatial index should be built for the observation grid, based
+        on the transformed coordinates of both distances. Default is False.
+    """
+    def __init__(
+            self,
+            length_scale: Tuple[float, float],
+            hori_dist: BaseDistance,
+            vert_dist: BaseDistance,
+            vert_coord: int = -1,
+            epsilon: float = 1E-5,
+            use_index: bool = False
+    ):
+        super().__init__(
+            length_scale=length_scale,
+            dist_func=SeparatedDistance([hori_dist, vert_dist]),
+            epsilon=epsilon, use_index=use_index
+        )
+        if len(self.radius) != 2:
+            raise ValueError(
+                'A horizontal and a vertical length scale has to be given, '
+                'got {0}'.format(self.radius)
+            )
+        self.vert_coord = vert_coord
+
+    def __str__(self) -> str:
+        return 'SeparableGaspariCohn(l={0})'.format(str(self.radius))
+
+    def __repr__(self) -> str:
+        return 'SeparableGaspariCohn'
+
+    @property
+    def hori_dist(self) -> BaseDistance:
+        return self.dist_func.distances[0]
+
+    @property
+    def vert_dist(self) -> BaseDistance:
+        return self.dist_func.distances[1]
+
+    def _split_coords(self, n_coords: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the positions of the horizontal and vertical coordinates.
+        """
+        all_coords = np.arange(n_coords)
+        vert_coords = all_coords[[self.vert_coord]]
+        hori_coords = np.setdiff1d(all_coords, vert_coords)
+        return hori_coords, vert_coords
+
+    def _get_table(
+            self,
+            dist_func: BaseDistance,
+            points: np.ndarray,
+            obs: np.ndarray,
+            radius: float
+    ) -> np.ndarray:
+        """
+        Estimates the taper table between all given representative grid
+        points and observations.
+        """
+        dist = dist_func(points[:, None], obs[None, :])
+        return self._taper(dist / radius)
+
+    def _get_weights(
+            self,
+            grid_points: np.ndarray,
+            obs_grid: np.ndarray
+    ) -> np.ndarray:
+        """
+        Estimates the weights for all given grid points and observations as
+        product of the looked-up horizontal and vertical taper.
+        """
+        grid_points = np.asarray(grid_points, dtype=float)
+        obs_grid = np.asarray(obs_grid, dtype=float)
+        hori_coords, vert_coords = self._split_coords(obs_grid.shape[-1])
+
+        point_cols, point_col_ind = _get_unique_rows(grid_points, hori_coords)
+        obs_cols, obs_col_ind = _get_unique_rows(obs_grid, hori_coords)
+        hori_table = self._get_table(self.hori_dist, point_cols, obs_cols,
+                                     self.radius[0])
+
+        point_levs, point_lev_ind = _get_unique_rows(grid_points, vert_coords)
+        obs_levs, obs_lev_ind = _get_unique_rows(obs_grid, vert_coords)
+        vert_table = self._get_table(self.vert_dist, point_levs, obs_levs,
+                                     self.radius[1])
+
+        weights = hori_table[np.ix_(point_col_ind, obs_col_ind)]
+        weights *= vert_table[np.ix_(point_lev_ind, obs_lev_ind)]
+        return weights
@@ -0,0 +1,276 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Created on 17.10.26
+#
+# Created for torch-assimilate
+#
+# @author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+#
+#    Copyright (C) {2026}  {Tobias Sebastian Finn}
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# System modules
+import logging
+from typing import Any, Callable, Tuple, Union
+
+# External modules
+import numpy as np
+import scipy.spatial
+
+# Internal modules
+
+
+logger = logging.getLogger(__name__)
+
+
+class SpatialIndex(object):
+    """
+    This spatial index is a KD-tree over a given grid, e.g. the observation
+    grid, and can be used to find all grid points within a given cutoff
+    radius without estimating the distance to every grid point. The distance
+    within this index is the Euclidean distance between the grid
+    coordinates, which can be transformed before, e.g. into the Cartesian
+    coordinates of a sphere with
+    :py:meth:`~pytassim.localization.distance.BaseDistance.to_coords`.
+
+    Parameters
+    ----------
+    grid : :py:class:`np.ndarray`
+        The index is built for this grid. The first axis of this grid is
+        the grid point axis, while all other axes are interpreted as
+        coordinates.
+    to_coords : callable or None, optional
+        If given, the indexed grid and all queried grid points are
+        transformed by this function into the coordinates of the index.
+        Default is None, indicating that the grid coordinates are used.
+    """
+    def __init__(
+            self,
+            grid: np.ndarray,
+            to_coords: Union[None, Callable] = None
+    ):
+        self.grid = grid
+        self.to_coords = to_coords
+        self._tree = scipy.spatial.cKDTree(self._get_coords(grid))
+
+    def __str__(self) -> str:
+        return 'SpatialIndex(n={0:d})'.format(self._tree.n)
+
+    def __repr__(self) -> str:
+        return 'SpatialIndex'
+
+    @staticmethod
+    def _to_coords(grid: Any) -> np.ndarray:
+        """
+        Converts given grid into a two-dimensional coordinate array with
+        grid points as first axis.
+        """
+        grid = np.asarray(grid, dtype=float)
+        if grid.ndim == 0:
+            grid = grid.reshape(1, 1)
+        return grid.reshape(grid.shape[0], -1)
+
+    @staticmethod
+    def _transform(
+            grid: Any,
+            to_coords: Union[None, Callable] = None
+    ) -> np.ndarray:
+        """
+        Transforms given grid with given function into the coordinates of
+        an index. A one-dimensional grid is interpreted as grid with a
+        single coordinate.
+        """
+        if to_coords is not None:
+            grid = np.asarray(grid, dtype=float)
+            if grid.ndim == 1:
+                grid = grid[:, None]
+            grid = to_coords(grid)
+        return SpatialIndex._to_coords(grid)
+
+    def _get_coords(self, grid: Any) -> np.ndarray:
+        """
+        Transforms given grid into the coordinates of this index.
+        """
+        return self._transform(grid, self.to_coords)
+
+    def fits(self, grid: np.ndarray) -> bool:
+        """
+        Checks if this index was built for given grid.
+        """
+        if grid is self.grid:
+            return True
+        grid = np.asarray(grid)
+        return grid.shape == np.shape(self.grid) and \
+            np.array_equal(grid, self.grid)
+
+    def query(self, grid_point: Any, radius: float) -> np.ndarray:
+        """
+        Returns the sorted indices of all indexed grid points within given
+        radius around given grid point.
+
+        Parameters
+        ----------
+        grid_point : any
+            The indexed grid points are searched around this grid point. The
+            size of this grid point has to match the number of coordinates of
+            the indexed grid.
+        radius : float
+            All indexed grid points with a Euclidean distance less or equal
+            than this radius are returned.
+
+        Returns
+        -------
+        grid_ind : :py:class:`np.ndarray`, dtype=int
+            The sorted indices of the found grid points.
+        """
+        point_coords = np.atleast_1d(np.asarray(grid_point, dtype=float))
+        if self.to_coords is not None:
+            point_coords = self.to_coords(point_coords)
+        point_coords = np.asarray(point_coords, dtype=float).reshape(-1)
+        grid_ind = self._tree.query_ball_point(point_coords, r=radius)
+        grid_ind = np.sort(np.asarray(grid_ind, dtype=int))
+        return grid_ind
+
+    def count(self, grid: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Returns the number of indexed grid points within given radius around
+        every point of given grid.
+
+        Parameters
+        ----------
+        grid : :py:class:`np.ndarray`
+            The indexed grid points are counted around the points of this
+            grid. The first axis of this grid is the grid point axis.
+        radius : float
+            All indexed grid points with a Euclidean distance less or equal
+            than this radius are counted.
+
+        Returns
+        -------
+        n_points : :py:class:`np.ndarray`, dtype=int
+            The number of found grid points for every point of given grid.
+        """
+        grid_coords = self._get_coords(grid)
+        n_points = self._tree.query_ball_point(
+            grid_coords, r=radius, return_length=True
+        )
+        return np.asarray(n_points, dtype=int)
+
+    def nearest(
+            self,
+            grid: np.ndarray,
+            n_points: int,
+            radius: float = np.inf
+    ) -> np.ndarray:
+        """
+        Returns the indices of the nearest indexed grid points for every
+        point of given grid.
+
+        Parameters
+        ----------
+        grid : :py:class:`np.ndarray`
+            The nearest indexed grid points are searched for every point of
+            this grid. The first axis of this grid is the grid point axis.
+        n_points : int
+            The maximum number of returned indexed grid points per point.
+        radius : float, optional
+            Only indexed grid points with a Euclidean distance less or equal
+            than this radius are returned. Default is infinity.
+
+        Returns
+        -------
+        grid_ind : :py:class:`np.ndarray` (n_grid, n_points), dtype=int
+            The indices of the nearest indexed grid points, sorted by their
+            distance. If less than `n_points` indexed grid points are found,
+            the remaining indices are set to -1.
+        """
+        grid_coords = self._get_coords(grid)
+        n_points = int(min(n_points, self._tree.n))
+        if n_points < 1:
+            return np.zeros((len(grid_coords), 0), dtype=int)
+        _, grid_ind = self._tree.query(
+            grid_coords, k=n_points, distance_upper_bound=np.nextafter(
+                radius, np.inf
+            )
+        )
+        grid_ind = np.asarray(grid_ind, dtype=int).reshape(len(grid_coords),
+                                                           n_points)
+        grid_ind[grid_ind >= self._tree.n] = -1
+        return grid_ind
+
+    def query_union(self, grid: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Returns the sorted indices of all indexed grid points within given
+        radius around any point of given grid.
+
+        Parameters
+        ----------
+        grid : :py:class:`np.ndarray`
+            The indexed grid points are searched around the points of this
+            grid. The first axis of this grid is the grid point axis.
+        radius : float
+            All indexed grid points with a Euclidean distance less or equal
+            than this radius are returned.
+
+        Returns
+        -------
+        grid_ind : :py:class:`np.ndarray`, dtype=int
+            The sorted and unique indices of the found grid points.
+        """
+        grid_coords = self._get_coords(grid)
+        found_ind = self._tree.query_ball_point(grid_coords, r=radius)
+        grid_ind = np.concatenate(
+            [np.asarray(ind, dtype=int) for ind in found_ind]
+            + [np.zeros(0, dtype=int)]
+        )
+        return np.unique(grid_ind)
+
+    def query_pairs(
+            self,
+            grid: np.ndarray,
+            radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns all pairs of points of given grid and indexed grid points,
+        which are within given radius.
+
+        Parameters
+        ----------
+        grid : :py:class:`np.ndarray`
+            The indexed grid points are searched around the points of this
+            grid. The first axis of this grid is the grid point axis.
+        radius : float
+            All indexed grid points with a Euclidean distance less or equal
+            than this radius are returned.
+
+        Returns
+        -------
+        point_ind : :py:class:`np.ndarray`, dtype=int
+            The index of the point of given grid for every found pair. The
+            pairs are sorted by these indices.
+        grid_ind : :py:class:`np.ndarray`, dtype=int
+            The index of the indexed grid point for every found pair.
+        """
+        grid_coords = self._get_coords(grid)
+        found_ind = self._tree.query_ball_point(grid_coords, r=radius)
+        n_found = [len(ind) for ind in found_ind]
+        point_ind = np.repeat(np.arange(len(found_ind)), n_found)
+        grid_ind = np.concatenate(
+            [np.asarray(ind, dtype=int) for ind in found_ind]
+            + [np.zeros(0, dtype=int)]
+        )
+        return point_ind, grid_ind
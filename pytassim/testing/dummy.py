@@ -31,6 +31,7 @@ import numpy as np
 import torch
 
 # Internal modules
+from pytassim.localization.localization import BaseLocalization
 
 
 logger = logging.getLogger(__name__)
@@ -126,7 +127,7 @@ def dummy_model(state):
     return derivative
 
 
-class DummyLocalization(object):
+class DummyLocalization(BaseLocalization):
     """
     This localization selects only grid points where `grid_ind` and `obs_grid`
     are the same.
@@ -0,0 +1,114 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# System modules
+import unittest
+import logging
+from unittest.mock import patch
+
+# External modules
+import numpy as np
+import scipy.linalg
+import torch
+
+# Internal modules
+from pytassim.assimilation.covariance import BlockDiagonalMatrix
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+def _create_cov(size: int) -> np.ndarray:
+    perts = np.random.normal(size=(size*10, size))
+    return perts.T @ perts / (size*10-1)
+
+
+class TestBlockDiagonalMatrix(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(42)
+        self.cov_1 = _create_cov(3)
+        self.cov_2 = _create_cov(5)
+        self.blocks = [self.cov_1, self.cov_1, self.cov_2]
+        self.matrix = BlockDiagonalMatrix(self.blocks)
+        self.dense = scipy.linalg.block_diag(*self.blocks)
+
+    def test_shape_returns_dense_shape(self):
+        self.assertListEqual(self.matrix.sizes, [3, 3, 5])
+        self.assertTupleEqual(self.matrix.shape, (11, 11))
+
+    def test_array_returns_dense_matrix(self):
+        np.testing.assert_equal(np.asarray(self.matrix), self.dense)
+        torch_matrix = self.matrix.to_torch(torch.float64)
+        torch.testing.assert_allclose(torch_matrix.to_dense(),
+                                      torch.from_numpy(self.dense))
+        np.testing.assert_equal(np.asarray(torch_matrix), self.dense)
+
+    def test_to_torch_keeps_repeated_blocks(self):
+        torch_matrix = self.matrix.to_torch(torch.float32)
+        self.assertTrue(all(isinstance(block, torch.Tensor)
+                            for block in torch_matrix.blocks))
+        self.assertEqual(torch_matrix.blocks[0].dtype, torch.float32)
+        self.assertIs(torch_matrix.blocks[0], torch_matrix.blocks[1])
+        self.assertIsNot(torch_matrix.blocks[0], torch_matrix.blocks[2])
+
+    def test_cholesky_returns_blockwise_cholesky(self):
+        chol_matrix = self.matrix.to_torch().cholesky()
+        right_chol = np.linalg.cholesky(self.dense)
+        np.testing.assert_allclose(np.asarray(chol_matrix), right_chol)
+
+    def test_cholesky_decomposes_repeated_block_once(self):
+        torch_matrix = self.matrix.to_torch()
+        with patch('torch.linalg.cholesky',
+                   side_effect=torch.linalg.cholesky) as chol_patch:
+            chol_matrix = torch_matrix.cholesky()
+        self.assertEqual(chol_patch.call_count, 2)
+        self.assertIs(chol_matrix.blocks[0], chol_matrix.blocks[1])
+
+    def test_solve_triangular_multiplies_with_dense_inverse(self):
+        chol_matrix = self.matrix.to_torch().cholesky()
+        state = torch.randn(10, 11, dtype=torch.float64)
+        right_cinv = np.linalg.inv(np.linalg.cholesky(self.dense))
+        ret_state = chol_matrix.solve_triangular(state)
+        np.testing.assert_allclose(ret_state.numpy(),
+                                   state.numpy() @ right_cinv)
+
+    def test_solve_triangular_supports_batch_dimensions(self):
+        chol_matrix = self.matrix.to_torch().cholesky()
+        state = torch.randn(2, 10, 11, dtype=torch.float64)
+        ret_state = chol_matrix.solve_triangular(state)
+        for k, single_state in enumerate(state):
+            torch.testing.assert_allclose(
+                ret_state[k], chol_matrix.solve_triangular(single_state)
+            )
+
+    def test_empty_matrix_returns_state(self):
+        matrix = BlockDiagonalMatrix([]).to_torch().cholesky()
+        self.assertTupleEqual(matrix.shape, (0, 0))
+        state = torch.ones(10, 0)
+        torch.testing.assert_allclose(matrix.solve_triangular(state), state)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,271 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+import os
+from unittest.mock import patch
+
+# External modules
+import xarray as xr
+import torch
+import numpy as np
+
+# Internal modules
+from pytassim.assimilation.filter.decomposition_cache import \
+    DecompositionCache, decomposition_cache
+from pytassim.assimilation.filter.etkf_core import ETKFWeightsModule, \
+    ETKFAnalyser
+from pytassim.assimilation.filter.ketkf_core import KETKFWeightsModule
+from pytassim.assimilation.filter.letkf_core import LETKFAnalyser
+from pytassim.kernels import RBFKernel
+from pytassim.testing import dummy_obs_operator, DummyLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DATA_PATH = os.path.join(os.path.dirname(BASE_PATH), 'data')
+
+
+class TestDecompositionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = DecompositionCache(max_items=4)
+        torch.manual_seed(42)
+        self.normed_perts = torch.randn(3, 10, 5, dtype=torch.float64)
+        self.normed_obs = torch.randn(3, 1, 5, dtype=torch.float64)
+
+    def test_default_cache_is_inactive(self):
+        self.assertFalse(DecompositionCache().active)
+        self.assertFalse(decomposition_cache.active)
+        self.assertTrue(self.cache.active)
+
+    def test_get_weights_returns_module_weights(self):
+        for solver in ('evd', 'svd', 'obs'):
+            module = ETKFWeightsModule(1.2, solver=solver)
+            right_weights = module(self.normed_perts, self.normed_obs)
+            for _ in range(2):
+                ret_weights = self.cache.get_weights(
+                    module, self.normed_perts, self.normed_obs
+                )
+                for ret, right in zip(ret_weights, right_weights):
+                    np.testing.assert_allclose(ret.numpy(), right.numpy())
+        self.assertEqual(self.cache.misses, 3)
+        self.assertEqual(self.cache.hits, 3)
+
+    def test_decomposition_reused_for_other_inf_factor(self):
+        _ = self.cache.get_weights(ETKFWeightsModule(1.0), self.normed_perts,
+                                   self.normed_obs)
+        module = ETKFWeightsModule(1.3)
+        with patch.object(module, 'decompose',
+                          side_effect=module.decompose) as decompose_patch:
+            ret_weights = self.cache.get_weights(
+                module, self.normed_perts, self.normed_obs
+            )
+        decompose_patch.assert_not_called()
+        self.assertEqual(self.cache.hits, 1)
+        right_weights = module(self.normed_perts, self.normed_obs)
+        for ret, right in zip(ret_weights, right_weights):
+            np.testing.assert_allclose(ret.numpy(), right.numpy())
+
+    def test_key_depends_on_data_and_config(self):
+        module = ETKFWeightsModule(1.0)
+        key = self.cache.get_key(module, self.normed_perts, self.normed_obs,
+                                 'obs')
+        self.assertEqual(
+            key, self.cache.get_key(ETKFWeightsModule(1.5),
+                                    self.normed_perts.clone(),
+                                    self.normed_obs.clone(), 'obs')
+        )
+        self.assertNotEqual(
+            key, self.cache.get_key(module, self.normed_perts,
+                                    self.normed_obs, 'evd')
+        )
+        self.assertNotEqual(
+            key, self.cache.get_key(module, self.normed_perts+1,
+                                    self.normed_obs, 'obs')
+        )
+        self.assertNotEqual(
+            key, self.cache.get_key(module, self.normed_perts.float(),
+                                    self.normed_obs.float(), 'obs')
+        )
+        self.assertNotEqual(
+            key, self.cache.get_key(ETKFWeightsModule(1.0, solver='svd'),
+                                    self.normed_perts, self.normed_obs, 'obs')
+        )
+
+    def test_key_depends_on_kernel(self):
+        key = self.cache.get_key(
+            KETKFWeightsModule(RBFKernel()), self.normed_perts,
+            self.normed_obs, 'evd'
+        )
+        self.assertNotEqual(
+            key, self.cache.get_key(
+                KETKFWeightsModule(RBFKernel(gamma=torch.tensor(2.))),
+                self.normed_perts, self.normed_obs, 'evd'
+            )
+        )
+
+    def test_kernel_weights_are_cached(self):
+        module = KETKFWeightsModule(RBFKernel(), inf_factor=1.2)
+        normed_perts = self.normed_perts[0]
+        normed_obs = self.normed_obs[0]
+        right_weights = module(normed_perts, normed_obs)
+        _ = self.cache.get_weights(module, normed_perts, normed_obs)
+        ret_weights = self.cache.get_weights(module, normed_perts, normed_obs)
+        self.assertEqual(self.cache.hits, 1)
+        for ret, right in zip(ret_weights, right_weights):
+            np.testing.assert_allclose(ret.numpy(), right.numpy())
+
+    def test_not_cacheable_with_gradients(self):
+        inf_factor = torch.tensor(1.2, dtype=torch.float64, requires_grad=True)
+        module = ETKFWeightsModule(inf_factor)
+        self.assertTrue(self.cache.is_cacheable(
+            module, self.normed_perts, self.normed_obs
+        ))
+        self.assertFalse(self.cache.is_cacheable(
+            module, self.normed_perts.requires_grad_(), self.normed_obs
+        ))
+        kernel_module = KETKFWeightsModule(
+            RBFKernel(gamma=torch.tensor(1., requires_grad=True))
+        )
+        self.assertFalse(self.cache.is_cacheable(
+            kernel_module, self.normed_perts.detach(), self.normed_obs
+        ))
+        _ = self.cache.get_weights(module, self.normed_perts,
+                                   self.normed_obs)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_inf_factor_gradient_with_cached_decomposition(self):
+        _ = self.cache.get_weights(ETKFWeightsModule(1.0), self.normed_perts,
+                                   self.normed_obs)
+        inf_factor = torch.tensor(1.2, dtype=torch.float64, requires_grad=True)
+        module = ETKFWeightsModule(inf_factor)
+        self.cache.get_weights(
+            module, self.normed_perts, self.normed_obs
+        )[0].sum().backward()
+        self.assertEqual(self.cache.hits, 1)
+        ret_grad = inf_factor.grad.clone()
+        inf_factor.grad = None
+        module(self.normed_perts, self.normed_obs)[0].sum().backward()
+        torch.testing.assert_allclose(ret_grad, inf_factor.grad)
+
+    def test_prior_weights_are_not_cached(self):
+        module = ETKFWeightsModule(1.2)
+        normed_perts = torch.ones(3, 10, 0)
+        normed_obs = torch.ones(3, 1, 0)
+        ret_weights = self.cache.get_weights(module, normed_perts, normed_obs)
+        torch.testing.assert_allclose(
+            ret_weights[0], module(normed_perts, normed_obs)[0]
+        )
+        self.assertEqual(len(self.cache), 0)
+
+    def test_raises_valueerror_if_different_sizes(self):
+        with self.assertRaises(ValueError):
+            _ = self.cache.get_weights(
+                ETKFWeightsModule(), self.normed_perts, self.normed_obs[..., 1:]
+            )
+
+    def test_removes_least_recently_used(self):
+        module = ETKFWeightsModule(1.2)
+        for k in range(5):
+            _ = self.cache.get_weights(module, self.normed_perts+k,
+                                       self.normed_obs)
+        self.assertEqual(len(self.cache), 4)
+        _ = self.cache.get_weights(module, self.normed_perts, self.normed_obs)
+        self.assertEqual(self.cache.hits, 0)
+        _ = self.cache.get_weights(module, self.normed_perts+4,
+                                   self.normed_obs)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_clear_removes_decompositions(self):
+        _ = self.cache.get_weights(ETKFWeightsModule(1.2), self.normed_perts,
+                                   self.normed_obs)
+        self.assertEqual(len(self.cache), 1)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.misses, 0)
+
+
+class TestAnalyserDecompositionCache(unittest.TestCase):
+    def setUp(self):
+        state_path = os.path.join(DATA_PATH, 'test_state.nc')
+        state = xr.open_dataarray(state_path).load().isel(time=0)
+        obs_path = os.path.join(DATA_PATH, 'test_single_obs.nc')
+        obs = xr.open_dataset(obs_path).load().isel(time=0)
+        obs.obs.operator = dummy_obs_operator
+        pseudo_state = obs.obs.operator(obs, state)
+        self.state_perts = torch.from_numpy(
+            (state-state.mean('ensemble')).values
+        ).float()
+        self.normed_perts = torch.from_numpy(
+            (pseudo_state - pseudo_state.mean('ensemble')).values
+        ).float().view(-1, 40)
+        self.normed_obs = torch.from_numpy(
+            (obs['observations'] - pseudo_state.mean('ensemble')).values
+        ).float().view(1, 40)
+        self.obs_grid = obs['obs_grid_1'].values.reshape(-1, 1)
+        self.state_grid = state.grid.values.reshape(-1, 1)
+        decomposition_cache.clear()
+        decomposition_cache.max_items = 16
+
+    def tearDown(self):
+        decomposition_cache.clear()
+        decomposition_cache.max_items = 0
+
+    def _get_analysis_perts(self, analyser):
+        return analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+
+    def test_letkf_analyser_reuses_decompositions(self):
+        analyser = LETKFAnalyser(localization=DummyLocalization(),
+                                 inf_factor=1.0, batch_size=10)
+        _ = self._get_analysis_perts(analyser)
+        self.assertEqual(decomposition_cache.misses, 4)
+        self.assertEqual(decomposition_cache.hits, 0)
+        analyser.inf_factor = 1.2
+        ret_perts = self._get_analysis_perts(analyser)
+        self.assertEqual(decomposition_cache.misses, 4)
+        self.assertEqual(decomposition_cache.hits, 4)
+        decomposition_cache.max_items = 0
+        right_perts = self._get_analysis_perts(analyser)
+        torch.testing.assert_allclose(ret_perts, right_perts)
+
+    def test_etkf_analyser_reuses_decompositions(self):
+        analyser = ETKFAnalyser(inf_factor=1.0)
+        _ = self._get_analysis_perts(analyser)
+        analyser.inf_factor = 1.2
+        ret_perts = self._get_analysis_perts(analyser)
+        self.assertEqual(decomposition_cache.misses, 1)
+        self.assertEqual(decomposition_cache.hits, 1)
+        decomposition_cache.max_items = 0
+        right_perts = self._get_analysis_perts(analyser)
+        torch.testing.assert_allclose(ret_perts, right_perts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,6 +45,7 @@ import scipy.linalg.blas
 # Internal modules
 import pytassim.state
 import pytassim.observation
+from pytassim.assimilation.covariance import BlockDiagonalMatrix
 from pytassim.assimilation.filter.etkf import ETKFCorr, ETKFUncorr
 from pytassim.testing import dummy_obs_operator, if_gpu_decorator
 
@@ -204,7 +205,8 @@ class TestETKFCorr(unittest.TestCase):
         returned_state = self.algorithm._get_states(self.state, obs_tuple)
         np.testing.assert_equal(returned_state[0], prepared_state)
         np.testing.assert_equal(returned_state[1], prepared_obs[0])
-        np.testing.assert_equal(returned_state[2], obs_cov)
+        np.testing.assert_equal(np.asarray(returned_state[2]),
+                                np.asarray(obs_cov))
         np.testing.assert_equal(returned_state[3], prepared_obs[1])
 
     def test_update_calls_prepare_with_pseudo_state(self):
@@ -232,8 +234,13 @@ class TestETKFCorr(unittest.TestCase):
         prepared_states = self.algorithm._get_states(self.state, obs_tuple)
         ret_states = self.algorithm._states_to_torch(*prepared_states)
         for k, state in enumerate(ret_states):
-            self.assertIsInstance(state, torch.Tensor)
-            np.testing.assert_array_equal(state.numpy(), prepared_states[k])
+            if k == 2:
+                self.assertIsInstance(state, BlockDiagonalMatrix)
+                self.assertIsInstance(state.blocks[0], torch.Tensor)
+            else:
+                self.assertIsInstance(state, torch.Tensor)
+            np.testing.assert_array_equal(np.asarray(state),
+                                          np.asarray(prepared_states[k]))
 
     @if_gpu_decorator
     def test_transfer_states_transfers_to_gpus(self):
@@ -255,6 +262,24 @@ class TestETKFCorr(unittest.TestCase):
         ret_cinv = self.algorithm._get_chol_inverse(cov)
         np.testing.assert_almost_equal(ret_cinv, right_cinv)
 
+    def test_block_cinv_normalises_as_dense_cinv(self):
+        obs_tuple = (self.obs, self.obs.copy())
+        pseudo_obs, obs_state, obs_cov, _ = self.algorithm._get_states(
+            self.state, obs_tuple
+        )
+        pseudo_obs, obs_state, obs_cov = self.algorithm._states_to_torch(
+            pseudo_obs, obs_state, obs_cov
+        )
+        block_cinv = self.algorithm._get_chol_inverse(obs_cov)
+        self.assertIsInstance(block_cinv, BlockDiagonalMatrix)
+        dense_cinv = self.algorithm._get_chol_inverse(obs_cov.to_dense())
+        ret_normed = self.algorithm._normalise_obs(pseudo_obs, obs_state,
+                                                   block_cinv)
+        right_normed = self.algorithm._normalise_obs(pseudo_obs, obs_state,
+                                                     dense_cinv)
+        for ret, right in zip(ret_normed, right_normed):
+            torch.testing.assert_allclose(ret, right)
+
     def test_uses_get_obs_cinv(self):
         ana_time = self.state.time[-1].values
         obs_tuple = (self.obs, self.obs.copy())
@@ -375,6 +400,37 @@ class TestETKFCorr(unittest.TestCase):
                                               None, ana_time)
         xr.testing.assert_identical(with_time, no_time)
 
+    def test_sweep_equals_single_assimilations(self):
+        obs_tuple = (self.obs, self.obs.copy())
+        analysis = self.algorithm.sweep(self.state, obs_tuple,
+                                        inf_factors=[0.5, 1.25])
+        self.assertTupleEqual(analysis.dims[:1], ('config', ))
+        np.testing.assert_equal(analysis['inf_factor'].values, [0.5, 1.25])
+        self.assertNotIn('localization', analysis.coords)
+        for k, inf_factor in enumerate([0.5, 1.25]):
+            self.algorithm.inf_factor = inf_factor
+            right_analysis = self.algorithm.assimilate(self.state, obs_tuple)
+            xr.testing.assert_allclose(
+                analysis.isel(config=k, drop=True), right_analysis
+            )
+
+    def test_sweep_restores_analyser(self):
+        analyser = self.algorithm.analyser
+        _ = self.algorithm.sweep(self.state, self.obs, inf_factors=[0.5, 1.])
+        self.assertEqual(id(self.algorithm.analyser), id(analyser))
+
+    def test_sweep_raises_valueerror_for_localizations(self):
+        with self.assertRaises(ValueError):
+            _ = self.algorithm.sweep(self.state, self.obs, inf_factors=[1.],
+                                     localizations=[None])
+
+    def test_sweep_applies_post_transform_for_every_config(self):
+        trans = MagicMock()
+        trans.post.side_effect = lambda analysis, *args: analysis
+        self.algorithm.post_transform = [trans]
+        _ = self.algorithm.sweep(self.state, self.obs, inf_factors=[0.5, 1.])
+        self.assertEqual(trans.post.call_count, 2)
+
 
 class TestETKFUncorr(unittest.TestCase):
     def setUp(self):
@@ -35,7 +35,9 @@ import xarray as xr
 # Internal modules
 from pytassim.assimilation.filter.etkf_core import ETKFWeightsModule, \
     ETKFAnalyser
-from pytassim.assimilation.utils import evd, rev_evd
+from pytassim.assimilation.utils import evd, rev_evd, evd_weights, \
+    svd_decomposition, svd_weights, obs_space_decomposition, \
+    obs_space_weights
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -165,6 +167,35 @@ class TestETKFModule(unittest.TestCase):
         ret_rev = rev_evd(evals, evects)
         torch.testing.assert_allclose(ret_rev, right_rev)
 
+    def test_evd_weights_equals_rev_evd(self):
+        normed_perts = torch.ones(5, 10, 20).normal_()
+        normed_obs = torch.ones(5, 1, 20).normal_()
+        k_perts = torch.einsum('...ij,...kj->...ik', normed_perts,
+                               normed_perts)
+        k_obs = torch.einsum('...ij,...kj->...ik', normed_perts, normed_obs)
+        evals, evects, evals_inv = evd(k_perts, 9.)
+        right_cov = rev_evd(evals_inv, evects)
+        right_mean = right_cov @ k_obs
+        right_perts = rev_evd((9 * evals_inv).sqrt(), evects)
+
+        w_mean, w_perts, cov_analysed = evd_weights(evals_inv, evects, k_obs,
+                                                    10)
+        torch.testing.assert_allclose(cov_analysed, right_cov)
+        torch.testing.assert_allclose(w_mean, right_mean)
+        torch.testing.assert_allclose(w_perts, right_perts)
+
+    def test_prior_weights_are_inflated_identity(self):
+        self.module.inf_factor = 1.2
+        normed_perts = torch.ones(5, 10, 0)
+        prior_mean, prior_perts, prior_cov = self.module._get_prior_weights(
+            normed_perts, torch.ones(5, 1, 0)
+        )
+        eye = torch.eye(10).expand(5, 10, 10)
+        torch.testing.assert_allclose(prior_mean, torch.zeros(5, 10, 1))
+        torch.testing.assert_allclose(prior_perts,
+                                      torch.tensor(1.2).sqrt() * eye)
+        torch.testing.assert_allclose(prior_cov, 1.2 / 9 * eye)
+
     def test_right_w_eigendecomposition(self):
         ret_prec = self.normed_perts @ self.normed_perts.t()
         evals, evects = np.linalg.eigh(ret_prec)
@@ -289,6 +320,115 @@ class TestETKFModule(unittest.TestCase):
         torch.testing.assert_allclose(ret_weights[2], prior_perts)
         torch.testing.assert_allclose(ret_weights[3], prior_cov)
 
+    def test_solver_raises_valueerror_if_not_available(self):
+        with self.assertRaises(ValueError):
+            self.module.solver = 'cholesky'
+        with self.assertRaises(ValueError):
+            _ = ETKFWeightsModule(solver='test')
+        self.assertEqual(self.module.solver, 'auto')
+
+    def test_get_solver_selects_solver_by_shapes(self):
+        self.assertEqual(self.module.get_solver(10, 0), 'prior')
+        self.assertEqual(self.module.get_solver(10, 3), 'obs')
+        self.assertEqual(self.module.get_solver(10, 10), 'evd')
+        self.assertEqual(self.module.get_solver(10, 30), 'evd')
+        self.module.solver = 'svd'
+        self.assertEqual(self.module.get_solver(10, 3), 'svd')
+        self.assertEqual(self.module.get_solver(10, 30), 'svd')
+        self.assertEqual(self.module.get_solver(10, 0), 'prior')
+
+    def test_low_rank_weights_equal_evd_weights(self):
+        torch.manual_seed(42)
+        reg_value = torch.tensor(9. / 1.2, dtype=torch.float64)
+        for n_obs in (1, 4, 10, 20):
+            normed_perts = torch.randn(5, 10, n_obs, dtype=torch.float64)
+            normed_perts -= normed_perts.mean(dim=-2, keepdim=True)
+            normed_obs = torch.randn(5, 1, n_obs, dtype=torch.float64)
+            k_perts = normed_perts @ normed_perts.transpose(-1, -2)
+            k_obs = normed_perts @ normed_obs.transpose(-1, -2)
+            _, evects, evals_inv = evd(k_perts, reg_value)
+            right_weights = evd_weights(evals_inv, evects, k_obs, 10)
+            for decomp_func, weights_func in (
+                    (svd_decomposition, svd_weights),
+                    (obs_space_decomposition, obs_space_weights)
+            ):
+                decomposition = decomp_func(normed_perts, normed_obs)
+                ret_weights = weights_func(*decomposition, reg_value, 10)
+                for ret, right in zip(ret_weights, right_weights):
+                    np.testing.assert_allclose(ret.numpy(), right.numpy(),
+                                               rtol=1E-10, atol=1E-10)
+
+    def test_solvers_return_same_weights(self):
+        torch.manual_seed(42)
+        normed_perts = torch.randn(5, 10, 4, dtype=torch.float64)
+        normed_obs = torch.randn(5, 1, 4, dtype=torch.float64)
+        inf_factor = torch.tensor(1.2, dtype=torch.float64)
+        right_weights = ETKFWeightsModule(inf_factor, solver='evd')(
+            normed_perts, normed_obs
+        )
+        for solver in ('auto', 'svd', 'obs'):
+            ret_weights = ETKFWeightsModule(inf_factor, solver=solver)(
+                normed_perts, normed_obs
+            )
+            for ret, right in zip(ret_weights, right_weights):
+                np.testing.assert_allclose(ret.numpy(), right.numpy(),
+                                           rtol=1E-10, atol=1E-10)
+
+    def test_compose_decomposition_returns_weights(self):
+        torch.manual_seed(42)
+        normed_perts = torch.randn(5, 10, 4, dtype=torch.float64)
+        normed_obs = torch.randn(5, 1, 4, dtype=torch.float64)
+        self.module.inf_factor = torch.tensor(1.2, dtype=torch.float64)
+        for solver in ('evd', 'svd', 'obs'):
+            decomposition = self.module.decompose(normed_perts, normed_obs,
+                                                  solver)
+            ret_weights = self.module.compose(*decomposition, solver)
+            self.module.solver = solver
+            right_weights = self.module(normed_perts, normed_obs)[1:]
+            for ret, right in zip(ret_weights, right_weights):
+                torch.testing.assert_allclose(ret, right)
+
+    def test_inf_factor_vector_adds_config_dimension(self):
+        torch.manual_seed(42)
+        normed_perts = torch.randn(5, 10, 4, dtype=torch.float64)
+        normed_obs = torch.randn(5, 1, 4, dtype=torch.float64)
+        inf_factors = torch.tensor([0.5, 1.2], dtype=torch.float64)
+        for solver in ('evd', 'svd', 'obs'):
+            ret_weights = ETKFWeightsModule(inf_factors, solver=solver)(
+                normed_perts, normed_obs
+            )
+            self.assertTupleEqual(ret_weights[0].shape, (2, 5, 10, 10))
+            for k, inf_factor in enumerate(inf_factors):
+                right_weights = ETKFWeightsModule(inf_factor, solver=solver)(
+                    normed_perts, normed_obs
+                )
+                for ret, right in zip(ret_weights, right_weights):
+                    np.testing.assert_allclose(ret[k].numpy(), right.numpy(),
+                                               rtol=1E-10, atol=1E-10)
+
+    def test_inf_factor_vector_adds_config_dimension_to_prior(self):
+        normed_perts = torch.ones(2, 10, 0)
+        normed_obs = torch.ones(2, 1, 0)
+        self.module.inf_factor = torch.tensor([0.5, 1.25])
+        ret_weights = self.module(normed_perts, normed_obs)
+        self.assertTupleEqual(ret_weights[0].shape, (2, 2, 10, 10))
+        torch.testing.assert_allclose(
+            ret_weights[3][1], 1.25 / 9 * torch.eye(10).expand(2, 10, 10)
+        )
+
+    def test_obs_solver_is_differentiable(self):
+        torch.manual_seed(42)
+        normed_perts = torch.randn(10, 3, dtype=torch.float64)
+        normed_obs = torch.randn(1, 3, dtype=torch.float64)
+        grads = []
+        for solver in ('evd', 'obs'):
+            inf_factor = torch.tensor(1.2, dtype=torch.float64,
+                                      requires_grad=True)
+            module = ETKFWeightsModule(inf_factor, solver=solver)
+            module(normed_perts, normed_obs)[0].sum().backward()
+            grads.append(inf_factor.grad.item())
+        self.assertAlmostEqual(grads[0], grads[1])
+
     def test_raises_valueerror_if_different_observation_size(self):
         normed_perts = torch.ones(10, 4)
         normed_obs = torch.ones(1, 3)
@@ -71,6 +71,10 @@ class TestKETKFWeightsModule(unittest.TestCase):
         self.module = KETKFWeightsModule(kernel=kernels.LinearKernel(),
                                          inf_factor=1.0)
 
+    def test_uses_evd_solver(self):
+        self.assertEqual(self.module.solver, 'evd')
+        self.assertEqual(self.module.get_solver(10, 3), 'evd')
+
     def test_kernel_is_added_as_module(self):
         new_kernel = kernels.LinearKernel()
         self.module = KETKFWeightsModule(kernel=new_kernel)
@@ -34,7 +34,9 @@ import numpy as np
 # Internal modules
 from pytassim.assimilation.filter.etkf import ETKFCorr
 from pytassim.assimilation.filter.letkf import LETKFCorr, LETKFUncorr
-from pytassim.testing import dummy_obs_operator
+from pytassim.assimilation.filter.weight_mapping import WeightInterpolation
+from pytassim.localization import GaspariCohn
+from pytassim.testing import dummy_obs_operator, DummyLocalization
 
 
 logging.basicConfig(level=logging.INFO)
@@ -90,6 +92,81 @@ class TestLETKFCorr(unittest.TestCase):
                                                       self.state, ana_time)
         self.assertFalse(np.any(np.isnan(assimilated_state.values)))
 
+    def test_batch_size_sets_analyser_batch_size(self):
+        self.algorithm.batch_size = 5
+        self.assertEqual(self.algorithm.analyser.batch_size, 5)
+        self.algorithm.inf_factor = 1.2
+        self.assertEqual(self.algorithm.analyser.batch_size, 5)
+        self.algorithm.localization = DummyLocalization()
+        self.assertEqual(self.algorithm.analyser.batch_size, 5)
+
+    def test_deduplicate_is_kept_for_new_analyser(self):
+        self.algorithm.deduplicate = True
+        self.assertTrue(self.algorithm.analyser.deduplicate)
+        self.algorithm.inf_factor = 1.2
+        self.algorithm.localization = DummyLocalization()
+        self.assertTrue(self.algorithm.analyser.deduplicate)
+
+    def test_weight_mapping_is_kept_for_new_analyser(self):
+        mapping = WeightInterpolation(stride=2)
+        self.algorithm.weight_mapping = mapping
+        self.assertEqual(id(self.algorithm.analyser.weight_mapping),
+                         id(mapping))
+        self.algorithm.inf_factor = 1.2
+        self.algorithm.localization = DummyLocalization()
+        self.assertEqual(id(self.algorithm.analyser.weight_mapping),
+                         id(mapping))
+
+    def test_batched_letkf_equals_sequential_letkf(self):
+        self.algorithm.localization = DummyLocalization()
+        obs_tuple = (self.obs, self.obs)
+        seq_analysis = self.algorithm.assimilate(self.state, obs_tuple)
+        self.algorithm.batch_size = 16
+        batch_analysis = self.algorithm.assimilate(self.state, obs_tuple)
+        xr.testing.assert_allclose(batch_analysis, seq_analysis)
+
+    def test_sweep_equals_single_assimilations(self):
+        localizations = [
+            GaspariCohn(5., dist_func=lambda x, y: np.abs(x-y)),
+            GaspariCohn(10., dist_func=lambda x, y: np.abs(x-y))
+        ]
+        self.algorithm.batch_size = 7
+        self.algorithm.weight_mapping = WeightInterpolation(stride=2)
+        obs_tuple = (self.obs, self.obs)
+        analysis = self.algorithm.sweep(self.state, obs_tuple,
+                                        inf_factors=[0.5, 1.25],
+                                        localizations=localizations)
+        self.assertEqual(analysis.sizes['config'], 4)
+        np.testing.assert_equal(analysis['inf_factor'].values,
+                                [0.5, 1.25, 0.5, 1.25])
+        np.testing.assert_equal(
+            analysis['localization'].values,
+            [str(localizations[0])] * 2 + [str(localizations[1])] * 2
+        )
+        self.assertIsNone(self.algorithm.localization)
+        self.assertEqual(self.algorithm.inf_factor, 1.0)
+        for k in range(4):
+            self.algorithm.inf_factor = [0.5, 1.25][k % 2]
+            self.algorithm.localization = localizations[k // 2]
+            right_analysis = self.algorithm.assimilate(self.state, obs_tuple)
+            xr.testing.assert_allclose(
+                analysis.isel(config=k, drop=True), right_analysis
+            )
+
+    def test_sweep_uses_set_localization(self):
+        localization = DummyLocalization()
+        self.algorithm.localization = localization
+        self.algorithm.deduplicate = True
+        analysis = self.algorithm.sweep(self.state, self.obs,
+                                        inf_factors=[0.5, 1.25])
+        np.testing.assert_equal(analysis['localization'].values,
+                                [str(localization)] * 2)
+        self.algorithm.inf_factor = 1.25
+        right_analysis = self.algorithm.assimilate(self.state, self.obs)
+        xr.testing.assert_allclose(
+            analysis.isel(config=1, drop=True), right_analysis
+        )
+
     def test_letkfuncorr_sets_correlated_to_false(self):
         self.assertFalse(LETKFUncorr()._correlated)
 
@@ -34,11 +34,14 @@ import torch
 import torch.jit
 import numpy as np
 import dask.array as da
+import scipy.sparse
 
 # Internal modules
 from pytassim.assimilation.filter.letkf_core import LETKFAnalyser
 from pytassim.assimilation.filter.etkf_core import ETKFWeightsModule, \
     ETKFAnalyser
+from pytassim.assimilation.filter.weight_mapping import WeightInterpolation
+from pytassim.localization.cache import CachedLocalization
 from pytassim.testing import dummy_obs_operator, DummyLocalization
 
 
@@ -147,6 +150,236 @@ class TestLETKFCorr(unittest.TestCase):
         )
         torch.testing.assert_allclose(ret_perts, right_perts)
 
+    def test_batch_size_raises_value_error_if_not_positive(self):
+        with self.assertRaises(ValueError):
+            self.analyser.batch_size = 0
+        with self.assertRaises(ValueError):
+            self.analyser.batch_size = 1.5
+        with self.assertRaises(ValueError):
+            self.analyser.batch_size = True
+
+    def test_batch_size_accepts_numpy_integers(self):
+        self.analyser.batch_size = np.int64(4)
+        self.assertEqual(self.analyser.batch_size, 4)
+        self.assertIsInstance(self.analyser.batch_size, int)
+
+    def test_get_loc_matrix_returns_localization_matrix(self):
+        loc_matrix = self.analyser._get_loc_matrix(self.state_grid,
+                                                   self.obs_grid)
+        self.assertIsInstance(loc_matrix, scipy.sparse.csr_matrix)
+        self.assertTupleEqual(loc_matrix.shape, (40, 40))
+        for ind, gp in enumerate(self.state_grid):
+            use_obs, obs_weights = self.localisation.localize_obs(
+                gp, self.obs_grid
+            )
+            np.testing.assert_equal(
+                loc_matrix[ind].toarray()[0], obs_weights * use_obs
+            )
+
+    def test_get_loc_matrix_uses_localize_all(self):
+        loc_matrix = scipy.sparse.csr_matrix(np.eye(40))
+        with patch.object(self.localisation, 'localize_all',
+                          return_value=loc_matrix) as loc_patch:
+            ret_matrix = self.analyser._get_loc_matrix(self.state_grid,
+                                                       self.obs_grid)
+        loc_patch.assert_called_once()
+        np.testing.assert_equal(ret_matrix.toarray(), np.eye(40))
+
+    def test_analyser_uses_cached_localization_matrix(self):
+        state_perts = torch.from_numpy(self.state_perts.values).float()
+        right_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, self.state_grid,
+            self.obs_grid
+        )
+        self.analyser.localization = CachedLocalization(self.localisation)
+        with patch.object(DummyLocalization, 'localize_all',
+                          wraps=self.localisation.localize_all) as loc_patch:
+            for _ in range(2):
+                ret_perts = self.analyser.get_analysis_perts(
+                    state_perts, self.normed_perts, self.normed_obs,
+                    self.state_grid, self.obs_grid
+                )
+                torch.testing.assert_allclose(ret_perts, right_perts)
+        loc_patch.assert_called_once()
+
+    def test_sparse_to_padded_pads_with_zero_weights(self):
+        loc_matrix = scipy.sparse.csr_matrix(
+            np.array([[0, 0.1, 0.2, 0.3, 0, 0],
+                      [0, 0, 0, 0, 0, 0.5],
+                      [0, 0, 0, 0, 0, 0]])
+        )
+        ret_ind, ret_weights = self.analyser._sparse_to_padded(loc_matrix)
+        np.testing.assert_equal(
+            ret_ind, np.array([[1, 2, 3], [5, 0, 0], [0, 0, 0]])
+        )
+        empty_ind, empty_weights = self.analyser._sparse_to_padded(
+            loc_matrix[-1:]
+        )
+        self.assertTupleEqual(empty_ind.shape, (1, 0))
+        self.assertTupleEqual(empty_weights.shape, (1, 0))
+        np.testing.assert_equal(
+            ret_weights,
+            np.array([[0.1, 0.2, 0.3], [0.5, 0, 0], [0, 0, 0]])
+        )
+
+    def test_gather_obs_returns_localised_batch(self):
+        loc_matrix = self.analyser._get_loc_matrix(self.state_grid[8:12],
+                                                   self.obs_grid)
+        obs_ind, obs_weights = self.analyser._sparse_to_padded(loc_matrix)
+        ret_perts, ret_obs = self.analyser._gather_obs(
+            self.normed_perts, self.normed_obs, obs_ind, obs_weights
+        )
+        self.assertTupleEqual(ret_perts.shape, (4, 10, obs_ind.shape[-1]))
+        self.assertTupleEqual(ret_obs.shape, (4, 1, obs_ind.shape[-1]))
+        for k, gp in enumerate(self.state_grid[8:12]):
+            loc_perts, loc_obs = self.analyser._localise_obs(
+                gp, self.normed_perts, self.normed_obs, self.obs_grid
+            )
+            num_obs = loc_perts.shape[-1]
+            torch.testing.assert_allclose(ret_perts[k, :, :num_obs],
+                                          loc_perts)
+            torch.testing.assert_allclose(ret_obs[k, :, :num_obs], loc_obs)
+            self.assertTrue(torch.all(ret_perts[k, :, num_obs:] == 0))
+
+    def test_batched_analysis_perts_equal_sequential_perts(self):
+        state_perts = torch.from_numpy(self.state_perts.values).float()
+        seq_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, self.state_grid,
+            self.obs_grid
+        )
+        self.analyser.batch_size = 7
+        batch_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, self.state_grid,
+            self.obs_grid
+        )
+        torch.testing.assert_allclose(batch_perts, seq_perts)
+
+    def test_batched_analysis_returns_prior_perts_without_obs(self):
+        self.analyser.batch_size = 4
+        self.analyser.inf_factor = 1.21
+        state_perts = torch.from_numpy(self.state_perts.values).float()
+        ret_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid + 1000, self.obs_grid
+        )
+        torch.testing.assert_allclose(ret_perts, state_perts * 1.1)
+
+    def test_get_unique_rows_groups_same_signatures(self):
+        loc_matrix = scipy.sparse.csr_matrix(
+            np.array([[0, 0.1, 0.2, 0, 0],
+                      [0, 0, 0, 0, 0],
+                      [0, 0.1, 0.2, 0, 0],
+                      [0, 0.1, 0.3, 0, 0],
+                      [0, 0, 0, 0, 0]])
+        )
+        unique_rows, inverse = self.analyser._get_unique_rows(loc_matrix)
+        np.testing.assert_equal(unique_rows, np.array([0, 1, 3]))
+        np.testing.assert_equal(inverse, np.array([0, 1, 0, 2, 1]))
+
+    def test_get_unique_rows_equals_signature_loop(self):
+        rnd_state = np.random.RandomState(0)
+        dense = rnd_state.choice([0, 0.1, 0.2], size=(200, 6),
+                                 p=[0.6, 0.2, 0.2])
+        dense[-1] = [0, 0.1, 0, 0, 0, 0]
+        dense[-2] = [0, 0.1, 0.1, 0, 0, 0]
+        loc_matrix = scipy.sparse.csr_matrix(dense)
+        signatures = {}
+        right_rows = []
+        right_inverse = []
+        for row in range(loc_matrix.shape[0]):
+            row_slice = slice(loc_matrix.indptr[row],
+                              loc_matrix.indptr[row+1])
+            key = (loc_matrix.indices[row_slice].tobytes(),
+                   loc_matrix.data[row_slice].tobytes())
+            right_inverse.append(signatures.setdefault(key, len(right_rows)))
+            if right_inverse[-1] == len(right_rows):
+                right_rows.append(row)
+        unique_rows, inverse = self.analyser._get_unique_rows(loc_matrix)
+        np.testing.assert_equal(unique_rows, np.array(right_rows))
+        np.testing.assert_equal(inverse, np.array(right_inverse))
+        unique_rows, inverse = self.analyser._get_unique_rows(
+            scipy.sparse.csr_matrix((0, 6))
+        )
+        self.assertEqual(len(unique_rows), 0)
+        self.assertEqual(len(inverse), 0)
+
+    def test_deduplicated_analysis_perts_equal_letkf(self):
+        state_perts = torch.from_numpy(self.state_perts.values).float()
+        state_grid = np.concatenate([self.state_grid, self.state_grid+1000])
+        state_perts = torch.cat([state_perts, state_perts], dim=-1)
+        right_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, state_grid,
+            self.obs_grid
+        )
+        self.analyser.deduplicate = True
+        self.analyser.batch_size = 8
+        with patch.object(
+                self.analyser, '_estimate_loc_weights',
+                wraps=self.analyser._estimate_loc_weights
+        ) as weights_patch:
+            ret_perts = self.analyser.get_analysis_perts(
+                state_perts, self.normed_perts, self.normed_obs, state_grid,
+                self.obs_grid
+            )
+        self.assertEqual(weights_patch.call_args[0][0].shape[0], 41)
+        torch.testing.assert_allclose(ret_perts, right_perts)
+
+    def test_deduplication_is_composed_with_weight_mapping(self):
+        state_perts = torch.from_numpy(self.state_perts.values).float()
+        state_grid = np.concatenate([self.state_grid, self.state_grid+1000])
+        state_perts = torch.cat([state_perts, state_perts], dim=-1)
+        self.analyser.weight_mapping = WeightInterpolation(
+            points=np.arange(0, 80, 2), method='nearest'
+        )
+        right_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, state_grid,
+            self.obs_grid
+        )
+        self.analyser.deduplicate = True
+        ret_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, state_grid,
+            self.obs_grid
+        )
+        torch.testing.assert_allclose(ret_perts, right_perts)
+
+    def test_weight_mapping_with_all_points_equals_letkf(self):
+        state_perts = torch.from_numpy(self.state_perts.values).float()
+        right_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, self.state_grid,
+            self.obs_grid
+        )
+        self.analyser.batch_size = 8
+        self.analyser.weight_mapping = WeightInterpolation(stride=1)
+        ret_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, self.state_grid,
+            self.obs_grid
+        )
+        torch.testing.assert_allclose(ret_perts, right_perts)
+
+    def test_weight_mapping_interpolates_weights(self):
+        state_perts = torch.from_numpy(self.state_perts.values).float()
+        weight_points = torch.arange(0, 40, 3)
+        self.analyser.weight_mapping = WeightInterpolation(stride=3)
+        weights = self.analyser._estimate_grid_weights(
+            self.state_grid[weight_points.numpy()], self.normed_perts,
+            self.normed_obs, self.obs_grid
+        )
+        ret_perts = self.analyser.get_analysis_perts(
+            state_perts, self.normed_perts, self.normed_obs, self.state_grid,
+            self.obs_grid
+        )
+        right_perts = self.analyser._batch_weights_matmul(
+            state_perts[..., weight_points], weights
+        )
+        torch.testing.assert_allclose(ret_perts[..., weight_points],
+                                      right_perts)
+        interp_weights = (weights[0] * 2 + weights[1]) / 3
+        torch.testing.assert_allclose(
+            ret_perts[..., [1]],
+            self.analyser._weights_matmul(state_perts[..., [1]],
+                                          interp_weights)
+        )
+
     def test_letkf_analyser_gets_same_solution_as_hunt_07(self):
         hunt_ana_perts = []
         for gp in range(40):
@@ -24,13 +24,15 @@ Created for torch-assimilate
 """
 # System modules
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import logging
 import os
 
 # External modules
 import xarray as xr
 import numpy as np
+import pandas as pd
+import dask.array as da
 import distributed.protocol.serialize
 
 from dask.distributed import LocalCluster, Client
@@ -38,8 +40,11 @@ from dask.distributed import LocalCluster, Client
 # Internal modules
 from pytassim.assimilation.filter.letkf import LETKFCorr, LETKFUncorr
 from pytassim.testing import dummy_obs_operator, DummyLocalization
+from pytassim.localization import GaspariCohn
+from pytassim.localization.distance import EuclideanDistance
 from pytassim.assimilation.filter.letkf_dist import DistributedLETKFCorr, \
     DistributedLETKFUncorr
+from pytassim.assimilation.filter.weight_mapping import WeightInterpolation
 
 
 logging.basicConfig(level=logging.INFO)
@@ -49,6 +54,10 @@ BASE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 DATA_PATH = os.path.join(os.path.dirname(BASE_PATH), 'data')
 
 
+def grid_distance(grid_ind, obs_grid):
+    return np.abs(grid_ind - obs_grid)[..., 0]
+
+
 class TestLETKFDistributed(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -153,6 +162,156 @@ class TestLETKFDistributed(unittest.TestCase):
                                               ana_time)
         xr.testing.assert_allclose(assimilated_state, letkf_state)
 
+    def test_analysis_is_lazy_dask_array_with_grid_chunks(self):
+        self.algorithm.localization = DummyLocalization()
+        ana_time = self.state.time[-1].values
+        assimilated_state = self.algorithm.assimilate(self.state, self.obs,
+                                                      self.state, ana_time)
+        self.assertIsInstance(assimilated_state.data, da.Array)
+        self.assertTupleEqual(assimilated_state.chunks[-1], (10, ) * 4)
+        letkf_state = LETKFCorr(localization=DummyLocalization()).assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        xr.testing.assert_allclose(assimilated_state.persist(), letkf_state)
+
+    def test_halo_partitioned_obs_get_same_analysis(self):
+        localization = GaspariCohn(2., dist_func=grid_distance,
+                                   use_index=True)
+        ana_time = self.state.time[-1].values
+        letkf_state = LETKFCorr(localization=localization).assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        self.algorithm.localization = localization
+        with patch.object(self.client, 'scatter',
+                          wraps=self.client.scatter) as scatter_patch:
+            assimilated_state = self.algorithm.assimilate(
+                self.state, self.obs, self.state, ana_time
+            )
+        self.assertEqual(scatter_patch.call_count, 4)
+        for call in scatter_patch.call_args_list:
+            self.assertNotIn('broadcast', call[1])
+            self.assertLess(len(call[0][0][2]), self.obs.obs_grid_1.size)
+        xr.testing.assert_allclose(assimilated_state.compute(), letkf_state)
+
+    def test_weight_mapping_with_halo_obs_gets_same_analysis(self):
+        localization = GaspariCohn(2., dist_func=grid_distance,
+                                   use_index=True)
+        weight_mapping = WeightInterpolation(stride=4)
+        ana_time = self.state.time[-1].values
+        letkf_state = LETKFCorr(
+            localization=localization, weight_mapping=weight_mapping
+        ).assimilate(self.state, self.obs, self.state, ana_time)
+        self.algorithm.localization = localization
+        self.algorithm.weight_mapping = weight_mapping
+        for chunksize in (7, 13):
+            self.algorithm.chunksize = chunksize
+            with self.client.as_current():
+                assimilated_state = self.algorithm.assimilate(
+                    self.state, self.obs, self.state, ana_time
+                ).compute()
+            xr.testing.assert_allclose(assimilated_state, letkf_state)
+
+    def test_balanced_chunks_get_same_analysis(self):
+        localization = GaspariCohn(2., dist_func=grid_distance,
+                                   use_index=True)
+        ana_time = self.state.time[-1].values
+        letkf_state = LETKFCorr(localization=localization).assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        self.algorithm.localization = localization
+        self.algorithm.balance = True
+        assimilated_state = self.algorithm.assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        self.assertEqual(len(assimilated_state.chunks[-1]), 4)
+        xr.testing.assert_allclose(assimilated_state.compute(), letkf_state)
+
+    def test_obs_are_broadcasted_without_obs_subset(self):
+        self.algorithm.localization = DummyLocalization()
+        ana_time = self.state.time[-1].values
+        with patch.object(self.client, 'scatter',
+                          wraps=self.client.scatter) as scatter_patch:
+            _ = self.algorithm.assimilate(self.state, self.obs, self.state,
+                                          ana_time)
+        scatter_patch.assert_called_once()
+        self.assertTrue(scatter_patch.call_args[1]['broadcast'])
+
+    def test_auto_chunksize_is_calibrated_and_reused(self):
+        self.algorithm.localization = DummyLocalization()
+        self.algorithm.chunksize = 'auto'
+        self.algorithm.target_duration = 0.
+        ana_time = self.state.time[-1].values
+        with patch.object(
+                self.algorithm, '_calibrate_chunksize',
+                wraps=self.algorithm._calibrate_chunksize
+        ) as calib_patch:
+            assimilated_state = self.algorithm.assimilate(
+                self.state, self.obs, self.state, ana_time
+            )
+            _ = self.algorithm.assimilate(
+                self.state, self.obs, self.state, ana_time
+            )
+        calib_patch.assert_called_once()
+        chunksize = self.algorithm.calibrated_chunksize
+        self.assertIsInstance(chunksize, int)
+        self.assertGreaterEqual(chunksize, 1)
+        self.assertEqual(assimilated_state.chunks[-1][0], chunksize)
+        letkf_state = LETKFCorr(localization=DummyLocalization()).assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        xr.testing.assert_allclose(assimilated_state.compute(), letkf_state)
+
+    def test_chunk_tasks_only_depend_on_their_grid_chunk(self):
+        self.algorithm.localization = DummyLocalization()
+        ana_time = self.state.time[-1].values
+        analysis = self.algorithm.assimilate(self.state, self.obs,
+                                             self.state, ana_time)
+        first_block = analysis.data.blocks[..., 0]
+        graph = dict(first_block.__dask_optimize__(
+            first_block.__dask_graph__(), first_block.__dask_keys__()
+        ))
+        key_names = [
+            key[0] if isinstance(key, tuple) else key for key in graph
+        ]
+        self.assertFalse(any(name.startswith('finalize')
+                             for name in key_names))
+        grid_ind = [key[-1] for key in graph if isinstance(key, tuple)
+                    and len(key) == analysis.ndim+1]
+        self.assertTrue(all(ind == 0 for ind in grid_ind))
+
+    def test_auto_chunksize_with_strided_weight_mapping(self):
+        lattice = pd.MultiIndex.from_product([np.arange(5), np.arange(8)])
+        self.state['grid'] = lattice
+        self.obs['obs_grid_1'] = self.obs['obs_grid_2'] = lattice
+        localization = GaspariCohn(3., dist_func=EuclideanDistance())
+        weight_mapping = WeightInterpolation(stride=2)
+        ana_time = self.state.time[-1].values
+        letkf_state = LETKFCorr(
+            localization=localization, weight_mapping=weight_mapping
+        ).assimilate(self.state, self.obs, self.state, ana_time)
+        self.algorithm.localization = localization
+        self.algorithm.weight_mapping = weight_mapping
+        self.algorithm.chunksize = 'auto'
+        self.algorithm.target_duration = 0.
+        with self.client.as_current():
+            assimilated_state = self.algorithm.assimilate(
+                self.state, self.obs, self.state, ana_time
+            ).compute()
+        self.assertIsNotNone(self.algorithm.calibrated_chunksize)
+        xr.testing.assert_allclose(assimilated_state, letkf_state)
+
+    def test_calibrate_chunksize_targets_duration(self):
+        self.algorithm.localization = DummyLocalization()
+        self.algorithm.target_duration = 1E10
+        self.algorithm.chunksize = 'auto'
+        ana_time = self.state.time[-1].values
+        assimilated_state = self.algorithm.assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        self.assertEqual(self.algorithm.calibrated_chunksize,
+                         self.state.grid.size)
+        self.assertEqual(len(assimilated_state.chunks[-1]), 1)
+
     def test_letkfuncorr_sets_correlated_to_false(self):
         self.assertFalse(DistributedLETKFUncorr(client=self.client)._correlated)
 
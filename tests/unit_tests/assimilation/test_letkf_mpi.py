@@ -0,0 +1,232 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+import os
+import threading
+
+# External modules
+import xarray as xr
+import numpy as np
+
+try:
+    from mpi4py import MPI
+except ImportError:
+    MPI = None
+
+# Internal modules
+from pytassim.assimilation.filter.letkf import LETKFCorr, LETKFUncorr
+from pytassim.assimilation.filter.letkf_mpi import MPILETKFCorr, \
+    MPILETKFUncorr
+from pytassim.localization import GaspariCohn
+from pytassim.testing import dummy_obs_operator, DummyLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+rnd = np.random.RandomState(42)
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DATA_PATH = os.path.join(os.path.dirname(BASE_PATH), 'data')
+
+
+def grid_distance(grid_ind, obs_grid):
+    return np.abs(grid_ind - obs_grid)[..., 0]
+
+
+def subset_obs_operator(obs_ds, state):
+    pseudo_obs = state.sel(var_name='x').rename(grid='obs_grid_1')
+    pseudo_obs = pseudo_obs.sel(obs_grid_1=obs_ds.obs_grid_1.values)
+    pseudo_obs['time'] = obs_ds.time.values
+    return pseudo_obs
+
+
+class FakeWorld(object):
+    """
+    Shared buffers of fake ranks, which run in threads of one process.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.barrier = threading.Barrier(size, timeout=60)
+        self.buffer = [None] * size
+
+    def exchange(self, rank, obj):
+        self.buffer[rank] = obj
+        self.barrier.wait()
+        gathered = list(self.buffer)
+        self.barrier.wait()
+        return gathered
+
+
+class FakeComm(object):
+    """
+    Fake communicator with the collectives used by the MPI LETKF.
+    """
+    def __init__(self, world, rank):
+        self.world = world
+        self.rank = rank
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return self.world.size
+
+    def allgather(self, obj):
+        return self.world.exchange(self.rank, obj)
+
+    def alltoall(self, objs):
+        gathered = self.world.exchange(self.rank, objs)
+        return [rank_objs[self.rank] for rank_objs in gathered]
+
+
+class TestLETKFFakeRanks(unittest.TestCase):
+    def setUp(self):
+        state_path = os.path.join(DATA_PATH, 'test_state.nc')
+        self.state = xr.open_dataarray(state_path).load()
+        obs_path = os.path.join(DATA_PATH, 'test_single_obs.nc')
+        self.obs = xr.open_dataset(obs_path).load()
+        self.obs['covariance'] = xr.DataArray(
+            np.diag(self.obs.covariance.values),
+            coords={'obs_grid_1': self.obs.obs_grid_1},
+            dims=['obs_grid_1']
+        )
+        self.obs.obs.operator = subset_obs_operator
+        self.ana_time = self.state.time[-1].values
+
+    def _assimilate_ranks(self, n_ranks, rank_obs):
+        world = FakeWorld(n_ranks)
+        results = [None] * n_ranks
+        errors = []
+
+        def run_rank(rank):
+            try:
+                algorithm = MPILETKFUncorr(
+                    comm=FakeComm(world, rank),
+                    localization=GaspariCohn(2., dist_func=grid_distance,
+                                             use_index=True)
+                )
+                local_state = self.state.isel(
+                    grid=algorithm.get_local_slice(self.state.grid.size)
+                )
+                results[rank] = algorithm.assimilate(
+                    local_state, rank_obs[rank], local_state, self.ana_time
+                )
+            except Exception as e:
+                errors.append(e)
+                world.barrier.abort()
+
+        threads = [threading.Thread(target=run_rank, args=(rank, ))
+                   for rank in range(n_ranks)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return xr.concat(results, dim='grid')
+
+    def test_halo_exchange_gets_same_analysis(self):
+        slices = [slice(0, 13), slice(13, 27), slice(27, 40)]
+        rank_obs = []
+        for rank_slice in slices:
+            local_obs = self.obs.isel(obs_grid_1=rank_slice)
+            local_obs.obs.operator = subset_obs_operator
+            rank_obs.append(local_obs)
+        letkf_state = LETKFUncorr(
+            localization=GaspariCohn(2., dist_func=grid_distance)
+        ).assimilate(self.state, self.obs, self.state, self.ana_time)
+        ret_state = self._assimilate_ranks(3, rank_obs)
+        xr.testing.assert_allclose(ret_state, letkf_state)
+
+    def test_rank_without_obs_takes_part_in_exchange(self):
+        obs = self.obs.isel(obs_grid_1=np.r_[0:13, 27:40])
+        obs.obs.operator = subset_obs_operator
+        rank_obs = []
+        for bounds in ((0, 13), (27, 40)):
+            local_obs = obs.sel(obs_grid_1=slice(bounds[0], bounds[1]-1))
+            local_obs.obs.operator = subset_obs_operator
+            rank_obs.append(local_obs)
+        rank_obs.insert(1, [])
+        letkf_state = LETKFUncorr(
+            localization=GaspariCohn(2., dist_func=grid_distance)
+        ).assimilate(self.state, obs, self.state, self.ana_time)
+        ret_state = self._assimilate_ranks(3, rank_obs)
+        xr.testing.assert_allclose(ret_state, letkf_state)
+        self.assertFalse(np.allclose(
+            ret_state.isel(grid=slice(13, 16)).values,
+            self.state.sel(time=[self.ana_time]).isel(
+                grid=slice(13, 16)
+            ).values
+        ))
+
+
+@unittest.skipIf(MPI is None, 'mpi4py is not available!')
+class TestLETKFMPI(unittest.TestCase):
+    def setUp(self):
+        self.algorithm = MPILETKFCorr(comm=MPI.COMM_SELF)
+        state_path = os.path.join(DATA_PATH, 'test_state.nc')
+        self.state = xr.open_dataarray(state_path).load()
+        obs_path = os.path.join(DATA_PATH, 'test_single_obs.nc')
+        self.obs = xr.open_dataset(obs_path).load()
+        self.obs.obs.operator = dummy_obs_operator
+
+    def test_comm_defaults_to_comm_world(self):
+        algorithm = MPILETKFCorr()
+        self.assertIs(algorithm.comm, MPI.COMM_WORLD)
+
+    def test_local_slice_spans_grid_for_single_rank(self):
+        self.assertEqual(self.algorithm.get_local_slice(40), slice(0, 40))
+
+    def test_localization_works(self):
+        localization = DummyLocalization()
+        letkf_filter = LETKFCorr(localization=localization)
+        self.algorithm.localization = localization
+        ana_time = self.state.time[-1].values
+        assimilated_state = self.algorithm.assimilate(self.state, self.obs,
+                                                      self.state, ana_time)
+        letkf_state = letkf_filter.assimilate(self.state, self.obs, self.state,
+                                              ana_time)
+        xr.testing.assert_allclose(assimilated_state, letkf_state)
+
+    def test_halo_obs_get_same_analysis(self):
+        localization = GaspariCohn(2., dist_func=grid_distance,
+                                   use_index=True)
+        ana_time = self.state.time[-1].values
+        letkf_state = LETKFCorr(localization=localization).assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        self.algorithm.localization = localization
+        assimilated_state = self.algorithm.assimilate(
+            self.state, self.obs, self.state, ana_time
+        )
+        xr.testing.assert_allclose(assimilated_state, letkf_state)
+
+    def test_letkfuncorr_sets_correlated_to_false(self):
+        self.assertFalse(MPILETKFUncorr()._correlated)
+
+
+if __name__ == '__main__':
+    unittest.main()
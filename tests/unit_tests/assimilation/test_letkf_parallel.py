@@ -0,0 +1,169 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+from unittest.mock import patch
+import logging
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+# External modules
+import xarray as xr
+import numpy as np
+
+# Internal modules
+from pytassim.assimilation.filter.letkf import LETKFCorr, LETKFUncorr
+from pytassim.assimilation.filter.etkf_core import ETKFWeightsModule
+from pytassim.assimilation.filter.letkf_core import LETKFAnalyser
+from pytassim.assimilation.filter.partition import estimate_costs, \
+    get_chunk_costs
+from pytassim.assimilation.filter.letkf_parallel import ParallelLETKFCorr, \
+    ParallelLETKFUncorr
+from pytassim.assimilation.filter.weight_mapping import WeightInterpolation
+from pytassim.localization import GaspariCohn
+from pytassim.testing import dummy_obs_operator, DummyLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+rnd = np.random.RandomState(42)
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DATA_PATH = os.path.join(os.path.dirname(BASE_PATH), 'data')
+
+
+def grid_distance(grid_ind, obs_grid):
+    return np.abs(grid_ind - obs_grid)[..., 0]
+
+
+class TestLETKFParallel(unittest.TestCase):
+    def setUp(self):
+        self.algorithm = ParallelLETKFCorr(chunksize=7)
+        state_path = os.path.join(DATA_PATH, 'test_state.nc')
+        self.state = xr.open_dataarray(state_path).load()
+        obs_path = os.path.join(DATA_PATH, 'test_single_obs.nc')
+        self.obs = xr.open_dataset(obs_path).load()
+        self.obs.obs.operator = dummy_obs_operator
+        self.localization = DummyLocalization()
+        self.ana_time = self.state.time[-1].values
+
+    def test_default_thread_pool_gets_same_analysis_as_letkf(self):
+        letkf_filter = LETKFCorr(localization=self.localization)
+        self.algorithm.localization = self.localization
+        obs_tuple = (self.obs, self.obs)
+        ret_state = self.algorithm.assimilate(self.state, obs_tuple,
+                                              self.state, self.ana_time)
+        right_state = letkf_filter.assimilate(self.state, obs_tuple,
+                                              self.state, self.ana_time)
+        xr.testing.assert_allclose(ret_state, right_state)
+
+    def test_given_pool_analyses_all_chunks(self):
+        self.algorithm.localization = self.localization
+        self.algorithm.batch_size = 3
+        right_state = LETKFCorr(localization=self.localization).assimilate(
+            self.state, self.obs, self.state, self.ana_time
+        )
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.algorithm.pool = pool
+            with patch.object(pool, 'submit', wraps=pool.submit) as \
+                    submit_patch:
+                ret_state = self.algorithm.assimilate(
+                    self.state, self.obs, self.state, self.ana_time
+                )
+        self.assertEqual(submit_patch.call_count, 6)
+        xr.testing.assert_allclose(ret_state, right_state)
+
+    def test_balanced_chunks_get_same_analysis(self):
+        self.algorithm.localization = self.localization
+        self.algorithm.balance = True
+        right_state = LETKFCorr(localization=self.localization).assimilate(
+            self.state, self.obs, self.state, self.ana_time
+        )
+        ret_state = self.algorithm.assimilate(self.state, self.obs,
+                                              self.state, self.ana_time)
+        xr.testing.assert_allclose(ret_state, right_state)
+
+    def test_balanced_chunks_are_submitted_with_descending_costs(self):
+        self.algorithm.localization = self.localization
+        self.algorithm.balance = True
+        grid = np.arange(40, dtype=float)[:, None]
+        obs_grid = np.concatenate([np.arange(0, 10, 0.25),
+                                   np.arange(10, 40, 5)])[:, None]
+        chunk_pos, submit_order = self.algorithm._partition_grid(
+            40, 10, grid, obs_grid
+        )
+        self.assertEqual(len(chunk_pos), 7)
+        costs = estimate_costs(self.localization, grid, obs_grid, 10)
+        chunk_costs = get_chunk_costs(costs, chunk_pos)[submit_order]
+        self.assertLess(chunk_pos[1], 10)
+        self.assertTrue(np.all(np.diff(chunk_costs) <= 0))
+
+    def test_weight_mapping_is_independent_of_chunksize(self):
+        self.obs['covariance'] = xr.DataArray(
+            np.diag(self.obs.covariance.values),
+            coords={'obs_grid_1': self.obs.obs_grid_1},
+            dims=['obs_grid_1']
+        )
+        localization = GaspariCohn(5., dist_func=grid_distance)
+        for weight_mapping in (WeightInterpolation(stride=3),
+                               WeightInterpolation(stride=6,
+                                                   method='nearest')):
+            right_state = LETKFUncorr(
+                localization=localization, weight_mapping=weight_mapping
+            ).assimilate(self.state, self.obs, self.state, self.ana_time)
+            for chunksize in (4, 7, 13):
+                algorithm = ParallelLETKFUncorr(
+                    chunksize=chunksize, localization=localization,
+                    weight_mapping=weight_mapping
+                )
+                ret_state = algorithm.assimilate(self.state, self.obs,
+                                                 self.state, self.ana_time)
+                xr.testing.assert_allclose(ret_state, right_state)
+
+    def test_no_localization_analyses_grid_once(self):
+        with patch.object(LETKFAnalyser, 'get_analysis_perts',
+                          wraps=self.algorithm.analyser.get_analysis_perts) \
+                as analyser_patch:
+            _ = self.algorithm.assimilate(self.state, self.obs, self.state,
+                                          self.ana_time)
+        analyser_patch.assert_called_once()
+
+    def test_analyser_can_be_pickled_for_process_pools(self):
+        analyser = LETKFAnalyser(localization=self.localization,
+                                 inf_factor=1.2, batch_size=4)
+        analyser._gen_weights = lambda *args: args
+        ret_analyser = pickle.loads(pickle.dumps(analyser))
+        self.assertEqual(ret_analyser.inf_factor, 1.2)
+        self.assertEqual(ret_analyser.batch_size, 4)
+        self.assertIsInstance(ret_analyser.localization, DummyLocalization)
+        self.assertIsInstance(ret_analyser.gen_weights, ETKFWeightsModule)
+
+    def test_parallel_uncorr_sets_correlated_to_false(self):
+        self.assertFalse(ParallelLETKFUncorr()._correlated)
+        self.assertTrue(ParallelLETKFCorr()._correlated)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+
+# External modules
+import xarray as xr
+import numpy as np
+import torch
+
+# Internal modules
+from pytassim.assimilation.filter.letkf import LETKFCorr
+from pytassim.assimilation.filter.letkf_core import LETKFAnalyser
+from pytassim.assimilation.filter.letkf_shared import SharedMemoryLETKFCorr, \
+    SharedMemoryLETKFUncorr, _to_shared, _create_shared, \
+    _analyse_shared_chunk, _close_shared
+from pytassim.assimilation.filter.weight_mapping import WeightInterpolation
+from pytassim.testing import dummy_obs_operator, DummyLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+rnd = np.random.RandomState(42)
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DATA_PATH = os.path.join(os.path.dirname(BASE_PATH), 'data')
+
+
+def list_shared_memory():
+    if not os.path.isdir('/dev/shm'):
+        return set()
+    return set(os.listdir('/dev/shm'))
+
+
+class TestLETKFShared(unittest.TestCase):
+    def setUp(self):
+        self.localization = DummyLocalization()
+        self.algorithm = SharedMemoryLETKFCorr(
+            chunksize=7, localization=self.localization, batch_size=3
+        )
+        state_path = os.path.join(DATA_PATH, 'test_state.nc')
+        self.state = xr.open_dataarray(state_path).load()
+        obs_path = os.path.join(DATA_PATH, 'test_single_obs.nc')
+        self.obs = xr.open_dataset(obs_path).load()
+        self.obs.obs.operator = dummy_obs_operator
+        self.ana_time = self.state.time[-1].values
+
+    def test_process_pool_gets_same_analysis_as_letkf(self):
+        letkf_filter = LETKFCorr(localization=self.localization)
+        obs_tuple = (self.obs, self.obs)
+        right_state = letkf_filter.assimilate(self.state, obs_tuple,
+                                              self.state, self.ana_time)
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            self.algorithm.pool = pool
+            ret_state = self.algorithm.assimilate(self.state, obs_tuple,
+                                                  self.state, self.ana_time)
+        xr.testing.assert_allclose(ret_state, right_state)
+
+    def test_thread_pool_gets_same_analysis_as_letkf(self):
+        letkf_filter = LETKFCorr(localization=self.localization)
+        right_state = letkf_filter.assimilate(self.state, self.obs,
+                                              self.state, self.ana_time)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.algorithm.pool = pool
+            ret_state = self.algorithm.assimilate(self.state, self.obs,
+                                                  self.state, self.ana_time)
+        xr.testing.assert_allclose(ret_state, right_state)
+
+    def test_weight_mapping_gets_same_analysis_as_letkf(self):
+        weight_mapping = WeightInterpolation(stride=3)
+        right_state = LETKFCorr(
+            localization=self.localization, weight_mapping=weight_mapping
+        ).assimilate(self.state, self.obs, self.state, self.ana_time)
+        self.algorithm.weight_mapping = weight_mapping
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.algorithm.pool = pool
+            ret_state = self.algorithm.assimilate(self.state, self.obs,
+                                                  self.state, self.ana_time)
+        xr.testing.assert_allclose(ret_state, right_state)
+
+    def test_shared_memory_is_released_after_analysis(self):
+        before_shm = list_shared_memory()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.algorithm.pool = pool
+            _ = self.algorithm.assimilate(self.state, self.obs,
+                                          self.state, self.ana_time)
+        self.assertSetEqual(list_shared_memory(), before_shm)
+
+    def test_shared_memory_is_released_if_analysis_fails(self):
+        before_shm = list_shared_memory()
+        with patch.object(LETKFAnalyser, '__call__',
+                          side_effect=RuntimeError('test')):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                self.algorithm.pool = pool
+                with self.assertRaises(RuntimeError):
+                    _ = self.algorithm.assimilate(self.state, self.obs,
+                                                  self.state, self.ana_time)
+        self.assertSetEqual(list_shared_memory(), before_shm)
+
+    def test_analyse_shared_chunk_closes_blocks_if_analysis_fails(self):
+        shared_blocks = []
+        analyser = MagicMock(side_effect=RuntimeError('test'))
+        try:
+            shared_meta = {
+                key: _to_shared(np.zeros((2, 3)), shared_blocks)
+                for key in ('state_perts', 'normed_perts', 'normed_obs',
+                            'state_grid', 'obs_grid', 'analysis')
+            }
+            with patch('pytassim.assimilation.filter.letkf_shared.'
+                       '_close_shared') as close_patch:
+                with self.assertRaises(RuntimeError):
+                    _ = _analyse_shared_chunk(analyser, shared_meta, 0, 2)
+            close_patch.assert_called_once()
+            self.assertEqual(len(close_patch.call_args[0][0]), 6)
+            _close_shared(close_patch.call_args[0][0])
+        finally:
+            _close_shared(shared_blocks, unlink=True)
+
+    def test_analyse_shared_chunk_writes_analysis_in_place(self):
+        shared_blocks = []
+        grid = np.arange(20, dtype=float)[:, None]
+        obs_grid = np.arange(0, 20, 2, dtype=float)[:, None]
+        state_perts = rnd.normal(size=(2, 10, 20)).astype(np.float32)
+        normed_perts = rnd.normal(size=(10, 10)).astype(np.float32)
+        normed_obs = rnd.normal(size=(1, 10)).astype(np.float32)
+        analyser = LETKFAnalyser(localization=self.localization)
+        try:
+            shared_meta = {
+                'state_perts': _to_shared(state_perts, shared_blocks),
+                'normed_perts': _to_shared(normed_perts, shared_blocks),
+                'normed_obs': _to_shared(normed_obs, shared_blocks),
+                'state_grid': _to_shared(grid, shared_blocks),
+                'obs_grid': _to_shared(obs_grid, shared_blocks),
+            }
+            shared_meta['analysis'], analysis = _create_shared(
+                state_perts.shape, state_perts.dtype, shared_blocks
+            )
+            analysis[:] = 0
+            ret_len = _analyse_shared_chunk(analyser, shared_meta, 5, 12)
+            self.assertEqual(ret_len, 7)
+            right_perts = analyser(
+                torch.from_numpy(state_perts[..., 5:12]),
+                torch.from_numpy(normed_perts),
+                torch.from_numpy(normed_obs), grid[5:12], obs_grid
+            )
+            np.testing.assert_allclose(analysis[..., 5:12],
+                                       right_perts.numpy(), rtol=1E-6)
+            np.testing.assert_equal(analysis[..., :5], 0)
+            np.testing.assert_equal(analysis[..., 12:], 0)
+            del analysis
+        finally:
+            for shm in shared_blocks:
+                shm.close()
+                shm.unlink()
+
+    def test_uncorr_sets_correlated_to_false(self):
+        self.assertFalse(SharedMemoryLETKFUncorr()._correlated)
+        self.assertTrue(SharedMemoryLETKFCorr()._correlated)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,288 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+import os
+import pickle
+from unittest.mock import patch
+
+# External modules
+import xarray as xr
+import torch
+
+# Internal modules
+from pytassim.assimilation.filter.module_cache import CompiledModuleCache, \
+    CompiledModule, module_cache
+from pytassim.assimilation.filter.etkf_core import ETKFWeightsModule
+from pytassim.assimilation.filter.ketkf_core import KETKFWeightsModule
+from pytassim.assimilation.filter.letkf_core import LETKFAnalyser
+from pytassim.kernels import RBFKernel
+from pytassim.testing import dummy_obs_operator, DummyLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DATA_PATH = os.path.join(os.path.dirname(BASE_PATH), 'data')
+
+
+def identity(module):
+    return module
+
+
+class TestCompiledModuleCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = CompiledModuleCache()
+        self.perts = torch.randn(5, 10, dtype=torch.float64)
+        self.obs = torch.randn(1, 10, dtype=torch.float64)
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_get_compiles_module_once(self, script_patch):
+        compiled = self.cache.get(ETKFWeightsModule(1.2), torch.float64)
+        self.assertIsInstance(compiled, CompiledModule)
+        self.assertTrue(compiled.compiled)
+        ret_compiled = self.cache.get(ETKFWeightsModule(1.2), torch.float64)
+        self.assertEqual(id(ret_compiled), id(compiled))
+        script_patch.assert_called_once()
+        self.assertEqual(len(self.cache), 1)
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_key_depends_on_inf_factor_and_dtype(self, _):
+        compiled = self.cache.get(ETKFWeightsModule(1.2), torch.float64)
+        self.assertNotEqual(
+            id(compiled),
+            id(self.cache.get(ETKFWeightsModule(1.1), torch.float64))
+        )
+        self.assertNotEqual(
+            id(compiled),
+            id(self.cache.get(ETKFWeightsModule(1.2), torch.float32))
+        )
+        self.assertEqual(len(self.cache), 3)
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_key_depends_on_kernel(self, _):
+        compiled = self.cache.get(KETKFWeightsModule(RBFKernel()))
+        self.assertEqual(
+            id(compiled), id(self.cache.get(KETKFWeightsModule(RBFKernel())))
+        )
+        self.assertNotEqual(
+            id(compiled),
+            id(self.cache.get(KETKFWeightsModule(RBFKernel(gamma=torch.tensor(1.)))))
+        )
+        self.assertNotEqual(
+            id(compiled), id(self.cache.get(ETKFWeightsModule()))
+        )
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_trainable_tensors_are_not_shared(self, _):
+        inf_factor = torch.tensor(1.2, requires_grad=True)
+        compiled = self.cache.get(ETKFWeightsModule(inf_factor))
+        self.assertEqual(
+            id(compiled), id(self.cache.get(ETKFWeightsModule(inf_factor)))
+        )
+        other_factor = torch.tensor(1.2, requires_grad=True)
+        self.assertNotEqual(
+            id(compiled), id(self.cache.get(ETKFWeightsModule(other_factor)))
+        )
+
+    def test_get_without_method_uses_module(self):
+        self.cache.method = None
+        module = ETKFWeightsModule(1.2)
+        compiled = self.cache.get(module)
+        self.assertFalse(compiled.compiled)
+        self.assertEqual(id(compiled.module), id(module))
+
+    @patch('torch.jit.script', side_effect=RuntimeError('test'))
+    def test_get_falls_back_to_module_if_compilation_fails(self, _):
+        module = ETKFWeightsModule(1.2)
+        with self.assertLogs(level=logging.WARNING):
+            compiled = self.cache.get(module)
+        self.assertFalse(compiled.compiled)
+        self.assertEqual(id(compiled.module), id(module))
+
+    @patch('torch.jit.script', side_effect=TypeError('test'))
+    def test_get_falls_back_for_any_compilation_error(self, _):
+        module = ETKFWeightsModule(1.2)
+        with self.assertLogs(level=logging.WARNING):
+            compiled = self.cache.get(module)
+        self.assertFalse(compiled.compiled)
+        self.assertEqual(id(compiled.module), id(module))
+
+    def test_compiled_module_falls_back_if_call_fails(self):
+        module = ETKFWeightsModule(1.2)
+
+        def failing_module(*args, **kwargs):
+            raise RuntimeError('test')
+
+        with patch('torch.jit.script', return_value=failing_module):
+            compiled = self.cache.get(module, torch.float64)
+        self.assertTrue(compiled.compiled)
+        with self.assertLogs(level=logging.WARNING):
+            weights = compiled(self.perts, self.obs)
+        torch.testing.assert_close(weights[0], module(self.perts,
+                                                      self.obs)[0])
+        self.assertFalse(compiled.compiled)
+        self.assertEqual(id(compiled.module), id(module))
+        self.assertFalse(self.cache.get_timings()[0]['compiled'])
+        self.assertEqual(compiled.n_calls, 1)
+
+    def test_compiled_module_raises_if_original_fails(self):
+        module = ETKFWeightsModule(1.2)
+        compiled = CompiledModule(module, 'test', None, True, 0.,
+                                  original=module)
+        with self.assertRaises(ValueError):
+            compiled(self.perts, self.obs[..., :5])
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_key_uses_digest_of_tensor_values(self, _):
+        gamma = torch.ones(1000)
+        key = self.cache.get_key(KETKFWeightsModule(RBFKernel(gamma=gamma)))
+        self.assertLess(len(repr(key)), 2000)
+        self.assertEqual(
+            key, self.cache.get_key(
+                KETKFWeightsModule(RBFKernel(gamma=gamma.clone()))
+            )
+        )
+        gamma[10] = 2.
+        self.assertNotEqual(
+            key,
+            self.cache.get_key(KETKFWeightsModule(RBFKernel(gamma=gamma)))
+        )
+
+    def test_get_raises_value_error_for_unknown_method(self):
+        self.cache.method = 'test'
+        with self.assertRaises(ValueError):
+            self.cache.get(ETKFWeightsModule(1.2))
+
+    @patch('torch.compile', side_effect=identity, create=True)
+    def test_get_uses_torch_compile(self, compile_patch):
+        self.cache.method = 'compile'
+        compiled = self.cache.get(ETKFWeightsModule(1.2))
+        compile_patch.assert_called_once()
+        self.assertTrue(compiled.compiled)
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_compiled_module_records_timings(self, _):
+        module = ETKFWeightsModule(1.2)
+        compiled = self.cache.get(module, torch.float64)
+        weights = compiled(self.perts, self.obs)
+        torch.testing.assert_close(weights[0], module(self.perts,
+                                                      self.obs)[0])
+        _ = compiled(self.perts, self.obs)
+        timings = self.cache.get_timings()
+        self.assertEqual(len(timings), 1)
+        self.assertEqual(timings[0]['n_calls'], 2)
+        self.assertEqual(timings[0]['dtype'], 'torch.float64')
+        self.assertGreater(timings[0]['run_time'], 0)
+        self.assertGreaterEqual(timings[0]['compile_time'], 0)
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_cache_removes_least_recently_used(self, _):
+        self.cache.max_items = 2
+        compiled = self.cache.get(ETKFWeightsModule(1.0))
+        _ = self.cache.get(ETKFWeightsModule(1.1))
+        _ = self.cache.get(ETKFWeightsModule(1.0))
+        _ = self.cache.get(ETKFWeightsModule(1.2))
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(id(compiled),
+                         id(self.cache.get(ETKFWeightsModule(1.0))))
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+class TestAnalyserModuleCache(unittest.TestCase):
+    def setUp(self):
+        state_path = os.path.join(DATA_PATH, 'test_state.nc')
+        state = xr.open_dataarray(state_path).load().isel(time=0)
+        obs_path = os.path.join(DATA_PATH, 'test_single_obs.nc')
+        obs = xr.open_dataset(obs_path).load().isel(time=0)
+        obs.obs.operator = dummy_obs_operator
+        pseudo_state = obs.obs.operator(obs, state)
+        self.state_perts = torch.from_numpy(
+            (state-state.mean('ensemble')).values
+        ).float()
+        self.normed_perts = torch.from_numpy(
+            (pseudo_state - pseudo_state.mean('ensemble')).values
+        ).float().view(-1, 40)
+        self.normed_obs = torch.from_numpy(
+            (obs['observations'] - pseudo_state.mean('ensemble')).values
+        ).float().view(1, 40)
+        self.obs_grid = obs['obs_grid_1'].values.reshape(-1, 1)
+        self.state_grid = state.grid.values.reshape(-1, 1)
+        self.analyser = LETKFAnalyser(localization=DummyLocalization(),
+                                      inf_factor=1.2, batch_size=10)
+        module_cache.clear()
+
+    def tearDown(self):
+        module_cache.clear()
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_analyser_compiles_weights_once(self, script_patch):
+        self.assertIsNone(self.analyser.compiled_weights)
+        for _ in range(2):
+            _ = self.analyser.get_analysis_perts(
+                self.state_perts, self.normed_perts, self.normed_obs,
+                self.state_grid, self.obs_grid
+            )
+        script_patch.assert_called_once()
+        self.assertIsInstance(self.analyser.compiled_weights, CompiledModule)
+        self.assertEqual(self.analyser.compiled_weights.n_calls, 8)
+        other_analyser = LETKFAnalyser(localization=DummyLocalization(),
+                                       inf_factor=1.2, batch_size=10)
+        _ = other_analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        script_patch.assert_called_once()
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_new_inf_factor_resets_compiled_weights(self, _):
+        _ = self.analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        self.assertIsNotNone(self.analyser.compiled_weights)
+        self.analyser.inf_factor = 1.1
+        self.assertIsNone(self.analyser.compiled_weights)
+
+    @patch('torch.jit.script', side_effect=identity)
+    def test_pickled_analyser_has_no_compiled_weights(self, _):
+        _ = self.analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        ret_analyser = pickle.loads(pickle.dumps(self.analyser))
+        self.assertIsNone(ret_analyser.compiled_weights)
+        self.assertIsNotNone(self.analyser.compiled_weights)
+
+    def test_pickled_analyser_keeps_solver(self):
+        self.analyser.gen_weights.solver = 'svd'
+        ret_analyser = pickle.loads(pickle.dumps(self.analyser))
+        self.assertEqual(ret_analyser.gen_weights.solver, 'svd')
+
+
+if __name__ == '__main__':
+    unittest.main()
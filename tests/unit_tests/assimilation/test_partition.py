@@ -0,0 +1,130 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+from unittest.mock import patch
+import logging
+
+# External modules
+import numpy as np
+
+# Internal modules
+from pytassim.assimilation.filter.partition import estimate_costs, \
+    get_chunk_pos, get_chunk_costs, partition_grid, estimate_chunksize
+from pytassim.testing import DummyLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestPartition(unittest.TestCase):
+    def setUp(self):
+        self.grid = np.arange(100, dtype=float)[:, None]
+        self.obs_grid = np.concatenate([np.arange(0, 20, 0.25),
+                                        np.arange(20, 100, 4)])[:, None]
+        self.localization = DummyLocalization()
+
+    def test_estimate_costs_uses_count_obs(self):
+        n_obs = self.localization.count_obs(self.grid, self.obs_grid)
+        ret_costs = estimate_costs(self.localization, self.grid,
+                                   self.obs_grid, ens_size=10)
+        np.testing.assert_equal(ret_costs, 1000 + 100 * n_obs)
+
+    def test_estimate_costs_interpolates_strided_samples(self):
+        n_obs = self.localization.count_obs(self.grid, self.obs_grid)
+        with patch.object(DummyLocalization, 'count_obs',
+                          wraps=self.localization.count_obs) as count_patch:
+            ret_costs = estimate_costs(self.localization, self.grid,
+                                       self.obs_grid, ens_size=10,
+                                       n_samples=12)
+        count_patch.assert_called_once()
+        sample_grid = count_patch.call_args[0][0]
+        self.assertEqual(len(sample_grid), 12)
+        sample_ind = sample_grid[:, 0].astype(int)
+        self.assertEqual(sample_ind[0], 0)
+        self.assertEqual(sample_ind[-1], 99)
+        np.testing.assert_equal(ret_costs[sample_ind],
+                                1000 + 100 * n_obs[sample_ind])
+        self.assertEqual(len(ret_costs), 100)
+        right_costs = 1000 + 100 * n_obs
+        self.assertLess(
+            np.abs(ret_costs.sum() - right_costs.sum()) / right_costs.sum(),
+            0.05
+        )
+
+    def test_get_chunk_pos_returns_fixed_chunks_without_costs(self):
+        ret_pos = get_chunk_pos(100, 30)
+        np.testing.assert_equal(ret_pos, np.array([0, 30, 60, 90, 100]))
+
+    def test_get_chunk_pos_balances_costs(self):
+        costs = np.ones(100)
+        costs[:20] = 10
+        ret_pos = get_chunk_pos(100, 25, costs)
+        self.assertEqual(len(ret_pos), 5)
+        self.assertEqual(ret_pos[0], 0)
+        self.assertEqual(ret_pos[-1], 100)
+        chunk_costs = get_chunk_costs(costs, ret_pos)
+        fixed_costs = get_chunk_costs(costs, get_chunk_pos(100, 25))
+        self.assertLess(chunk_costs.max(), fixed_costs.max())
+        self.assertLessEqual(chunk_costs.max() - costs.sum() / 4, costs.max())
+
+    def test_get_chunk_costs_sums_costs(self):
+        costs = np.arange(10)
+        ret_costs = get_chunk_costs(costs, np.array([0, 3, 10]))
+        np.testing.assert_equal(ret_costs, np.array([3, 42]))
+
+    def test_partition_grid_without_balance_does_not_count_obs(self):
+        with patch.object(DummyLocalization, 'count_obs') as count_patch:
+            ret_pos, ret_costs = partition_grid(
+                100, 30, self.localization, self.grid, self.obs_grid, 10,
+                balance=False
+            )
+        count_patch.assert_not_called()
+        np.testing.assert_equal(ret_pos, get_chunk_pos(100, 30))
+        np.testing.assert_equal(ret_costs, np.array([30, 30, 30, 10]))
+
+    def test_partition_grid_balances_by_local_obs(self):
+        ret_pos, ret_costs = partition_grid(
+            100, 25, self.localization, self.grid, self.obs_grid, 10,
+            balance=True
+        )
+        costs = estimate_costs(self.localization, self.grid, self.obs_grid,
+                               10)
+        np.testing.assert_equal(ret_pos, get_chunk_pos(100, 25, costs))
+        self.assertLess(ret_pos[1], 25)
+
+    def test_estimate_chunksize_targets_duration(self):
+        self.assertEqual(estimate_chunksize(1000, 0.01, 0., 0.5), 50)
+
+    def test_estimate_chunksize_respects_overhead(self):
+        self.assertEqual(estimate_chunksize(1000, 0.01, 0.1, 0.5), 100)
+
+    def test_estimate_chunksize_gives_chunk_to_every_worker(self):
+        self.assertEqual(estimate_chunksize(1000, 0.01, 0., 100., 4), 250)
+        self.assertEqual(estimate_chunksize(1000, 1., 0., 0.01, 4), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,365 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+
+# External modules
+import numpy as np
+import pandas as pd
+import torch
+
+# Internal modules
+from pytassim.assimilation.filter.weight_mapping import WeightInterpolation, \
+    ColumnWeights, TileWeights, ChunkWeightMapping
+from pytassim.assimilation.filter.letkf_core import LETKFAnalyser
+from pytassim.testing import DummyLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+rnd = np.random.RandomState(42)
+
+
+def interp_values(values, map_ind, map_weights):
+    return np.sum(values[map_ind] * map_weights, axis=-1)
+
+
+class TestWeightInterpolation(unittest.TestCase):
+    def setUp(self):
+        self.grid_1d = np.arange(40, dtype=float).reshape(-1, 1)
+        rlat, rlon = np.meshgrid(np.linspace(-2, 2, 10), np.arange(8) * 0.5,
+                                 indexing='ij')
+        self.grid_2d = np.stack([rlat.reshape(-1), rlon.reshape(-1)], axis=-1)
+
+    def test_init_raises_value_error_if_no_stride_or_points(self):
+        with self.assertRaises(ValueError):
+            WeightInterpolation()
+
+    def test_init_raises_value_error_for_unknown_method(self):
+        with self.assertRaises(ValueError):
+            WeightInterpolation(stride=2, method='cubic')
+
+    def test_stride_returns_strided_weight_grid_with_last_point(self):
+        mapping = WeightInterpolation(stride=4)
+        weight_grid, _, _ = mapping.get_mapping(self.grid_1d)
+        right_grid = np.append(np.arange(0, 40, 4), 39).reshape(-1, 1)
+        np.testing.assert_equal(weight_grid, right_grid)
+
+    def test_linear_interpolation_1d_is_exact_for_linear_function(self):
+        mapping = WeightInterpolation(stride=4)
+        weight_grid, map_ind, map_weights = mapping.get_mapping(self.grid_1d)
+        self.assertTupleEqual(map_ind.shape, (40, 2))
+        np.testing.assert_almost_equal(map_weights.sum(axis=-1), 1)
+        values = 2 * weight_grid[:, 0] + 1
+        ret_values = interp_values(values, map_ind, map_weights)
+        np.testing.assert_almost_equal(ret_values, 2 * self.grid_1d[:, 0] + 1)
+
+    def test_bilinear_interpolation_is_exact_for_bilinear_function(self):
+        mapping = WeightInterpolation(stride=(3, 2))
+        weight_grid, map_ind, map_weights = mapping.get_mapping(self.grid_2d)
+        self.assertTupleEqual(weight_grid.shape, (4 * 5, 2))
+        self.assertTupleEqual(map_ind.shape, (80, 4))
+
+        def func(grid):
+            return 1 + 2 * grid[:, 0] - grid[:, 1] + 0.5 * grid[:, 0] * \
+                   grid[:, 1]
+        ret_values = interp_values(func(weight_grid), map_ind, map_weights)
+        np.testing.assert_almost_equal(ret_values, func(self.grid_2d))
+
+    def test_weight_points_are_mapped_to_themselves(self):
+        mapping = WeightInterpolation(stride=(3, 2))
+        weight_grid, map_ind, map_weights = mapping.get_mapping(self.grid_2d)
+        values = rnd.normal(size=len(weight_grid))
+        ret_values = interp_values(values, map_ind, map_weights)
+        for k, point in enumerate(weight_grid):
+            grid_pos = np.nonzero(np.all(self.grid_2d == point, axis=-1))[0]
+            np.testing.assert_almost_equal(ret_values[grid_pos], values[k])
+
+    def test_nearest_interpolation_uses_nearest_weight_point(self):
+        mapping = WeightInterpolation(stride=4, method='nearest')
+        weight_grid, map_ind, map_weights = mapping.get_mapping(self.grid_1d)
+        self.assertTupleEqual(map_ind.shape, (40, 1))
+        np.testing.assert_equal(map_weights, 1)
+        dist = np.abs(self.grid_1d - weight_grid.T)
+        np.testing.assert_equal(
+            np.min(dist, axis=-1), dist[np.arange(40), map_ind[:, 0]]
+        )
+
+    def test_points_select_weight_grid(self):
+        points = [0, 5, 17, 39]
+        mapping = WeightInterpolation(points=points)
+        weight_grid, map_ind, map_weights = mapping.get_mapping(self.grid_1d)
+        np.testing.assert_equal(weight_grid, self.grid_1d[points])
+        values = 3 * weight_grid[:, 0]
+        ret_values = interp_values(values, map_ind, map_weights)
+        np.testing.assert_almost_equal(ret_values, 3 * self.grid_1d[:, 0])
+
+    def test_irregular_points_use_nearest_neighbour(self):
+        points = [0, 13, 27, 51, 79]
+        mapping = WeightInterpolation(points=points, method='nearest')
+        weight_grid, map_ind, map_weights = mapping.get_mapping(self.grid_2d)
+        np.testing.assert_equal(weight_grid, self.grid_2d[points])
+        dist = np.linalg.norm(
+            self.grid_2d[:, None, :] - weight_grid[None, ...], axis=-1
+        )
+        np.testing.assert_equal(map_ind[:, 0], np.argmin(dist, axis=-1))
+
+    def test_irregular_points_raise_value_error_for_linear(self):
+        mapping = WeightInterpolation(points=[0, 13, 27, 51, 79])
+        with self.assertRaises(ValueError):
+            mapping.get_mapping(self.grid_2d)
+
+    def test_stride_raises_value_error_for_incomplete_grid(self):
+        mapping = WeightInterpolation(stride=2)
+        with self.assertRaises(ValueError):
+            mapping.get_mapping(self.grid_2d[:-1])
+
+
+class TestColumnWeights(unittest.TestCase):
+    def setUp(self):
+        hgrid, vgrid = np.meshgrid(np.arange(10), np.arange(5) * 100.,
+                                   indexing='ij')
+        self.grid = np.stack([hgrid.reshape(-1), vgrid.reshape(-1)], axis=-1)
+        self.state_grid = pd.MultiIndex.from_arrays(
+            self.grid.T, names=['rlon', 'vgrid']
+        )
+        self.obs_grid = np.stack(
+            [np.arange(10) + 0.5, np.zeros(10)], axis=-1
+        )
+        self.normed_perts = torch.from_numpy(
+            rnd.normal(size=(10, 10))
+        ).float()
+        self.normed_obs = torch.from_numpy(rnd.normal(size=(1, 10))).float()
+        self.state_perts = torch.from_numpy(rnd.normal(size=(10, 50))).float()
+
+    def test_get_mapping_groups_grid_points_into_columns(self):
+        weight_grid, map_ind, map_weights = ColumnWeights().get_mapping(
+            self.grid
+        )
+        self.assertTupleEqual(weight_grid.shape, (10, 2))
+        np.testing.assert_equal(weight_grid[:, 0], np.arange(10))
+        np.testing.assert_equal(weight_grid[:, 1], 0)
+        np.testing.assert_equal(map_ind[:, 0], np.repeat(np.arange(10), 5))
+        np.testing.assert_equal(map_weights, 1)
+
+    def test_vertical_coord_specifies_column_coordinates(self):
+        weight_grid, map_ind, _ = ColumnWeights(vertical_coord=0).get_mapping(
+            self.grid
+        )
+        self.assertTupleEqual(weight_grid.shape, (5, 2))
+        np.testing.assert_equal(map_ind[:, 0], np.tile(np.arange(5), 10))
+
+    def test_taper_adds_identity_weights(self):
+        mapping = ColumnWeights(taper=lambda z: 1 - z / 400.)
+        _, map_ind, map_weights = mapping.get_mapping(self.grid)
+        self.assertTupleEqual(map_ind.shape, (50, 2))
+        np.testing.assert_equal(map_ind[:, 1], -1)
+        np.testing.assert_almost_equal(map_weights[:, 0],
+                                       1 - self.grid[:, 1] / 400.)
+        np.testing.assert_almost_equal(map_weights.sum(axis=-1), 1)
+
+    def test_get_mapping_raises_value_error_for_one_coordinate(self):
+        with self.assertRaises(ValueError):
+            ColumnWeights().get_mapping(self.grid[:, :1])
+
+    def test_column_weights_equal_weights_for_horizontal_localization(self):
+        analyser = LETKFAnalyser(localization=DummyLocalization(),
+                                 batch_size=7)
+        right_perts = analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        analyser.weight_mapping = ColumnWeights()
+        ret_perts = analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        torch.testing.assert_allclose(ret_perts, right_perts)
+
+    def test_zero_taper_returns_prior_perturbations(self):
+        analyser = LETKFAnalyser(
+            localization=DummyLocalization(),
+            weight_mapping=ColumnWeights(taper=lambda z: (z < 250.) * 1.)
+        )
+        ret_perts = analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        upper_levels = self.grid[:, 1] > 250.
+        torch.testing.assert_allclose(ret_perts[:, upper_levels],
+                                      self.state_perts[:, upper_levels])
+        self.assertFalse(torch.allclose(ret_perts[:, ~upper_levels],
+                                        self.state_perts[:, ~upper_levels]))
+
+
+class TestChunkWeightMapping(unittest.TestCase):
+    def setUp(self):
+        hgrid, vgrid = np.meshgrid(np.arange(10), np.arange(5) * 100.,
+                                   indexing='ij')
+        self.grid = np.stack([hgrid.reshape(-1), vgrid.reshape(-1)], axis=-1)
+        self.mapping = ColumnWeights(taper=lambda z: 1 - z / 400.)
+        self.chunk_pos = np.array([0, 7, 20, 21, 50])
+
+    def test_split_keeps_mapping_of_whole_grid(self):
+        weight_grid, map_ind, map_weights = self.mapping.get_mapping(
+            self.grid
+        )
+        chunk_mappings = self.mapping.split(self.grid, self.chunk_pos)
+        self.assertEqual(len(chunk_mappings), 4)
+        for k, chunk_mapping in enumerate(chunk_mappings):
+            chunk_slice = slice(self.chunk_pos[k], self.chunk_pos[k+1])
+            ret_grid, ret_ind, ret_weights = chunk_mapping.get_mapping(
+                self.grid[chunk_slice]
+            )
+            np.testing.assert_equal(ret_ind < 0, map_ind[chunk_slice] < 0)
+            is_weight = ret_ind >= 0
+            np.testing.assert_equal(
+                ret_grid[ret_ind[is_weight]],
+                weight_grid[map_ind[chunk_slice][is_weight]]
+            )
+            np.testing.assert_equal(ret_weights, map_weights[chunk_slice])
+            self.assertEqual(len(ret_grid),
+                             len(np.unique(ret_ind[is_weight])))
+
+    def test_get_mapping_raises_value_error_for_wrong_grid(self):
+        chunk_mapping = self.mapping.split(self.grid, self.chunk_pos)[0]
+        with self.assertRaises(ValueError):
+            chunk_mapping.get_mapping(self.grid)
+
+    def test_split_analysers_equal_analysis_of_whole_grid(self):
+        normed_perts = torch.from_numpy(rnd.normal(size=(10, 10)))
+        normed_obs = torch.from_numpy(rnd.normal(size=(1, 10)))
+        state_perts = torch.from_numpy(rnd.normal(size=(10, 50)))
+        obs_grid = np.stack([np.arange(10) + 0.5, np.zeros(10)], axis=-1)
+        analyser = LETKFAnalyser(localization=DummyLocalization(),
+                                 weight_mapping=self.mapping)
+        right_perts = analyser.get_analysis_perts(
+            state_perts, normed_perts, normed_obs, self.grid, obs_grid
+        )
+        analysers = analyser.split(self.grid, self.chunk_pos)
+        ret_perts = torch.cat([
+            chunk_analyser.get_analysis_perts(
+                state_perts[:, start:end], normed_perts, normed_obs,
+                self.grid[start:end], obs_grid
+            )
+            for chunk_analyser, start, end in zip(
+                analysers, self.chunk_pos[:-1], self.chunk_pos[1:]
+            )
+        ], dim=-1)
+        torch.testing.assert_allclose(ret_perts, right_perts)
+        self.assertIsInstance(analysers[0].weight_mapping, ChunkWeightMapping)
+        self.assertIs(analyser.weight_mapping, self.mapping)
+
+
+class TestTileWeights(unittest.TestCase):
+    def setUp(self):
+        rlat, rlon = np.meshgrid(np.linspace(-2, 2, 10), np.arange(8) * 0.5,
+                                 indexing='ij')
+        self.grid = np.stack([rlat.reshape(-1), rlon.reshape(-1)], axis=-1)
+        self.state_grid = pd.MultiIndex.from_arrays(
+            self.grid.T, names=['rlat', 'rlon']
+        )
+        self.obs_grid = np.stack(
+            [np.linspace(-2, 2, 10) + 0.1, np.zeros(10)], axis=-1
+        )
+        self.normed_perts = torch.from_numpy(
+            rnd.normal(size=(10, 10))
+        ).float()
+        self.normed_obs = torch.from_numpy(rnd.normal(size=(1, 10))).float()
+        self.state_perts = torch.from_numpy(rnd.normal(size=(10, 80))).float()
+
+    def test_init_raises_value_error_for_unknown_method(self):
+        with self.assertRaises(ValueError):
+            TileWeights(2, method='cubic')
+
+    def test_init_raises_value_error_for_empty_tiles(self):
+        with self.assertRaises(ValueError):
+            TileWeights(0)
+
+    def test_constant_tiles_map_grid_points_to_tile_centres(self):
+        weight_grid, map_ind, map_weights = TileWeights(5).get_mapping(
+            self.grid
+        )
+        rlat = np.linspace(-2, 2, 10)
+        rlon = np.arange(8) * 0.5
+        self.assertTupleEqual(weight_grid.shape, (4, 2))
+        np.testing.assert_almost_equal(
+            np.unique(weight_grid[:, 0]),
+            [(rlat[0]+rlat[4])/2, (rlat[5]+rlat[9])/2]
+        )
+        np.testing.assert_almost_equal(
+            np.unique(weight_grid[:, 1]),
+            [(rlon[0]+rlon[4])/2, (rlon[5]+rlon[7])/2]
+        )
+        self.assertTupleEqual(map_ind.shape, (80, 1))
+        np.testing.assert_equal(map_weights, 1)
+        tile_dist = np.abs(weight_grid[map_ind[:, 0]]-self.grid)
+        self.assertTrue(np.all(tile_dist[:, 0] <= (rlat[4]-rlat[0])/2+1E-8))
+        self.assertTrue(np.all(tile_dist[:, 1] <= 1.))
+
+    def test_tile_size_can_be_set_per_coordinate(self):
+        weight_grid, _, _ = TileWeights((5, 2)).get_mapping(self.grid)
+        self.assertTupleEqual(weight_grid.shape, (8, 2))
+
+    def test_coords_specifies_tiled_coordinates(self):
+        weight_grid, map_ind, _ = TileWeights(5, coords=(0, )).get_mapping(
+            self.grid
+        )
+        self.assertTupleEqual(weight_grid.shape, (2, 2))
+        np.testing.assert_equal(weight_grid[:, 1], self.grid[0, 1])
+        np.testing.assert_equal(map_ind[:, 0], np.repeat([0, 1], 40))
+
+    def test_linear_tiles_interpolate_between_tile_centres(self):
+        mapping = TileWeights(2, method='linear')
+        weight_grid, map_ind, map_weights = mapping.get_mapping(self.grid)
+        self.assertTupleEqual(weight_grid.shape, (20, 2))
+        values = 2 * weight_grid[:, 0] - 3 * weight_grid[:, 1]
+        inside = np.logical_and.reduce([
+            self.grid[:, 0] >= weight_grid[:, 0].min(),
+            self.grid[:, 0] <= weight_grid[:, 0].max(),
+            self.grid[:, 1] >= weight_grid[:, 1].min(),
+            self.grid[:, 1] <= weight_grid[:, 1].max(),
+        ])
+        np.testing.assert_almost_equal(
+            interp_values(values, map_ind, map_weights)[inside],
+            (2 * self.grid[:, 0] - 3 * self.grid[:, 1])[inside]
+        )
+
+    def test_single_point_tiles_equal_unmapped_analysis(self):
+        analyser = LETKFAnalyser(localization=DummyLocalization())
+        right_perts = analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        analyser.weight_mapping = TileWeights(1)
+        ret_perts = analyser.get_analysis_perts(
+            self.state_perts, self.normed_perts, self.normed_obs,
+            self.state_grid, self.obs_grid
+        )
+        torch.testing.assert_allclose(ret_perts, right_perts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+import os
+import tempfile
+import functools
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# External modules
+import numpy as np
+import scipy.sparse
+
+# Internal modules
+from pytassim.localization.cache import CachedLocalization
+from pytassim.localization.gaspari_cohn import GaspariCohn
+from pytassim.localization.nearest import NearestLocalization
+from pytassim.testing import dummy_distance
+
+
+def _scaled_distance(x, y, scale=1.):
+    return scale * np.abs(x-y)
+
+
+def _get_scaled_distance(scale):
+    return lambda x, y: scale * np.abs(x-y)
+
+
+class _UnstableDistance(object):
+    __slots__ = ()
+
+    def __call__(self, x, y):
+        return np.abs(x-y)
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestCachedLocalization(unittest.TestCase):
+    def setUp(self):
+        self.state_grid = np.arange(40, dtype=float)
+        self.obs_grid = np.arange(0, 40, 2, dtype=float)
+        self.base_loc = GaspariCohn(5., dist_func=dummy_distance)
+        self.localization = CachedLocalization(self.base_loc)
+
+    def test_localize_all_returns_matrix_of_wrapped_localization(self):
+        right_matrix = self.base_loc.localize_all(self.state_grid,
+                                                  self.obs_grid)
+        ret_matrix = self.localization.localize_all(self.state_grid,
+                                                    self.obs_grid)
+        np.testing.assert_equal(ret_matrix.toarray(), right_matrix.toarray())
+
+    def test_localize_obs_calls_wrapped_localization(self):
+        use_obs, weights = self.base_loc.localize_obs(10, self.obs_grid)
+        ret_use_obs, ret_weights = self.localization.localize_obs(
+            10, self.obs_grid
+        )
+        np.testing.assert_equal(ret_use_obs, use_obs)
+        np.testing.assert_equal(ret_weights, weights)
+
+    def test_localize_all_uses_memory_cache(self):
+        with patch.object(GaspariCohn, 'localize_all', autospec=True,
+                          side_effect=GaspariCohn.localize_all) as loc_patch:
+            first_matrix = self.localization.localize_all(self.state_grid,
+                                                          self.obs_grid)
+            second_matrix = self.localization.localize_all(
+                self.state_grid.copy(), self.obs_grid.copy()
+            )
+        loc_patch.assert_called_once()
+        self.assertEqual(id(first_matrix), id(second_matrix))
+
+    def test_get_key_depends_on_grids_and_params(self):
+        key = self.localization.get_key(self.state_grid, self.obs_grid)
+        self.assertEqual(
+            key, self.localization.get_key(self.state_grid.copy(),
+                                           self.obs_grid.copy())
+        )
+        self.assertNotEqual(
+            key, self.localization.get_key(self.state_grid, self.obs_grid+1)
+        )
+        self.assertNotEqual(
+            key, self.localization.get_key(self.state_grid[:-1],
+                                           self.obs_grid)
+        )
+        self.base_loc.radius = np.array([3.])
+        self.assertNotEqual(
+            key, self.localization.get_key(self.state_grid, self.obs_grid)
+        )
+
+    def _get_loc_key(self, localization, **kwargs):
+        return CachedLocalization(localization, **kwargs).get_key(
+            self.state_grid, self.obs_grid
+        )
+
+    def test_get_key_depends_on_nested_localization(self):
+        self.assertNotEqual(
+            self._get_loc_key(NearestLocalization(
+                GaspariCohn(3., dist_func=dummy_distance), 4
+            )),
+            self._get_loc_key(NearestLocalization(
+                GaspariCohn(9., dist_func=dummy_distance), 4
+            ))
+        )
+
+    def test_get_key_depends_on_function_code(self):
+        abs_key = self._get_loc_key(
+            GaspariCohn(3., dist_func=lambda x, y: np.abs(x-y))
+        )
+        self.assertEqual(abs_key, self._get_loc_key(
+            GaspariCohn(3., dist_func=lambda x, y: np.abs(x-y))
+        ))
+        self.assertNotEqual(abs_key, self._get_loc_key(
+            GaspariCohn(3., dist_func=lambda x, y: np.square(x-y))
+        ))
+        self.assertNotEqual(abs_key, self._get_loc_key(
+            GaspariCohn(3., dist_func=lambda x, y: 2 * np.abs(x-y))
+        ))
+
+    def test_get_key_depends_on_closure(self):
+        self.assertNotEqual(
+            self._get_loc_key(GaspariCohn(
+                3., dist_func=_get_scaled_distance(2.)
+            )),
+            self._get_loc_key(GaspariCohn(
+                3., dist_func=_get_scaled_distance(3.)
+            ))
+        )
+
+    def test_get_key_depends_on_partial_arguments(self):
+        self.assertNotEqual(
+            self._get_loc_key(GaspariCohn(
+                3., dist_func=functools.partial(_scaled_distance, scale=2.)
+            )),
+            self._get_loc_key(GaspariCohn(
+                3., dist_func=functools.partial(_scaled_distance, scale=3.)
+            ))
+        )
+
+    def test_get_key_raises_typeerror_for_unstable_param(self):
+        localization = GaspariCohn(3., dist_func=_UnstableDistance())
+        with self.assertRaises(TypeError):
+            _ = self._get_loc_key(localization)
+        self.assertNotEqual(
+            self._get_loc_key(localization, cache_key='v1'),
+            self._get_loc_key(localization, cache_key='v2')
+        )
+
+    def test_pickle_drops_memory_cache(self):
+        self.localization = CachedLocalization(
+            GaspariCohn(5., dist_func=_scaled_distance)
+        )
+        _ = self.localization.localize_all(self.state_grid, self.obs_grid)
+        ret_localization = pickle.loads(pickle.dumps(self.localization))
+        self.assertFalse(ret_localization._memory_cache)
+        self.assertEqual(
+            ret_localization.get_key(self.state_grid, self.obs_grid),
+            self.localization.get_key(self.state_grid, self.obs_grid)
+        )
+        _ = ret_localization.localize_all(self.state_grid, self.obs_grid)
+        self.assertEqual(len(ret_localization._memory_cache), 1)
+
+    def test_memory_cache_is_thread_safe(self):
+        self.localization.max_items = 3
+        grids = [self.state_grid + shift for shift in range(20)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            ret_matrices = list(executor.map(
+                lambda grid: self.localization.localize_all(
+                    grid, self.obs_grid
+                ), grids
+            ))
+        self.assertEqual(len(self.localization._memory_cache), 3)
+        for grid, ret_matrix in zip(grids, ret_matrices):
+            right_matrix = self.base_loc.localize_all(grid, self.obs_grid)
+            np.testing.assert_equal(ret_matrix.toarray(),
+                                    right_matrix.toarray())
+
+    def test_memory_cache_removes_least_recently_used(self):
+        self.localization.max_items = 2
+        for shift in range(3):
+            _ = self.localization.localize_all(self.state_grid+shift,
+                                               self.obs_grid)
+        self.assertEqual(len(self.localization._memory_cache), 2)
+        first_key = self.localization.get_key(self.state_grid, self.obs_grid)
+        self.assertNotIn(first_key, self.localization._memory_cache)
+
+    def test_localize_all_uses_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.localization.cache_dir = cache_dir
+            right_matrix = self.localization.localize_all(self.state_grid,
+                                                          self.obs_grid)
+            key = self.localization.get_key(self.state_grid, self.obs_grid)
+            self.assertTrue(
+                os.path.isfile(self.localization._get_cache_path(key))
+            )
+            new_localization = CachedLocalization(
+                GaspariCohn(5., dist_func=dummy_distance), cache_dir=cache_dir
+            )
+            with patch.object(GaspariCohn, 'localize_all') as loc_patch:
+                ret_matrix = new_localization.localize_all(self.state_grid,
+                                                           self.obs_grid)
+            loc_patch.assert_not_called()
+        self.assertIsInstance(ret_matrix, scipy.sparse.csr_matrix)
+        np.testing.assert_equal(ret_matrix.toarray(), right_matrix.toarray())
+
+    def test_clear_clears_memory_cache(self):
+        _ = self.localization.localize_all(self.state_grid, self.obs_grid)
+        self.localization.clear()
+        self.assertFalse(self.localization._memory_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
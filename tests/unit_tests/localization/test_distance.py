@@ -0,0 +1,196 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+
+# External modules
+import numpy as np
+import torch
+
+# Internal modules
+from pytassim.localization.distance import *
+from pytassim.localization.gaspari_cohn import GaspariCohn
+from pytassim.localization.cache import CachedLocalization
+
+
+logging.basicConfig(level=logging.INFO)
+
+rnd = np.random.RandomState(42)
+
+
+class TestDistance(unittest.TestCase):
+    def setUp(self):
+        self.grid = np.stack([
+            rnd.uniform(-80, 80, size=100), rnd.uniform(0, 360, size=100),
+            rnd.uniform(100, 1000, size=100)
+        ], axis=-1)
+        self.distances = [
+            EuclideanDistance(), EuclideanDistance(coords=[1]),
+            CyclicDistance(360., coord=1), HaversineDistance(),
+            ChordDistance(), LogPressureDistance(scale_height=7.)
+        ]
+
+    def test_numpy_torch_equal(self):
+        for dist_func in self.distances:
+            np_dist = dist_func(self.grid[:, None], self.grid[None, :])
+            torch_dist = dist_func(torch.from_numpy(self.grid[:, None]),
+                                   self.grid[None, :])
+            self.assertIsInstance(np_dist, np.ndarray)
+            self.assertIsInstance(torch_dist, torch.Tensor)
+            self.assertTupleEqual(np_dist.shape, (100, 100))
+            np.testing.assert_allclose(torch_dist.numpy(), np_dist,
+                                       atol=1E-6)
+
+    def test_to_coords_is_lower_bound(self):
+        for dist_func in self.distances:
+            coords = dist_func.to_coords(self.grid)
+            euc_dist = np.sqrt(
+                ((coords[:, None]-coords[None, :]) ** 2).sum(-1)
+            )
+            dist = dist_func(self.grid[:, None], self.grid[None, :])
+            self.assertTrue(np.all(euc_dist <= dist + 1E-6), dist_func)
+
+    def test_euclidean_distance(self):
+        dist = EuclideanDistance()(np.array([0., 0.]), np.array([3., 4.]))
+        self.assertAlmostEqual(dist, 5.)
+        dist = EuclideanDistance(coords=[0])(np.array([0., 0.]),
+                                             np.array([3., 4.]))
+        self.assertAlmostEqual(dist, 3.)
+
+    def test_cyclic_distance_wraps_around(self):
+        dist_func = CyclicDistance(40.)
+        dist = dist_func(np.array([[1.], [39.], [15.]]), np.array([[38.]]))
+        np.testing.assert_almost_equal(dist, [3., 1., 17.])
+
+    def test_haversine_distance_known_values(self):
+        dist_func = HaversineDistance(radius=1.)
+        np.testing.assert_almost_equal(
+            dist_func(np.array([0., 0.]), np.array([0., 90.])), np.pi/2
+        )
+        np.testing.assert_almost_equal(
+            dist_func(np.array([90., 0.]), np.array([-90., 0.])), np.pi
+        )
+        np.testing.assert_almost_equal(
+            dist_func(np.array([0., -179.]), np.array([0., 179.])),
+            np.deg2rad(2)
+        )
+        dist_func = HaversineDistance(radius=1., degrees=False)
+        np.testing.assert_almost_equal(
+            dist_func(np.array([0., 0.]), np.array([np.pi/2, 0.])), np.pi/2
+        )
+
+    def test_chord_less_equal_haversine(self):
+        chord = ChordDistance()(self.grid[:, None], self.grid[None, :])
+        haversine = HaversineDistance()(self.grid[:, None],
+                                        self.grid[None, :])
+        self.assertTrue(np.all(chord <= haversine + 1E-6))
+        np.testing.assert_almost_equal(
+            ChordDistance(radius=1.)(np.array([0., 0.]),
+                                     np.array([0., 180.])), 2.
+        )
+
+    def test_log_pressure_distance(self):
+        dist_func = LogPressureDistance(scale_height=7.)
+        dist = dist_func(np.array([[50., 1000.]]), np.array([[20., 500.]]))
+        np.testing.assert_almost_equal(dist, 7. * np.log(2.))
+
+    def test_separated_distance_stacks_distances(self):
+        dist_func = SeparatedDistance(
+            [HaversineDistance(), LogPressureDistance(coord=2)]
+        )
+        dist = dist_func(self.grid[:, None], self.grid[None, :])
+        self.assertTupleEqual(dist.shape, (2, 100, 100))
+        np.testing.assert_equal(
+            dist[1], LogPressureDistance(coord=2)(self.grid[:, None],
+                                                  self.grid[None, :])
+        )
+        self.assertTupleEqual(dist_func.to_coords(self.grid).shape,
+                              (100, 4))
+
+    def test_repr_contains_params(self):
+        self.assertEqual(repr(CyclicDistance(40.)),
+                         'CyclicDistance(coord=0, period=40.0)')
+
+    def test_cache_key_depends_on_distance_params(self):
+        state_grid = np.arange(40.)
+        key = CachedLocalization(GaspariCohn(
+            5., dist_func=CyclicDistance(40.)
+        )).get_key(state_grid, state_grid)
+        other_key = CachedLocalization(GaspariCohn(
+            5., dist_func=CyclicDistance(20.)
+        )).get_key(state_grid, state_grid)
+        self.assertNotEqual(key, other_key)
+
+
+class TestDistanceLocalization(unittest.TestCase):
+    def setUp(self):
+        self.state_grid = np.arange(40, dtype=float)
+        self.obs_grid = np.arange(0, 40, 0.7)
+        lat = rnd.uniform(-80, 80, size=300)
+        lon = rnd.uniform(0, 360, size=300)
+        self.sphere_grid = np.stack([lat, lon], axis=-1)
+
+    def test_cyclic_localization_wraps_around(self):
+        loc = GaspariCohn(5., dist_func=CyclicDistance(40.))
+        use_obs, weights = loc.localize_obs(1., self.obs_grid)
+        self.assertTrue(use_obs[-1])
+        self.assertGreater(weights[-1], 0)
+
+    def test_index_equals_full_scan(self):
+        for dist_func in [EuclideanDistance(), CyclicDistance(40.)]:
+            loc = GaspariCohn(5., dist_func=dist_func)
+            index_loc = GaspariCohn(5., dist_func=dist_func, use_index=True)
+            loc_matrix = loc.localize_all(self.state_grid, self.obs_grid)
+            index_matrix = index_loc.localize_all(self.state_grid,
+                                                  self.obs_grid)
+            np.testing.assert_equal(index_matrix.toarray(),
+                                    loc_matrix.toarray())
+
+    def test_spherical_index_equals_full_scan(self):
+        for dist_func in [HaversineDistance(), ChordDistance()]:
+            loc = GaspariCohn(1000., dist_func=dist_func)
+            index_loc = GaspariCohn(1000., dist_func=dist_func,
+                                    use_index=True)
+            loc_matrix = loc.localize_all(self.sphere_grid[:50],
+                                          self.sphere_grid)
+            index_matrix = index_loc.localize_all(self.sphere_grid[:50],
+                                                  self.sphere_grid)
+            self.assertGreater(loc_matrix.nnz, 50)
+            np.testing.assert_equal(index_matrix.toarray(),
+                                    loc_matrix.toarray())
+
+    def test_spherical_obs_subset_contains_used_obs(self):
+        loc = GaspariCohn(1000., dist_func=HaversineDistance(),
+                          use_index=True)
+        loc_matrix = loc.localize_all(self.sphere_grid[:50],
+                                      self.sphere_grid)
+        obs_subset = loc.get_obs_subset(self.sphere_grid[:50],
+                                        self.sphere_grid)
+        self.assertTrue(np.all(np.isin(loc_matrix.indices, obs_subset)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,7 @@ Created for torch-assimilate
 """
 # System modules
 import unittest
+from unittest.mock import patch
 import logging
 import os
 import warnings
@@ -29,10 +30,13 @@ import warnings
 # External modules
 import xarray as xr
 import numpy as np
+import torch
 
 # Internal modules
-from pytassim.localization.gaspari_cohn import GaspariCohn, GaspariCohnInf
-from pytassim.testing import dummy_distance
+from pytassim.localization.gaspari_cohn import GaspariCohn, GaspariCohnInf, \
+    gaspari_cohn_taper, gaspari_cohn_inf_taper
+from pytassim.localization.localization import BaseLocalization
+from pytassim.testing import dummy_distance, DummyLocalization
 
 
 logging.basicConfig(level=logging.INFO)
@@ -41,34 +45,73 @@ BASE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 DATA_PATH = os.path.join(os.path.dirname(BASE_PATH), 'data')
 
 
+def gc_f1(dist):
+    f1 = - 1 / 4 * dist ** 5
+    f1 += 1 / 2 * dist ** 4
+    f1 += 5 / 8 * dist ** 3
+    f1 -= 5 / 3 * dist ** 2
+    f1 += 1
+    return f1
+
+
+def gc_f2(dist):
+    f2 = 1 / 12 * dist ** 5
+    f2 -= 1 / 2 * dist ** 4
+    f2 += 5 / 8 * dist ** 3
+    f2 += 5 / 3 * dist ** 2
+    f2 -= 5 * dist
+    f2 += 4
+    f2 -= 2 / 3 / dist
+    return f2
+
+
+def gc_inf_f1(dist):
+    f1 = -28 * dist ** 5 / 33
+    f1 += 8 * dist ** 4 / 11
+    f1 += 20 * dist ** 3 / 11
+    f1 -= 80 * dist ** 2 / 33
+    f1 += 1
+    return f1
+
+
+def gc_inf_f2(dist):
+    f2 = 20 * dist ** 5 / 33
+    f2 -= 16 * dist ** 4 / 11
+    f2 += 100 * dist ** 2 / 33
+    f2 -= 45 * dist / 11
+    f2 += 51 / 22
+    f2 -= 7 / (44 * dist)
+    return f2
+
+
+def gc_inf_f3(dist):
+    f3 = -4 * dist ** 5 / 11
+    f3 += 16 * dist ** 4 / 11
+    f3 -= 10 * dist ** 3 / 11
+    f3 -= 100 * dist ** 2 / 33
+    f3 += 5 * dist
+    f3 -= 61 / 22
+    f3 += 115 / (132 * dist)
+    return f3
+
+
+def gc_inf_f4(dist):
+    f4 = 4 * dist ** 5 / 33
+    f4 -= 8 * dist ** 4 / 11
+    f4 += 10 * dist ** 3 / 11
+    f4 += 80 * dist ** 2 / 33
+    f4 -= 80 * dist / 11
+    f4 += 64 / 11
+    f4 -= 32 / (33 * dist)
+    return f4
+
+
 class TestGaspariCohn(unittest.TestCase):
     def setUp(self):
         state_path = os.path.join(DATA_PATH, 'test_state.nc')
         state = xr.open_dataarray(state_path).load()
         self.grid = state.grid.values.astype(float)
         self.loc = GaspariCohn(5., dist_func=dummy_distance)
-        self.dist = dummy_distance(10, self.grid)
-
-    def test_f1_returns_f1_from_gc99(self):
-        f1 = - 1 / 4 * self.dist ** 5
-        f1 += 1 / 2 * self.dist ** 4
-        f1 += 5 / 8 * self.dist ** 3
-        f1 -= 5 / 3 * self.dist ** 2
-        f1 += 1
-
-        ret_f1 = self.loc._f1(self.dist)
-        np.testing.assert_equal(ret_f1, f1)
-
-    def test_f2_returns_f2_from_gc99(self):
-        f2 = 1 / 12 * self.dist ** 5
-        f2 -= 1 / 2 * self.dist ** 4
-        f2 += 5 / 8 * self.dist ** 3
-        f2 += 5 / 3 * self.dist ** 2
-        f2 -= 5 * self.dist
-        f2 += 4
-        f2 -= 2 / 3 / self.dist
-        ret_f2 = self.loc._f2(self.dist)
-        np.testing.assert_equal(ret_f2, f2)
 
     def test_localize_obs_returns_zero_weight_for_two_times_radius(self):
         zero_weights = np.zeros_like(self.grid)
@@ -82,17 +125,98 @@ class TestGaspariCohn(unittest.TestCase):
         weights = np.zeros_like(self.grid)
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            weights[conds[0]] = self.loc._f2(grid_radi[conds[0]])
-        weights[conds[1]] = self.loc._f1(grid_radi[conds[1]])
+            weights[conds[0]] = gc_f2(grid_radi[conds[0]])
+        weights[conds[1]] = gc_f1(grid_radi[conds[1]])
 
         _, ret_weights = self.loc.localize_obs(0, self.grid)
-        np.testing.assert_equal(ret_weights, weights)
+        np.testing.assert_allclose(ret_weights, weights, rtol=0, atol=1E-12)
 
     def test_localize_obs_returns_use_obs_bool(self):
         ret_use_obs, ret_weights = self.loc.localize_obs(0, self.grid)
         use_obs = ret_weights > 0
         np.testing.assert_equal(ret_use_obs, use_obs)
 
+    def test_localize_all_returns_sparse_weights_of_all_grid_points(self):
+        state_grid = np.arange(-5, 45, dtype=float)
+        loc_matrix = self.loc.localize_all(state_grid, self.grid)
+        self.assertTupleEqual(loc_matrix.shape, (50, 40))
+        for k, grid_ind in enumerate(state_grid):
+            use_obs, weights = self.loc.localize_obs(grid_ind, self.grid)
+            np.testing.assert_equal(loc_matrix[k].indices,
+                                    np.nonzero(use_obs)[0])
+            np.testing.assert_equal(loc_matrix[k].data, weights[use_obs])
+
+    def test_localize_obs_batch_equals_single_points(self):
+        grid_points = np.arange(-5, 45, 3, dtype=float)
+        for use_index in (False, True):
+            self.loc.use_index = use_index
+            use_obs, weights = self.loc.localize_obs_batch(grid_points,
+                                                           self.grid)
+            self.assertTupleEqual(weights.shape, (len(grid_points), 40))
+            for k, grid_ind in enumerate(grid_points):
+                right_use, right_weights = self.loc.localize_obs(grid_ind,
+                                                                 self.grid)
+                np.testing.assert_equal(use_obs[k], right_use)
+                np.testing.assert_almost_equal(weights[k], right_weights)
+
+    def test_localize_obs_batch_calls_distance_once(self):
+        grid_points = np.arange(10, 20, dtype=float)
+        with patch.object(self.loc, 'dist_func',
+                          wraps=dummy_distance) as dist_patch:
+            _ = self.loc.localize_obs_batch(grid_points, self.grid)
+        dist_patch.assert_called_once()
+
+    def test_localize_obs_batch_supports_multiple_distances(self):
+        grid = np.stack(np.meshgrid(
+            np.arange(10.), np.arange(8.), indexing='ij'
+        ), axis=-1).reshape(-1, 2)
+        loc = GaspariCohn((3., 5.), dist_func=lambda a, b: np.abs(a-b).T)
+        use_obs, weights = loc.localize_obs_batch(grid[:7], grid)
+        for k, grid_ind in enumerate(grid[:7]):
+            right_use, right_weights = loc.localize_obs(grid_ind, grid)
+            np.testing.assert_equal(use_obs[k], right_use)
+            np.testing.assert_almost_equal(weights[k], right_weights)
+
+    def test_base_localize_obs_batch_stacks_single_points(self):
+        localization = DummyLocalization()
+        grid = self.grid.reshape(-1, 1)
+        use_obs, weights = BaseLocalization.localize_obs_batch(
+            localization, grid[5:10], grid
+        )
+        for k, grid_ind in enumerate(grid[5:10]):
+            right_use, right_weights = localization.localize_obs(grid_ind,
+                                                                 grid)
+            np.testing.assert_equal(use_obs[k], right_use)
+            np.testing.assert_equal(weights[k], right_weights)
+
+    def test_get_obs_subset_returns_none_without_index(self):
+        state_grid = np.arange(10, 20, dtype=float)
+        self.assertIsNone(self.loc.get_obs_subset(state_grid, self.grid))
+
+    def test_get_obs_subset_returns_obs_within_halo(self):
+        self.loc.use_index = True
+        state_grid = np.arange(10, 20, dtype=float)
+        ret_ind = self.loc.get_obs_subset(state_grid, self.grid)
+        right_ind = np.nonzero((self.grid >= 0) & (self.grid <= 29))[0]
+        np.testing.assert_equal(ret_ind, right_ind)
+        loc_matrix = self.loc.localize_all(state_grid, self.grid)
+        self.assertTrue(np.all(np.isin(loc_matrix.indices, ret_ind)))
+
+    def test_count_obs_returns_number_of_used_obs(self):
+        state_grid = np.arange(-5, 45, dtype=float)
+        loc_matrix = self.loc.localize_all(state_grid, self.grid)
+        ret_count = self.loc.count_obs(state_grid, self.grid)
+        np.testing.assert_equal(ret_count, np.diff(loc_matrix.indptr))
+
+    def test_count_obs_uses_index_as_upper_bound(self):
+        self.loc.use_index = True
+        state_grid = np.arange(-5, 45, dtype=float)
+        loc_matrix = self.loc.localize_all(state_grid, self.grid)
+        with patch.object(GaspariCohn, 'localize_all') as loc_patch:
+            ret_count = self.loc.count_obs(state_grid, self.grid)
+        loc_patch.assert_not_called()
+        self.assertTrue(np.all(ret_count >= np.diff(loc_matrix.indptr)))
+
 
 class TestGaspariCohnInf(unittest.TestCase):
     def setUp(self):
@@ -100,51 +224,6 @@ class TestGaspariCohnInf(unittest.TestCase):
         state = xr.open_dataarray(state_path).load()
         self.grid = state.grid.values.astype(float)
         self.loc = GaspariCohnInf(5., dist_func=dummy_distance)
-        self.dist = dummy_distance(10, self.grid)
-
-    def test_f1_returns_f1_from_gc99(self):
-        ret_f1 = self.loc._f1(self.dist)
-        f1 = -28 * self.dist**5 / 33
-        f1 += 8 * self.dist**4 / 11
-        f1 += 20 * self.dist**3 / 11
-        f1 -= 80 * self.dist**2 / 33
-        f1 += 1
-        np.testing.assert_equal(ret_f1, f1)
-
-    def test_f2_returns_f2_from_gc99(self):
-        f2 = 20 * self.dist ** 5 / 33
-        f2 -= 16 * self.dist ** 4 / 11
-        f2 += 100 * self.dist ** 2 / 33
-        f2 -= 45 * self.dist / 11
-        f2 += 51 / 22
-        f2 -= 7 / (44 * self.dist)
-
-        ret_f2 = self.loc._f2(self.dist)
-        np.testing.assert_equal(ret_f2, f2)
-
-    def test_f3_returns_f3_from_gc99(self):
-        f3 = -4 * self.dist ** 5 / 11
-        f3 += 16 * self.dist ** 4 / 11
-        f3 -= 10 * self.dist ** 3 / 11
-        f3 -= 100 * self.dist ** 2 / 33
-        f3 += 5 * self.dist
-        f3 -= 61 / 22
-        f3 += 115 / (132 * self.dist)
-
-        ret_f3 = self.loc._f3(self.dist)
-        np.testing.assert_equal(ret_f3, f3)
-
-    def test_f4_returns_f4_from_gc99(self):
-        f4 = 4 * self.dist ** 5 / 33
-        f4 -= 8 * self.dist ** 4 / 11
-        f4 += 10 * self.dist ** 3 / 11
-        f4 += 80 * self.dist ** 2 / 33
-        f4 -= 80 * self.dist / 11
-        f4 += 64 / 11
-        f4 -= 32 / (33 * self.dist)
-
-        ret_f4 = self.loc._f4(self.dist)
-        np.testing.assert_equal(ret_f4, f4)
 
     def test_localize_obs_returns_zero_weight_for_two_times_radius(self):
         zero_weights = np.zeros_like(self.grid)
@@ -152,24 +231,80 @@ class TestGaspariCohnInf(unittest.TestCase):
         np.testing.assert_equal(ret_weights, zero_weights)
 
     def test_localize_obs_returns_right_weights(self):
+        grid_radi = self.grid / self.loc.radius
         conds = [2, 1.5, 1, 0.5]
-        conds = [self.grid < c * self.loc.radius for c in conds]
+        conds = [grid_radi < c for c in conds]
         weights = np.zeros_like(self.grid)
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            weights[conds[0]] = self.loc._f4(self.grid[conds[0]] / self.loc.radius)
-            weights[conds[1]] = self.loc._f3(self.grid[conds[1]] / self.loc.radius)
-            weights[conds[2]] = self.loc._f2(self.grid[conds[2]] / self.loc.radius)
-        weights[conds[3]] = self.loc._f1(self.grid[conds[3]] / self.loc.radius)
+            weights[conds[0]] = gc_inf_f4(grid_radi[conds[0]])
+            weights[conds[1]] = gc_inf_f3(grid_radi[conds[1]])
+            weights[conds[2]] = gc_inf_f2(grid_radi[conds[2]])
+        weights[conds[3]] = gc_inf_f1(grid_radi[conds[3]])
 
         _, ret_weights = self.loc.localize_obs(0, self.grid)
-        np.testing.assert_equal(ret_weights, weights)
+        np.testing.assert_allclose(ret_weights, weights, rtol=0, atol=1E-12)
 
     def test_localize_obs_returns_use_obs_bool(self):
         ret_use_obs, ret_weights = self.loc.localize_obs(0, self.grid)
         use_obs = ret_weights > 0
         np.testing.assert_equal(ret_use_obs, use_obs)
 
+    def test_localize_obs_batch_equals_single_points(self):
+        grid_points = np.arange(-5, 45, 3, dtype=float)
+        use_obs, weights = self.loc.localize_obs_batch(grid_points, self.grid)
+        for k, grid_ind in enumerate(grid_points):
+            right_use, right_weights = self.loc.localize_obs(grid_ind,
+                                                             self.grid)
+            np.testing.assert_equal(use_obs[k], right_use)
+            np.testing.assert_almost_equal(weights[k], right_weights)
+
+
+class TestGaspariCohnTaper(unittest.TestCase):
+    def setUp(self):
+        self.dist = np.concatenate([
+            np.linspace(0, 3, 1001), [0., 0.5, 1., 1.5, 2., 1E300, np.inf]
+        ])
+
+    def test_taper_equals_piecewise_functions(self):
+        for taper_func, funcs, thres in (
+                (gaspari_cohn_taper, [gc_f2, gc_f1], [2, 1]),
+                (gaspari_cohn_inf_taper,
+                 [gc_inf_f4, gc_inf_f3, gc_inf_f2, gc_inf_f1],
+                 [2, 1.5, 1, 0.5])
+        ):
+            right_taper = np.zeros_like(self.dist)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                for c, func in zip(thres, funcs):
+                    cond = self.dist < c
+                    right_taper[cond] = func(self.dist[cond])
+            ret_taper = taper_func(self.dist)
+            np.testing.assert_allclose(ret_taper, right_taper, rtol=0,
+                                       atol=1E-12)
+
+    def test_taper_raises_no_warnings(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            for taper_func in (gaspari_cohn_taper, gaspari_cohn_inf_taper):
+                taper = taper_func(self.dist)
+                self.assertEqual(taper[0], 1.)
+                np.testing.assert_equal(taper[-3:], 0.)
+
+    def test_taper_supports_torch(self):
+        for taper_func in (gaspari_cohn_taper, gaspari_cohn_inf_taper):
+            dist = torch.tensor(self.dist[:-2], dtype=torch.float32,
+                                requires_grad=True)
+            ret_taper = taper_func(dist)
+            self.assertIsInstance(ret_taper, torch.Tensor)
+            self.assertEqual(ret_taper.dtype, torch.float32)
+            np.testing.assert_allclose(ret_taper.detach().numpy(),
+                                       taper_func(self.dist[:-2]),
+                                       atol=1E-6)
+            ret_taper.sum().backward()
+            self.assertTrue(torch.all(dist.grad[dist > 2] == 0))
+            self.assertTrue(torch.all(dist.grad[dist < 2] <= 1E-5))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,150 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+from unittest.mock import patch
+
+# External modules
+import numpy as np
+
+# Internal modules
+from pytassim.localization.nearest import NearestLocalization
+from pytassim.localization.gaspari_cohn import GaspariCohn
+from pytassim.testing import dummy_distance
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestNearestLocalization(unittest.TestCase):
+    def setUp(self):
+        self.state_grid = np.arange(40, dtype=float)
+        self.obs_grid = np.arange(0, 40, 0.7)
+        self.base_loc = GaspariCohn(5., dist_func=dummy_distance)
+        self.localization = NearestLocalization(self.base_loc, n_obs=4)
+
+    def test_init_raises_value_error_without_obs(self):
+        with self.assertRaises(ValueError):
+            NearestLocalization(self.base_loc, n_obs=0)
+
+    def test_localize_obs_uses_nearest_obs(self):
+        use_obs, weights = self.localization.localize_obs(10.,
+                                                          self.obs_grid)
+        right_ind = np.sort(np.argsort(np.abs(self.obs_grid-10.))[:4])
+        np.testing.assert_equal(np.nonzero(use_obs)[0], right_ind)
+        _, base_weights = self.base_loc.localize_obs(10., self.obs_grid)
+        np.testing.assert_almost_equal(weights[right_ind],
+                                       base_weights[right_ind])
+        self.assertEqual(np.count_nonzero(weights), 4)
+
+    def test_localize_obs_uses_highest_weights(self):
+        self.localization.by_weight = True
+        use_obs, weights = self.localization.localize_obs(10.,
+                                                          self.obs_grid)
+        _, base_weights = self.base_loc.localize_obs(10., self.obs_grid)
+        right_ind = np.sort(np.argsort(-base_weights)[:4])
+        np.testing.assert_equal(np.nonzero(use_obs)[0], right_ind)
+        np.testing.assert_almost_equal(weights[right_ind],
+                                       base_weights[right_ind])
+
+    def test_localize_all_is_bounded_by_n_obs(self):
+        loc_matrix = self.localization.localize_all(self.state_grid,
+                                                    self.obs_grid)
+        self.assertTrue(np.all(np.diff(loc_matrix.indptr) <= 4))
+        base_matrix = self.base_loc.localize_all(self.state_grid,
+                                                 self.obs_grid)
+        self.assertTrue(np.all(np.diff(base_matrix.indptr) > 4))
+
+    def test_localize_all_equals_wrapped_for_many_obs(self):
+        self.localization.n_obs = len(self.obs_grid)
+        for by_weight in (False, True):
+            self.localization.by_weight = by_weight
+            loc_matrix = self.localization.localize_all(self.state_grid,
+                                                        self.obs_grid)
+            base_matrix = self.base_loc.localize_all(self.state_grid,
+                                                     self.obs_grid)
+            np.testing.assert_almost_equal(loc_matrix.toarray(),
+                                           base_matrix.toarray())
+
+    def test_localize_obs_batch_equals_localize_obs(self):
+        self.obs_grid = np.arange(0, 40, 0.5)
+        for by_weight in (False, True):
+            self.localization.by_weight = by_weight
+            for use_index in (False, True):
+                self.base_loc.use_index = use_index
+                use_obs, weights = self.localization.localize_obs_batch(
+                    self.state_grid, self.obs_grid
+                )
+                for k, grid_ind in enumerate(self.state_grid):
+                    right_use, right_weights = self.localization.localize_obs(
+                        grid_ind, self.obs_grid
+                    )
+                    np.testing.assert_equal(use_obs[k], right_use)
+                    np.testing.assert_almost_equal(weights[k], right_weights)
+
+    def test_localize_obs_batch_calls_wrapped_batch_once(self):
+        for by_weight in (False, True):
+            self.localization.by_weight = by_weight
+            with patch.object(self.base_loc, 'localize_obs_batch',
+                              wraps=self.base_loc.localize_obs_batch) as \
+                    batch_patch:
+                _ = self.localization.localize_obs_batch(self.state_grid,
+                                                         self.obs_grid)
+            batch_patch.assert_called_once()
+
+    def test_localize_obs_batch_reuses_index_of_wrapped(self):
+        self.base_loc.use_index = True
+        _ = self.localization.localize_obs_batch(self.state_grid[:2],
+                                                 self.obs_grid)
+        obs_index = self.base_loc._obs_index
+        _ = self.localization.localize_obs_batch(self.state_grid[2:],
+                                                 self.obs_grid)
+        self.assertIs(self.base_loc._obs_index, obs_index)
+        self.assertIs(obs_index.grid, self.obs_grid)
+
+    def test_count_obs_uses_index_without_weights(self):
+        with patch.object(self.base_loc, 'localize_all') as all_patch:
+            ret_count = self.localization.count_obs(self.state_grid,
+                                                    self.obs_grid)
+        all_patch.assert_not_called()
+        np.testing.assert_equal(ret_count, 4)
+
+    def test_count_obs_is_bounded_by_n_obs(self):
+        ret_count = self.localization.count_obs(self.state_grid,
+                                                self.obs_grid)
+        np.testing.assert_equal(ret_count, 4)
+
+    def test_obs_subset_contains_all_used_obs(self):
+        loc_matrix = self.localization.localize_all(self.state_grid[5:15],
+                                                    self.obs_grid)
+        obs_subset = self.localization.get_obs_subset(self.state_grid[5:15],
+                                                      self.obs_grid)
+        self.assertTrue(np.all(np.isin(loc_matrix.indices, obs_subset)))
+        self.assertLess(len(obs_subset), len(self.obs_grid))
+
+
+if __name__ == '__main__':
+    unittest.main()
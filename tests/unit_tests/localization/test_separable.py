@@ -0,0 +1,140 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+
+# External modules
+import numpy as np
+
+# Internal modules
+from pytassim.localization.separable import SeparableGaspariCohn
+from pytassim.localization.gaspari_cohn import GaspariCohn
+from pytassim.localization.distance import HaversineDistance, \
+    LogPressureDistance, SeparatedDistance, EuclideanDistance
+
+
+logging.basicConfig(level=logging.INFO)
+
+rnd = np.random.RandomState(42)
+
+
+class TestSeparableGaspariCohn(unittest.TestCase):
+    def setUp(self):
+        lat = np.linspace(-10, 10, 10)
+        lon = np.linspace(0, 20, 10)
+        pres = np.linspace(100, 1000, 8)
+        self.state_grid = np.stack(
+            np.meshgrid(lat, lon, pres, indexing='ij'), axis=-1
+        ).reshape(-1, 3)
+        self.obs_grid = self.state_grid[
+            rnd.choice(len(self.state_grid), size=200, replace=False)
+        ]
+        self.hori_dist = HaversineDistance()
+        self.vert_dist = LogPressureDistance(coord=2)
+        self.localization = SeparableGaspariCohn(
+            (500., 0.5), self.hori_dist, self.vert_dist
+        )
+
+    def test_init_raises_value_error_for_wrong_scales(self):
+        with self.assertRaises(ValueError):
+            SeparableGaspariCohn(500., self.hori_dist, self.vert_dist)
+
+    def test_localize_all_equals_gaspari_cohn(self):
+        loc = GaspariCohn(
+            (500., 0.5), SeparatedDistance([self.hori_dist, self.vert_dist])
+        )
+        right_matrix = loc.localize_all(self.state_grid, self.obs_grid)
+        ret_matrix = self.localization.localize_all(self.state_grid,
+                                                    self.obs_grid)
+        self.assertGreater(right_matrix.nnz, 0)
+        np.testing.assert_allclose(ret_matrix.toarray(),
+                                   right_matrix.toarray())
+
+    def test_localize_obs_equals_gaspari_cohn(self):
+        loc = GaspariCohn(
+            (500., 0.5), SeparatedDistance([self.hori_dist, self.vert_dist])
+        )
+        right_use, right_weights = loc.localize_obs(self.state_grid[123],
+                                                    self.obs_grid)
+        ret_use, ret_weights = self.localization.localize_obs(
+            self.state_grid[123], self.obs_grid
+        )
+        np.testing.assert_equal(ret_use, right_use)
+        np.testing.assert_allclose(ret_weights, right_weights)
+
+    def test_vert_coord_selects_vertical_coordinate(self):
+        state_grid = self.state_grid[:, [2, 0, 1]]
+        obs_grid = self.obs_grid[:, [2, 0, 1]]
+        loc = SeparableGaspariCohn(
+            (500., 0.5), HaversineDistance(lat_coord=1, lon_coord=2),
+            LogPressureDistance(coord=0), vert_coord=0
+        )
+        np.testing.assert_allclose(
+            loc.localize_all(state_grid, obs_grid).toarray(),
+            self.localization.localize_all(self.state_grid,
+                                           self.obs_grid).toarray()
+        )
+
+    def test_tables_are_estimated_for_unique_columns_and_levels(self):
+        shapes = []
+
+        def get_table(dist_func, points, obs, radius):
+            shapes.append((len(points), len(obs)))
+            return SeparableGaspariCohn._get_table(
+                self.localization, dist_func, points, obs, radius
+            )
+        self.localization._get_table = get_table
+        _ = self.localization.localize_obs_batch(self.state_grid,
+                                                 self.obs_grid)
+        n_obs_cols = len(np.unique(self.obs_grid[:, :2], axis=0))
+        n_obs_levs = len(np.unique(self.obs_grid[:, 2]))
+        self.assertListEqual(shapes, [(100, n_obs_cols), (8, n_obs_levs)])
+
+    def test_index_equals_full_scan(self):
+        loc = SeparableGaspariCohn(
+            (500., 0.5), self.hori_dist, self.vert_dist, use_index=True
+        )
+        np.testing.assert_equal(
+            loc.localize_all(self.state_grid, self.obs_grid).toarray(),
+            self.localization.localize_all(self.state_grid,
+                                           self.obs_grid).toarray()
+        )
+
+    def test_euclidean_horizontal_distance(self):
+        loc = SeparableGaspariCohn(
+            (5., 0.5), EuclideanDistance(coords=[0, 1]), self.vert_dist
+        )
+        right_loc = GaspariCohn((5., 0.5), SeparatedDistance(
+            [EuclideanDistance(coords=[0, 1]), self.vert_dist]
+        ))
+        np.testing.assert_allclose(
+            loc.localize_all(self.state_grid, self.obs_grid).toarray(),
+            right_loc.localize_all(self.state_grid, self.obs_grid).toarray()
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
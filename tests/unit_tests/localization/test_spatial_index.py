@@ -0,0 +1,215 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 17.10.26
+
+Created for torch-assimilate
+
+@author: Tobias Sebastian Finn, tobias.sebastian.finn@uni-hamburg.de
+
+    Copyright (C) {2026}  {Tobias Sebastian Finn}
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+# System modules
+import unittest
+import logging
+import pickle
+
+# External modules
+import numpy as np
+
+# Internal modules
+from pytassim.localization.spatial_index import SpatialIndex
+from pytassim.localization.gaspari_cohn import GaspariCohn, GaspariCohnInf
+
+
+logging.basicConfig(level=logging.INFO)
+rnd = np.random.RandomState(42)
+
+
+def euclidean_distance(a, b):
+    return np.sqrt(np.sum((a-b)**2, axis=-1))
+
+
+def separated_distance(a, b):
+    return np.abs(a-b).T
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.grid = rnd.uniform(0, 100, size=(500, 2))
+        self.index = SpatialIndex(self.grid)
+
+    def test_query_returns_sorted_points_within_radius(self):
+        point = np.array([50., 40.])
+        dist = euclidean_distance(point, self.grid)
+        right_ind = np.nonzero(dist <= 10)[0]
+        ret_ind = self.index.query(point, 10)
+        np.testing.assert_equal(ret_ind, right_ind)
+
+    def test_query_works_for_scalar_points_and_1d_grids(self):
+        grid = np.arange(40, dtype=float)
+        index = SpatialIndex(grid)
+        ret_ind = index.query(10, 2.5)
+        np.testing.assert_equal(ret_ind, np.array([8, 9, 10, 11, 12]))
+
+    def test_query_returns_empty_int_array_if_nothing_found(self):
+        ret_ind = self.index.query(np.array([500., 500.]), 10)
+        self.assertEqual(len(ret_ind), 0)
+        self.assertEqual(ret_ind.dtype, int)
+
+    def test_count_returns_number_of_points_within_radius(self):
+        points = rnd.uniform(0, 100, size=(20, 2))
+        ret_count = self.index.count(points, 10)
+        self.assertTupleEqual(ret_count.shape, (20, ))
+        for k, point in enumerate(points):
+            self.assertEqual(ret_count[k], len(self.index.query(point, 10)))
+
+    def test_nearest_returns_nearest_points_sorted_by_distance(self):
+        points = rnd.uniform(0, 100, size=(20, 2))
+        ret_ind = self.index.nearest(points, 5)
+        self.assertTupleEqual(ret_ind.shape, (20, 5))
+        for k, point in enumerate(points):
+            dist = euclidean_distance(point, self.grid)
+            np.testing.assert_equal(ret_ind[k], np.argsort(dist)[:5])
+
+    def test_nearest_pads_missing_points_within_radius(self):
+        grid = np.arange(40, dtype=float)
+        index = SpatialIndex(grid)
+        ret_ind = index.nearest(np.array([0., 20.]), 4, radius=1.)
+        np.testing.assert_equal(ret_ind[0], np.array([0, 1, -1, -1]))
+        np.testing.assert_equal(np.sort(ret_ind[1][:3]), [19, 20, 21])
+        self.assertEqual(ret_ind[1][3], -1)
+
+    def test_query_union_returns_union_of_queries(self):
+        points = rnd.uniform(0, 100, size=(20, 2))
+        right_ind = np.unique(np.concatenate(
+            [self.index.query(point, 10) for point in points]
+        ))
+        np.testing.assert_equal(self.index.query_union(points, 10), right_ind)
+
+    def test_query_pairs_returns_pairs_of_queries(self):
+        points = rnd.uniform(0, 100, size=(20, 2))
+        point_ind, grid_ind = self.index.query_pairs(points, 10)
+        np.testing.assert_equal(point_ind, np.sort(point_ind))
+        for k, point in enumerate(points):
+            np.testing.assert_equal(np.sort(grid_ind[point_ind == k]),
+                                    self.index.query(point, 10))
+
+    def test_fits_checks_grid(self):
+        self.assertTrue(self.index.fits(self.grid))
+        self.assertTrue(self.index.fits(self.grid.copy()))
+        self.assertFalse(self.index.fits(self.grid[:-1]))
+        self.assertFalse(self.index.fits(self.grid + 1))
+
+    def test_index_can_be_pickled(self):
+        index = pickle.loads(pickle.dumps(self.index))
+        np.testing.assert_equal(index.query(np.array([50., 40.]), 10),
+                                self.index.query(np.array([50., 40.]), 10))
+
+
+class TestIndexLocalization(unittest.TestCase):
+    def setUp(self):
+        self.obs_grid = rnd.uniform(0, 100, size=(500, 2))
+        self.grid_point = np.array([30., 60.])
+
+    def test_localization_caches_index(self):
+        loc = GaspariCohn(5., dist_func=euclidean_distance, use_index=True)
+        self.assertIsNone(loc._obs_index)
+        _ = loc.localize_obs(self.grid_point, self.obs_grid)
+        index = loc._obs_index
+        self.assertIsInstance(index, SpatialIndex)
+        _ = loc.localize_obs(self.grid_point + 1, self.obs_grid)
+        self.assertEqual(id(index), id(loc._obs_index))
+        _ = loc.localize_obs(self.grid_point, self.obs_grid[:-1])
+        self.assertNotEqual(id(index), id(loc._obs_index))
+
+    def test_pickled_localization_drops_index(self):
+        loc = GaspariCohn(5., dist_func=euclidean_distance, use_index=True)
+        use_obs, weights = loc.localize_obs(self.grid_point, self.obs_grid)
+        self.assertIsNotNone(loc._obs_index)
+        ret_loc = pickle.loads(pickle.dumps(loc))
+        self.assertIsNone(ret_loc._obs_index)
+        self.assertIsNotNone(loc._obs_index)
+        ret_use, ret_weights = ret_loc.localize_obs(self.grid_point,
+                                                    self.obs_grid)
+        np.testing.assert_equal(ret_use, use_obs)
+        np.testing.assert_almost_equal(ret_weights, weights)
+
+    def test_gaspari_cohn_index_equals_full_scan(self):
+        loc = GaspariCohn(5., dist_func=euclidean_distance)
+        index_loc = GaspariCohn(5., dist_func=euclidean_distance,
+                                use_index=True)
+        use_obs, weights = loc.localize_obs(self.grid_point, self.obs_grid)
+        ret_use_obs, ret_weights = index_loc.localize_obs(
+            self.grid_point, self.obs_grid
+        )
+        self.assertTrue(np.any(use_obs))
+        np.testing.assert_equal(ret_use_obs, use_obs)
+        np.testing.assert_equal(ret_weights, weights)
+
+    def test_gaspari_cohn_index_equals_full_scan_tuple_scale(self):
+        loc = GaspariCohn((5., 10.), dist_func=separated_distance)
+        index_loc = GaspariCohn((5., 10.), dist_func=separated_distance,
+                                use_index=True)
+        use_obs, weights = loc.localize_obs(self.grid_point, self.obs_grid)
+        ret_use_obs, ret_weights = index_loc.localize_obs(
+            self.grid_point, self.obs_grid
+        )
+        self.assertTrue(np.any(use_obs))
+        np.testing.assert_equal(ret_use_obs, use_obs)
+        np.testing.assert_equal(ret_weights, weights)
+
+    def test_gaspari_cohn_inf_index_equals_full_scan(self):
+        loc = GaspariCohnInf(5., dist_func=euclidean_distance)
+        index_loc = GaspariCohnInf(5., dist_func=euclidean_distance,
+                                   use_index=True)
+        use_obs, weights = loc.localize_obs(self.grid_point, self.obs_grid)
+        ret_use_obs, ret_weights = index_loc.localize_obs(
+            self.grid_point, self.obs_grid
+        )
+        self.assertTrue(np.any(use_obs))
+        np.testing.assert_equal(ret_use_obs, use_obs)
+        np.testing.assert_equal(ret_weights, weights)
+
+    def test_localize_all_only_estimates_distances_within_cutoff(self):
+        state_grid = rnd.uniform(0, 100, size=(50, 2))
+        n_pairs = []
+
+        def counted_distance(a, b):
+            n_pairs.append(len(a))
+            return euclidean_distance(a, b)
+
+        loc = GaspariCohn(5., dist_func=euclidean_distance)
+        index_loc = GaspariCohn(5., dist_func=counted_distance,
+                                use_index=True)
+        loc_matrix = loc.localize_all(state_grid, self.obs_grid)
+        ret_matrix = index_loc.localize_all(state_grid, self.obs_grid)
+        np.testing.assert_almost_equal(ret_matrix.toarray(),
+                                       loc_matrix.toarray())
+        right_pairs = index_loc._obs_index.count(state_grid,
+                                                 index_loc.cutoff).sum()
+        self.assertEqual(sum(n_pairs), right_pairs)
+        self.assertLess(sum(n_pairs), len(state_grid) * len(self.obs_grid))
+
+    def test_localize_all_returns_empty_matrix_without_obs(self):
+        loc = GaspariCohn(5., dist_func=euclidean_distance, use_index=True)
+        ret_matrix = loc.localize_all(self.obs_grid[:10], self.obs_grid[:0])
+        self.assertTupleEqual(ret_matrix.shape, (10, 0))
+        self.assertEqual(ret_matrix.nnz, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()